@@ -0,0 +1,355 @@
+"""
+Benchmark cases for the engine hot paths
+
+Each case takes a Dataset, does its setup and returns the zero-argument callable that gets timed.
+"""
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# The app modules import each other from the lit_lineups directory (models, services, utils)
+APP_DIR = Path(__file__).resolve().parent.parent / "lit_lineups"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from models.athlete_table import AthleteTable, CAN_COX
+from models.constants import EVENTS_DATA
+from models.lineup_store import LineupStore
+from services.assignment_grid import build_assignment_grid
+from services.auto_assignment import AutoAssignment, affected_events, roster_signature
+from services.boat_assignment import BoatAssignment
+from services.cox_allocation import CoxAllocator
+from services.data_manager import DataManager
+from services.dropout_analysis import DropoutAnalysis, analyze_dropouts
+from services.issue_engine import IssueEngine, SUMMARY_CATEGORIES
+from services.itinerary import ItineraryIndex
+from services.itinerary_export import export_itineraries
+from services.lineup_search import LineupSearch
+from services.lineup_validator import LineupValidator
+from services.roster_import import read_roster_file, upsert_athletes, validate_roster
+from services.schedule import build_schedule
+from services.seat_order import SEATING_OBJECTIVES, optimize_all_seating
+from services.solver_runner import START_TEMPERATURE
+from utils.event_utils import build_timetable, find_event_details, get_event_time, parse_event_requirements
+
+# Registered cases in run order: name -> (function, description)
+CASES = {}
+
+
+def case(name, description):
+    """Register a benchmark case"""
+    def register(func):
+        CASES[name] = (func, description)
+        return func
+    return register
+
+
+class Dataset:
+    """A saved regatta that each case can load fresh copies of"""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.json_str = json.dumps(data)
+        self.data_manager = DataManager()
+
+    @classmethod
+    def from_file(cls, name, filepath):
+        with open(filepath, 'r') as f:
+            return cls(name, json.load(f))
+
+    def load(self):
+        """Fresh RegattaState, with the loader's progress output silenced"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.data_manager.deserialize(self.data)
+
+    def describe(self):
+        return {
+            'athletes': len(self.data.get('athletes', [])),
+            'lineups': len(self.data.get('lineups', {})),
+            'boats': len(self.data.get('boats', []))
+        }
+
+
+def _compact(lineup):
+    """Lineup without empty seats, as the validator expects"""
+    return {
+        'athletes': [a for a in lineup.get('athletes', []) if a is not None],
+        'coxswain': lineup.get('coxswain')
+    }
+
+
+@case('auto_assign', "AutoAssignment.assign_all_preferred_events")
+def auto_assign(dataset):
+    state = dataset.load()
+    return lambda: AutoAssignment(state).assign_all_preferred_events()
+
+
+@case('event_eligibility', "AthleteTable: build, then eligible rowers and coxes for every event and day")
+def event_eligibility(dataset):
+    state = dataset.load()
+    events = [(day, name) for day, day_events in EVENTS_DATA.items() for _, name in day_events]
+
+    def run():
+        table = AthleteTable(state.athletes)
+        can_cox = table.has(CAN_COX)
+        return [int(((table.rower_mask(name) | can_cox) & table.available_on(day)).sum()) for day, name in events]
+    return run
+
+
+@case('lineup_store', "LineupStore: seat matrix and crew statistics for every lineup")
+def lineup_store(dataset):
+    state = dataset.load()
+    table = AthleteTable(state.athletes)
+    return lambda: LineupStore(state.lineups, table).crew_stats()
+
+
+@case('auto_assign_boats', "BoatAssignment.assign_all_boats (equipment tab _auto_assign_boats)")
+def auto_assign_boats(dataset):
+    state = dataset.load()
+    return lambda: BoatAssignment(state).assign_all_boats()
+
+
+@case('validate_lineups', "LineupValidator.validate_lineup over every lineup")
+def validate_lineups(dataset):
+    state = dataset.load()
+    params = state.params
+    validator = LineupValidator()
+    compact_lineups = {event_num: _compact(lineup) for event_num, lineup in state.lineups.items()}
+    events = []
+    for event_num in compact_lineups:
+        event_name, _ = find_event_details(event_num)
+        if event_name:
+            events.append((event_num, parse_event_requirements(event_name)))
+
+    def run():
+        for event_num, requirements in events:
+            validator.validate_lineup(compact_lineups[event_num], requirements, event_num, compact_lineups,
+                                      params.event_spacing_minutes, params.min_gap_minutes, params)
+    return run
+
+
+@case('validate_all', "LineupValidator.validate_all (every lineup in one batch)")
+def validate_all(dataset):
+    state = dataset.load()
+    return lambda: LineupValidator().validate_all(state)
+
+
+def _without_coxswains(state):
+    """Open every cox seat and return the coxed events that had one"""
+    coxed = [event_num for event_num, lineup in state.lineups.items() if lineup.get('coxswain') is not None]
+    for event_num in coxed:
+        state.lineups[event_num]['coxswain'] = None
+    return coxed
+
+
+@case('cox_allocation', "CoxAllocator.refresh: allocate coxswains to every coxed event from scratch")
+def cox_allocation(dataset):
+    state = dataset.load()
+    _without_coxswains(state)
+    return lambda: CoxAllocator().refresh(state)
+
+
+@case('cox_allocation_incremental', "CoxAllocator.refresh after one coxed lineup changed")
+def cox_allocation_incremental(dataset):
+    state = dataset.load()
+    coxed = _without_coxswains(state)
+    table = AthleteTable(state.athletes)
+    allocator = CoxAllocator()
+    allocator.refresh(state)
+    changed = set(coxed[:1])
+    return lambda: allocator.refresh(state, changed, LineupStore(state.lineups, table))
+
+
+@case('optimize_seating', "optimize_all_seating for every lineup under each objective")
+def optimize_seating(dataset):
+    state = dataset.load()
+
+    def run():
+        for objective in SEATING_OBJECTIVES:
+            optimize_all_seating(state, objective)
+    return run
+
+
+@case('lineup_search', "LineupSearch: 20,000 annealing moves over the auto-assigned lineups")
+def lineup_search(dataset):
+    state = dataset.load()
+    AutoAssignment(state).assign_all_preferred_events()
+
+    def run():
+        search = LineupSearch(state, seed=0)
+        for i in range(20000):
+            search.step(START_TEMPERATURE * (1 - i / 20000))
+    return run
+
+
+@case('warm_resolve', "AutoAssignment.reassign_events after five athletes drop a preferred event")
+def warm_resolve(dataset):
+    state = dataset.load()
+    AutoAssignment(state).assign_all_preferred_events()
+    lineups = state.lineups
+    signature = roster_signature(state.athletes)
+    for athlete in [a for a in state.athletes if a.preferred_events][:5]:
+        athlete.preferred_events = athlete.preferred_events[1:]
+    events = affected_events(signature, state)
+
+    def run():
+        state.lineups = {event_num: {'athletes': list(lineup['athletes']), 'coxswain': lineup['coxswain']}
+                         for event_num, lineup in lineups.items()}
+        AutoAssignment(state).reassign_events(events)
+    return run
+
+
+@case('dropout_analysis', "analyze_dropouts: every athlete's dropout over the auto-assigned lineups and boats")
+def dropout_analysis(dataset):
+    state = dataset.load()
+    AutoAssignment(state).assign_all_preferred_events()
+    BoatAssignment(state).assign_all_boats()
+    return lambda: analyze_dropouts(state)
+
+
+@case('seat_candidates', "DropoutAnalysis.seat_candidates for every seat of the first 20 auto-assigned lineups")
+def seat_candidates(dataset):
+    state = dataset.load()
+    AutoAssignment(state).assign_all_preferred_events()
+    BoatAssignment(state).assign_all_boats()
+    analysis = DropoutAnalysis(state)
+    seats = [(event_num, seat) for event_num, lineup in list(state.lineups.items())[:20]
+             for seat in list(range(len(lineup['athletes']))) + ([-1] if lineup.get('coxswain') is not None else [])]
+
+    def run():
+        for event_num, seat in seats:
+            analysis.seat_candidates(event_num, seat)
+    return run
+
+
+@case('issues_full', "Every Issues tab check from scratch (IssueEngine refresh + queries)")
+def issues_full(dataset):
+    state = dataset.load()
+
+    def run():
+        engine = IssueEngine()
+        engine.refresh_state(state)
+        for category in SUMMARY_CATEGORIES + ['lineup_validation']:
+            engine.issues(category)
+        engine.workload()
+        engine.boat_usage(state.boats)
+    return run
+
+
+@case('issues_incremental', "IssueEngine refresh after a single seat change")
+def issues_incremental(dataset):
+    state = dataset.load()
+    engine = IssueEngine()
+    engine.refresh_state(state)
+
+    # Toggle the first filled seat in the first lineup on and off
+    for event_num, lineup in state.lineups.items():
+        seats = lineup['athletes']
+        filled = [i for i, a in enumerate(seats) if a is not None]
+        if filled:
+            break
+    else:
+        return lambda: engine.refresh_state(state)
+    seat = filled[0]
+    athlete = seats[seat]
+
+    def run():
+        seats[seat] = None if seats[seat] is not None else athlete
+        engine.refresh_state(state, {event_num})
+        for category in SUMMARY_CATEGORIES:
+            engine.issues(category)
+    return run
+
+
+@case('assignment_grid', "build_assignment_grid (assignments overview matrices)")
+def assignment_grid(dataset):
+    state = dataset.load()
+    return lambda: build_assignment_grid(state)
+
+
+@case('schedule', "build_schedule (whole-regatta schedule frame)")
+def schedule(dataset):
+    state = dataset.load()
+    return lambda: build_schedule(state)
+
+
+@case('athlete_itineraries', "ItineraryIndex: index every lineup, then build every athlete's itinerary")
+def athlete_itineraries(dataset):
+    state = dataset.load()
+
+    def run():
+        index = ItineraryIndex()
+        index.refresh(state.lineups, state.boat_assignments, state.params)
+        for athlete in state.athletes:
+            index.itinerary(athlete)
+    return run
+
+
+@case('itinerary_export', "export_itineraries: every athlete's CSV and .ics into an in-memory zip")
+def itinerary_export(dataset):
+    state = dataset.load()
+    return lambda: export_itineraries(state, io.BytesIO())
+
+
+@case('roster_import', "Validate the roster as a CSV file and upsert it into a copy of itself")
+def roster_import(dataset):
+    state = dataset.load()
+    roster_csv = pd.DataFrame([{
+        'Name': a.name, 'Gender': a.gender, 'Age': a.age, 'Weight': a.weight, 'Port': a.can_port,
+        'Starboard': a.can_starboard, 'Scull': a.can_scull, 'Cox': a.can_cox,
+        'Available Days': "/".join(a.available_days), 'Preferred Events': " ".join(map(str, a.preferred_events))
+    } for a in state.athletes]).to_csv(index=False).encode()
+
+    def run():
+        result = validate_roster(read_roster_file(roster_csv, "roster.csv"))
+        upsert_athletes(list(state.athletes), result.athletes, result.given)
+    return run
+
+
+@case('event_times_cold', "get_event_time for every event and session with an empty timetable cache")
+def event_times_cold(dataset):
+    params = dataset.load().params
+    event_nums = [event_num for events in EVENTS_DATA.values() for event_num, _ in events]
+
+    def run():
+        build_timetable.cache_clear()
+        for event_num in event_nums:
+            get_event_time(event_num, params.event_spacing_minutes, 'morning', params)
+            get_event_time(event_num, params.event_spacing_minutes, 'afternoon', params)
+    return run
+
+
+@case('event_times_warm', "get_event_time for every event and session with a warm timetable cache")
+def event_times_warm(dataset):
+    params = dataset.load().params
+    event_nums = [event_num for events in EVENTS_DATA.values() for event_num, _ in events]
+
+    def run():
+        for event_num in event_nums:
+            get_event_time(event_num, params.event_spacing_minutes, 'morning', params)
+            get_event_time(event_num, params.event_spacing_minutes, 'afternoon', params)
+    run()
+    return run
+
+
+@case('save_data', "DataManager save (serialize + JSON encode)")
+def save_data(dataset):
+    state = dataset.load()
+    data_manager = dataset.data_manager
+    return lambda: json.dumps(data_manager.serialize(state), indent=2)
+
+
+@case('load_data', "DataManager load (JSON decode + deserialize)")
+def load_data(dataset):
+    data_manager = dataset.data_manager
+    json_str = dataset.json_str
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            data_manager.deserialize(json.loads(json_str))
+    return run
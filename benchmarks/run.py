@@ -0,0 +1,213 @@
+"""
+Headless benchmark runner for the engine hot paths
+
+Runs every case in benchmarks/cases.py against the RowFest preset and seeded synthetic regattas,
+one child process per case so a runaway case is stopped by --timeout instead of stalling the run.
+
+    python benchmarks/run.py -o baseline.json
+    python benchmarks/run.py --scales 30 150 500 1000 --timeout 120 -o results.json
+    python benchmarks/run.py --compare baseline.json            # run, then compare
+    python benchmarks/run.py --compare baseline.json --current results.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cases import APP_DIR, CASES, Dataset
+from services.data_manager import DataManager
+from services.regatta_generator import generate_regatta
+
+REAL_PRESET = APP_DIR / "presets" / "RowFest_2025_version_3.json"
+DEFAULT_SCALES = [30, 150, 500]
+
+
+def build_datasets(scales, seed, presets):
+    """The real preset, any extra presets, then one synthetic regatta per scale"""
+    datasets = [Dataset.from_file("rowfest_2025", REAL_PRESET)]
+    for preset in presets:
+        datasets.append(Dataset.from_file(Path(preset).stem, preset))
+    data_manager = DataManager()
+    for num_athletes in scales:
+        state = generate_regatta(num_athletes, seed)
+        datasets.append(Dataset(f"synthetic_{num_athletes}", data_manager.serialize(state)))
+    return datasets
+
+
+def _time_case(case_name, dataset, repeats, max_seconds, connection):
+    """Child process: set up and time one case, sending the timings back"""
+    try:
+        func, _ = CASES[case_name]
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < repeats:
+            run = func(dataset)
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+            if time.perf_counter() - started > max_seconds:
+                break
+        connection.send({'status': 'ok', 'timings': timings})
+    except Exception as e:
+        connection.send({'status': 'error', 'message': f"{type(e).__name__}: {e}"})
+    finally:
+        connection.close()
+
+
+def run_case(case_name, dataset, repeats, max_seconds, timeout):
+    """Time one case in a child process, stopping it after `timeout` seconds"""
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_time_case, args=(case_name, dataset, repeats, max_seconds, sender))
+    process.start()
+    sender.close()
+
+    result = None
+    if receiver.poll(timeout):
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = None
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+        process.join()
+        return {'status': 'timeout', 'timeout': timeout}
+    if result is None:
+        return {'status': 'crashed', 'exitcode': process.exitcode}
+    if result['status'] != 'ok':
+        return result
+
+    timings = result['timings']
+    return {
+        'status': 'ok',
+        'repeats': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings)
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    """Run every selected case against every dataset"""
+    datasets = build_datasets(args.scales, args.seed, args.preset)
+    case_names = args.only or list(CASES)
+    unknown = [name for name in case_names if name not in CASES]
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(unknown)} (available: {', '.join(CASES)})")
+
+    results = []
+    for dataset in datasets:
+        for case_name in case_names:
+            label = f"{dataset.name:<16} {case_name:<20}"
+            if sys.stderr.isatty():
+                print(f"{label} ...", end="\r", flush=True, file=sys.stderr)
+            result = run_case(case_name, dataset, args.repeats, args.max_time, args.timeout)
+            results.append({'dataset': dataset.name, 'case': case_name, **result})
+            print(f"{label} {_format_result(result)}", file=sys.stderr)
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeats': args.repeats,
+            'datasets': {dataset.name: dataset.describe() for dataset in datasets},
+            'cases': {name: description for name, (_, description) in CASES.items()}
+        },
+        'results': results
+    }
+
+
+def _format_result(result):
+    if result['status'] != 'ok':
+        return result['status'].upper()
+    return f"{result['median'] * 1000:10.2f} ms  (min {result['min'] * 1000:.2f}, n={result['repeats']})"
+
+
+def compare(baseline, current, threshold):
+    """Print median ratios against a baseline; returns True when anything regressed"""
+    baseline_results = {(r['dataset'], r['case']): r for r in baseline['results']}
+    regressed = False
+
+    print(f"{'dataset':<16} {'case':<20} {'baseline ms':>12} {'current ms':>12} {'ratio':>8}")
+    for result in current['results']:
+        key = (result['dataset'], result['case'])
+        before = baseline_results.get(key)
+        if before is None:
+            continue
+
+        if before['status'] != 'ok' or result['status'] != 'ok':
+            verdict = f"{before['status']} -> {result['status']}"
+            if before['status'] == 'ok':
+                regressed = True
+            print(f"{key[0]:<16} {key[1]:<20} {'':>12} {'':>12} {'':>8}  {verdict}")
+            continue
+
+        ratio = result['median'] / before['median'] if before['median'] else float('inf')
+        if ratio > threshold:
+            verdict = "SLOWER"
+            regressed = True
+        elif ratio < 1 / threshold:
+            verdict = f"{1 / ratio:.1f}x faster"
+        else:
+            verdict = ""
+        print(f"{key[0]:<16} {key[1]:<20} {before['median'] * 1000:12.2f} {result['median'] * 1000:12.2f} "
+              f"{ratio:8.2f}  {verdict}")
+
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lineup engine hot paths")
+    parser.add_argument('--scales', type=int, nargs='*', default=DEFAULT_SCALES, help="Synthetic roster sizes")
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the synthetic regattas")
+    parser.add_argument('--preset', action='append', default=[], help="Extra preset file to benchmark (repeatable)")
+    parser.add_argument('--only', nargs='+', help="Run only these cases")
+    parser.add_argument('--repeats', type=int, default=5, help="Timed runs per case")
+    parser.add_argument('--max-time', type=float, default=10.0, help="Stop repeating a case after this many seconds")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Give up on a case after this many seconds")
+    parser.add_argument('--output', '-o', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline results JSON to compare against")
+    parser.add_argument('--current', help="Compare this results file instead of running the benchmarks")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Median ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.current:
+        with open(args.current, 'r') as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, current, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
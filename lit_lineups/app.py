@@ -2,6 +2,9 @@ import streamlit as st
 import os
 from datetime import datetime
 from debug_utils import enable_debugging
+from utils.perf_utils import (PROFILING_ENABLED, start_rerun, finish_rerun, timed, track_cache,
+                              start_capture, stop_capture)
+from utils.event_utils import build_timetable, get_event_entries_2024
 from ui.notes_tab import render_notes_tab
 from ui.roster_tab import render_roster_tab
 from ui.lineup_tab import render_lineup_tab
@@ -12,7 +15,9 @@ from ui.data_tab import render_data_tab
 from ui.issues_tab import render_issues_tab
 from ui.grid_tab import render_assignments_overview_tab
 from ui.events_tab import render_event_planning_tab
-from models.session_state import initialize_session_state
+from models.session_state import initialize_session_state, keep_widget_state
+from services.issue_engine import get_issue_engine
+from ui.performance_panel import render_performance_panel
 
 # Set page config for wide layout
 st.set_page_config(
@@ -26,6 +31,16 @@ st.set_page_config(
 if os.getenv("STREAMLIT_DEBUG", "false").lower() == "true":
     enable_debugging()
 
+# Opt-in per-rerun timing (STREAMLIT_PROFILE=true), shown in the sidebar Performance panel
+if PROFILING_ENABLED:
+    track_cache('build_timetable', build_timetable)
+    track_cache('get_event_entries_2024', get_event_entries_2024)
+    # "Profile next interaction" was armed last run: capture this one under cProfile/tracemalloc
+    if st.session_state.get('profile_next_interaction'):
+        st.session_state.profile_next_interaction = False
+        start_capture()
+    start_rerun()
+
 # Initialize session state
 initialize_session_state()
 
@@ -105,42 +120,50 @@ st.session_state.min_gap_minutes = st.sidebar.number_input(
     value=st.session_state.min_gap_minutes
 )
 
-# Main tabs
-tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs([
-    "💾 Data Management",
-    "📋 Roster Management", 
-    "🏁 Event Lineups",
-    "⛵ Equipment", 
-    "📅 Schedule View",       
-    "📊 Assignments Overview",
-    "👤 Athlete View",
-    "⚠️ Issues",
-    "📝 Notes"
-])
-
-with tab1:
-    render_data_tab()
-
-with tab2:
-    render_roster_tab()
-
-with tab3:
-    render_lineup_tab()  # This should be Event Lineups
-
-with tab4:
-    render_equipment_tab()
-
-with tab5:
-    render_schedule_tab()
-
-with tab6:
-    render_assignments_overview_tab()
-
-with tab7:
-    render_athlete_tab()
-
-with tab8:
-    render_issues_tab()
-
-with tab9:
-    render_notes_tab()  # This was tab9, should be tab10
\ No newline at end of file
+# Issue count badge for the Issues tab (the engine only recomputes what changed)
+with timed('issue count badge'):
+    issue_count = get_issue_engine().total_issues() if st.session_state.lineups else 0
+issues_label = f"⚠️ Issues ({issue_count})" if issue_count else "⚠️ Issues"
+
+# Main views: only the selected view is rendered, so a click in one view does not rerun the others
+VIEWS = {
+    'data': ("💾 Data Management", render_data_tab),
+    'roster': ("📋 Roster Management", render_roster_tab),
+    'lineups': ("🏁 Event Lineups", render_lineup_tab),
+    'equipment': ("⛵ Equipment", render_equipment_tab),
+    'schedule': ("📅 Schedule View", render_schedule_tab),
+    'overview': ("📊 Assignments Overview", render_assignments_overview_tab),
+    'athlete': ("👤 Athlete View", render_athlete_tab),
+    'issues': (issues_label, render_issues_tab),
+    'notes': ("📝 Notes", render_notes_tab)
+}
+
+# The ?view= query parameter picks the view on page load, so views can be bookmarked
+if 'active_view' not in st.session_state:
+    requested_view = st.query_params.get('view')
+    st.session_state.active_view = requested_view if requested_view in VIEWS else 'data'
+
+# Keep the view choice and the selections inside views that are not rendered this run
+keep_widget_state('active_view', 'lineup_event_selector', 'athlete_selector', 'preset_sort_option')
+
+active_view = st.radio(
+    "View",
+    options=list(VIEWS),
+    format_func=lambda view: VIEWS[view][0],
+    horizontal=True,
+    label_visibility="collapsed",
+    key="active_view"
+)
+st.query_params['view'] = active_view
+st.divider()
+
+render_view = VIEWS[active_view][1]
+with timed(f"view: {active_view}"):
+    render_view()
+
+if PROFILING_ENABLED:
+    rerun = finish_rerun()
+    capture = stop_capture()
+    if capture is not None:
+        st.session_state.last_profile_capture = capture
+    render_performance_panel(rerun)
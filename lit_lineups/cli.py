@@ -0,0 +1,450 @@
+"""
+Command-line batch runner for presets
+
+Runs the same services as the app without a Streamlit server, e.g. from the repository root:
+
+    python -m lit_lineups.cli validate presets/*.json --jobs 4
+    python -m lit_lineups.cli autoassign preset.json -o out.json
+    python -m lit_lineups.cli assign-boats preset.json -o out.json
+    python -m lit_lineups.cli assign-coxes preset.json -o out.json
+    python -m lit_lineups.cli optimize-seating preset.json --objective balance -o out.json
+    python -m lit_lineups.cli improve preset.json --seconds 10 -o out.json
+    python -m lit_lineups.cli import-roster preset.json --roster other_club.csv -o merged.json
+    python -m lit_lineups.cli import-roster preset.json --roster changes.csv --resolve -o out.json
+    python -m lit_lineups.cli dropouts preset.json --workers 4 --json
+    python -m lit_lineups.cli schedule preset.json --csv
+    python -m lit_lineups.cli itineraries preset.json -o itineraries.zip
+    python -m lit_lineups.cli issues preset.json --json
+    python -m lit_lineups.cli generate --athletes 30 150 2000 --seed 1 -o /tmp/synthetic
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# The app modules import each other from this directory (models, services, utils)
+APP_DIR = Path(__file__).resolve().parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from services.auto_assignment import AutoAssignment, affected_events, roster_signature
+from services.boat_assignment import BoatAssignment
+from services.cox_allocation import CoxAllocator
+from services.data_manager import DataManager
+from services.dropout_analysis import analyze_dropouts
+from services.itinerary_export import export_itineraries
+from services.issue_engine import IssueEngine, EVENT_CATEGORIES, SHARED_CATEGORIES, SUMMARY_CATEGORIES
+from services.roster_import import read_roster_file, upsert_athletes, validate_roster
+from services.regatta_generator import generate_event_catalog, write_synthetic_preset
+from services.schedule import EXPORT_COLUMNS, build_schedule, schedule_export
+from services.seat_order import SEATING_OBJECTIVES, optimize_all_seating
+from services.solver_runner import SolverRunner
+from utils.event_utils import find_event_details
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ISSUES = 1
+EXIT_ERROR = 2
+
+
+def _load(data_manager, preset_path, verbose):
+    """Load a preset, keeping the loader's progress output off stdout"""
+    target = sys.stderr if verbose else io.StringIO()
+    with contextlib.redirect_stdout(target):
+        return data_manager.read_state(preset_path)
+
+
+def _write(data_manager, state, output_path):
+    """Write a state to a file, or as JSON on stdout when there is no output path"""
+    if output_path:
+        data_manager.write_state(state, output_path, state.preset_name, state.preset_description)
+        return None
+    return json.dumps(data_manager.serialize(state, state.preset_name, state.preset_description), indent=2)
+
+
+def _schedule_rows(state, preset_path=None):
+    """Flatten the schedule into export rows"""
+    export = schedule_export(build_schedule(state))
+    if preset_path is not None:
+        export.insert(0, 'Preset', preset_path)
+    return export.to_dict('records')
+
+
+def _run_validate(state, preset_path, options):
+    """Validate every lineup in a preset"""
+    engine = IssueEngine()
+    engine.refresh_state(state)
+
+    lines = []
+    events_with_issues = 0
+    for event_num in state.lineups:
+        messages = engine.event_issues(event_num, EVENT_CATEGORIES + SHARED_CATEGORIES)
+        if messages:
+            events_with_issues += 1
+            event_name, event_day = find_event_details(event_num)
+            lines.append(f"  Event {event_num}: {event_name} ({event_day})")
+            lines.extend(f"    - {message}" for message in messages)
+
+    header = f"{preset_path}: {len(state.lineups)} lineups, {events_with_issues} with issues"
+    exit_code = EXIT_ISSUES if events_with_issues else EXIT_OK
+    return {'text': "\n".join([header] + lines), 'exit_code': exit_code}
+
+
+def _run_issues(state, preset_path, options):
+    """Report every issue category for a preset"""
+    engine = IssueEngine()
+    engine.refresh_state(state)
+
+    categories = SUMMARY_CATEGORIES + ['lineup_validation']
+    issues = {category: engine.issues(category) for category in categories}
+    exit_code = EXIT_ISSUES if engine.total_issues() else EXIT_OK
+
+    if options['json']:
+        data = {
+            'preset': preset_path,
+            'total_issues': engine.total_issues(),
+            'issues': issues,
+            'workload': engine.workload(),
+            'boat_usage': engine.boat_usage(state.boats)
+        }
+        return {'data': data, 'exit_code': exit_code}
+
+    lines = [f"{preset_path}: {engine.total_issues()} issues"]
+    for category in categories:
+        if issues[category]:
+            lines.append(f"  {category.replace('_', ' ').title()} ({len(issues[category])})")
+            lines.extend(f"    - {message}" for message in issues[category])
+    return {'text': "\n".join(lines), 'exit_code': exit_code}
+
+
+def _run_schedule(state, preset_path, options):
+    """Build the full schedule for a preset"""
+    rows = _schedule_rows(state, preset_path if options['multiple'] else None)
+    if options['csv']:
+        return {'data': rows, 'exit_code': EXIT_OK}
+
+    lines = [f"{preset_path}: {len(rows) // 2} scheduled lineups"]
+    for row in rows:
+        crew = row['Rowers'] + (f" + Cox: {row['Coxswain']}" if row['Coxswain'] else "")
+        lines.append(f"  {row['Race']}  {row['Event']}: {row['Event Name']} ({row['Round']})  "
+                     f"[{row['Boat'] or 'Not assigned'}]  {crew}")
+    return {'text': "\n".join(lines), 'exit_code': EXIT_OK}
+
+
+def _run_itineraries(state, preset_path, options):
+    """Write every athlete's itinerary (CSV and .ics) into a zip archive"""
+    count = export_itineraries(state, options['output_path'])
+    return {'text': f"{preset_path}: {count} athlete itineraries written to {options['output_path']}",
+            'exit_code': EXIT_OK}
+
+
+def _run_autoassign(state, preset_path, options):
+    """Auto-assign athletes to their preferred events, optionally followed by boats"""
+    result = AutoAssignment(state).assign_all_preferred_events()
+    if not result["success"]:
+        return {'text': f"{preset_path}: {result['message']}", 'exit_code': EXIT_ERROR}
+
+    lines = [f"{preset_path}: made {result['assignments_made']} automatic assignments"]
+    lines.extend(f"  - {issue}" for issue in result["issues"])
+
+    if options['with_boats']:
+        boat_result = BoatAssignment(state).assign_all_boats()
+        lines.append(_boat_summary(boat_result))
+
+    return {'state': state, 'text': "\n".join(lines), 'exit_code': EXIT_OK}
+
+
+def _run_assign_boats(state, preset_path, options):
+    """Auto-assign boats to every lineup in a preset"""
+    result = BoatAssignment(state).assign_all_boats()
+    if not result["success"]:
+        return {'text': f"{preset_path}: {result['message']}", 'exit_code': EXIT_ERROR}
+    return {'state': state, 'text': f"{preset_path}:\n{_boat_summary(result)}", 'exit_code': EXIT_OK}
+
+
+def _run_assign_coxes(state, preset_path, options):
+    """Fill every open cox seat from the regatta-wide coxswain allocation"""
+    allocator = CoxAllocator()
+    allocator.refresh(state)
+    lines = [f"{preset_path}: assigned {allocator.apply(state)} coxswains"]
+    lines.extend(f"  - Event {event_num}: no coxswain available" for event_num in allocator.unfilled)
+    return {'state': state, 'text': "\n".join(lines), 'exit_code': EXIT_ISSUES if allocator.unfilled else EXIT_OK}
+
+
+def _run_optimize_seating(state, preset_path, options):
+    """Reorder the seats of every lineup under a seating objective"""
+    result = optimize_all_seating(state, options['objective'])
+    lines = [f"{preset_path}: {result['message']}"]
+    lines.extend(f"  - Event {event_num}: no seat order puts every rower on a side they row"
+                 for event_num in result["unseatable"])
+    return {'state': state, 'text': "\n".join(lines), 'exit_code': EXIT_OK}
+
+
+def _run_improve(state, preset_path, options):
+    """Improve every lineup with the anytime search for a fixed time"""
+    runner = SolverRunner(state, options['seconds'], seed=options['seed'])
+    progress = runner.run()
+    state.lineups = runner.best_lineups()
+    text = (f"{preset_path}: objective {progress.initial_objective} -> {progress.objective}, "
+            f"{progress.conflicts} conflicts left ({progress.iterations} moves in {progress.elapsed:.1f}s)")
+    return {'state': state, 'text': text, 'exit_code': EXIT_ISSUES if progress.conflicts else EXIT_OK}
+
+
+def _run_dropouts(state, preset_path, options):
+    """Simulate every athlete dropping out and report broken lineups and substitutes"""
+    result = analyze_dropouts(state, jobs=options['workers'])
+    summary, impact = result['summary'], result['impact']
+    exit_code = EXIT_ISSUES if (summary['uncovered'] > 0).any() else EXIT_OK
+
+    if options['json']:
+        data = {
+            'preset': preset_path,
+            'total_issues': result['total_issues'],
+            'summary': summary.to_dict('records'),
+            'impact': impact.astype({'issues_with_substitute': object}).where(impact.notna(), None).to_dict('records')
+        }
+        return {'data': data, 'exit_code': exit_code}
+
+    lines = [f"{preset_path}: {result['message']} ({result['total_issues']} lineup issues now)"]
+    for athlete in summary.itertuples():
+        if not athlete.uncovered:
+            break
+        lines.append(f"  {athlete.athlete}: {athlete.uncovered} seat{'s' if athlete.uncovered != 1 else ''} "
+                     f"nobody can cover")
+        seats = impact[(impact['athlete'] == athlete.athlete) & (impact['substitutes'].map(len) == 0)]
+        lines.extend(f"    - Event {seat.event_num}: {seat.event_name} ({seat.role})" for seat in seats.itertuples())
+    return {'text': "\n".join(lines), 'exit_code': exit_code}
+
+
+def _run_import_roster(state, preset_path, options):
+    """Add or update athletes from a CSV/Excel roster file, optionally re-solving the events it affects"""
+    roster_path = options['roster_path']
+    with open(roster_path, 'rb') as f:
+        result = validate_roster(read_roster_file(f.read(), roster_path))
+    signature = roster_signature(state.athletes)
+    import_result = upsert_athletes(state.athletes, result.athletes, result.given)
+
+    lines = [f"{preset_path}: {import_result['message']} from {roster_path}"]
+    if options['resolve']:
+        lines.append(f"  {AutoAssignment(state).reassign_events(affected_events(signature, state))['message']}")
+    if len(result.errors):
+        lines.append(f"  skipped {result.rejected_rows} rows with errors:")
+        lines.extend(f"  - row {e.row}, {e.column} '{e.value}': {e.message}" for e in result.errors.itertuples())
+    exit_code = EXIT_ISSUES if len(result.errors) else EXIT_OK
+    return {'state': state, 'text': "\n".join(lines), 'exit_code': exit_code}
+
+
+def _boat_summary(result):
+    """Describe a boat assignment result"""
+    if not result["success"]:
+        return f"  boats: {result['message']}"
+    lines = [f"  assigned {result['assigned']} boats using {result['boats_used']} total boats"]
+    lines.extend(f"  - {issue}" for issue in result["issues"])
+    return "\n".join(lines)
+
+
+COMMANDS = {
+    'validate': _run_validate,
+    'issues': _run_issues,
+    'schedule': _run_schedule,
+    'itineraries': _run_itineraries,
+    'autoassign': _run_autoassign,
+    'assign-boats': _run_assign_boats,
+    'assign-coxes': _run_assign_coxes,
+    'optimize-seating': _run_optimize_seating,
+    'improve': _run_improve,
+    'import-roster': _run_import_roster,
+    'dropouts': _run_dropouts,
+}
+
+
+def run_job(job):
+    """Run one command against one preset (executed in a worker process when --jobs > 1)"""
+    command, preset_path, options = job
+    data_manager = DataManager()
+    try:
+        state = _load(data_manager, preset_path, options['verbose'])
+        result = COMMANDS[command](state, preset_path, options)
+        if 'state' in result:
+            result['json'] = _write(data_manager, result.pop('state'), options['output_path'])
+            if options['output_path']:
+                result['text'] += f"\n  written to {options['output_path']}"
+    except Exception as e:
+        result = {'text': f"{preset_path}: error: {e}", 'exit_code': EXIT_ERROR}
+    result['preset'] = preset_path
+    return result
+
+
+def _generate(args):
+    """Write synthetic presets, one per roster size"""
+    data_manager = DataManager()
+    if args.output and len(args.athletes) == 1 and not Path(args.output).is_dir():
+        paths = [Path(args.output)]
+    else:
+        output_dir = Path(args.output) if args.output else data_manager.presets_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = [output_dir / f"Synthetic_{num_athletes}_seed{args.seed}.json" for num_athletes in args.athletes]
+
+    for num_athletes, path in zip(args.athletes, paths):
+        state = write_synthetic_preset(path, num_athletes, args.seed, args.entry_ratio, not args.no_boats)
+        print(f"{path}: {data_manager.describe_state(state)}")
+
+    if args.catalog:
+        events_data, entries_data = generate_event_catalog(args.seed, args.events_per_day)
+        with open(args.catalog, 'w') as f:
+            json.dump({'events': events_data, 'entries_2024': entries_data}, f, indent=2)
+        print(f"{args.catalog}: {sum(len(events) for events in events_data.values())} events")
+    return EXIT_OK
+
+
+def _output_paths(parser, args, suffix=None):
+    """Work out where each preset's result goes for commands that write files"""
+    if not args.output:
+        if len(args.presets) > 1:
+            parser.error("-o/--output must name a directory when several presets are given")
+        return [None]
+    if len(args.presets) == 1 and not Path(args.output).is_dir():
+        return [args.output]
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = [Path(preset).name if suffix is None else Path(preset).with_suffix(suffix).name for preset in args.presets]
+    return [str(output_dir / name) for name in names]
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog="python -m lit_lineups.cli", description="Run lineup tools on presets without the app")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, help_text):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument('presets', nargs='+', help="Preset JSON files")
+        subparser.add_argument('--jobs', '-j', type=int, default=1, help="Worker processes (0 = one per CPU)")
+        subparser.add_argument('--verbose', '-v', action='store_true', help="Show loader progress on stderr")
+        return subparser
+
+    add_command('validate', "Validate every lineup")
+
+    issues = add_command('issues', "Report all issues")
+    issues.add_argument('--json', action='store_true', help="Print issues as JSON")
+
+    schedule = add_command('schedule', "Print the full schedule")
+    schedule.add_argument('--csv', action='store_true', help="Print the schedule as CSV")
+    schedule.add_argument('--output', '-o', help="Write the output to a file instead of stdout")
+
+    itineraries = add_command('itineraries', "Export every athlete's itinerary as CSV and .ics files in a zip")
+    itineraries.add_argument('--output', '-o', required=True, help="Output zip file (or directory for several presets)")
+
+    autoassign = add_command('autoassign', "Auto-assign athletes to their preferred events")
+    autoassign.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+    autoassign.add_argument('--with-boats', action='store_true', help="Also auto-assign boats afterwards")
+
+    assign_boats = add_command('assign-boats', "Auto-assign boats to lineups")
+    assign_boats.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+
+    assign_coxes = add_command('assign-coxes', "Fill open cox seats across all coxed events")
+    assign_coxes.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+
+    optimize_seating = add_command('optimize-seating', "Reorder the seats of every lineup")
+    optimize_seating.add_argument('--objective', choices=list(SEATING_OBJECTIVES), default='balance',
+                                  help="; ".join(f"{name}: {text}" for name, text in SEATING_OBJECTIVES.items()))
+    optimize_seating.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+
+    improve = add_command('improve', "Search for lineups with fewer conflicts and issues for a fixed time")
+    improve.add_argument('--seconds', type=float, default=10, help="Time budget per preset")
+    improve.add_argument('--seed', type=int, default=0, help="Random seed of the search")
+    improve.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+
+    import_roster = add_command('import-roster', "Add or update athletes from a CSV/Excel roster")
+    import_roster.add_argument('--roster', required=True, help="Roster CSV or Excel file")
+    import_roster.add_argument('--resolve', action='store_true',
+                               help="Re-solve the lineups of the events the import affects, keeping pins")
+    import_roster.add_argument('--output', '-o', help="Output preset file (or directory for several presets)")
+
+    dropouts = add_command('dropouts', "Simulate each athlete dropping out: broken lineups and substitutes")
+    dropouts.add_argument('--workers', type=int, default=1, help="Processes for the roster sweep of each preset")
+    dropouts.add_argument('--json', action='store_true', help="Print the analysis as JSON")
+
+    generate = subparsers.add_parser('generate', help="Write seeded synthetic presets for scale testing")
+    generate.add_argument('--athletes', '-n', type=int, nargs='+', default=[150], help="Roster sizes (e.g. 30 150 2000)")
+    generate.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same regatta")
+    generate.add_argument('--entry-ratio', type=float, default=0.85, help="Club entries per athlete")
+    generate.add_argument('--no-boats', action='store_true', help="Leave boats unassigned")
+    generate.add_argument('--output', '-o', help="Output preset file, or directory for several sizes (default: presets folder)")
+    generate.add_argument('--catalog', help="Also write a synthetic event catalog in the EVENTS_DATA format to this file")
+    generate.add_argument('--events-per-day', type=int, default=60, help="Events per day in the synthetic catalog")
+
+    return parser
+
+
+def main(argv=None):
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        return _generate(args)
+
+    writes_presets = args.command in ('autoassign', 'assign-boats', 'assign-coxes', 'optimize-seating', 'improve', 'import-roster')
+    if writes_presets:
+        output_paths = _output_paths(parser, args)
+    elif args.command == 'itineraries':
+        output_paths = _output_paths(parser, args, suffix='.zip')
+    else:
+        output_paths = [None] * len(args.presets)
+    base_options = {
+        'verbose': args.verbose,
+        'json': getattr(args, 'json', False),
+        'csv': getattr(args, 'csv', False),
+        'with_boats': getattr(args, 'with_boats', False),
+        'roster_path': getattr(args, 'roster', None),
+        'resolve': getattr(args, 'resolve', False),
+        'objective': getattr(args, 'objective', None),
+        'seconds': getattr(args, 'seconds', None),
+        'seed': getattr(args, 'seed', None),
+        'workers': getattr(args, 'workers', 1),
+        'multiple': len(args.presets) > 1,
+    }
+    jobs = [(args.command, preset, {**base_options, 'output_path': output_path})
+            for preset, output_path in zip(args.presets, output_paths)]
+
+    workers = args.jobs if args.jobs > 0 else os.cpu_count()
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_job, jobs))
+    else:
+        results = [run_job(job) for job in jobs]
+
+    data_on_stdout = base_options['json'] or base_options['csv'] or (writes_presets and not args.output)
+    output = open(args.output, 'w', newline='') if args.command == 'schedule' and args.output else sys.stdout
+    try:
+        if base_options['json']:
+            data = [result.get('data', {'preset': result['preset'], 'error': result.get('text')}) for result in results]
+            json.dump(data[0] if len(data) == 1 else data, output, indent=2, default=str)
+            output.write("\n")
+        elif base_options['csv']:
+            rows = [row for result in results for row in result.get('data', [])]
+            columns = (['Preset'] if base_options['multiple'] else []) + EXPORT_COLUMNS
+            writer = csv.DictWriter(output, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        for result in results:
+            if result.get('json'):
+                output.write(result['json'] + "\n")
+            if 'text' in result:
+                # Keep reports and errors out of machine-readable output
+                to_stderr = data_on_stdout or result['exit_code'] == EXIT_ERROR
+                print(result['text'], file=sys.stderr if to_stderr else output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return max(result['exit_code'] for result in results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
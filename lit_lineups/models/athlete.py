@@ -5,7 +5,21 @@ import re
 from typing import List
 from .constants import AGE_CATEGORIES
 
+def _age_category_table() -> tuple:
+    """Age category for every age up to the oldest category's limit"""
+    oldest = max(max_age for _, max_age in AGE_CATEGORIES.values())
+    table = ['K'] * (oldest + 1)  # Default to oldest category
+    for cat, (min_age, max_age) in reversed(list(AGE_CATEGORIES.items())):
+        for age in range(min_age, max_age + 1):
+            table[age] = cat
+    return tuple(table)
+
+AGE_CATEGORY_BY_AGE = _age_category_table()
+
 class Athlete:
+    __slots__ = ('name', 'gender', 'age', 'weight', 'can_port', 'can_starboard', 'can_scull', 'can_cox',
+                 'preferred_events', 'available_days')
+    
     def __init__(self, name: str, gender: str, age: int, weight: int = 160, can_port: bool = True, 
                  can_starboard: bool = True, can_scull: bool = True, can_cox: bool = False,
                  preferred_events: List[str] = None, available_days: List[str] = None):
@@ -19,12 +33,12 @@ class Athlete:
         self.can_cox = can_cox
         self.preferred_events = preferred_events or []
         self.available_days = available_days or ['Thursday', 'Friday', 'Saturday', 'Sunday']
-        self.age_category = self._get_age_category()
     
-    def _get_age_category(self) -> str:
-        for cat, (min_age, max_age) in AGE_CATEGORIES.items():
-            if min_age <= self.age <= max_age:
-                return cat
+    @property
+    def age_category(self) -> str:
+        """Masters age category, looked up so it always follows the current age"""
+        if self.age == int(self.age) and 0 <= self.age < len(AGE_CATEGORY_BY_AGE):
+            return AGE_CATEGORY_BY_AGE[int(self.age)]
         return 'K'  # Default to oldest category
     
     def is_available_on_day(self, day: str) -> bool:
@@ -0,0 +1,100 @@
+"""
+Columnar roster arrays for vectorized eligibility and crew statistics
+"""
+from typing import Dict, Iterable, List
+import numpy as np
+from .athlete import Athlete
+from .boat import BoatType
+from .constants import EVENTS_DATA
+
+# Capability bits
+CAN_PORT = 1
+CAN_STARBOARD = 2
+CAN_SCULL = 4
+CAN_COX = 8
+
+GENDER_CODES = {'M': 0, 'F': 1}
+DAY_BITS = {day: 1 << i for i, day in enumerate(EVENTS_DATA)}
+
+
+class AthleteTable:
+    """Column arrays over a roster, one row per athlete in roster order.
+
+    The Athlete objects stay the editable records; a table is a snapshot of
+    them (rebuilt when the roster changes) for mask-based filtering instead
+    of per-athlete Python checks.
+    """
+
+    def __init__(self, athletes: List[Athlete]):
+        self.athletes = list(athletes)
+        n = len(self.athletes)
+        self.age = np.fromiter((a.age for a in self.athletes), dtype=np.int16, count=n)
+        self.weight = np.fromiter((a.weight for a in self.athletes), dtype=np.float64, count=n)
+        self.gender = np.fromiter((GENDER_CODES.get(a.gender, -1) for a in self.athletes), dtype=np.int8, count=n)
+        self.capabilities = np.fromiter(
+            (CAN_PORT * bool(a.can_port) | CAN_STARBOARD * bool(a.can_starboard)
+             | CAN_SCULL * bool(a.can_scull) | CAN_COX * bool(a.can_cox) for a in self.athletes),
+            dtype=np.uint8, count=n
+        )
+        self.days = np.fromiter((sum(DAY_BITS.get(day, 0) for day in set(a.available_days)) for a in self.athletes),
+                                dtype=np.uint8, count=n)
+
+        # Preferred events in CSR form: row i prefers preferred_events[preferred_indptr[i]:preferred_indptr[i + 1]]
+        counts = np.fromiter((len(a.preferred_events) for a in self.athletes), dtype=np.int64, count=n)
+        self.preferred_indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.preferred_events = np.fromiter((e for a in self.athletes for e in a.preferred_events),
+                                            dtype=np.int64, count=int(self.preferred_indptr[-1]))
+
+        self._rows = {id(a): i for i, a in enumerate(self.athletes)}
+
+    def __len__(self):
+        return len(self.athletes)
+
+    # --- Row lookups ---------------------------------------------------------
+
+    def row(self, athlete) -> int:
+        """Row of an athlete in the table, -1 if the object is not on this roster"""
+        return self._rows.get(id(athlete), -1)
+
+    def rows(self, athletes: Iterable) -> np.ndarray:
+        """Rows of the given athletes (empty seats and unknown athletes skipped)"""
+        rows = np.fromiter((self._rows.get(id(a), -1) for a in athletes if a is not None), dtype=np.int64)
+        return rows[rows >= 0]
+
+    def select(self, mask: np.ndarray) -> List[Athlete]:
+        """Athletes where the mask is set, in roster order"""
+        return [self.athletes[i] for i in np.flatnonzero(mask)]
+
+    # --- Masks -------------------------------------------------------------
+
+    def has(self, capability: int) -> np.ndarray:
+        return (self.capabilities & capability) != 0
+
+    def available_on(self, day: str) -> np.ndarray:
+        return (self.days & DAY_BITS.get(day, 0)) != 0
+
+    def rower_mask(self, event_name: str) -> np.ndarray:
+        """Athletes who can row in an event: gender and boat type (port or starboard for sweep)"""
+        return self.gender_mask(event_name) & self.boat_mask(event_name)
+
+    def gender_mask(self, event_name: str) -> np.ndarray:
+        """Athletes of the gender a men's or women's event asks for (everyone for mixed and open events)"""
+        mask = np.ones(len(self), dtype=bool)
+        if "Men's" in event_name:
+            mask &= self.gender == GENDER_CODES['M']
+        if "Women's" in event_name:
+            mask &= self.gender == GENDER_CODES['F']
+        return mask
+
+    def boat_mask(self, event_name: str) -> np.ndarray:
+        """Athletes who can row an event's boat type: sculling, or port or starboard for sweep"""
+        boat = BoatType(event_name.split()[-1])
+        return self.has(CAN_SCULL) if boat.is_sculling else self.has(CAN_PORT | CAN_STARBOARD)
+
+    def preferring(self) -> Dict[int, np.ndarray]:
+        """Rows preferring each event, events in order of first mention, rows in roster order"""
+        owners = np.repeat(np.arange(len(self)), np.diff(self.preferred_indptr))
+        events, first, inverse = np.unique(self.preferred_events, return_index=True, return_inverse=True)
+        order = np.lexsort((owners, inverse))
+        groups = np.split(owners[order], np.cumsum(np.bincount(inverse, minlength=len(events)))[:-1])
+        return {int(events[g]): groups[g] for g in np.argsort(first, kind='stable')}
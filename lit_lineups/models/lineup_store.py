@@ -0,0 +1,130 @@
+"""
+Array-backed lineups: an event x seat matrix of roster rows with per-event crew statistics
+"""
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from .athlete_table import AthleteTable, CAN_PORT, CAN_STARBOARD, GENDER_CODES
+
+EMPTY = -1
+
+CREW_STAT_COLUMNS = ['seats', 'filled', 'has_cox', 'avg_weight', 'avg_age', 'men', 'women',
+                     'port', 'starboard', 'both_sides']
+
+
+class LineupStore(Mapping):
+    """Lineups as arrays over an AthleteTable's rows.
+
+    `seats[e, s]` is the row of the athlete in seat s of the e-th event (EMPTY
+    for an open seat or beyond the boat's seat count), `coxswains[e]` the
+    coxswain's row. Crew statistics for every event come from a few bincounts.
+
+    The store is a snapshot of the session's lineup dicts, which stay the
+    editable data. Reading it like that dict (`store[event_num]`,
+    `event_num in store`, iteration) gives lineups rebuilt from the arrays.
+    Seated athletes missing from the table (removed from the roster but still
+    in a lineup) get extra rows so that statistics keep counting them.
+    """
+
+    def __init__(self, lineups: Dict, table: AthleteTable):
+        seated = [a for lineup in lineups.values()
+                  for a in list(lineup.get('athletes', [])) + [lineup.get('coxswain')] if a is not None]
+        extras = list({id(a): a for a in seated if table.row(a) == EMPTY}.values())
+        if extras:
+            table = AthleteTable(table.athletes + extras)
+        self.table = table
+
+        self.events = np.fromiter(lineups, dtype=np.int64, count=len(lineups))
+        self._index = {int(event_num): i for i, event_num in enumerate(self.events)}
+        self.seat_counts = np.fromiter((len(lineup.get('athletes', [])) for lineup in lineups.values()),
+                                       dtype=np.int64, count=len(lineups))
+
+        self.seats = np.full((len(lineups), max(self.seat_counts, default=0)), EMPTY, dtype=np.int64)
+        for i, lineup in enumerate(lineups.values()):
+            for s, athlete in enumerate(lineup.get('athletes', [])):
+                if athlete is not None:
+                    self.seats[i, s] = table.row(athlete)
+        self.coxswains = np.fromiter((table.row(lineup.get('coxswain')) if lineup.get('coxswain') is not None
+                                      else EMPTY for lineup in lineups.values()), dtype=np.int64, count=len(lineups))
+        self._crew = None
+        self._stats = None
+
+    # --- Mapping facade ------------------------------------------------------
+
+    def __getitem__(self, event_num) -> Dict:
+        i = self._index[event_num]
+        athletes = self.table.athletes
+        return {
+            'athletes': [athletes[r] if r != EMPTY else None for r in self.seats[i, :self.seat_counts[i]]],
+            'coxswain': athletes[self.coxswains[i]] if self.coxswains[i] != EMPTY else None
+        }
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, event_num):
+        return event_num in self._index
+
+    # --- Crews ---------------------------------------------------------------
+
+    def rowers(self, event_num) -> List:
+        """The athletes in an event's filled seats, bow to stroke"""
+        rows = self.seats[self._index[event_num]]
+        return [self.table.athletes[r] for r in rows[rows != EMPTY]]
+
+    def coxswain(self, event_num) -> Optional[object]:
+        row = self.coxswains[self._index[event_num]]
+        return self.table.athletes[row] if row != EMPTY else None
+
+    def crew_arrays(self) -> Dict[str, np.ndarray]:
+        """Per-event rower statistics (coxswains excluded) as arrays aligned with `events`.
+
+        avg_weight and avg_age are NaN for events without rowers; port/starboard
+        count rowers able to take that side and both_sides those able to take either.
+        """
+        if self._crew is None:
+            self._crew = self._build_crew_arrays()
+        return self._crew
+
+    def crew_stats(self) -> pd.DataFrame:
+        """The crew statistics as a frame indexed by event number"""
+        if self._stats is None:
+            self._stats = pd.DataFrame(self.crew_arrays(), index=pd.Index(self.events, name='event_num'),
+                                       columns=CREW_STAT_COLUMNS)
+        return self._stats
+
+    def _build_crew_arrays(self) -> Dict[str, np.ndarray]:
+        table = self.table
+        num_events = len(self.events)
+        event_of_seat, seat = np.nonzero(self.seats != EMPTY)
+        rows = self.seats[event_of_seat, seat]
+
+        def per_event(values) -> np.ndarray:
+            return np.bincount(event_of_seat, weights=values[rows], minlength=num_events)
+
+        filled = np.bincount(event_of_seat, minlength=num_events)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_weight = per_event(table.weight) / filled
+            avg_age = per_event(table.age.astype(np.float64)) / filled
+
+        port = table.has(CAN_PORT)
+        starboard = table.has(CAN_STARBOARD)
+        counts = {
+            'men': table.gender == GENDER_CODES['M'],
+            'women': table.gender == GENDER_CODES['F'],
+            'port': port,
+            'starboard': starboard,
+            'both_sides': port & starboard
+        }
+        return {
+            'seats': self.seat_counts,
+            'filled': filled,
+            'has_cox': self.coxswains != EMPTY,
+            'avg_weight': avg_weight,
+            'avg_age': avg_age,
+            **{name: per_event(mask).astype(np.int64) for name, mask in counts.items()}
+        }
@@ -0,0 +1,53 @@
+"""
+Pinned assignments that automatic assignment keeps as they are
+"""
+from typing import Dict, Set
+
+# Pins of an event besides seat indices
+CREW = 'crew'  # every rower and the coxswain
+COX = 'cox'
+BOAT = 'boat'
+
+
+def pinned_seats(pins: Dict, event_num: int, lineup: Dict) -> Set[int]:
+    """Rower seats of a lineup whose athlete is pinned (a pin on an empty seat holds nothing)"""
+    event_pins = pins.get(event_num, ())
+    athletes = lineup.get('athletes', [])
+    return {seat_idx for seat_idx, athlete in enumerate(athletes)
+            if athlete is not None and (CREW in event_pins or seat_idx in event_pins)}
+
+
+def cox_pinned(pins: Dict, event_num: int, lineup: Dict) -> bool:
+    event_pins = pins.get(event_num, ())
+    return lineup.get('coxswain') is not None and (CREW in event_pins or COX in event_pins)
+
+
+def boat_pinned(pins: Dict, event_num: int) -> bool:
+    return BOAT in pins.get(event_num, ())
+
+
+def is_pinned(pins: Dict, event_num: int, pin) -> bool:
+    return pin in pins.get(event_num, ())
+
+
+def toggle_pin(pins: Dict, event_num: int, pin):
+    """Pin or unpin a seat index, COX, CREW or BOAT of an event"""
+    event_pins = pins.setdefault(event_num, set())
+    event_pins.symmetric_difference_update({pin})
+    if not event_pins:
+        del pins[event_num]
+
+
+def unpin(pins: Dict, event_num: int, pin):
+    if pin in pins.get(event_num, ()):
+        toggle_pin(pins, event_num, pin)
+
+
+def serialize_pins(pins: Dict) -> Dict:
+    """JSON-ready pins: event number -> seat indices, then named pins"""
+    return {str(event_num): sorted(event_pins, key=lambda pin: (isinstance(pin, str), pin))
+            for event_num, event_pins in pins.items()}
+
+
+def deserialize_pins(data: Dict) -> Dict:
+    return {int(event_num): set(event_pins) for event_num, event_pins in data.items() if event_pins}
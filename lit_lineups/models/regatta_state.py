@@ -0,0 +1,48 @@
+"""
+Plain-Python regatta state shared by the Streamlit app and headless tools
+"""
+from dataclasses import dataclass, field, astuple
+from datetime import date, time
+from typing import Dict, List, Set
+
+@dataclass(frozen=True)
+class RegattaParams:
+    """Timetable and filtering parameters (the sidebar settings)"""
+    event_spacing_minutes: int = 4
+    min_gap_minutes: int = 30
+    regatta_start_date: date = date(2024, 7, 17)
+    morning_start_time: time = time(8, 0)
+    afternoon_start_time: time = time(13, 0)
+    exclude_lightweight: bool = True
+    meet_minutes_before: int = 40
+    launch_minutes_before: int = 30
+    land_minutes_after: int = 15
+    boats_per_race: int = 8
+
+    def timetable_key(self, spacing_minutes: int = None) -> tuple:
+        """Key for everything that moves race times"""
+        spacing = self.event_spacing_minutes if spacing_minutes is None else spacing_minutes
+        return (spacing, self.regatta_start_date, self.morning_start_time,
+                self.afternoon_start_time, self.boats_per_race)
+
+    def as_key(self) -> tuple:
+        """Hashable key over every parameter"""
+        return astuple(self)
+
+# Names of the session state entries that make up a RegattaState
+PARAM_NAMES = tuple(RegattaParams.__dataclass_fields__)
+
+@dataclass
+class RegattaState:
+    """Everything a regatta plan consists of, independent of Streamlit"""
+    athletes: List = field(default_factory=list)
+    lineups: Dict = field(default_factory=dict)          # {event_num: {'athletes': [...], 'coxswain': ...}}
+    boats: List = field(default_factory=list)
+    boat_assignments: Dict = field(default_factory=dict)  # {event_num: boat}
+    selected_events: Set = field(default_factory=set)
+    event_statuses: Dict = field(default_factory=dict)
+    pins: Dict = field(default_factory=dict)              # {event_num: {seat_idx, 'cox', 'crew', 'boat'}}, see models.pins
+    notes: str = ""
+    params: RegattaParams = field(default_factory=RegattaParams)
+    preset_name: str = None
+    preset_description: str = None
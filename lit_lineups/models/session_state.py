@@ -2,7 +2,164 @@
 Session state initialization and management
 """
 import streamlit as st
-from datetime import datetime, time
+from streamlit.errors import StreamlitAPIException
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from models.regatta_state import RegattaParams, RegattaState, PARAM_NAMES
+from utils.perf_utils import record_cache_lookup
+
+# Session state containers tracked by the revision counters
+TRACKED_DOMAINS = ('lineups', 'athletes', 'boats', 'boat_assignments', 'event_statuses', 'pins')
+
+@dataclass(frozen=True)
+class StateChange:
+    """A single mutation of tracked session state"""
+    domain: str                # one of TRACKED_DOMAINS or 'params'
+    action: str                # e.g. 'replace', 'set_seat', 'assign', 'remove'
+    key: Any = None            # event number, athlete index, parameter name...
+    revision: int = 0          # domain revision after this change
+    sequence: int = 0          # position in the change journal
+
+class StateTracker:
+    """Per-domain revision counters and a change journal for session state.
+
+    In-place edits are reported with `record`; wholesale replacement of a tracked
+    container (e.g. `st.session_state.lineups = {}`) and sidebar parameter changes
+    are picked up by `sync`. Caches key on `revision(...)` instead of hashing
+    the object graph.
+    """
+
+    def __init__(self, journal_size: int = 500):
+        self.revisions = {domain: 0 for domain in TRACKED_DOMAINS + ('params',)}
+        self.journal = deque(maxlen=journal_size)
+        self.sequence = 0
+        # The tracked container objects themselves: an id() can be reused once the old container is freed
+        self._containers = {}
+        self._param_values = None
+
+    def record(self, domain: str, action: str, key: Any = None) -> StateChange:
+        """Bump a domain's revision and journal the change"""
+        self.revisions[domain] += 1
+        self.sequence += 1
+        change = StateChange(domain, action, key, self.revisions[domain], self.sequence)
+        self.journal.append(change)
+        return change
+
+    def revision(self, *domains: str) -> tuple:
+        """Get the current revisions for the given domains (all domains if none given)"""
+        return tuple(self.revisions[d] for d in (domains or self.revisions))
+
+    def changes_since(self, sequence: int, *domains: str) -> Optional[list]:
+        """Get journal entries after `sequence`, or None if the journal no longer reaches back"""
+        if self.journal and self.journal[0].sequence > sequence + 1:
+            return None
+        return [c for c in self.journal if c.sequence > sequence and (not domains or c.domain in domains)]
+
+    def sync(self, session):
+        """Detect replaced containers and changed parameters in a session state object"""
+        for domain in TRACKED_DOMAINS:
+            container = getattr(session, domain, None)
+            known = domain in self._containers
+            if not known or container is not self._containers[domain]:
+                self._containers[domain] = container
+                if known:
+                    self.record(domain, 'replace')
+
+        param_values = tuple(getattr(session, name, None) for name in PARAM_NAMES)
+        if param_values != self._param_values:
+            if self._param_values is not None:
+                changed = [name for name, old, new in zip(PARAM_NAMES, self._param_values, param_values) if old != new]
+                self.record('params', 'update', tuple(changed))
+            self._param_values = param_values
+
+def get_state_tracker() -> StateTracker:
+    """Get the session's state tracker, synced with the current session state"""
+    if 'state_tracker' not in st.session_state:
+        st.session_state.state_tracker = StateTracker()
+    tracker = st.session_state.state_tracker
+    tracker.sync(st.session_state)
+    return tracker
+
+def record_change(domain: str, action: str, key: Any = None) -> StateChange:
+    """Report an in-place mutation of tracked session state"""
+    return get_state_tracker().record(domain, action, key)
+
+def cached_on_revisions(name: str, domains: tuple, build: Callable, *args):
+    """Memoize `build(*args)` in the session until one of the domains changes"""
+    cache_key = (get_state_tracker().revision(*domains), args)
+    cache = st.session_state.setdefault('revision_cache', {})
+    entry = cache.get(name)
+    hit = entry is not None and entry[0] == cache_key
+    record_cache_lookup(name, hit)
+    if not hit:
+        entry = (cache_key, build(*args))
+        cache[name] = entry
+    return entry[1]
+
+def get_athlete_table():
+    """Columnar snapshot of the roster, rebuilt when the athletes change"""
+    from models.athlete_table import AthleteTable
+    return cached_on_revisions('athlete_table', ('athletes',), lambda: AthleteTable(st.session_state.athletes))
+
+def get_lineup_store():
+    """Array snapshot of the lineups over the roster table, rebuilt when either changes"""
+    from models.lineup_store import LineupStore
+    return cached_on_revisions('lineup_store', ('lineups', 'athletes'),
+                               lambda: LineupStore(st.session_state.lineups, get_athlete_table()))
+
+def keep_widget_state(*keys):
+    """Keep widget values across runs in which their widgets are not rendered"""
+    # Re-assigning a widget's key marks its value as user state, which Streamlit does not clean up
+    for key in keys:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+def discard_stale_selection(key: str, options):
+    """Forget a kept selection that is no longer one of the widget's options"""
+    if key in st.session_state and st.session_state[key] not in options:
+        del st.session_state[key]
+
+def rerun_scoped(app_changed: bool):
+    """After an edit inside a fragment, rerun just the fragment unless state shown outside it changed"""
+    if not app_changed:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            pass  # The fragment is running as part of a full app run
+    st.rerun()
+
+def get_regatta_params() -> RegattaParams:
+    """Build RegattaParams from the sidebar values in session state"""
+    return RegattaParams(**{name: st.session_state[name] for name in PARAM_NAMES if name in st.session_state})
+
+def get_regatta_state() -> RegattaState:
+    """Adapt st.session_state to a RegattaState sharing the same containers"""
+    return RegattaState(
+        athletes=st.session_state.athletes,
+        lineups=st.session_state.lineups,
+        boats=st.session_state.boats,
+        boat_assignments=st.session_state.boat_assignments,
+        selected_events=st.session_state.selected_events,
+        event_statuses=st.session_state.event_statuses,
+        pins=st.session_state.pins,
+        notes=st.session_state.get('notes', ''),
+        params=get_regatta_params(),
+        preset_name=st.session_state.get('auto_loaded_preset')
+    )
+
+def apply_regatta_state(state: RegattaState):
+    """Write a RegattaState back into st.session_state"""
+    st.session_state.athletes = state.athletes
+    st.session_state.lineups = state.lineups
+    st.session_state.boats = state.boats
+    st.session_state.boat_assignments = state.boat_assignments
+    st.session_state.selected_events = state.selected_events
+    st.session_state.event_statuses = state.event_statuses
+    st.session_state.pins = state.pins
+    st.session_state.notes = state.notes
+    for name in PARAM_NAMES:
+        setattr(st.session_state, name, getattr(state.params, name))
 
 def initialize_session_state():
     """Initialize all session state variables"""
@@ -14,26 +171,18 @@ def initialize_session_state():
         st.session_state.boats = []
     if 'boat_assignments' not in st.session_state:
         st.session_state.boat_assignments = {}
-    if 'event_spacing_minutes' not in st.session_state:
-        st.session_state.event_spacing_minutes = 4
-    if 'min_gap_minutes' not in st.session_state:
-        st.session_state.min_gap_minutes = 30
-    if 'regatta_start_date' not in st.session_state:
-        st.session_state.regatta_start_date = datetime(2024, 7, 17).date()
-    if 'morning_start_time' not in st.session_state:  # Renamed from regatta_start_time
-        st.session_state.morning_start_time = time(8, 0)
-    if 'afternoon_start_time' not in st.session_state:  # New parameter
-        st.session_state.afternoon_start_time = time(13, 0)  # 1:00 PM default
-    if 'exclude_lightweight' not in st.session_state:
-        st.session_state.exclude_lightweight = True
-    if 'meet_minutes_before' not in st.session_state:
-        st.session_state.meet_minutes_before = 40
-    if 'launch_minutes_before' not in st.session_state:
-        st.session_state.launch_minutes_before = 30
-    if 'land_minutes_after' not in st.session_state:
-        st.session_state.land_minutes_after = 15
-    if 'boats_per_race' not in st.session_state:
-        st.session_state.boats_per_race = 8
+    if 'event_statuses' not in st.session_state:
+        st.session_state.event_statuses = {}
+    if 'selected_events' not in st.session_state:
+        st.session_state.selected_events = set()
+    if 'pins' not in st.session_state:
+        st.session_state.pins = {}
+    
+    # Sidebar parameters default to the RegattaParams defaults
+    default_params = RegattaParams()
+    for name in PARAM_NAMES:
+        if name not in st.session_state:
+            setattr(st.session_state, name, getattr(default_params, name))
     
     # Auto-load most recent preset if this is a fresh session
     if 'session_initialized' not in st.session_state:
@@ -46,4 +195,7 @@ def initialize_session_state():
             st.session_state.auto_load_message = auto_load_result["message"]
         elif "no data" not in auto_load_result["message"].lower():
             # Only show error if it's not just "no data to auto-load"
-            st.session_state.auto_load_error = auto_load_result["message"]
\ No newline at end of file
+            st.session_state.auto_load_error = auto_load_result["message"]
+    
+    # Start tracking revisions (after any auto-load so it is not counted as a change)
+    get_state_tracker()
@@ -0,0 +1,115 @@
+"""
+Athlete and boat by event assignment matrices for the assignments overview
+"""
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+import pandas as pd
+from models.constants import EVENTS_DATA
+from models.regatta_state import RegattaState
+
+UNKNOWN_EVENT = "Unknown Event"
+UNKNOWN_DAY = "Unknown Day"
+
+# Regatta days in calendar order; events on days outside the catalog sort last
+DAY_ORDER = {day: i for i, day in enumerate(EVENTS_DATA)}
+EVENT_DETAILS = {num: (name, day) for day, events in EVENTS_DATA.items() for num, name in events}
+
+@dataclass
+class AssignmentGrid:
+    """Assignment marks for every athlete and assigned boat across the events that have lineups"""
+    events: pd.DataFrame            # event_num, event_name, day: one row per grid column, in display order
+    athletes: List                  # athlete per row of athlete_marks, sorted by name
+    athlete_marks: np.ndarray       # 'X' rower, 'C' coxswain or '' per athlete and event
+    unavailable: np.ndarray         # True where the athlete is not available on the event's day
+    boats: List                     # assigned boat per row of boat_marks, sorted by name
+    boat_marks: np.ndarray          # 'B' or '' per boat and event
+
+    @property
+    def athlete_totals(self) -> np.ndarray:
+        return (self.athlete_marks != '').sum(axis=1)
+
+    @property
+    def boat_totals(self) -> np.ndarray:
+        return (self.boat_marks != '').sum(axis=1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per athlete then boat: Type, Name, one column per event and Total Events"""
+        columns = [str(num) for num in self.events['event_num']]
+        athletes_df = pd.DataFrame(self.athlete_marks, columns=columns)
+        athletes_df.insert(0, 'Name', [a.name for a in self.athletes])
+        athletes_df.insert(0, 'Type', 'Athlete')
+        athletes_df['Total Events'] = self.athlete_totals
+        boats_df = pd.DataFrame(self.boat_marks, columns=columns)
+        boats_df.insert(0, 'Name', [b.name for b in self.boats])
+        boats_df.insert(0, 'Type', 'Boat')
+        boats_df['Total Events'] = self.boat_totals
+        return pd.concat([athletes_df, boats_df], ignore_index=True)
+
+def build_seat_index(state: RegattaState) -> pd.DataFrame:
+    """One row per filled seat: event_num, athlete and role ('X' rower, 'C' coxswain)"""
+    records = []
+    for event_num, lineup in state.lineups.items():
+        for athlete in lineup.get('athletes', []):
+            if athlete is not None:
+                records.append((event_num, athlete, 'X'))
+        coxswain = lineup.get('coxswain')
+        if coxswain:
+            records.append((event_num, coxswain, 'C'))
+    return pd.DataFrame(records, columns=['event_num', 'athlete', 'role'])
+
+def _pivot_marks(index: pd.DataFrame, row_codes, num_rows, events: pd.DataFrame, value_column) -> np.ndarray:
+    """Pivot (row code, event) pairs into a rows x events array of marks, '' where unassigned"""
+    if not num_rows:
+        return np.empty((0, len(events)), dtype=object)
+    marks = (index.assign(row=row_codes)
+                  .pivot_table(index='row', columns='event_num', values=value_column, aggfunc='min')
+                  .reindex(index=range(num_rows), columns=events['event_num']))
+    return marks.fillna('').to_numpy(dtype=object)
+
+def build_assignment_grid(state: RegattaState) -> AssignmentGrid:
+    """Build the athlete x event and boat x event matrices from the seat index"""
+    seats = build_seat_index(state)
+
+    # Columns: events with anyone seated, by day then event number
+    event_nums = pd.unique(seats['event_num']) if len(seats) else []
+    details = [EVENT_DETAILS.get(num, (UNKNOWN_EVENT, UNKNOWN_DAY)) for num in event_nums]
+    events = pd.DataFrame({
+        'event_num': pd.Series(event_nums, dtype='int64'),
+        'event_name': [name for name, _ in details],
+        'day': [day for _, day in details]
+    })
+    events['day_order'] = events['day'].map(DAY_ORDER).fillna(999)
+    events = events.sort_values(['day_order', 'event_num'], kind='stable').drop(columns='day_order')
+    events = events.reset_index(drop=True)
+
+    # Athlete rows, sorted by name (a coxswain mark wins over a rower mark in the same event)
+    athlete_codes, athletes = pd.factorize(seats['athlete']) if len(seats) else ([], [])
+    name_order = sorted(range(len(athletes)), key=lambda i: athletes[i].name)
+    athlete_rows = np.empty(len(athletes), dtype=int)
+    athlete_rows[name_order] = np.arange(len(athletes))
+    sorted_athletes = [athletes[i] for i in name_order]
+    athlete_marks = _pivot_marks(seats, athlete_rows[athlete_codes], len(sorted_athletes), events, 'role')
+
+    # Day availability per athlete, broadcast to the event columns through each event's day
+    day_codes, days = pd.factorize(events['day'])
+    available = np.array([[athlete.is_available_on_day(day) for day in days] for athlete in sorted_athletes],
+                         dtype=bool).reshape(len(sorted_athletes), len(days))
+    unavailable = ~available[:, day_codes]
+
+    # Boat rows: every assigned boat, marked on the grid's events
+    assignments = pd.DataFrame(list(state.boat_assignments.items()), columns=['event_num', 'boat'])
+    boat_codes, boats = pd.factorize(assignments['boat']) if len(assignments) else ([], [])
+    boat_order = sorted(range(len(boats)), key=lambda i: boats[i].name)
+    boat_rows = np.empty(len(boats), dtype=int)
+    boat_rows[boat_order] = np.arange(len(boats))
+    boat_marks = _pivot_marks(assignments.assign(mark='B'), boat_rows[boat_codes], len(boats), events, 'mark')
+
+    return AssignmentGrid(
+        events=events,
+        athletes=sorted_athletes,
+        athlete_marks=athlete_marks,
+        unavailable=unavailable,
+        boats=[boats[i] for i in boat_order],
+        boat_marks=boat_marks
+    )
@@ -1,53 +1,171 @@
 """
 Automatic lineup assignment service
 """
-import streamlit as st
-from collections import defaultdict
-from utils.event_utils import parse_event_requirements, find_event_details
+from typing import Dict, Set
+import numpy as np
+from utils.event_utils import find_event_details, min_required_age, parse_event_requirements
+from models.athlete_table import AthleteTable, GENDER_CODES
 from models.constants import EVENTS_DATA
+from models.lineup_store import LineupStore
+from models.pins import CREW, cox_pinned, is_pinned, pinned_seats
+from models.regatta_state import RegattaState
+from services.cox_allocation import CoxAllocator
+from services.lineup_search import LineupSearch
+from services.seat_sides import sides_feasible
+from utils.perf_utils import profiled
+
+# Improving moves tried per event when re-solving events from their current lineups
+WARM_START_MOVES = 50
+
+
+def roster_signature(athletes) -> Dict[int, tuple]:
+    """Everything auto-assignment reads from each athlete, keyed by athlete identity"""
+    return {id(a): (a.name, a.gender, a.age, a.can_port, a.can_starboard, a.can_scull, a.can_cox,
+                    tuple(a.preferred_events), tuple(a.available_days)) for a in athletes}
+
+
+def affected_events(signature: Dict[int, tuple], state: RegattaState) -> Set[int]:
+    """Events to re-solve after the roster changed from an earlier roster_signature.
+
+    These are the events where added, dropped or edited athletes sit, and
+    those they prefer now or preferred before.
+    """
+    current = roster_signature(state.athletes)
+    changed = {key for key in signature.keys() | current.keys() if signature.get(key) != current.get(key)}
+    events = set()
+    for key in changed:
+        for athlete_signature in (signature.get(key), current.get(key)):
+            if athlete_signature is not None:
+                events.update(athlete_signature[7])
+    for event_num, lineup in state.lineups.items():
+        if any(id(a) in changed for a in lineup.get('athletes', []) + [lineup.get('coxswain')] if a is not None):
+            events.add(event_num)
+    return events
+
 
 class AutoAssignment:
     """Service for automatically assigning athletes to their preferred events"""
     
+    def __init__(self, state: RegattaState):
+        self.state = state
+    
+    @profiled('AutoAssignment.assign_all_preferred_events')
     def assign_all_preferred_events(self):
-        """Automatically assign all athletes to their preferred events"""
-        if not st.session_state.athletes:
+        """Automatically assign all athletes to their preferred events, keeping pinned seats and coxswains"""
+        if not self.state.athletes:
             return {"success": False, "message": "No athletes to assign"}
         
-        # Initialize selected_events if needed
-        if 'selected_events' not in st.session_state:
-            st.session_state.selected_events = set()
+        # Clear existing lineups down to their pins
+        self.state.lineups = self._pinned_lineups()
+        self.state.selected_events.update(self.state.lineups)
         
-        # Clear existing lineups
-        st.session_state.lineups = {}
-        
-        # Group athletes by preferred events
-        event_preferences = defaultdict(list)
-        for athlete in st.session_state.athletes:
-            for event_num in athlete.preferred_events:
-                event_preferences[event_num].append(athlete)
+        # Group athletes (as roster rows) by preferred events
+        self.table = AthleteTable(self.state.athletes)
+        event_preferences = self.table.preferring()
         
         assignments_made = 0
         issues = []
         
-        # Process each preferred event
-        for event_num, interested_athletes in event_preferences.items():
-            result = self._assign_event(event_num, interested_athletes)
+        # Process each preferred event (crews pinned as a whole stay as they are)
+        for event_num, interested_rows in event_preferences.items():
+            if is_pinned(self.state.pins, event_num, CREW) and event_num in self.state.lineups:
+                continue
+            result = self._assign_event(event_num, interested_rows)
             if result["success"]:
                 assignments_made += 1
                 # Add event to selected events so it shows up in the lineup tab
-                st.session_state.selected_events.add(event_num)
+                self.state.selected_events.add(event_num)
             else:
                 issues.append(f"Event {event_num}: {result['message']}")
         
+        # Coxswains are allocated across all coxed events at once, now that the crews are known
+        allocator = CoxAllocator()
+        allocator.refresh(self.state)
+        allocator.apply(self.state)
+        for event_num in allocator.unfilled:
+            self._cox_from_crew(event_num)
+        
         return {
             "success": True,
             "assignments_made": assignments_made,
             "issues": issues
         }
     
-    def _assign_event(self, event_num, interested_athletes):
+    @profiled('AutoAssignment.reassign_events')
+    def reassign_events(self, events, moves_per_event: int = WARM_START_MOVES):
+        """Re-solve only some events, starting from their current lineups.
+
+        Rowers and coxswains who can no longer take their seat (left the
+        roster, dropped the event, not eligible or not available) are released
+        unless pinned (a pin never holds someone who left the roster), events newly preferred by someone get a lineup, and a
+        short greedy run of the lineup search fills and improves just these
+        events. Everything else, and every pin, stays as it is.
+        """
+        events = {event_num for event_num in events if find_event_details(event_num)[0]}
+        if not events:
+            return {"success": True, "message": "No events to re-solve", "events": []}
+        
+        self.table = AthleteTable(self.state.athletes)
+        preferring = self.table.preferring()
+        on_roster = set(map(id, self.state.athletes))
+        released = 0
+        created = set()
+        for event_num in sorted(events):
+            event_name, event_day = find_event_details(event_num)
+            requirements = parse_event_requirements(event_name)
+            interested = preferring.get(event_num, np.zeros(0, dtype=np.intp))
+            eligible = self.table.rower_mask(event_name) & self.table.available_on(event_day)
+            lineup = self.state.lineups.get(event_num)
+            if lineup is None:
+                if not eligible[interested].any():
+                    continue
+                lineup = self.state.lineups[event_num] = {'athletes': [None] * requirements['num_rowers'],
+                                                          'coxswain': None}
+                created.add(event_num)
+            
+            pinned = pinned_seats(self.state.pins, event_num, lineup)
+            keep = {id(self.table.athletes[r]) for r in interested[eligible[interested]]}
+            for seat_idx, athlete in enumerate(lineup['athletes']):
+                if athlete is not None and id(athlete) not in keep and (seat_idx not in pinned or
+                                                                        id(athlete) not in on_roster):
+                    lineup['athletes'][seat_idx] = None
+                    released += 1
+            coxswain = lineup.get('coxswain')
+            if coxswain is not None and id(coxswain) not in on_roster:
+                lineup['coxswain'] = None
+                released += 1
+            elif coxswain is not None and not cox_pinned(self.state.pins, event_num, lineup):
+                if not coxswain.can_cox or not coxswain.is_available_on_day(event_day):
+                    lineup['coxswain'] = None
+                    released += 1
+        
+        # Greedy moves only: the current lineups are already a good start
+        search = LineupSearch(self.state, seed=0, events=events, table=self.table)
+        search.fill_open_seats()
+        for _ in range(moves_per_event * len(events)):
+            search.step(0)
+        for event_num in events & search.lineups.keys():
+            self.state.lineups[event_num] = search.lineups[event_num]
+        
+        for event_num in created:
+            if not any(self.state.lineups[event_num]['athletes']):
+                del self.state.lineups[event_num]
+        solved = sorted(events & self.state.lineups.keys())
+        self.state.selected_events.update(solved)
+        
+        allocator = CoxAllocator()
+        allocator.refresh(self.state, store=LineupStore(self.state.lineups, self.table))
+        allocator.apply(self.state, set(solved))
+        
+        return {
+            "success": True,
+            "message": f"Re-solved {len(solved)} event{'s' if len(solved) != 1 else ''}, releasing {released} seat{'s' if released != 1 else ''}",
+            "events": solved
+        }
+    
+    def _assign_event(self, event_num, interested_rows):
         """Assign athletes to a specific event"""
+        table = self.table
         # Check if event exists and get details
         event_name, event_day = find_event_details(event_num)
         if not event_name:
@@ -56,33 +174,43 @@ class AutoAssignment:
         # Get event requirements
         requirements = parse_event_requirements(event_name)
         
+        # Pinned rowers kept from the previous lineup, by seat
+        previous = self.state.lineups.get(event_num, {})
+        pinned = {seat_idx: previous['athletes'][seat_idx]
+                  for seat_idx in pinned_seats(self.state.pins, event_num, previous)}
+        pinned_athletes = list(pinned.values())
+        
         # Filter athletes who are eligible and available
-        eligible_athletes = []
-        for athlete in interested_athletes:
-            if (self._athlete_fits_basic_requirements(athlete, event_name) and 
-                athlete.is_available_on_day(event_day)):
-                eligible_athletes.append(athlete)
+        available = table.available_on(event_day)
+        eligible_rows = interested_rows[table.rower_mask(event_name)[interested_rows] & available[interested_rows]]
+        eligible_rows = eligible_rows[~np.isin(eligible_rows, table.rows(pinned_athletes))]
+        eligible_athletes = [table.athletes[i] for i in eligible_rows]
         
         # Allow partial lineups - just need at least 1 athlete
         if not eligible_athletes:
+            if pinned:
+                return {"success": True, "message": f"Kept {len(pinned)} pinned rowers"}
             return {"success": False, "message": "No eligible athletes available"}
         
         # Assign athletes with optimizations but ensure we always fill spots
         assigned_athletes = []
-        coxswain = None
         
-        # Take as many athletes as we can, up to the requirement
-        athletes_to_assign = min(len(eligible_athletes), requirements['num_rowers'])
+        # Take as many athletes as we can, up to the open seats
+        athletes_to_assign = min(len(eligible_athletes), requirements['num_rowers'] - len(pinned))
         
         # For mixed events, try to balance genders if possible
         if requirements['gender_req'] == 'Mixed':
-            men = [a for a in eligible_athletes if a.gender == 'M']
-            women = [a for a in eligible_athletes if a.gender == 'F']
+            genders = table.gender[eligible_rows]
+            men = [table.athletes[i] for i in eligible_rows[genders == GENDER_CODES['M']]]
+            women = [table.athletes[i] for i in eligible_rows[genders == GENDER_CODES['F']]]
+            pinned_men = sum(1 for a in pinned_athletes if a.gender == 'M')
+            pinned_women = len(pinned_athletes) - pinned_men
             needed_per_gender = requirements['num_rowers'] // 2
             
-            # Take what we can get, preferring balance
-            men_to_take = min(len(men), needed_per_gender, athletes_to_assign // 2)
-            women_to_take = min(len(women), needed_per_gender, athletes_to_assign - men_to_take)
+            # Take what we can get, preferring balance with the pinned rowers
+            balanced_men = (athletes_to_assign + pinned_women - pinned_men) // 2
+            men_to_take = min(len(men), needed_per_gender - pinned_men, max(min(balanced_men, athletes_to_assign), 0))
+            women_to_take = min(len(women), needed_per_gender - pinned_women, athletes_to_assign - men_to_take)
             
             # Add men (avoiding duplicates)
             for athlete in men[:men_to_take]:
@@ -100,8 +228,10 @@ class AutoAssignment:
                     assigned_athletes.append(athlete)
         else:
             # For single-gender events, try age optimization if applicable
-            if self._check_age_eligibility(eligible_athletes, event_name, athletes_to_assign):
-                best_combo = self._find_best_age_combination(eligible_athletes, athletes_to_assign, event_name)
+            pinned_ages = [a.age for a in pinned_athletes]
+            if self._check_age_eligibility(eligible_rows, event_name, athletes_to_assign, pinned_ages):
+                best_combo = self._find_best_age_combination(eligible_rows, athletes_to_assign, event_name,
+                                                             pinned_ages)
                 if best_combo and len(best_combo) == athletes_to_assign:
                     assigned_athletes = list(best_combo)
                 else:
@@ -124,159 +254,170 @@ class AutoAssignment:
                 unique_assigned.append(athlete)
         assigned_athletes = unique_assigned
         
-        # Assign coxswain if needed - coxswain can be any gender/age
-        if requirements['has_cox']:
-            # First priority: interested athletes who can cox (from preferred events)
-            interested_coxes = []
-            for athlete in interested_athletes:
-                if (athlete.can_cox and 
-                    athlete.is_available_on_day(event_day) and 
-                    athlete not in assigned_athletes):
-                    interested_coxes.append(athlete)
-            
-            if interested_coxes:
-                coxswain = interested_coxes[0]
-            else:
-                # Second priority: ANY available coxes from the whole roster
-                all_available_coxes = []
-                for athlete in st.session_state.athletes:
-                    if (athlete.can_cox and 
-                        athlete.is_available_on_day(event_day) and 
-                        athlete not in assigned_athletes):
-                        all_available_coxes.append(athlete)
-                
-                if all_available_coxes:
-                    coxswain = all_available_coxes[0]
-                else:
-                    # Last resort: try to swap someone from the crew
-                    crew_coxes = [a for a in assigned_athletes if a.can_cox]
-                    if crew_coxes:
-                        # Move a cox from crew to coxswain position
-                        cox_to_move = crew_coxes[0]
-                        assigned_athletes.remove(cox_to_move)
-                        coxswain = cox_to_move
-        
-        # Save the lineup with proper structure (array with None placeholders)
-        final_lineup = {'athletes': [None] * requirements['num_rowers'], 'coxswain': None}
+        # Sweep crews have to split evenly between port and starboard
+        if not requirements['is_sculling']:
+            assigned_athletes = self._balance_sides(assigned_athletes, eligible_athletes, requirements['num_rowers'],
+                                                    pinned_athletes)
         
-        # Fill in the assigned athletes (ensuring no duplicates)
-        for i, athlete in enumerate(assigned_athletes):
-            if i < len(final_lineup['athletes']):
-                final_lineup['athletes'][i] = athlete
+        # Save the lineup with proper structure (array with None placeholders), keeping a pinned coxswain
+        final_lineup = {'athletes': [None] * requirements['num_rowers'], 'coxswain': None}
+        if cox_pinned(self.state.pins, event_num, previous):
+            final_lineup['coxswain'] = previous['coxswain']
         
-        final_lineup['coxswain'] = coxswain
+        # Pinned rowers keep their seats; the assigned athletes fill the others from bow
+        for seat_idx, athlete in pinned.items():
+            final_lineup['athletes'][seat_idx] = athlete
+        open_seats = [seat_idx for seat_idx in range(requirements['num_rowers']) if seat_idx not in pinned]
+        for seat_idx, athlete in zip(open_seats, assigned_athletes):
+            final_lineup['athletes'][seat_idx] = athlete
         
-        st.session_state.lineups[event_num] = final_lineup
+        self.state.lineups[event_num] = final_lineup
         
         rower_count = len([a for a in final_lineup['athletes'] if a is not None])
-        cox_text = " + coxswain" if final_lineup['coxswain'] else ""
         partial_text = f" (partial: {rower_count}/{requirements['num_rowers']})" if rower_count < requirements['num_rowers'] else ""
         
-        return {"success": True, "message": f"Assigned {rower_count} rowers{cox_text}{partial_text}"}
+        return {"success": True, "message": f"Assigned {rower_count} rowers{partial_text}"}
     
-    def _athlete_fits_basic_requirements(self, athlete, event_name):
-        """Check basic athlete eligibility for event (for rowers only - coxswains checked separately)"""
-        from models.boat import BoatType
-        
-        # Gender check for rowers (coxswains can be any gender in most events)
-        if 'Men\'s' in event_name and athlete.gender != 'M':
-            return False
-        if 'Women\'s' in event_name and athlete.gender != 'F':
-            return False
-        
-        # Boat type compatibility - but be lenient
-        try:
-            boat = BoatType(event_name.split()[-1])
-            if boat.is_sculling and not athlete.can_scull:
-                return False
-            if boat.is_sweep and not (athlete.can_port or athlete.can_starboard):
-                return False
-        except:
-            # If we can't parse boat type, just allow it
-            pass
-            
-        return True
+    def _cox_from_crew(self, event_num):
+        """Last resort for a coxed event nobody else can cox: move a crew member who can cox into the cox seat"""
+        lineup = self.state.lineups[event_num]
+        pinned = pinned_seats(self.state.pins, event_num, lineup)
+        for seat_idx, athlete in enumerate(lineup['athletes']):
+            if athlete is not None and athlete.can_cox and seat_idx not in pinned:
+                if pinned:
+                    lineup['athletes'][seat_idx] = None
+                else:
+                    lineup['athletes'] = [a for a in lineup['athletes'] if a is not athlete] + [None]
+                lineup['coxswain'] = athlete
+                return
+    
+    def _pinned_lineups(self):
+        """The current lineups reduced to their pinned seats and coxswains still on the roster (lineups with no pins dropped)"""
+        on_roster = set(map(id, self.state.athletes))
+        lineups = {}
+        for event_num, lineup in self.state.lineups.items():
+            seats = {seat_idx for seat_idx in pinned_seats(self.state.pins, event_num, lineup)
+                     if id(lineup['athletes'][seat_idx]) in on_roster}
+            keep_cox = cox_pinned(self.state.pins, event_num, lineup) and id(lineup['coxswain']) in on_roster
+            if seats or keep_cox:
+                lineups[event_num] = {
+                    'athletes': [a if seat_idx in seats else None for seat_idx, a in enumerate(lineup['athletes'])],
+                    'coxswain': lineup['coxswain'] if keep_cox else None
+                }
+        return lineups
     
-    def _check_age_eligibility(self, athletes, event_name, num_rowers):
-        """Check if we can form a crew meeting age requirements"""
-        import re
-        from models.constants import AGE_CATEGORIES
-        
-        # Extract age requirements
-        age_cats_in_event = re.findall(r'\b([A-K]{1,2}(?:-[A-K]{1,2})?)\b', event_name)
-        if not age_cats_in_event:
+    def _check_age_eligibility(self, rows, event_name, num_rowers, pinned_ages=()):
+        """Check if we can form a crew meeting age requirements (together with any pinned rowers)"""
+        min_age = min_required_age(event_name)
+        if min_age is None:
             return True  # No age restriction
+        if len(rows) < num_rowers:
+            return False
         
-        # Find minimum age requirement
-        min_required_age = None
-        for cat_group in age_cats_in_event:
-            if '-' in cat_group:
-                start_cat = cat_group.split('-')[0]
-            else:
-                start_cat = cat_group
-            
-            if start_cat in AGE_CATEGORIES:
-                cat_min_age = AGE_CATEGORIES[start_cat][0]
-                if min_required_age is None or cat_min_age < min_required_age:
-                    min_required_age = cat_min_age
-        
-        if min_required_age is None:
-            return True
-        
-        # Check if any combination can meet the requirement
-        from itertools import combinations
-        for combo in combinations(athletes, num_rowers):
-            avg_age = sum(a.age for a in combo) / len(combo)
-            if avg_age >= min_required_age:
-                return True
-        
-        return False
+        # The oldest possible crew is the num_rowers oldest athletes
+        oldest = np.sort(self.table.age[rows].astype(np.int64))[::-1][:num_rowers]
+        return oldest.sum() + sum(pinned_ages) >= min_age * (num_rowers + len(pinned_ages))
     
-    def _find_best_age_combination(self, athletes, num_rowers, event_name):
-        """Find the best combination of athletes that meets age requirements"""
-        import re
-        from itertools import combinations
-        from models.constants import AGE_CATEGORIES
-        
-        # Extract age requirements
-        age_cats_in_event = re.findall(r'\b([A-K]{1,2}(?:-[A-K]{1,2})?)\b', event_name)
-        if not age_cats_in_event:
+    def _find_best_age_combination(self, rows, num_rowers, event_name, pinned_ages=()):
+        """Find the best combination of athletes that meets age requirements.
+        
+        Best is the lowest average age at or above the minimum (counting any pinned
+        rowers); among equals, the crew that comes first in roster order (as
+        combinations() would list it).
+        """
+        athletes = [self.table.athletes[i] for i in rows]
+        min_age = min_required_age(event_name)
+        if min_age is None:
             return athletes[:num_rowers]  # No age restriction, take first N
         
-        # Find minimum age requirement
-        min_required_age = None
-        for cat_group in age_cats_in_event:
-            if '-' in cat_group:
-                start_cat = cat_group.split('-')[0]
-            else:
-                start_cat = cat_group
-            
-            if start_cat in AGE_CATEGORIES:
-                cat_min_age = AGE_CATEGORIES[start_cat][0]
-                if min_required_age is None or cat_min_age < min_required_age:
-                    min_required_age = cat_min_age
-        
-        if min_required_age is None:
-            return athletes[:num_rowers]
-        
-        # Find valid combinations, prefer those closer to the minimum age
-        valid_combos = []
-        for combo in combinations(athletes, num_rowers):
-            avg_age = sum(a.age for a in combo) / len(combo)
-            if avg_age >= min_required_age:
-                valid_combos.append((combo, avg_age))
-        
-        if valid_combos:
-            # Sort by average age (closest to minimum first)
-            valid_combos.sort(key=lambda x: x[1])
-            return list(valid_combos[0][0])
-        
-        return None
+        # reachable[j][c]: bitset of age totals reachable with c athletes picked from position j on
+        ages = [int(age) for age in self.table.age[rows]]
+        n = len(ages)
+        reachable = [[0] * (num_rowers + 1) for _ in range(n + 1)]
+        reachable[n][0] = 1
+        for j in range(n - 1, -1, -1):
+            reachable[j][0] = 1
+            for c in range(1, num_rowers + 1):
+                reachable[j][c] = reachable[j + 1][c] | (reachable[j + 1][c - 1] << ages[j])
+        
+        # Lowest reachable total at or above the minimum average
+        target = max(min_age * (num_rowers + len(pinned_ages)) - sum(pinned_ages), 0)
+        above = reachable[0][num_rowers] >> target
+        if not above:
+            return None
+        remaining = target + (above & -above).bit_length() - 1
+        
+        # Earliest athletes that still leave that total reachable
+        combo = []
+        for j in range(n):
+            picks_left = num_rowers - len(combo)
+            if picks_left == 0:
+                break
+            if remaining >= ages[j] and (reachable[j + 1][picks_left - 1] >> (remaining - ages[j])) & 1:
+                combo.append(athletes[j])
+                remaining -= ages[j]
+        return combo
     
-    def _check_sweep_balance(self, athletes, num_rowers):
-        """Check if we have adequate port/starboard coverage for sweep events"""
-        port_capable = [a for a in athletes if a.can_port]
-        starboard_capable = [a for a in athletes if a.can_starboard]
-        
-        needed_per_side = num_rowers // 2
-        return len(port_capable) >= needed_per_side and len(starboard_capable) >= needed_per_side
\ No newline at end of file
+    def _balance_sides(self, crew, candidates, num_rowers, pinned=()):
+        """Swap rowers who keep the crew from splitting half to each side for unassigned candidates.
+
+        Rowers who can row neither side go first, then surplus one-sided rowers
+        (pinned rowers stay). Each swap must bring the crew closer to a split,
+        counted over the whole crew, so a one-sided substitute never overfills
+        the other side; when no swap helps the crew is left as it is.
+        """
+        crew = list(crew)
+        half = num_rowers // 2
+        bench = [a for a in candidates if a not in crew and a not in pinned]
+        
+        def side(athlete):
+            """'both', 'port', 'starboard' or None for a rower who can row neither side"""
+            if athlete.can_port and athlete.can_starboard:
+                return 'both'
+            return 'port' if athlete.can_port else 'starboard' if athlete.can_starboard else None
+        
+        def excess(counts):
+            """Rowers beyond what a half-and-half split can seat"""
+            return counts[None] + max(counts['port'] - half, 0) + max(counts['starboard'] - half, 0)
+        
+        while True:
+            counts = {'both': 0, 'port': 0, 'starboard': 0, None: 0}
+            for athlete in list(pinned) + crew:
+                counts[side(athlete)] += 1
+            if sides_feasible(counts['port'], counts['starboard'], counts[None], num_rowers):
+                return crew
+            
+            # Rowers worth replacing, latest picks first
+            surplus = [s for s in (None, 'port', 'starboard') if s is None or counts[s] > half]
+            leaving_order = [a for s in surplus for a in reversed(crew) if side(a) == s]
+            for leaving in leaving_order:
+                def improves(athlete):
+                    after = dict(counts)
+                    after[side(leaving)] -= 1
+                    after[side(athlete)] += 1
+                    return excess(after) < excess(counts)
+                # Prefer the same gender (keeps mixed crews balanced), then rowers who can row either side
+                options = sorted((a for a in bench if improves(a)),
+                                 key=lambda a: (a.gender != leaving.gender, side(a) != 'both'))
+                if options:
+                    crew[crew.index(leaving)] = options[0]
+                    bench.remove(options[0])
+                    bench.append(leaving)
+                    break
+            else:
+                return crew
+        
+        bench = [a for a in candidates if a not in crew]
+        for one_sided, short_side in ((port_only, 'can_starboard'), (starboard_only, 'can_port')):
+            movable = [a for a in one_sided if a in crew]
+            while len(one_sided) > num_rowers // 2 and movable:
+                leaving = movable.pop()
+                one_sided.remove(leaving)
+                # Prefer the same gender (keeps mixed crews balanced), then rowers who can row either side
+                options = [a for a in bench if getattr(a, short_side)]
+                options.sort(key=lambda a: (a.gender != leaving.gender, not (a.can_port and a.can_starboard)))
+                if not options:
+                    break
+                crew[crew.index(leaving)] = options[0]
+                bench.remove(options[0])
+        return crew
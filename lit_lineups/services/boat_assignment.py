@@ -0,0 +1,161 @@
+"""
+Automatic boat assignment service
+"""
+from datetime import timedelta
+from models.athlete_table import AthleteTable
+from models.lineup_store import LineupStore
+from models.pins import boat_pinned
+from models.regatta_state import RegattaState
+from utils.event_utils import find_event_details, get_event_time, parse_event_requirements
+from utils.perf_utils import profiled
+
+class BoatAssignment:
+    """Service for assigning boats to events without launch/land overlaps"""
+    
+    def __init__(self, state: RegattaState):
+        self.state = state
+    
+    @profiled('BoatAssignment.assign_all_boats')
+    def assign_all_boats(self):
+        """Auto-assign boats to events to minimize boat count while avoiding conflicts"""
+        params = self.state.params
+            
+        # Clear existing assignments, keeping pinned boats
+        self.state.boat_assignments = {event_num: boat for event_num, boat in self.state.boat_assignments.items()
+                                       if boat_pinned(self.state.pins, event_num)}
+        
+        # Get all events that need boats
+        crew_stats = LineupStore(self.state.lineups, AthleteTable(self.state.athletes)).crew_stats()
+        events_needing_boats = []
+        crewed = crew_stats[crew_stats['filled'] > 0]
+        for event_num, avg_weight in zip(crewed.index.tolist(), crewed['avg_weight'].tolist()):
+            event_name, _ = find_event_details(event_num)
+            if event_name:
+                event_time = get_event_time(event_num, params.event_spacing_minutes, 'morning', params)
+                launch_time = event_time - timedelta(minutes=params.launch_minutes_before)
+                land_time = event_time + timedelta(minutes=params.land_minutes_after)
+                
+                events_needing_boats.append({
+                    'event_num': event_num,
+                    'event_name': event_name,
+                    'avg_weight': avg_weight,
+                    'launch_time': launch_time,
+                    'land_time': land_time,
+                    'requirements': parse_event_requirements(event_name)
+                })
+        
+        if not events_needing_boats:
+            return {"success": False, "message": "No events need boat assignments"}
+        
+        # Sort events by launch time to assign in chronological order
+        events_needing_boats.sort(key=lambda x: x['launch_time'])
+        
+        assigned_count = 0
+        issues = []
+        boats_used = {boat.name for boat in self.state.boat_assignments.values()}
+        
+        for event_info in events_needing_boats:
+            event_num = event_info['event_num']
+            if event_num in self.state.boat_assignments:
+                continue
+            event_name = event_info['event_name']
+            avg_weight = event_info['avg_weight']
+            launch_time = event_info['launch_time']
+            land_time = event_info['land_time']
+            requirements = event_info['requirements']
+            
+            # Find compatible boats
+            compatible_boats = []
+            for boat in self.state.boats:
+                if boat.is_compatible_with_event(event_name):
+                    compatible_boats.append(boat)
+            
+            if not compatible_boats:
+                issues.append(f"No compatible boats found for Event {event_num}")
+                continue
+            
+            # Score boats by preference:
+            # 1. Weight compatibility (good > warning > bad)
+            # 2. Whether boat is already in use (prefer reusing boats)
+            # 3. Availability (no time conflicts)
+            
+            boat_scores = []
+            for boat in compatible_boats:
+                # Check if boat is available (no time conflicts)
+                available = True
+                for assigned_event, assigned_boat in self.state.boat_assignments.items():
+                    if assigned_boat == boat:
+                        # Check for time conflict
+                        other_event_time = get_event_time(assigned_event, params.event_spacing_minutes, 'morning', params)
+                        other_launch = other_event_time - timedelta(minutes=params.launch_minutes_before)
+                        other_land = other_event_time + timedelta(minutes=params.land_minutes_after)
+                        
+                        # Check for overlap
+                        if not (land_time <= other_launch or other_land <= launch_time):
+                            available = False
+                            break
+                
+                if not available:
+                    continue  # Skip boats that would cause conflicts
+                
+                # Calculate score
+                score = 0
+                
+                # Weight compatibility score (most important)
+                weight_check = boat.weight_check(avg_weight)
+                if weight_check == "good":
+                    score += 100
+                elif weight_check == "warning":
+                    score += 50
+                else:
+                    score += 10  # Still usable but not ideal
+                
+                # Prefer boats already in use (to minimize total boats needed)
+                if boat.name in boats_used:
+                    score += 20
+                
+                boat_scores.append((score, boat))
+            
+            if not boat_scores:
+                issues.append(f"No available boats for Event {event_num} (all compatible boats have conflicts)")
+                continue
+            
+            # Sort by score (highest first) and assign best boat
+            boat_scores.sort(key=lambda x: x[0], reverse=True)
+            best_score, best_boat = boat_scores[0]
+            
+            self.state.boat_assignments[event_num] = best_boat
+            boats_used.add(best_boat.name)
+            assigned_count += 1
+            
+            # Check if weight is outside ideal range
+            weight_check = best_boat.weight_check(avg_weight)
+            if weight_check == "bad":
+                issues.append(f"Event {event_num}: Weight {avg_weight:.1f}lbs significantly outside {best_boat.name} range ({best_boat.min_weight}-{best_boat.max_weight}lbs)")
+            elif weight_check == "warning":
+                issues.append(f"Event {event_num}: Weight {avg_weight:.1f}lbs near limits for {best_boat.name} ({best_boat.min_weight}-{best_boat.max_weight}lbs)")
+        
+        return {
+            "success": True,
+            "assigned": assigned_count,
+            "boats_used": len(boats_used),
+            "issues": issues
+        }
+    
+    def boats_conflict(self, event1_num, event2_num):
+        """Check if two events have conflicting boat usage times"""
+        params = self.state.params
+        
+        # Get timing for both events
+        event1_time = get_event_time(event1_num, params.event_spacing_minutes, 'morning', params)
+        event2_time = get_event_time(event2_num, params.event_spacing_minutes, 'morning', params)
+        
+        # Calculate launch and land times
+        event1_launch = event1_time - timedelta(minutes=params.launch_minutes_before)
+        event1_land = event1_time + timedelta(minutes=params.land_minutes_after)
+        
+        event2_launch = event2_time - timedelta(minutes=params.launch_minutes_before)
+        event2_land = event2_time + timedelta(minutes=params.land_minutes_after)
+        
+        # Check for overlap
+        return not (event1_land <= event2_launch or event2_land <= event1_launch)
@@ -0,0 +1,221 @@
+"""
+Regatta-wide coxswain allocation
+"""
+from typing import Dict, List, Optional
+import numpy as np
+from models.athlete_table import AthleteTable, CAN_COX
+from models.lineup_store import EMPTY, LineupStore
+from models.regatta_state import RegattaState
+from utils.event_utils import find_event_details, get_event_time, parse_event_requirements
+from utils.perf_utils import profiled, record_cache_lookup
+
+
+class CoxAllocator:
+    """Chooses a coxswain for every open coxed seat at once.
+
+    A coxed event with a crew can be coxed by anyone on the roster who can cox, is
+    available that day and is not racing (rowing, or coxing an already set
+    lineup) within min_gap_minutes of it. One cox may take several events as
+    long as no two of them clash, so the allocation is a matching of events to
+    coxes over the time-conflict graph of the coxed events. It is grown one
+    event at a time with augmenting paths: an event whose candidates are all
+    taken moves the clashing event of one of them to another cox, recursively.
+
+    Candidates are tried preferring the event first, then with the lighter
+    workload (events rowed plus events coxed), and a final pass moves events
+    off heavily loaded coxes. Coxswains already set in the lineups are kept.
+
+    `refresh` with the events known to have changed keeps the other
+    suggestions and re-solves just those events and any suggestion the change
+    invalidated.
+    """
+
+    def __init__(self):
+        self.suggestions = {}    # event_num -> suggested coxswain
+        self.unfilled = []       # open coxed events nobody can cox
+        self._solved_key = None  # Roster and parameters the suggestions were made for
+        self.synced_revisions = None
+        self.synced_sequence = 0
+
+    @profiled('CoxAllocator.refresh')
+    def refresh(self, state: RegattaState, events: Optional[set] = None,
+                store: Optional[LineupStore] = None) -> Dict[int, object]:
+        """Bring the suggestions up to date with a regatta state and return them.
+
+        `store` may pass an already built LineupStore of the state's lineups.
+        """
+        self._build(state, store or LineupStore(state.lineups, AthleteTable(state.athletes)))
+        solved_key = (state.params.as_key(), tuple(map(id, state.athletes)))
+        incremental = events is not None and solved_key == self._solved_key
+        record_cache_lookup('cox_allocation', incremental)
+        self._solved_key = solved_key
+
+        self._cox_of = {}
+        self._coxing = {}
+        self._loads = self._rowing_load.copy()
+        for c in self._fixed:
+            self._assign(c, int(self._store.coxswains[self._coxed[c]]))
+        if incremental:
+            self._keep_suggestions(events)
+        self._fill(c for c in range(len(self._coxed)) if c not in self._cox_of)
+        if not incremental:
+            self._rebalance()
+
+        athletes = self._store.table.athletes
+        event_nums = self._store.events[self._coxed].tolist()
+        self.suggestions = {event_nums[c]: athletes[r] for c, r in self._cox_of.items() if c not in self._fixed}
+        self.unfilled = [event_nums[c] for c in range(len(self._coxed)) if c not in self._cox_of]
+        return self.suggestions
+
+    def apply(self, state: RegattaState, events: Optional[set] = None) -> int:
+        """Seat the suggested coxswains (of `events`, if given) in the state's lineups and return how many were set"""
+        applied = 0
+        for event_num, coxswain in self.suggestions.items():
+            if events is None or event_num in events:
+                state.lineups[event_num]['coxswain'] = coxswain
+                applied += 1
+        return applied
+
+    # --- Problem ---------------------------------------------------------------
+
+    def _build(self, state: RegattaState, store: LineupStore):
+        """Candidate coxes, preferences, workloads and clashes of the coxed events"""
+        params = state.params
+        self._store = store
+
+        # Coxed events with at least one rower seated
+        details = [find_event_details(int(event_num)) for event_num in store.events]
+        crewed = (store.seats != EMPTY).any(axis=1)
+        self._coxed = np.array([i for i, (name, _) in enumerate(details)
+                                if name and crewed[i] and parse_event_requirements(name)['has_cox']], dtype=np.int64)
+        self._fixed = {c for c, i in enumerate(self._coxed) if store.coxswains[i] != EMPTY}
+
+        minutes = np.array([get_event_time(int(e), params.event_spacing_minutes, 'morning', params).timestamp() / 60
+                            for e in store.events], dtype=float)
+        coxed_minutes = minutes[self._coxed]
+        self._clash = np.abs(coxed_minutes[:, None] - coxed_minutes[None, :]) < params.min_gap_minutes
+        np.fill_diagonal(self._clash, False)
+
+        # Rowers are busy in their own events and within min_gap_minutes of them
+        event_of_seat, seat = np.nonzero(store.seats != EMPTY)
+        rows = store.seats[event_of_seat, seat]
+        near = np.abs(coxed_minutes[:, None] - minutes[event_of_seat][None, :]) < params.min_gap_minutes
+        near |= self._coxed[:, None] == event_of_seat[None, :]
+        busy = np.zeros((len(self._coxed), len(store.table)), dtype=bool)
+        coxed_idx, member = np.nonzero(near)
+        busy[coxed_idx, rows[member]] = True
+
+        # Only athletes still on the roster (the store appends removed ones that sit in a lineup)
+        on_roster = np.arange(len(store.table)) < len(state.athletes)
+        can_cox = store.table.has(CAN_COX) & on_roster
+        days = {day: store.table.available_on(day) for _, day in details if day}
+        self._candidates = [np.flatnonzero(can_cox & days[details[i][1]] & ~busy[c])
+                            for c, i in enumerate(self._coxed)]
+
+        # Whether each athlete lists each coxed event among their preferences
+        owners = np.repeat(np.arange(len(store.table)), np.diff(store.table.preferred_indptr))
+        coxed_idx, preference = np.nonzero(store.events[self._coxed][:, None] == store.table.preferred_events[None, :])
+        self._prefers = np.zeros((len(self._coxed), len(store.table)), dtype=bool)
+        self._prefers[coxed_idx, owners[preference]] = True
+        self._rowing_load = np.bincount(rows, minlength=len(store.table))
+
+    # --- Matching --------------------------------------------------------------
+
+    def _assign(self, c: int, r: int):
+        self._cox_of[c] = r
+        self._coxing.setdefault(r, set()).add(c)
+        self._loads[r] += 1
+
+    def _unassign(self, c: int):
+        r = self._cox_of.pop(c)
+        self._coxing[r].discard(c)
+        self._loads[r] -= 1
+
+    def _ranked(self, c: int) -> List[int]:
+        """Candidates of a coxed event, best first: preferring it, then by workload (events rowed and coxed)"""
+        candidates = self._candidates[c]
+        order = np.lexsort((candidates, self._loads[candidates], ~self._prefers[c, candidates]))
+        return candidates[order].tolist()
+
+    def _blockers(self, c: int, r: int) -> List[int]:
+        """Events r already coxes that clash with c"""
+        return [other for other in self._coxing.get(r, ()) if self._clash[c, other]]
+
+    def _augment(self, c: int, visited: set) -> bool:
+        """Give event c a cox, moving one clashing event along if needed"""
+        for r in self._ranked(c):
+            if r in visited:
+                continue
+            visited.add(r)
+            blockers = self._blockers(c, r)
+            if len(blockers) > 1 or any(other in self._fixed for other in blockers):
+                continue
+            if blockers:
+                other = blockers[0]
+                self._unassign(other)
+                if not self._augment(other, visited):
+                    self._assign(other, r)
+                    continue
+            self._assign(c, r)
+            return True
+        return False
+
+    def _fill(self, open_events):
+        """Augment the open events, those with the fewest candidates first"""
+        for c in sorted(open_events, key=lambda c: (len(self._candidates[c]), c)):
+            self._augment(c, set())
+
+    def _keep_suggestions(self, changed_events: set):
+        """Carry over previous suggestions that are still valid and not for a changed event"""
+        table = self._store.table
+        index = {int(self._store.events[i]): c for c, i in enumerate(self._coxed)}
+        for event_num, coxswain in self.suggestions.items():
+            c = index.get(event_num)
+            if c is None or c in self._fixed or event_num in changed_events:
+                continue
+            r = table.row(coxswain)
+            if r in self._candidates[c] and not self._blockers(c, r):
+                self._assign(c, r)
+
+    def _rebalance(self):
+        """Move events from busy coxes to candidates at least two events lighter, without losing a preference"""
+        moved = True
+        while moved:
+            moved = False
+            for c, r in list(self._cox_of.items()):
+                if c in self._fixed:
+                    continue
+                for other in self._ranked(c):
+                    if (self._prefers[c, other] or not self._prefers[c, r]) \
+                            and self._loads[other] + 1 < self._loads[r] and not self._blockers(c, other):
+                        self._unassign(c)
+                        self._assign(c, other)
+                        moved = True
+                        break
+
+
+def get_cox_allocator() -> CoxAllocator:
+    """Get the session's coxswain allocator, refreshed against the current session state"""
+    import streamlit as st
+    from models.session_state import get_state_tracker, get_regatta_state, get_lineup_store
+
+    if 'cox_allocator' not in st.session_state:
+        st.session_state.cox_allocator = CoxAllocator()
+
+    allocator = st.session_state.cox_allocator
+    tracker = get_state_tracker()
+    revisions = tracker.revision('lineups', 'athletes', 'params')
+    if revisions == allocator.synced_revisions:
+        return allocator
+
+    # Re-solve just the edited events when every change since the last refresh names its event
+    changed_events = None
+    if allocator.synced_revisions is not None:
+        changes = tracker.changes_since(allocator.synced_sequence, 'lineups', 'athletes', 'params')
+        if changes is not None and all(c.domain == 'lineups' and c.key is not None for c in changes):
+            changed_events = {c.key for c in changes}
+
+    allocator.refresh(get_regatta_state(), changed_events, get_lineup_store())
+    allocator.synced_revisions = revisions
+    allocator.synced_sequence = tracker.sequence
+    return allocator
@@ -2,24 +2,28 @@
 Data save/load manager for roster, lineups, equipment, and notes
 """
 import json
-import streamlit as st
 from datetime import datetime, time
 from models.athlete import Athlete
 from models.boat import Boat
+from models.pins import deserialize_pins, serialize_pins
+from models.regatta_state import RegattaParams, RegattaState
+from utils.perf_utils import profiled
 import os
 from pathlib import Path
 
 class DataManager:
     """Manager for saving and loading all application data"""
     
-    def __init__(self):
+    def __init__(self, presets_dir=None):
         # Define preset datasets directory
-        self.presets_dir = Path(__file__).parent.parent / "presets"
+        self.presets_dir = Path(presets_dir) if presets_dir else Path(__file__).parent.parent / "presets"
         self.presets_dir.mkdir(exist_ok=True)
+        self.preset_errors = []
     
     def get_available_presets(self, sort_by_date=True):
         """Get list of available preset files"""
         presets = []
+        self.preset_errors = []
         for file_path in self.presets_dir.glob("*.json"):
             try:
                 with open(file_path, 'r') as f:
@@ -50,7 +54,7 @@ class DataManager:
                     'has_notes': bool(data.get('notes', '').strip())
                 })
             except Exception as e:
-                st.warning(f"Could not read preset {file_path.name}: {e}")
+                self.preset_errors.append(f"Could not read preset {file_path.name}: {e}")
         
         if sort_by_date and presets:
             # Sort by date (newest first), falling back to name for presets without dates
@@ -58,34 +62,143 @@ class DataManager:
         else:
             return sorted(presets, key=lambda x: x['name'])
     
-    def save_data(self, preset_name=None, preset_description=None):
-        """Save all data to JSON format"""
-        data = {
+    def serialize(self, state: RegattaState, preset_name=None, preset_description=None):
+        """Convert a regatta state to its JSON-ready format"""
+        params = state.params
+        return {
             "version": "1.2",
             "saved_at": datetime.now().isoformat(),
             "preset_name": preset_name,
             "preset_description": preset_description,
             "parameters": {
-                "event_spacing_minutes": st.session_state.event_spacing_minutes,
-                "min_gap_minutes": st.session_state.min_gap_minutes,
-                "regatta_start_date": st.session_state.regatta_start_date.isoformat(),
-                "morning_start_time": st.session_state.morning_start_time.isoformat(),
-                "afternoon_start_time": st.session_state.afternoon_start_time.isoformat(),
-                "exclude_lightweight": st.session_state.exclude_lightweight,
-                "meet_minutes_before": st.session_state.meet_minutes_before,
-                "launch_minutes_before": st.session_state.launch_minutes_before,
-                "land_minutes_after": getattr(st.session_state, 'land_minutes_after', 15),
-                "boats_per_race": getattr(st.session_state, 'boats_per_race', 8)
+                "event_spacing_minutes": params.event_spacing_minutes,
+                "min_gap_minutes": params.min_gap_minutes,
+                "regatta_start_date": params.regatta_start_date.isoformat(),
+                "morning_start_time": params.morning_start_time.isoformat(),
+                "afternoon_start_time": params.afternoon_start_time.isoformat(),
+                "exclude_lightweight": params.exclude_lightweight,
+                "meet_minutes_before": params.meet_minutes_before,
+                "launch_minutes_before": params.launch_minutes_before,
+                "land_minutes_after": params.land_minutes_after,
+                "boats_per_race": params.boats_per_race
             },
-            "athletes": self._serialize_athletes(),
-            "lineups": self._serialize_lineups(),
-            "selected_events": list(getattr(st.session_state, 'selected_events', set())),
-            "boats": self._serialize_boats(),
-            "boat_assignments": self._serialize_boat_assignments(),
-            "event_statuses": getattr(st.session_state, 'event_statuses', {}),
-            "notes": getattr(st.session_state, 'notes', '')
+            "athletes": self._serialize_athletes(state.athletes),
+            "lineups": self._serialize_lineups(state.lineups),
+            "selected_events": list(state.selected_events),
+            "boats": self._serialize_boats(state.boats),
+            "boat_assignments": self._serialize_boat_assignments(state.boat_assignments),
+            "event_statuses": state.event_statuses,
+            "pins": serialize_pins(state.pins),
+            "notes": state.notes
         }
+    
+    def deserialize(self, data) -> RegattaState:
+        """Build a regatta state from its JSON-ready format"""
+        # Debug: Print what we're trying to load
+        print(f"Loading data with {len(data.get('athletes', []))} athletes and {len(data.get('lineups', {}))} lineups")
+        
+        # Load parameters first
+        params = self._deserialize_params(data.get("parameters", {}))
+        
+        # Load athletes
+        athletes = []
+        for athlete_data in data.get("athletes", []):
+            athletes.append(Athlete(
+                name=athlete_data["name"],
+                gender=athlete_data["gender"],
+                age=athlete_data["age"],
+                weight=athlete_data.get("weight", 160),
+                can_port=athlete_data.get("can_port", True),
+                can_starboard=athlete_data.get("can_starboard", True),
+                can_scull=athlete_data.get("can_scull", True),
+                can_cox=athlete_data.get("can_cox", False),
+                preferred_events=athlete_data.get("preferred_events", []),
+                available_days=athlete_data.get("available_days", ["Thursday", "Friday", "Saturday", "Sunday"])
+            ))
+        print(f"Loaded {len(athletes)} athletes")
+        
+        # Load boats
+        boats = []
+        for boat_data in data.get("boats", []):
+            boats.append(Boat(
+                name=boat_data["name"],
+                boat_type=boat_data["boat_type"],
+                num_seats=boat_data["num_seats"],
+                min_weight=boat_data["min_weight"],
+                max_weight=boat_data["max_weight"]
+            ))
+        print(f"Loaded {len(boats)} boats")
+        
+        # Load lineups, matching athletes against the loaded roster (first match wins)
+        roster_index = {}
+        for athlete in athletes:
+            roster_index.setdefault((athlete.name, athlete.gender, athlete.age), athlete)
         
+        def find_athlete(athlete_dict):
+            if not athlete_dict:
+                return None
+            return roster_index.get((athlete_dict["name"], athlete_dict["gender"], athlete_dict["age"]))
+        
+        lineups = {}
+        for event_num_str, lineup_data in data.get("lineups", {}).items():
+            lineups[int(event_num_str)] = {
+                "athletes": [find_athlete(athlete_dict) for athlete_dict in lineup_data.get("athletes", [])],
+                "coxswain": find_athlete(lineup_data.get("coxswain"))
+            }
+        print(f"Loaded {len(lineups)} lineups")
+        
+        # Load boat assignments
+        boat_index = {}
+        for boat in boats:
+            boat_index.setdefault((boat.name, boat.boat_type), boat)
+        
+        boat_assignments = {}
+        for event_num_str, boat_data in data.get("boat_assignments", {}).items():
+            matching_boat = boat_index.get((boat_data["name"], boat_data["boat_type"]))
+            if matching_boat:
+                boat_assignments[int(event_num_str)] = matching_boat
+        print(f"Loaded {len(boat_assignments)} boat assignments")
+        
+        # Convert string keys back to integers
+        event_statuses = {int(k): v for k, v in data.get("event_statuses", {}).items()}
+        
+        if "selected_events" in data:
+            selected_events = set(data["selected_events"])
+        else:
+            selected_events = set(lineups.keys())
+        
+        return RegattaState(
+            athletes=athletes,
+            lineups=lineups,
+            boats=boats,
+            boat_assignments=boat_assignments,
+            selected_events=selected_events,
+            event_statuses=event_statuses,
+            pins=deserialize_pins(data.get("pins", {})),
+            notes=data.get("notes", ""),
+            params=params,
+            preset_name=data.get("preset_name"),
+            preset_description=data.get("preset_description")
+        )
+    
+    def read_state(self, filepath) -> RegattaState:
+        """Load a regatta state from a saved JSON file"""
+        with open(filepath, 'r') as f:
+            return self.deserialize(json.load(f))
+    
+    def write_state(self, state: RegattaState, filepath, preset_name=None, preset_description=None):
+        """Save a regatta state to a JSON file"""
+        data = self.serialize(state, preset_name, preset_description)
+        with open(filepath, 'w') as f:
+            f.write(json.dumps(data, indent=2))
+        return data
+    
+    @profiled('DataManager.save_data')
+    def save_data(self, preset_name=None, preset_description=None):
+        """Save all session data to JSON format"""
+        from models.session_state import get_regatta_state
+        
+        data = self.serialize(get_regatta_state(), preset_name, preset_description)
         json_str = json.dumps(data, indent=2)
         return json_str, data
     
@@ -125,6 +238,8 @@ class DataManager:
     
     def auto_load_most_recent_preset(self):
         """Automatically load the most recent preset if no data exists"""
+        import streamlit as st
+        
         # Only auto-load if session is essentially empty
         if (len(getattr(st.session_state, 'athletes', [])) == 0 and 
             len(getattr(st.session_state, 'lineups', {})) == 0 and
@@ -154,194 +269,32 @@ class DataManager:
         except Exception as e:
             return {"success": False, "message": f"Error deleting preset: {str(e)}"}
     
+    @profiled('DataManager.load_data')
     def load_data(self, json_str):
-        """Load data from JSON string"""
+        """Load data from JSON string into the session"""
         import traceback
+        import streamlit as st
+        from models.session_state import apply_regatta_state
         
         try:
             data = json.loads(json_str)
-            
-            # Debug: Print what we're trying to load
-            print(f"Loading data with {len(data.get('athletes', []))} athletes and {len(data.get('lineups', {}))} lineups")
-            
-            # Load parameters first
-            params = data.get("parameters", {})
-            st.session_state.event_spacing_minutes = params.get("event_spacing_minutes", 4)
-            st.session_state.min_gap_minutes = params.get("min_gap_minutes", 30)
-            st.session_state.exclude_lightweight = params.get("exclude_lightweight", True)
-            st.session_state.meet_minutes_before = params.get("meet_minutes_before", 40)
-            st.session_state.launch_minutes_before = params.get("launch_minutes_before", 30)
-            st.session_state.land_minutes_after = params.get("land_minutes_after", 15)
-            st.session_state.boats_per_race = params.get("boats_per_race", 8)
-            
-            if "regatta_start_date" in params:
-                st.session_state.regatta_start_date = datetime.fromisoformat(params["regatta_start_date"]).date()
-            
-            # Handle both old and new time formats
-            if "morning_start_time" in params:
-                time_str = params["morning_start_time"]
-                if 'T' in time_str:
-                    st.session_state.morning_start_time = datetime.fromisoformat(time_str).time()
-                else:
-                    time_parts = time_str.split(':')
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                    st.session_state.morning_start_time = time(hour, minute, second)
-            elif "regatta_start_time" in params:  # Backwards compatibility
-                time_str = params["regatta_start_time"]
-                if 'T' in time_str:
-                    st.session_state.morning_start_time = datetime.fromisoformat(time_str).time()
-                else:
-                    time_parts = time_str.split(':')
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                    st.session_state.morning_start_time = time(hour, minute, second)
-            
-            if "afternoon_start_time" in params:
-                time_str = params["afternoon_start_time"]
-                if 'T' in time_str:
-                    st.session_state.afternoon_start_time = datetime.fromisoformat(time_str).time()
-                else:
-                    time_parts = time_str.split(':')
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                    st.session_state.afternoon_start_time = time(hour, minute, second)
-            
-            # Load athletes - FORCE new list
-            athletes_data = data.get("athletes", [])
-            new_athletes = []
-            for athlete_data in athletes_data:
-                athlete = Athlete(
-                    name=athlete_data["name"],
-                    gender=athlete_data["gender"],
-                    age=athlete_data["age"],
-                    weight=athlete_data.get("weight", 160),
-                    can_port=athlete_data.get("can_port", True),
-                    can_starboard=athlete_data.get("can_starboard", True),
-                    can_scull=athlete_data.get("can_scull", True),
-                    can_cox=athlete_data.get("can_cox", False),
-                    preferred_events=athlete_data.get("preferred_events", []),
-                    available_days=athlete_data.get("available_days", ["Thursday", "Friday", "Saturday", "Sunday"])
-                )
-                new_athletes.append(athlete)
-            
-            st.session_state.athletes = new_athletes
-            print(f"Set {len(st.session_state.athletes)} athletes in session state")
-            
-            # Load boats
-            boats_data = data.get("boats", [])
-            new_boats = []
-            for boat_data in boats_data:
-                boat = Boat(
-                    name=boat_data["name"],
-                    boat_type=boat_data["boat_type"],
-                    num_seats=boat_data["num_seats"],
-                    min_weight=boat_data["min_weight"],
-                    max_weight=boat_data["max_weight"]
-                )
-                new_boats.append(boat)
-            
-            st.session_state.boats = new_boats
-            print(f"Set {len(st.session_state.boats)} boats in session state")
-            
-            # Load lineups - FORCE new dict
-            lineups_data = data.get("lineups", {})
-            new_lineups = {}
-            for event_num_str, lineup_data in lineups_data.items():
-                event_num = int(event_num_str)
-                
-                # Reconstruct athletes list for this lineup
-                athletes_in_lineup = []
-                for athlete_dict in lineup_data.get("athletes", []):
-                    if athlete_dict is None:
-                        athletes_in_lineup.append(None)
-                    else:
-                        # Find matching athlete from our loaded roster
-                        matching_athlete = None
-                        for athlete in st.session_state.athletes:
-                            if (athlete.name == athlete_dict["name"] and 
-                                athlete.gender == athlete_dict["gender"] and 
-                                athlete.age == athlete_dict["age"]):
-                                matching_athlete = athlete
-                                break
-                        athletes_in_lineup.append(matching_athlete)
-                
-                # Reconstruct coxswain
-                cox_data = lineup_data.get("coxswain")
-                coxswain = None
-                if cox_data:
-                    for athlete in st.session_state.athletes:
-                        if (athlete.name == cox_data["name"] and 
-                            athlete.gender == cox_data["gender"] and 
-                            athlete.age == cox_data["age"]):
-                            coxswain = athlete
-                            break
-                
-                new_lineups[event_num] = {
-                    "athletes": athletes_in_lineup,
-                    "coxswain": coxswain
-                }
-            
-            st.session_state.lineups = new_lineups
-            print(f"Set {len(st.session_state.lineups)} lineups in session state")
-            
-            # Load boat assignments
-            boat_assignments_data = data.get("boat_assignments", {})
-            new_boat_assignments = {}
-            for event_num_str, boat_data in boat_assignments_data.items():
-                event_num = int(event_num_str)
-                # Find matching boat from our loaded boats
-                matching_boat = None
-                for boat in st.session_state.boats:
-                    if (boat.name == boat_data["name"] and 
-                        boat.boat_type == boat_data["boat_type"]):
-                        matching_boat = boat
-                        break
-                
-                if matching_boat:
-                    new_boat_assignments[event_num] = matching_boat
-            
-            st.session_state.boat_assignments = new_boat_assignments
-            print(f"Set {len(st.session_state.boat_assignments)} boat assignments in session state")
-            
-            # Load event statuses
-            event_statuses_data = data.get("event_statuses", {})
-            # Convert string keys back to integers
-            st.session_state.event_statuses = {int(k): v for k, v in event_statuses_data.items()}
-            print(f"Loaded event statuses: {len(st.session_state.event_statuses)} events")
-            
-            # Load notes
-            st.session_state.notes = data.get("notes", "")
-            print(f"Loaded notes: {len(st.session_state.notes)} characters")
+            state = self.deserialize(data)
+            apply_regatta_state(state)
             
             # Force UI refresh for notes by incrementing refresh counter
             if 'notes_refresh_counter' not in st.session_state:
                 st.session_state.notes_refresh_counter = 0
             st.session_state.notes_refresh_counter += 1
             
-            # Load selected events
-            if "selected_events" in data:
-                st.session_state.selected_events = set(data["selected_events"])
-            else:
-                st.session_state.selected_events = set(st.session_state.lineups.keys())
-            
-            print(f"Set {len(st.session_state.selected_events)} selected events")
-            
             preset_info = ""
-            if data.get("preset_name"):
-                preset_info = f" from preset '{data['preset_name']}'"
+            if state.preset_name:
+                preset_info = f" from preset '{state.preset_name}'"
                 # Update the currently loaded preset indicator
-                st.session_state.auto_loaded_preset = data['preset_name']
-            
-            event_statuses_info = f", event statuses ({len(st.session_state.event_statuses)} events)" if st.session_state.event_statuses else ""
-            notes_info = f", notes ({len(st.session_state.notes)} chars)" if st.session_state.notes else ""
+                st.session_state.auto_loaded_preset = state.preset_name
             
             return {
                 "success": True, 
-                "message": f"Successfully loaded{preset_info}: {len(st.session_state.athletes)} athletes, {len(st.session_state.lineups)} lineups, {len(st.session_state.boats)} boats, {len(st.session_state.boat_assignments)} boat assignments{event_statuses_info}{notes_info}",
+                "message": f"Successfully loaded{preset_info}: {self.describe_state(state)}",
                 "timestamp": data.get('saved_at', 'unknown time')
             }
             
@@ -354,10 +307,54 @@ class DataManager:
                 "traceback": traceback.format_exc()
             }
     
-    def _serialize_athletes(self):
+    def describe_state(self, state: RegattaState):
+        """Summarize what a regatta state contains"""
+        event_statuses_info = f", event statuses ({len(state.event_statuses)} events)" if state.event_statuses else ""
+        notes_info = f", notes ({len(state.notes)} chars)" if state.notes else ""
+        return (f"{len(state.athletes)} athletes, {len(state.lineups)} lineups, {len(state.boats)} boats, "
+                f"{len(state.boat_assignments)} boat assignments{event_statuses_info}{notes_info}")
+    
+    def _deserialize_params(self, params) -> RegattaParams:
+        """Build regatta parameters, falling back to defaults for missing values"""
+        defaults = RegattaParams()
+        values = {
+            "event_spacing_minutes": params.get("event_spacing_minutes", defaults.event_spacing_minutes),
+            "min_gap_minutes": params.get("min_gap_minutes", defaults.min_gap_minutes),
+            "exclude_lightweight": params.get("exclude_lightweight", defaults.exclude_lightweight),
+            "meet_minutes_before": params.get("meet_minutes_before", defaults.meet_minutes_before),
+            "launch_minutes_before": params.get("launch_minutes_before", defaults.launch_minutes_before),
+            "land_minutes_after": params.get("land_minutes_after", defaults.land_minutes_after),
+            "boats_per_race": params.get("boats_per_race", defaults.boats_per_race)
+        }
+        
+        if "regatta_start_date" in params:
+            values["regatta_start_date"] = datetime.fromisoformat(params["regatta_start_date"]).date()
+        
+        # Handle both old and new time formats
+        if "morning_start_time" in params:
+            values["morning_start_time"] = self._parse_time(params["morning_start_time"])
+        elif "regatta_start_time" in params:  # Backwards compatibility
+            values["morning_start_time"] = self._parse_time(params["regatta_start_time"])
+        
+        if "afternoon_start_time" in params:
+            values["afternoon_start_time"] = self._parse_time(params["afternoon_start_time"])
+        
+        return RegattaParams(**values)
+    
+    def _parse_time(self, time_str):
+        """Parse a saved time in either ISO datetime or HH:MM[:SS] format"""
+        if 'T' in time_str:
+            return datetime.fromisoformat(time_str).time()
+        time_parts = time_str.split(':')
+        hour = int(time_parts[0])
+        minute = int(time_parts[1])
+        second = int(time_parts[2]) if len(time_parts) > 2 else 0
+        return time(hour, minute, second)
+    
+    def _serialize_athletes(self, athletes):
         """Convert athletes to serializable format"""
         athletes_data = []
-        for athlete in st.session_state.athletes:
+        for athlete in athletes:
             athletes_data.append({
                 "name": athlete.name,
                 "gender": athlete.gender,
@@ -372,10 +369,10 @@ class DataManager:
             })
         return athletes_data
     
-    def _serialize_boats(self):
+    def _serialize_boats(self, boats):
         """Convert boats to serializable format"""
         boats_data = []
-        for boat in getattr(st.session_state, 'boats', []):
+        for boat in boats:
             boats_data.append({
                 "name": boat.name,
                 "boat_type": boat.boat_type,
@@ -385,10 +382,10 @@ class DataManager:
             })
         return boats_data
     
-    def _serialize_boat_assignments(self):
+    def _serialize_boat_assignments(self, boat_assignments):
         """Convert boat assignments to serializable format"""
         assignments_data = {}
-        for event_num, boat in getattr(st.session_state, 'boat_assignments', {}).items():
+        for event_num, boat in boat_assignments.items():
             assignments_data[str(event_num)] = {
                 "name": boat.name,
                 "boat_type": boat.boat_type,
@@ -398,10 +395,10 @@ class DataManager:
             }
         return assignments_data
     
-    def _serialize_lineups(self):
+    def _serialize_lineups(self, lineups):
         """Convert lineups to serializable format"""
         lineups_data = {}
-        for event_num, lineup in st.session_state.lineups.items():
+        for event_num, lineup in lineups.items():
             lineups_data[str(event_num)] = {
                 "athletes": [self._athlete_to_dict(a) for a in lineup.get("athletes", [])],
                 "coxswain": self._athlete_to_dict(lineup["coxswain"]) if lineup.get("coxswain") else None
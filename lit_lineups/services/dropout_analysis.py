@@ -0,0 +1,427 @@
+"""
+Dropout impact analysis: which lineups each athlete's absence breaks and who can step in
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from models.athlete_table import AthleteTable, CAN_COX, CAN_PORT, CAN_STARBOARD, GENDER_CODES
+from models.lineup_store import EMPTY, LineupStore
+from models.regatta_state import RegattaState
+from services.itinerary import seat_name
+from services.lineup_validator import EVENT_NAMES, LineupValidator
+from utils.event_utils import find_event_details, get_event_time, min_required_age, parse_event_requirements
+from utils.perf_utils import profiled
+
+# Substitutes listed per lineup seat, best first
+MAX_SUBSTITUTES = 5
+
+IMPACT_COLUMNS = ['athlete', 'event_num', 'event_name', 'role', 'broken', 'issues_before', 'issues_after',
+                  'substitutes', 'issues_with_substitute']
+
+SUMMARY_COLUMNS = ['athlete', 'events', 'broken', 'uncovered', 'issues_after', 'issues_with_substitutes']
+
+SUBSTITUTE_COLUMNS = ['row', 'athlete', 'feasible', 'cost', 'races', 'prefers', 'avg_age', 'avg_weight', 'problems']
+
+# Ranking cost of a substitute, lowest first
+SUBSTITUTE_COSTS = {
+    'race': 1.0,           # per event they already race
+    'not_preferred': 2.0,  # the event is not one of their preferences
+    'weight': 0.1,         # per unit the crew's average weight ends up outside the boat's band
+}
+
+# Why an athlete cannot take a seat, one entry per seat check
+SEAT_PROBLEMS = {
+    'in_crew': "already in this lineup",
+    'gender': "wrong gender",
+    'boat': "can't row this boat type",
+    'day': "not available on {day}",
+    'conflict': "races within {gap} minutes",
+    'balance': "unbalances the mixed crew",
+    'sides': "leaves a side nobody can row",
+    'age': "average age below {age}",
+    'weight': "average weight further outside the boat's band",
+}
+
+
+class DropoutAnalysis:
+    """What happens to each lineup an athlete races in if that athlete drops out.
+
+    Built once per regatta state:
+    - eligibility matrices of lineup events x roster rows (gender, boat type
+      and day availability);
+    - the conflict graph of the lineup events (morning races closer than
+      min_gap_minutes), and from it which athletes race near each event;
+    - the validation issue count of every lineup, from LineupValidator.
+
+    `analyze` then takes the athletes out one at a time. For each of their
+    seats it counts the lineup's issues without them, and ranks substitutes
+    that pass every seat check: eligible and available, not racing within
+    min_gap_minutes, and leaving the crew no worse than before on mixed
+    gender balance, sweep sides, the minimum average age and the assigned
+    boat's weight band. `seat_candidates` runs the same checks for a single
+    seat over the whole roster. Substitutes are ranked by SUBSTITUTE_COSTS,
+    then by how near they are to the replaced athlete's weight.
+    """
+
+    def __init__(self, state: RegattaState, max_substitutes: int = MAX_SUBSTITUTES):
+        params = state.params
+        self.max_substitutes = max_substitutes
+        self.min_gap_minutes = params.min_gap_minutes
+        store = LineupStore(state.lineups, AthleteTable(state.athletes))
+        table = store.table
+        self._store = store
+        self._table = table
+        self._crew = store.crew_arrays()
+        num_events, num_rows = len(store.events), len(table)
+
+        names = [EVENT_NAMES.get(int(event_num)) for event_num in store.events]
+        self._names = names
+        self._requirements = [parse_event_requirements(name) if name else None for name in names]
+        self._days = [find_event_details(int(event_num))[1] for event_num in store.events]
+        named = np.array([name is not None for name in names], dtype=bool)
+
+        # Eligibility matrices: gender and boat type for rowing each lineup event, and availability on its day
+        self._on_roster = np.arange(num_rows) < len(state.athletes)
+        self._can_cox = table.has(CAN_COX)
+        self._gender_ok = np.zeros((num_events, num_rows), dtype=bool)
+        self._boat_ok = np.zeros((num_events, num_rows), dtype=bool)
+        self._day_ok = np.zeros((num_events, num_rows), dtype=bool)
+        for e, name in enumerate(names):
+            if name:
+                self._gender_ok[e] = table.gender_mask(name)
+                self._boat_ok[e] = table.boat_mask(name)
+                self._day_ok[e] = table.available_on(self._days[e])
+
+        # Conflict graph of the lineup events, and the races of each athlete
+        minutes = np.array([get_event_time(int(e), params.event_spacing_minutes, 'morning', params).timestamp() / 60
+                            for e in store.events], dtype=float)
+        clash = (np.abs(minutes[:, None] - minutes[None, :]) < params.min_gap_minutes) & named[None, :]
+        np.fill_diagonal(clash, False)
+        races = np.zeros((num_rows, num_events), dtype=np.int64)
+        event_of_seat, seat = np.nonzero(store.seats != EMPTY)
+        np.add.at(races, (store.seats[event_of_seat, seat], event_of_seat), 1)
+        coxed = np.flatnonzero(store.coxswains != EMPTY)
+        np.add.at(races, (store.coxswains[coxed], coxed), 1)
+        near = races @ clash.astype(np.int64)
+        self._racing = races > 0
+        # Racing any event that clashes with an event
+        self._near = near > 0
+        # A member's conflict text in an event (as the validator gives it, once per seat)
+        self._conflicted = self._racing & self._near
+        self._load = races.sum(axis=1)
+        self._everyone = self._rower_values(np.arange(num_rows))
+        self._athlete_names = np.array([athlete.name for athlete in table.athletes], dtype=object)
+
+        # Whether each athlete prefers each lineup event
+        owners = np.repeat(np.arange(num_rows), np.diff(table.preferred_indptr))
+        e_idx, preference = np.nonzero(store.events[:, None] == table.preferred_events[None, :])
+        self._prefers = np.zeros((num_events, num_rows), dtype=bool)
+        self._prefers[e_idx, owners[preference]] = True
+
+        # Issue counts of every validated lineup, and the conflict texts they include
+        results = LineupValidator().validate_all(state)
+        self._index = {int(event_num): e for e, event_num in enumerate(store.events)}
+        self._issues = np.zeros(num_events, dtype=np.int64)
+        self._conflicts = np.zeros(num_events, dtype=np.int64)
+        for event_num, messages, conflicts in zip(results.index.tolist(), results['messages'], results['conflicts']):
+            self._issues[self._index[event_num]] = len(messages)
+            self._conflicts[self._index[event_num]] = len(conflicts)
+        self.total_issues = int(self._issues.sum())
+
+        # Boat weight band of each event (NaN without a boat)
+        self._band = np.full((num_events, 2), np.nan)
+        for event_num, boat in state.boat_assignments.items():
+            if event_num in self._index and boat is not None:
+                self._band[self._index[event_num]] = (boat.min_weight, boat.max_weight)
+
+        # Every seat and cox seat in a named lineup: (row, event, seat), seat -1 for the cox
+        seats = [(store.seats[event_of_seat, seat], event_of_seat, seat),
+                 (store.coxswains[coxed], coxed, np.full(len(coxed), -1))]
+        rows, events, slots = (np.concatenate(parts) for parts in zip(*seats))
+        keep = named[events] & self._on_roster[rows]
+        self._members = np.column_stack([rows[keep], events[keep], slots[keep]])
+
+    def analyze(self, rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Impact records (IMPACT_COLUMNS plus the roster `row`) for the given roster rows, default everyone"""
+        members = self._members
+        if rows is not None:
+            members = members[np.isin(members[:, 0], rows)]
+        records = []
+        for e in np.unique(members[:, 1]).tolist():
+            records.extend(self._event_dropouts(e, members[members[:, 1] == e]))
+        records.sort(key=lambda record: (record['row'], record['event_num'], record['seat']))
+        for record in records:
+            del record['seat']
+        return records
+
+    def seat_candidates(self, event_num: int, seat: int) -> pd.DataFrame:
+        """Every roster athlete for one seat of a lineup (seat -1 for the cox), as SUBSTITUTE_COLUMNS.
+
+        The seat may be empty or taken; its athlete is left out of the list
+        and out of the crew the candidates are checked against. Athletes who
+        pass every seat check come first, cheapest first; the others list
+        the checks they fail in `problems`. `avg_age` and `avg_weight` are
+        the crew's averages with the candidate in the seat (rower seats).
+        """
+        e = self._index.get(int(event_num))
+        if e is None or self._names[e] is None:
+            return pd.DataFrame(columns=SUBSTITUTE_COLUMNS)
+        table = self._table
+        rowing = np.array([seat >= 0])
+        occupant = self._store.seats[e, seat] if seat >= 0 else self._store.coxswains[e]
+        without, age_sum, weight_sum = self._vacated(e, np.array([occupant]), rowing)
+        checks, excess = self._seat_checks(e, rowing, without, age_sum, weight_sum)
+        cost = self._costs(e, excess)[0]
+        passed = np.array([np.broadcast_to(ok, (1, len(table)))[0] for ok in checks.values()])
+
+        problems = {**SEAT_PROBLEMS, **({} if seat >= 0 else {'boat': "can't cox"})}
+        min_age = min_required_age(self._names[e])
+        texts = np.array([problems[check].format(day=self._days[e], gap=self.min_gap_minutes, age=min_age)
+                          for check in checks], dtype=object)
+
+        rows = np.flatnonzero(self._on_roster & (np.arange(len(table)) != occupant))
+        feasible = passed[:, rows].all(axis=0)
+        # Problem texts once per combination of failed checks
+        failed = (~passed[:, rows]).astype(np.int64) << np.arange(len(texts))[:, None]
+        combos, combo_of_row = np.unique(failed.sum(axis=0), return_inverse=True)
+        combo_texts = [", ".join(texts[(combo >> np.arange(len(texts))) & 1 == 1]) for combo in combos.tolist()]
+        filled = without['filled'][0] + 1
+        crew_age = np.round((age_sum[0] + table.age[rows]) / filled, 1) if seat >= 0 else np.nan
+        crew_weight = np.round((weight_sum[0] + table.weight[rows]) / filled, 1) if seat >= 0 else np.nan
+        frame = pd.DataFrame({
+            'row': rows,
+            'athlete': self._athlete_names[rows],
+            'feasible': feasible,
+            'cost': np.round(cost[rows], 2),
+            'races': self._load[rows],
+            'prefers': self._prefers[e, rows],
+            'avg_age': crew_age,
+            'avg_weight': crew_weight,
+            'problems': np.array(combo_texts, dtype=object)[combo_of_row],
+        }, columns=SUBSTITUTE_COLUMNS)
+        nearness = np.abs(table.weight[rows] - table.weight[occupant]) if occupant != EMPTY else np.zeros(len(rows))
+        order = np.lexsort((rows, nearness, cost[rows], ~feasible))
+        return frame.iloc[order].reset_index(drop=True)
+
+    def _event_dropouts(self, e: int, members: np.ndarray) -> List[Dict]:
+        """Impact of each given member of one lineup dropping out"""
+        leaving, slots = members[:, 0], members[:, 2]
+        rowing = slots >= 0
+        name, requirements = self._names[e], self._requirements[e]
+        table = self._table
+
+        without, age_sum, weight_sum = self._vacated(e, leaving, rowing)
+        conflicts = self._conflicts[e] - self._conflicted[leaving, e]
+        # A lineup left with nobody in it is no longer validated (nor entered): broken, but without issues
+        emptied = (without['filled'] == 0) & ~without['has_cox']
+        issues_after = np.where(emptied, 0, self._issue_counts(without, name, conflicts))
+        broken = emptied | (issues_after > self._issues[e])
+
+        # Substitutes: on the roster and passing every seat check, cheapest first
+        checks, excess = self._seat_checks(e, rowing, without, age_sum, weight_sum)
+        allowed = np.broadcast_to(self._on_roster, (len(members), len(table))).copy()
+        for ok in checks.values():
+            allowed &= ok
+        cost = self._costs(e, excess)
+
+        nearness = np.abs(table.weight[None, :] - table.weight[leaving][:, None])
+        best = np.full(len(members), EMPTY, dtype=np.int64)
+        substitutes = []
+        for i in range(len(members)):
+            candidates = np.flatnonzero(allowed[i])
+            ranked = candidates[np.lexsort((candidates, nearness[i, candidates], cost[i, candidates]))]
+            ranked = ranked[:self.max_substitutes]
+            substitutes.append(self._athlete_names[ranked].tolist())
+            if len(ranked):
+                best[i] = ranked[0]
+
+        # The crew with the best substitute in the dropout's seat
+        covered = best != EMPTY
+        with_sub = self._crew_rows(e, len(members))
+        sub_rows = np.where(covered, best, 0)
+        for column, values in self._rower_values(sub_rows).items():
+            with_sub[column] = without[column] + np.where(rowing & covered, values, 0)
+        with_sub['has_cox'] = without['has_cox'] | (covered & ~rowing)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            with_sub['avg_age'] = (age_sum + np.where(rowing & covered, table.age[sub_rows], 0)) / with_sub['filled']
+        issues_with_sub = self._issue_counts(with_sub, name, conflicts)
+
+        event_num = int(self._store.events[e])
+        return [{
+            'row': int(row),
+            'seat': int(slot),
+            'athlete': table.athletes[row].name,
+            'event_num': event_num,
+            'event_name': name,
+            'role': seat_name(int(slot), requirements) if slot >= 0 else 'Cox',
+            'broken': bool(broken[i]),
+            'issues_before': int(self._issues[e]),
+            'issues_after': int(issues_after[i]),
+            'substitutes': substitutes[i],
+            'issues_with_substitute': int(issues_with_sub[i]) if covered[i] else None,
+        } for i, (row, slot) in enumerate(zip(leaving.tolist(), slots.tolist()))]
+
+    def _vacated(self, e: int, leaving: np.ndarray, rowing: np.ndarray):
+        """One event's crew with each given seat emptied (`leaving` EMPTY for a seat already empty):
+        crew_arrays rows with the average age, and the crew's age and weight sums"""
+        table = self._table
+        gone = rowing & (leaving != EMPTY)
+        rows = np.where(leaving == EMPTY, 0, leaving)
+        without = self._crew_rows(e, len(leaving))
+        for column, values in self._rower_values(rows).items():
+            without[column] = without[column] - np.where(gone, values, 0)
+        without['has_cox'] = without['has_cox'] & rowing
+        filled = self._crew['filled'][e]
+        age_sum = np.nan_to_num(self._crew['avg_age'][e] * filled) - np.where(gone, table.age[rows], 0)
+        weight_sum = np.nan_to_num(self._crew['avg_weight'][e] * filled) - np.where(gone, table.weight[rows], 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            without['avg_age'] = age_sum / without['filled']
+        return without, age_sum, weight_sum
+
+    def _crew_rows(self, e: int, count: int) -> Dict[str, np.ndarray]:
+        """`count` copies of one event's crew_arrays row"""
+        return {column: np.repeat(values[e:e + 1], count) for column, values in self._crew.items()}
+
+    def _rower_values(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """What each given athlete adds to the crew counts as a rower"""
+        table = self._table
+        port = table.has(CAN_PORT)[rows]
+        starboard = table.has(CAN_STARBOARD)[rows]
+        return {
+            'filled': np.ones(len(rows), dtype=np.int64),
+            'men': (table.gender[rows] == GENDER_CODES['M']).astype(np.int64),
+            'women': (table.gender[rows] == GENDER_CODES['F']).astype(np.int64),
+            'port': port.astype(np.int64),
+            'starboard': starboard.astype(np.int64),
+            'both_sides': (port & starboard).astype(np.int64),
+        }
+
+    def _seat_checks(self, e: int, rowing: np.ndarray, without: Dict[str, np.ndarray], age_sum: np.ndarray,
+                     weight_sum: np.ndarray):
+        """Each SEAT_PROBLEMS check for every roster row in each given vacated seat (True where it passes,
+        broadcastable to seats x rows), and how far outside the boat's band each would leave the crew's
+        average weight (None without a boat)"""
+        table = self._table
+        requirements = self._requirements[e]
+        crew = self._crew
+        everyone = self._everyone
+        rowing_col = rowing[:, None]
+        checks = {
+            'in_crew': ~self._racing[None, :, e],
+            'gender': ~rowing_col | self._gender_ok[e][None, :],
+            'boat': np.where(rowing_col, self._boat_ok[e][None, :], self._can_cox[None, :]),
+            'day': self._day_ok[e][None, :],
+            'conflict': ~self._near[None, :, e],
+        }
+
+        # Mixed crews: the gender imbalance does not grow
+        if requirements['gender_req'] == 'Mixed':
+            before = abs(int(crew['men'][e]) - int(crew['women'][e]))
+            men = without['men'][:, None] + everyone['men'][None, :]
+            women = without['women'][:, None] + everyone['women'][None, :]
+            checks['balance'] = ~rowing_col | (np.abs(men - women) <= before)
+
+        # Sweep crews: no side that could be covered becomes uncoverable
+        if not requirements['is_sculling']:
+            half = requirements['num_rowers'] // 2
+            port, starboard, both = (without[side][:, None] + everyone[side][None, :]
+                                     for side in ('port', 'starboard', 'both_sides'))
+            port_was_ok = crew['starboard'][e] - crew['both_sides'][e] <= half
+            starboard_was_ok = crew['port'][e] - crew['both_sides'][e] <= half
+            checks['sides'] = ~rowing_col | ((~port_was_ok | (starboard - both <= half))
+                                             & (~starboard_was_ok | (port - both <= half)))
+
+        filled = without['filled'][:, None] + 1
+
+        # Category events: the average age stays at the minimum, or at least does not fall
+        min_age = min_required_age(self._names[e])
+        if min_age is not None:
+            avg_age = (age_sum[:, None] + table.age[None, :]) / filled
+            checks['age'] = ~rowing_col | (avg_age >= min_age) | (avg_age >= crew['avg_age'][e])
+
+        # Assigned boat: the average weight stays in its band, or gets no further outside it
+        excess = None
+        low, high = self._band[e]
+        if not np.isnan(low):
+            def outside(weight):
+                return np.maximum(low - weight, 0) + np.maximum(weight - high, 0)
+            avg_weight = (weight_sum[:, None] + table.weight[None, :]) / filled
+            excess = np.where(rowing_col, outside(avg_weight), 0)
+            checks['weight'] = ~rowing_col | (excess <= outside(crew['avg_weight'][e]))
+        return checks, excess
+
+    def _costs(self, e: int, excess: Optional[np.ndarray]) -> np.ndarray:
+        """SUBSTITUTE_COSTS of every roster row for one event's seats (seats x rows)"""
+        cost = (SUBSTITUTE_COSTS['race'] * self._load + SUBSTITUTE_COSTS['not_preferred'] * ~self._prefers[e])[None, :]
+        if excess is not None:
+            cost = cost + SUBSTITUTE_COSTS['weight'] * excess
+        return cost
+
+    @staticmethod
+    def _issue_counts(crew: Dict[str, np.ndarray], event_name: str, conflicts: np.ndarray) -> np.ndarray:
+        columns = LineupValidator.crew_checks(crew, [event_name] * len(conflicts))
+        return LineupValidator.issue_counts(columns, conflicts)
+
+
+# The analysis each pool worker builds once from the pickled state
+_worker_analysis = None
+
+
+def _init_worker(state: RegattaState, max_substitutes: int):
+    global _worker_analysis
+    _worker_analysis = DropoutAnalysis(state, max_substitutes)
+
+
+def _analyze_rows(rows: np.ndarray) -> List[Dict]:
+    return _worker_analysis.analyze(rows)
+
+
+@profiled('analyze_dropouts')
+def analyze_dropouts(state: RegattaState, jobs: int = 1, max_substitutes: int = MAX_SUBSTITUTES) -> Dict:
+    """Simulate every athlete on the roster dropping out.
+
+    With `jobs` > 1 the roster is split into chunks analyzed by a process
+    pool; each worker builds the eligibility matrix and conflict graph once.
+    Returns the per-seat `impact` frame (IMPACT_COLUMNS) and a per-athlete
+    `summary` frame (SUMMARY_COLUMNS): lineups broken (more issues without
+    them, or left empty), seats nobody can cover, and the regatta's lineup issue count after
+    the dropout, without and with the best substitutes.
+    """
+    analysis = DropoutAnalysis(state, max_substitutes)
+    if jobs > 1 and len(state.athletes) > 1:
+        chunks = np.array_split(np.arange(len(state.athletes)), jobs * 4)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(state, max_substitutes)) as executor:
+            records = [record for chunk in executor.map(_analyze_rows, chunks) for record in chunk]
+    else:
+        records = analysis.analyze()
+
+    impact = pd.DataFrame(records, columns=['row'] + IMPACT_COLUMNS)
+    impact['issues_with_substitute'] = impact['issues_with_substitute'].astype('Int64')
+    summary = _summarize(impact, analysis.total_issues)
+    broken = int((summary['broken'] > 0).sum())
+    message = (f"{len(summary)} athletes race in lineups; losing {broken} of them breaks at least one lineup, "
+               f"{int((summary['uncovered'] > 0).sum())} leave a seat nobody can cover")
+    return {"success": True, "message": message, "impact": impact.drop(columns='row'), "summary": summary,
+            "total_issues": analysis.total_issues}
+
+
+def _summarize(impact: pd.DataFrame, total_issues: int) -> pd.DataFrame:
+    """One row per athlete, the most disruptive dropouts first"""
+    if impact.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    added = impact['issues_after'] - impact['issues_before']
+    covered = impact['issues_with_substitute'].notna()
+    added_with_sub = impact['issues_with_substitute'].where(covered, impact['issues_after']) - impact['issues_before']
+    grouped = impact.assign(uncovered=~covered, added=added, added_with_sub=added_with_sub).groupby('row', sort=True)
+    summary = pd.DataFrame({
+        'athlete': grouped['athlete'].first(),
+        'events': grouped['event_num'].nunique(),
+        'broken': grouped['broken'].sum(),
+        'uncovered': grouped['uncovered'].sum(),
+        'issues_after': total_issues + grouped['added'].sum(),
+        'issues_with_substitutes': total_issues + grouped['added_with_sub'].sum(),
+    })
+    summary = summary.sort_values(['uncovered', 'broken', 'issues_after'], ascending=False, kind='stable')
+    return summary.reset_index(drop=True)[SUMMARY_COLUMNS]
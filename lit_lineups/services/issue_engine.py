@@ -0,0 +1,500 @@
+"""
+Incremental issue engine with dependency-tracked recomputation
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+from models.constants import EVENTS_DATA
+from models.regatta_state import RegattaParams, RegattaState
+from services.lineup_validator import LineupValidator
+from utils.event_utils import get_event_time, parse_event_requirements
+from utils.perf_utils import profiled, record_cache_lookup
+
+# Issue categories tracked per event
+EVENT_CATEGORIES = ['incomplete_lineups', 'unassigned_boats', 'weight_issues',
+                    'age_category_issues', 'lineup_validation']
+
+# Issue categories tracked per athlete / per boat
+SHARED_CATEGORIES = ['athlete_conflicts', 'boat_conflicts']
+
+# Categories counted in the Issues tab summary
+SUMMARY_CATEGORIES = ['athlete_conflicts', 'boat_conflicts', 'unassigned_boats',
+                      'incomplete_lineups', 'weight_issues', 'age_category_issues']
+
+DAYS = ['Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class IssueEngine:
+    """Keeps issue sets per category and per event, recomputing only what changed.
+
+    Every issue depends on some of: the lineup of an event, the boat assignment
+    of an event, the timetable parameters and the roster. `refresh` compares
+    cheap signatures of those inputs against the previous call and recomputes
+    only the issues whose inputs changed, plus the conflict neighbours of a
+    changed lineup (events sharing an athlete or a boat with it).
+    """
+
+    def __init__(self):
+        self._validator = LineupValidator()
+        self._reset()
+
+    def _reset(self):
+        """Drop every cached issue and index"""
+        self._params_key = None
+        self._roster_names = []
+        self._lineup_keys = {}    # event_num -> crew signature
+        self._boat_keys = {}      # event_num -> boat signature
+        self._crews = {}          # event_num -> set of athlete names (rowers and cox)
+        self._boats = {}          # event_num -> assigned boat
+        self._lineups = {}
+        self._lineup_order = []
+        self._boat_order = []
+        self._athlete_events = defaultdict(set)
+        self._boat_events = defaultdict(set)
+        self._event_issues = {cat: {} for cat in EVENT_CATEGORIES}
+        self._athlete_conflicts = {}  # athlete name -> [(message, event1, event2)]
+        self._boat_conflicts = {}     # boat name -> [(message, event1, event2)]
+        self._event_times = {}
+        self._event_details = None
+        self._workload = None
+        self.params = RegattaParams()
+        self.last_recomputed = set()
+        self.synced_revisions = None
+        self.synced_sequence = 0
+
+    def refresh_state(self, state: RegattaState, events: Optional[set] = None) -> set:
+        """Bring issues up to date with a regatta state"""
+        return self.refresh(state.lineups, state.boat_assignments, state.athletes, state.params, events)
+
+    @profiled('IssueEngine.refresh')
+    def refresh(self, lineups: Dict, boat_assignments: Dict, athletes: List, params: RegattaParams,
+                events: Optional[set] = None) -> set:
+        """Bring issues up to date with the given state and return the recomputed events.
+
+        `events` optionally limits the change scan to events known to have changed.
+        """
+        params_key = (params.timetable_key(), params.min_gap_minutes,
+                      params.launch_minutes_before, params.land_minutes_after)
+        if params_key != self._params_key:
+            # Timetable parameters feed every time-based check, so start over
+            self._reset()
+            self._params_key = params_key
+            self.params = params
+            events = None
+
+        roster_names = [a.name for a in athletes]
+        if roster_names != self._roster_names:
+            self._roster_names = roster_names
+            self._workload = None
+
+        self._lineups = lineups
+        self._lineup_order = list(lineups.keys())
+        self._boat_order = list(boat_assignments.keys())
+
+        changed_lineups = set()
+        changed_boats = set()
+        affected_athletes = set()
+        affected_boats = set()
+
+        scan = set(lineups) | set(self._lineup_keys) if events is None else events
+        for event_num in scan:
+            lineup = lineups.get(event_num)
+            key = self._lineup_signature(lineup)
+            if self._lineup_keys.get(event_num) == key:
+                continue
+
+            old_crew = self._crews.get(event_num, set())
+            new_crew = self._crew_names(lineup)
+            for name in old_crew - new_crew:
+                self._athlete_events[name].discard(event_num)
+            for name in new_crew - old_crew:
+                self._athlete_events[name].add(event_num)
+            affected_athletes |= old_crew | new_crew
+
+            if lineup is None:
+                self._lineup_keys.pop(event_num, None)
+                self._crews.pop(event_num, None)
+            else:
+                self._lineup_keys[event_num] = key
+                self._crews[event_num] = new_crew
+            changed_lineups.add(event_num)
+
+        scan = set(boat_assignments) | set(self._boat_keys) if events is None else events
+        for event_num in scan:
+            boat = boat_assignments.get(event_num)
+            key = self._boat_signature(boat)
+            if self._boat_keys.get(event_num) == key:
+                continue
+
+            old_boat = self._boats.get(event_num)
+            if old_boat is not None:
+                self._boat_events[old_boat.name].discard(event_num)
+                affected_boats.add(old_boat.name)
+            if boat is not None:
+                self._boat_events[boat.name].add(event_num)
+                affected_boats.add(boat.name)
+                self._boat_keys[event_num] = key
+                self._boats[event_num] = boat
+            else:
+                self._boat_keys.pop(event_num, None)
+                self._boats.pop(event_num, None)
+            changed_boats.add(event_num)
+
+        # Time conflicts in lineup validation reach every event sharing an athlete
+        conflict_neighbours = set()
+        for name in affected_athletes:
+            conflict_neighbours |= self._athlete_events.get(name, set())
+
+        for event_num in changed_lineups:
+            self._update_incomplete(event_num)
+        for event_num in changed_lineups | changed_boats:
+            self._update_unassigned(event_num)
+            self._update_weight(event_num)
+        for event_num in changed_boats:
+            self._update_age_category(event_num)
+        self._update_validation(changed_lineups | conflict_neighbours)
+        for name in affected_athletes:
+            self._update_athlete_conflicts(name)
+        for boat_name in affected_boats:
+            self._update_boat_conflicts(boat_name)
+
+        if changed_lineups:
+            self._workload = None
+
+        self.last_recomputed = changed_lineups | changed_boats | conflict_neighbours
+        return self.last_recomputed
+
+    # --- Queries -----------------------------------------------------------
+
+    def issues(self, category: str) -> List[str]:
+        """Get all issue messages for a category in display order"""
+        if category == 'athlete_conflicts':
+            return [msg for name in self._athletes_in_lineup_order()
+                    for msg, _, _ in self._athlete_conflicts.get(name, [])]
+        if category == 'boat_conflicts':
+            boat_names = list(dict.fromkeys(self._boats[e].name for e in self._boat_order if e in self._boats))
+            return [msg for name in boat_names for msg, _, _ in self._boat_conflicts.get(name, [])]
+
+        order = self._boat_order if category in ('weight_issues', 'age_category_issues') else self._lineup_order
+        issues_by_event = self._event_issues[category]
+        return [msg for event_num in order for msg in issues_by_event.get(event_num, [])]
+
+    def event_issues(self, event_num: int, categories: List[str] = None) -> List[str]:
+        """Get issue messages touching a single event"""
+        categories = categories or EVENT_CATEGORIES + SHARED_CATEGORIES
+        messages = []
+        for category in categories:
+            if category == 'athlete_conflicts':
+                for name in self._crews.get(event_num, set()):
+                    messages.extend(msg for msg, e1, e2 in self._athlete_conflicts.get(name, [])
+                                    if event_num in (e1, e2))
+            elif category == 'boat_conflicts':
+                boat = self._boats.get(event_num)
+                if boat is not None:
+                    messages.extend(msg for msg, e1, e2 in self._boat_conflicts.get(boat.name, [])
+                                    if event_num in (e1, e2))
+            else:
+                messages.extend(self._event_issues[category].get(event_num, []))
+        return messages
+
+    def event_issue_count(self, event_num: int) -> int:
+        """Count issues touching a single event (used for badges)"""
+        return len(self.event_issues(event_num))
+
+    def total_issues(self) -> int:
+        """Count issues across the summary categories"""
+        return sum(len(self.issues(category)) for category in SUMMARY_CATEGORIES)
+
+    def workload(self) -> Dict:
+        """Analyze athlete workload and distribution"""
+        if self._workload is not None:
+            return self._workload
+
+        overloaded = []
+        daily_breakdown = []
+        used_names = set()
+        for athlete_name in self._athletes_in_lineup_order():
+            events = self._athlete_events.get(athlete_name, set())
+            if not events:
+                continue
+            used_names.add(athlete_name)
+
+            # Find overloaded athletes (6+ events)
+            if len(events) >= 6:
+                overloaded.append({
+                    'Athlete': athlete_name,
+                    'Total Events': len(events),
+                    'Events': ', '.join(map(str, sorted(events)))
+                })
+
+            # Daily breakdown for athletes with 2+ events
+            daily_counts = defaultdict(int)
+            for event_num in events:
+                event_day = self._details(event_num)[1]
+                if event_day:
+                    daily_counts[event_day] += 1
+            if sum(daily_counts.values()) >= 2:
+                row = {'Athlete': athlete_name}
+                for day in DAYS:
+                    row[day] = daily_counts.get(day, 0)
+                row['Total'] = sum(daily_counts.values())
+                daily_breakdown.append(row)
+
+        daily_breakdown.sort(key=lambda x: x['Total'], reverse=True)
+        unused = [name for name in self._roster_names if name not in used_names]
+
+        self._workload = {
+            'overloaded': overloaded,
+            'daily_breakdown': daily_breakdown,
+            'unused': unused
+        }
+        return self._workload
+
+    def boat_usage(self, boats: List) -> Dict:
+        """Analyze boat usage and availability"""
+        used = {}
+        for event_num in self._boat_order:
+            boat = self._boats.get(event_num)
+            if boat is not None:
+                used.setdefault(boat.name, []).append(event_num)
+        unused = [boat.name for boat in boats if boat.name not in used]
+        return {'used': used, 'unused': unused}
+
+    # --- Signatures and indexes ----------------------------------------------
+
+    @staticmethod
+    def _athlete_signature(athlete):
+        if athlete is None:
+            return None
+        return (id(athlete), athlete.name, athlete.gender, athlete.age, athlete.weight,
+                athlete.can_port, athlete.can_starboard)
+
+    def _lineup_signature(self, lineup):
+        if lineup is None:
+            return None
+        return (tuple(self._athlete_signature(a) for a in lineup.get('athletes', [])),
+                self._athlete_signature(lineup.get('coxswain')))
+
+    @staticmethod
+    def _boat_signature(boat):
+        if boat is None:
+            return None
+        return (id(boat), boat.name, boat.min_weight, boat.max_weight, boat.year)
+
+    @staticmethod
+    def _crew_names(lineup):
+        if lineup is None:
+            return set()
+        names = {a.name for a in lineup.get('athletes', []) if a is not None}
+        if lineup.get('coxswain'):
+            names.add(lineup['coxswain'].name)
+        return names
+
+    def _athletes_in_lineup_order(self):
+        ordered = {}
+        for event_num in self._lineup_order:
+            lineup = self._lineups.get(event_num, {})
+            for athlete in lineup.get('athletes', []):
+                if athlete is not None:
+                    ordered[athlete.name] = True
+            if lineup.get('coxswain'):
+                ordered[lineup['coxswain'].name] = True
+        return list(ordered)
+
+    def _details(self, event_num):
+        if self._event_details is None:
+            self._event_details = {num: (name, day) for day, events in EVENTS_DATA.items()
+                                   for num, name in events}
+        return self._event_details.get(event_num, (None, None))
+
+    def _event_time(self, event_num):
+        if event_num not in self._event_times:
+            self._event_times[event_num] = get_event_time(event_num, self.params.event_spacing_minutes, 'morning', self.params)
+        return self._event_times[event_num]
+
+    def _set_event_issues(self, category, event_num, messages):
+        if messages:
+            self._event_issues[category][event_num] = messages
+        else:
+            self._event_issues[category].pop(event_num, None)
+
+    # --- Per-event checks ----------------------------------------------------
+
+    def _update_incomplete(self, event_num):
+        """Check for lineups with empty seats"""
+        messages = []
+        lineup = self._lineups.get(event_num)
+        event_name = self._details(event_num)[0] or "Unknown"
+
+        if lineup is not None:
+            try:
+                requirements = parse_event_requirements(event_name)
+            except Exception:
+                requirements = None
+
+            athletes = lineup.get('athletes', [])
+            coxswain = lineup.get('coxswain')
+            empty_seats = sum(1 for a in athletes if a is None)
+            filled_seats = len(athletes) - empty_seats
+
+            # Only report if lineup is partially filled but incomplete
+            if requirements is not None and filled_seats > 0:
+                if empty_seats > 0:
+                    messages.append(f"Event {event_num} ({event_name}): {empty_seats} empty rower seat{'s' if empty_seats != 1 else ''}")
+                if requirements.get('has_cox', False) and not coxswain:
+                    messages.append(f"Event {event_num} ({event_name}): Missing required coxswain")
+
+        self._set_event_issues('incomplete_lineups', event_num, messages)
+
+    def _update_unassigned(self, event_num):
+        """Check for events with athletes but without a boat"""
+        messages = []
+        lineup = self._lineups.get(event_num)
+        if lineup and any(a is not None for a in lineup.get('athletes', [])):
+            if event_num not in self._boats:
+                event_name = self._details(event_num)[0] or "Unknown"
+                messages.append(f"Event {event_num}: {event_name}")
+        self._set_event_issues('unassigned_boats', event_num, messages)
+
+    def _update_weight(self, event_num):
+        """Check for boat weight compatibility issues"""
+        messages = []
+        boat = self._boats.get(event_num)
+        lineup = self._lineups.get(event_num) or {}
+        athletes = [a for a in lineup.get('athletes', []) if a is not None]
+
+        if boat is not None and athletes:
+            avg_weight = sum(a.weight for a in athletes) / len(athletes)
+            weight_check = boat.weight_check(avg_weight)
+            event_name = self._details(event_num)[0] or "Unknown"
+
+            if weight_check == "bad":
+                messages.append(f"❌ Event {event_num} ({event_name}): {boat.name} - avg weight {avg_weight:.1f}lbs outside range {boat.min_weight}-{boat.max_weight}lbs")
+            elif weight_check == "warning":
+                messages.append(f"⚠️ Event {event_num} ({event_name}): {boat.name} - avg weight {avg_weight:.1f}lbs near range limits {boat.min_weight}-{boat.max_weight}lbs")
+
+        self._set_event_issues('weight_issues', event_num, messages)
+
+    def _update_age_category(self, event_num):
+        """Check for age category mismatches with boats"""
+        messages = []
+        boat = self._boats.get(event_num)
+        event_name = self._details(event_num)[0]
+
+        # Extract age category from event name (e.g., "Master E", "Master B", etc.)
+        event_age_category = None
+        if boat is not None and event_name and "Master" in event_name:
+            parts = event_name.split()
+            for i, part in enumerate(parts):
+                if part == "Master" and i + 1 < len(parts):
+                    next_part = parts[i + 1]
+                    if len(next_part) == 1 and next_part.isalpha():
+                        event_age_category = next_part.upper()
+                        break
+
+        if event_age_category and boat.year:
+            # Calculate boat age (assuming current year is 2025)
+            boat_age = 2025 - boat.year
+
+            # Approximate boat age ranges per masters age category
+            age_category_limits = {
+                'A': (0, 15), 'B': (0, 20), 'C': (0, 25), 'D': (0, 30),
+                'E': (0, 35), 'F': (0, 40), 'G': (0, 50),
+            }
+            if event_age_category in age_category_limits:
+                min_boat_age, max_boat_age = age_category_limits[event_age_category]
+                if boat_age < min_boat_age:
+                    messages.append(f"❌ Event {event_num} ({event_name}): {boat.name} ({boat.year}) is too new for Master {event_age_category} category")
+                elif boat_age > max_boat_age:
+                    messages.append(f"⚠️ Event {event_num} ({event_name}): {boat.name} ({boat.year}) may be too old for Master {event_age_category} category")
+
+        self._set_event_issues('age_category_issues', event_num, messages)
+
+    def _update_validation(self, events):
+        """Re-run the lineup validator for the given events in one batch"""
+        if not events:
+            return
+        # Only lineups sharing an athlete with these events can produce a time conflict
+        related = set(events)
+        for event_num in events:
+            for name in self._crews.get(event_num, set()):
+                related |= self._athlete_events.get(name, set())
+        lineups = {e: self._lineups[e] for e in self._lineup_order if e in related}
+        # The lineup store adds seated athletes itself, so the roster is not needed
+        self._validator.validate_all(RegattaState(lineups=lineups, params=self.params), events)
+        for event_num in events:
+            self._set_event_issues('lineup_validation', event_num, self._validator.event_messages(event_num))
+
+    # --- Shared checks -------------------------------------------------------
+
+    def _update_athlete_conflicts(self, athlete_name):
+        """Check one athlete's schedule for back-to-back events"""
+        conflicts = []
+        # Time then event number, so events at the same time keep a stable order between reruns
+        events = sorted(((e, self._event_time(e)) for e in self._athlete_events.get(athlete_name, set())),
+                        key=lambda x: (x[1], x[0]))
+
+        for (current_event, current_time), (next_event, next_time) in zip(events, events[1:]):
+            gap_minutes = (next_time - current_time).total_seconds() / 60
+            if 0 < gap_minutes < self.params.min_gap_minutes:
+                conflicts.append((f"{athlete_name}: {gap_minutes:.0f} min gap between events {current_event} and {next_event}",
+                                  current_event, next_event))
+
+        if conflicts:
+            self._athlete_conflicts[athlete_name] = conflicts
+        else:
+            self._athlete_conflicts.pop(athlete_name, None)
+
+    def _update_boat_conflicts(self, boat_name):
+        """Check one boat's assignments for overlapping launch/land windows"""
+        conflicts = []
+        launch_before = timedelta(minutes=self.params.launch_minutes_before)
+        land_after = timedelta(minutes=self.params.land_minutes_after)
+
+        windows = []
+        for event_num in self._boat_events.get(boat_name, set()):
+            event_time = self._event_time(event_num)
+            windows.append((event_num, event_time - launch_before, event_time + land_after))
+        windows.sort(key=lambda x: (x[1], x[0]))
+
+        for (current_event, _, current_land), (next_event, next_launch, _) in zip(windows, windows[1:]):
+            if current_land > next_launch:
+                overlap_minutes = (current_land - next_launch).total_seconds() / 60
+                conflicts.append((f"{boat_name}: {overlap_minutes:.0f} min overlap between events {current_event} and {next_event}",
+                                  current_event, next_event))
+
+        if conflicts:
+            self._boat_conflicts[boat_name] = conflicts
+        else:
+            self._boat_conflicts.pop(boat_name, None)
+
+
+def get_issue_engine() -> IssueEngine:
+    """Get the session's issue engine, refreshed against the current session state"""
+    import streamlit as st
+    from models.session_state import get_state_tracker, get_regatta_state
+
+    if 'issue_engine' not in st.session_state:
+        st.session_state.issue_engine = IssueEngine()
+
+    engine = st.session_state.issue_engine
+    tracker = get_state_tracker()
+    revisions = tracker.revision('lineups', 'athletes', 'boat_assignments', 'params')
+    if revisions == engine.synced_revisions:
+        record_cache_lookup('issue_engine', True)
+        return engine
+    record_cache_lookup('issue_engine', False)
+
+    # Use the change journal to narrow the scan when every change names its event
+    # (athlete edits can touch any lineup the athlete sits in, so they rescan everything)
+    changed_events = None
+    if engine.synced_revisions is not None:
+        changes = tracker.changes_since(engine.synced_sequence, 'lineups', 'athletes', 'boat_assignments', 'params')
+        if changes is not None and all(c.domain in ('lineups', 'boat_assignments') and c.key is not None
+                                       for c in changes):
+            changed_events = {c.key for c in changes}
+
+    engine.refresh_state(get_regatta_state(), changed_events)
+    engine.synced_revisions = revisions
+    engine.synced_sequence = tracker.sequence
+    return engine
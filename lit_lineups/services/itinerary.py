@@ -0,0 +1,264 @@
+"""
+Per-athlete race itineraries kept up to date event by event
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from models.constants import EVENTS_DATA
+from models.regatta_state import RegattaParams
+from services.seat_sides import assign_sides
+from utils.event_utils import build_timetable, get_event_entries_2024, parse_event_requirements
+from utils.perf_utils import profiled, record_cache_lookup
+
+SESSIONS = ('morning', 'afternoon')
+SESSION_NAMES = {'morning': "Heat", 'afternoon': "Final"}
+DAYS = tuple(EVENTS_DATA)
+
+# Races closer together than this on the same day are highlighted as quick turnarounds
+QUICK_TURNAROUND_MINUTES = 60
+
+# Event number -> (name, day, catalog position); the first listing wins, as in find_event_details
+EVENT_CATALOG = {}
+for _day, _events in EVENTS_DATA.items():
+    for _num, _name in _events:
+        EVENT_CATALOG.setdefault(_num, (_name, _day, len(EVENT_CATALOG)))
+
+ITINERARY_COLUMNS = ['day', 'session', 'event_num', 'event_name', 'session_name', 'role', 'boat', 'crew',
+                     'entries_2024', 'meet', 'launch', 'race', 'land', 'gap_minutes', 'quick_turnaround']
+
+
+def seat_name(seat_idx: int, requirements: Dict, side: Optional[str] = None) -> str:
+    """Get the name for a seat position, with the side rowed from if given"""
+    if side:
+        return f"{seat_name(seat_idx, requirements)} ({side})"
+    if requirements['is_sculling']:
+        return f"Seat {seat_idx + 1}"
+    if requirements['num_rowers'] == 8:
+        positions = ["Bow", "2", "3", "4", "5", "6", "7", "Stroke"]
+    elif requirements['num_rowers'] == 4:
+        positions = ["Bow", "2", "3", "Stroke"]
+    elif requirements['num_rowers'] == 2:
+        positions = ["Bow", "Stroke"]
+    else:
+        positions = [f"Seat {i+1}" for i in range(requirements['num_rowers'])]
+    return positions[seat_idx] if seat_idx < len(positions) else f"Seat {seat_idx + 1}"
+
+
+class ItineraryIndex:
+    """Keeps which events every athlete races in, and builds their itineraries on demand.
+
+    `refresh` compares a signature of each event's crew and boat against the
+    previous call; the itineraries of everyone in a changed boat (before and
+    after the change) are dropped and rebuilt the next time they are asked for.
+    Timing parameter changes start over.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        """Drop every cached itinerary and index"""
+        self._params_key = None
+        self._event_keys = {}                  # event_num -> crew and boat signature
+        self._crews = {}                       # event_num -> athletes in the boat (rowers and cox)
+        self._athlete_events = defaultdict(set)
+        self._itineraries = {}                 # athlete -> itinerary frame
+        self._lineups = {}
+        self._boat_assignments = {}
+        self.params = RegattaParams()
+        self.synced_revisions = None
+        self.synced_sequence = 0
+
+    def refresh(self, lineups: Dict, boat_assignments: Dict, params: RegattaParams,
+                events: Optional[set] = None) -> set:
+        """Bring the index up to date and return the athletes whose itineraries were dropped.
+
+        `events` optionally limits the change scan to events known to have changed.
+        """
+        params_key = (params.timetable_key(), params.meet_minutes_before,
+                      params.launch_minutes_before, params.land_minutes_after)
+        if params_key != self._params_key:
+            self._reset()
+            self._params_key = params_key
+            self.params = params
+            events = None
+
+        self._lineups = lineups
+        self._boat_assignments = boat_assignments
+
+        dropped = set()
+        scan = set(lineups) | set(self._event_keys) if events is None else events
+        for event_num in scan:
+            lineup = lineups.get(event_num)
+            key = self._event_signature(lineup, boat_assignments.get(event_num))
+            if self._event_keys.get(event_num) == key:
+                continue
+
+            old_crew = self._crews.get(event_num, set())
+            new_crew = self._crew(lineup)
+            for athlete in old_crew - new_crew:
+                self._athlete_events[athlete].discard(event_num)
+            for athlete in new_crew - old_crew:
+                self._athlete_events[athlete].add(event_num)
+            dropped |= old_crew | new_crew
+
+            if lineup is None:
+                self._event_keys.pop(event_num, None)
+                self._crews.pop(event_num, None)
+            else:
+                self._event_keys[event_num] = key
+                self._crews[event_num] = new_crew
+
+        for athlete in dropped:
+            self._itineraries.pop(athlete, None)
+        return dropped
+
+    def itinerary(self, athlete) -> pd.DataFrame:
+        """The athlete's races in both sessions, in race order.
+
+        gap_minutes is the time since the athlete's previous race (NaN for the first);
+        quick_turnaround flags races less than an hour after another race that day.
+        """
+        itinerary = self._itineraries.get(athlete)
+        if itinerary is None:
+            itinerary = self._build_itinerary(athlete)
+            self._itineraries[athlete] = itinerary
+        return itinerary
+
+    @staticmethod
+    def _crew(lineup) -> set:
+        if lineup is None:
+            return set()
+        crew = {a for a in lineup.get('athletes', []) if a is not None}
+        if lineup.get('coxswain') is not None:
+            crew.add(lineup['coxswain'])
+        return crew
+
+    @staticmethod
+    def _event_signature(lineup, boat) -> Optional[tuple]:
+        """Who sits where (under which name, and which sides they row) plus the boat"""
+        if lineup is None:
+            return None
+        seats = tuple((id(a), a.name, a.can_port, a.can_starboard) if a is not None else None
+                      for a in lineup.get('athletes', []))
+        coxswain = lineup.get('coxswain')
+        return (seats, (id(coxswain), coxswain.name) if coxswain is not None else None,
+                (id(boat), boat.name) if boat is not None else None)
+
+    def _event_role(self, athlete, event_num: int, event_name: str) -> str:
+        """Seat name and sweep side of a rower (a rowing seat wins over coxing the same boat), else Coxswain"""
+        lineup = self._lineups[event_num]
+        athletes = lineup.get('athletes', [])
+        for i, rower in enumerate(athletes):
+            if rower is athlete:
+                requirements = parse_event_requirements(event_name)
+                sides = None if requirements['is_sculling'] else assign_sides(athletes, requirements['num_rowers'])
+                return seat_name(i, requirements, sides[i] if sides else None)
+        return "Coxswain"
+
+    def _crew_members(self, athlete, event_num: int) -> str:
+        """The other people in the boat"""
+        lineup = self._lineups[event_num]
+        crew_names = [a.name for a in lineup.get('athletes', []) if a is not None and a is not athlete]
+        coxswain = lineup.get('coxswain')
+        if coxswain is not None and coxswain is not athlete:
+            crew_names.append(f"{coxswain.name} (Cox)")
+        return ", ".join(crew_names) if crew_names else "Solo"
+
+    @profiled('ItineraryIndex.build_itinerary')
+    def _build_itinerary(self, athlete) -> pd.DataFrame:
+        """One row per race of the athlete's events, both sessions"""
+        params = self.params
+        timetables = {session: build_timetable(params.timetable_key(), session) for session in SESSIONS}
+        session_starts = {
+            'morning': datetime.combine(params.regatta_start_date, params.morning_start_time),
+            'afternoon': datetime.combine(params.regatta_start_date, params.afternoon_start_time)
+        }
+
+        rows = []
+        for event_num in self._athlete_events.get(athlete, ()):
+            if event_num not in EVENT_CATALOG:
+                continue
+            event_name, day, position = EVENT_CATALOG[event_num]
+            role = self._event_role(athlete, event_num, event_name)
+            boat = self._boat_assignments.get(event_num)
+            crew = self._crew_members(athlete, event_num)
+            entries_2024 = get_event_entries_2024(event_num)
+            for session in SESSIONS:
+                race = timetables[session].get(event_num, session_starts[session])
+                rows.append((race, position, day, session, event_num, event_name, SESSION_NAMES[session], role,
+                             boat.name if boat is not None else None, crew, entries_2024))
+        rows.sort(key=lambda row: row[:2])
+        (races, _, days, sessions, event_nums, event_names, session_names, roles, boats, crews,
+         entries) = zip(*rows) if rows else [()] * 11
+
+        # Gaps between consecutive races in one diff over the sorted race times
+        race = np.array(races, dtype='datetime64[ns]')
+        gaps = np.full(len(race), np.nan)
+        gaps[1:] = np.diff(race) / np.timedelta64(1, 'm')
+        day_codes = np.array([DAYS.index(day) for day in days], dtype=int)
+        same_day = np.zeros(len(race), dtype=bool)
+        same_day[1:] = day_codes[1:] == day_codes[:-1]
+
+        # Built in one constructor call: this runs once per athlete for bulk exports
+        return pd.DataFrame({
+            'day': pd.Categorical.from_codes(day_codes, categories=DAYS, ordered=True),
+            'session': pd.Categorical(sessions, categories=SESSIONS, ordered=True),
+            'event_num': np.array(event_nums, dtype='int64'),
+            'event_name': np.array(event_names, dtype=object),
+            'session_name': np.array(session_names, dtype=object),
+            'role': np.array(roles, dtype=object),
+            'boat': np.array(boats, dtype=object),
+            'crew': np.array(crews, dtype=object),
+            'entries_2024': pd.array(entries, dtype='Int64'),
+            'meet': race - np.timedelta64(params.meet_minutes_before, 'm'),
+            'launch': race - np.timedelta64(params.launch_minutes_before, 'm'),
+            'race': race,
+            'land': race + np.timedelta64(params.land_minutes_after, 'm'),
+            'gap_minutes': gaps,
+            'quick_turnaround': same_day & (gaps > 0) & (gaps < QUICK_TURNAROUND_MINUTES)
+        }, columns=ITINERARY_COLUMNS)
+
+
+def short_gaps(itinerary: pd.DataFrame, min_gap_minutes: int) -> List[str]:
+    """Describe every pair of consecutive races closer together than min_gap_minutes"""
+    gaps = itinerary['gap_minutes'].to_numpy()
+    rows = np.flatnonzero((gaps > 0) & (gaps < min_gap_minutes))
+    event_nums = itinerary['event_num'].to_numpy()
+    days = itinerary['day'].astype(str).to_numpy()
+    return [f"Short gap ({gaps[i]:.0f} min) between events {event_nums[i - 1]} and {event_nums[i]} on {days[i - 1]}"
+            for i in rows]
+
+
+def get_itinerary_index() -> ItineraryIndex:
+    """Get the session's itinerary index, refreshed against the current session state"""
+    import streamlit as st
+    from models.session_state import get_state_tracker, get_regatta_params
+
+    if 'itinerary_index' not in st.session_state:
+        st.session_state.itinerary_index = ItineraryIndex()
+
+    index = st.session_state.itinerary_index
+    tracker = get_state_tracker()
+    revisions = tracker.revision('lineups', 'athletes', 'boats', 'boat_assignments', 'params')
+    if revisions == index.synced_revisions:
+        record_cache_lookup('itinerary_index', True)
+        return index
+    record_cache_lookup('itinerary_index', False)
+
+    # Lineup and boat assignment edits name their event; anything else rescans every event
+    changed_events = None
+    if index.synced_revisions is not None:
+        changes = tracker.changes_since(index.synced_sequence, 'lineups', 'athletes', 'boats',
+                                        'boat_assignments', 'params')
+        if changes is not None and all(c.domain in ('lineups', 'boat_assignments') and c.key is not None
+                                       for c in changes):
+            changed_events = {c.key for c in changes}
+
+    index.refresh(st.session_state.lineups, st.session_state.boat_assignments, get_regatta_params(),
+                  changed_events)
+    index.synced_revisions = revisions
+    index.synced_sequence = tracker.sequence
+    return index
@@ -0,0 +1,157 @@
+"""
+Bulk itinerary export: a CSV and an iCalendar file per athlete, streamed into one zip archive
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterable, List, Union
+import numpy as np
+import pandas as pd
+from models.regatta_state import RegattaState
+from services.itinerary import ItineraryIndex
+from utils.perf_utils import profiled
+
+# Column order for per-athlete itinerary CSVs
+ITINERARY_EXPORT_COLUMNS = ['Day', 'Session', 'Event', 'Event Name', 'Round', 'Meet', 'Launch', 'Race', 'Land',
+                            'Entries 2024', 'Role', 'Boat', 'Crew']
+
+# Athletes formatted together and written out before the next batch is built
+EXPORT_BATCH_SIZE = 25
+
+ICS_PRODID = "-//Rowing Lineup Management//Athlete Itinerary//EN"
+ICS_LINE_OCTETS = 75
+
+
+def itinerary_export(itinerary: pd.DataFrame) -> pd.DataFrame:
+    """Flatten itinerary rows into export columns (full date-times)"""
+    export = pd.DataFrame({
+        'Day': itinerary['day'].astype(str),
+        'Session': itinerary['session'].astype(str),
+        'Event': itinerary['event_num'],
+        'Event Name': itinerary['event_name'],
+        'Round': itinerary['session_name']
+    })
+    for column in ('meet', 'launch', 'race', 'land'):
+        export[column.title()] = itinerary[column].dt.strftime("%Y-%m-%d %H:%M")
+    export['Entries 2024'] = itinerary['entries_2024'].astype('string').fillna("")
+    export['Role'] = itinerary['role']
+    export['Boat'] = itinerary['boat'].fillna("Not assigned")
+    export['Crew'] = itinerary['crew']
+    return export[ITINERARY_EXPORT_COLUMNS]
+
+
+def _ics_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+                 .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_fold(line: str) -> str:
+    """Fold a content line at 75 octets (continuations start with a space) and terminate it"""
+    if len(line.encode('utf-8')) <= ICS_LINE_OCTETS:
+        return line + "\r\n"
+    pieces = []
+    current, size = "", 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > ICS_LINE_OCTETS:
+            pieces.append(current)
+            current, size = " ", 1
+        current += char
+        size += char_size
+    pieces.append(current)
+    return "".join(piece + "\r\n" for piece in pieces)
+
+
+def _ics_events(itineraries: pd.DataFrame, uid_prefixes: pd.Series, stamp: datetime) -> pd.Series:
+    """A VEVENT block per race, from meet time to land time (local, floating times)"""
+    summary = (itineraries['event_num'].astype(str) + ": " + itineraries['event_name']
+               + " (" + itineraries['session_name'] + ")")
+    description = ("Role: " + itineraries['role'] + "\nBoat: " + itineraries['boat'].fillna("Not assigned")
+                   + "\nCrew: " + itineraries['crew']
+                   + "\nMeet " + itineraries['meet'].dt.strftime("%H:%M")
+                   + ", launch " + itineraries['launch'].dt.strftime("%H:%M")
+                   + ", race " + itineraries['race'].dt.strftime("%H:%M")
+                   + ", land " + itineraries['land'].dt.strftime("%H:%M"))
+    uid = (uid_prefixes + "-" + itineraries['event_num'].astype(str) + "-"
+           + itineraries['session'].astype(str) + "@rowing-lineups")
+    dtstamp = stamp.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return ("BEGIN:VEVENT\r\n"
+            + ("UID:" + uid).map(_ics_fold)
+            + f"DTSTAMP:{dtstamp}\r\n"
+            + "DTSTART:" + itineraries['meet'].dt.strftime("%Y%m%dT%H%M%S") + "\r\n"
+            + "DTEND:" + itineraries['land'].dt.strftime("%Y%m%dT%H%M%S") + "\r\n"
+            + ("SUMMARY:" + summary.map(_ics_text)).map(_ics_fold)
+            + ("DESCRIPTION:" + description.map(_ics_text)).map(_ics_fold)
+            + "END:VEVENT\r\n")
+
+
+def _ics_calendar(athlete_name: str, events: List[str]) -> str:
+    """Wrap an athlete's VEVENT blocks in a calendar"""
+    header = ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + _ics_fold(f"PRODID:{ICS_PRODID}") + "CALSCALE:GREGORIAN\r\n"
+              + _ics_fold(f"X-WR-CALNAME:{_ics_text(f'{athlete_name} - Regatta schedule')}"))
+    return header + "".join(events) + "END:VCALENDAR\r\n"
+
+
+def _csv_text(rows: np.ndarray) -> str:
+    """CSV for one athlete's export rows, formatted like DataFrame.to_csv"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(ITINERARY_EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _file_stem(name: str, used: set) -> str:
+    """A filesystem-safe, unique file name for an athlete"""
+    stem = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('._') or "athlete"
+    candidate, n = stem, 2
+    while candidate.lower() in used:
+        candidate, n = f"{stem}_{n}", n + 1
+    used.add(candidate.lower())
+    return candidate
+
+
+@profiled('write_itinerary_archive')
+def write_itinerary_archive(index: ItineraryIndex, athletes: Iterable, target: Union[str, BinaryIO],
+                            batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Write <name>.csv and <name>.ics for every athlete with races into a zip archive.
+
+    Each batch of athletes is formatted in one pass over their concatenated
+    itineraries and compressed straight into `target` (a path or a seekable
+    binary file), so only one batch is held in memory. Returns the number of
+    athletes exported.
+    """
+    stamp = datetime.now(timezone.utc)
+    used_stems = set()
+    athletes = list(athletes)
+    exported = 0
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for start in range(0, len(athletes), batch_size):
+            members = [(athlete, itinerary) for athlete in athletes[start:start + batch_size]
+                       for itinerary in [index.itinerary(athlete)] if not itinerary.empty]
+            if not members:
+                continue
+            stems = [_file_stem(athlete.name, used_stems) for athlete, _ in members]
+            lengths = [len(itinerary) for _, itinerary in members]
+            bounds = np.cumsum([0] + lengths)
+
+            batch = pd.concat([itinerary for _, itinerary in members], ignore_index=True)
+            csv_rows = itinerary_export(batch).to_numpy(dtype=object)
+            events = _ics_events(batch, pd.Series(np.repeat(stems, lengths)), stamp).tolist()
+
+            for i, ((athlete, _), stem) in enumerate(zip(members, stems)):
+                rows = slice(bounds[i], bounds[i + 1])
+                archive.writestr(f"{stem}.csv", _csv_text(csv_rows[rows]))
+                archive.writestr(f"{stem}.ics", _ics_calendar(athlete.name, events[rows]))
+            exported += len(members)
+    return exported
+
+
+def export_itineraries(state: RegattaState, target: Union[str, BinaryIO], batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Write every athlete's itinerary for a regatta state into a zip archive"""
+    index = ItineraryIndex()
+    index.refresh(state.lineups, state.boat_assignments, state.params)
+    return write_itinerary_archive(index, sorted(state.athletes, key=lambda a: a.name), target, batch_size)
@@ -0,0 +1,198 @@
+"""
+Local search that improves the rower seats of every lineup
+"""
+import math
+import random
+from typing import Dict, Optional
+from models.athlete_table import AthleteTable
+from models.pins import pinned_seats
+from models.regatta_state import RegattaState
+from services.seat_sides import sides_feasible
+from utils.event_utils import find_event_details, get_event_time, min_required_age, parse_event_requirements
+
+# Cost of each kind of problem in the search objective
+PENALTY_WEIGHTS = {
+    'conflicts': 10,    # per pair of an athlete's races closer than min_gap_minutes
+    'sides': 5,         # per sweep rower without a seat on a side they row
+    'gender': 5,        # per rower of imbalance in a mixed crew
+    'empty_seats': 3,   # per open seat
+    'age': 2,           # per crew below its category's minimum average age
+}
+
+
+class LineupSearch:
+    """Simulated annealing over who sits in the rower seats of each lineup.
+
+    A move puts a bench candidate into a seat, or empties a seat. Candidates
+    for an event are the athletes who prefer it, can row it and are
+    available that day, as for auto-assignment. The objective is the
+    weighted count of PENALTY_WEIGHTS problems; each move is scored from the
+    one crew and the two athletes it touches. Coxswains are left in place
+    but their races count for conflicts. Worse moves are taken with a
+    probability that falls as `temperature` goes to 0, so the search can
+    leave local minima early on and settles towards the end. Pinned seats
+    are never moved, and `events` limits the moves to some events. `table`
+    may pass an already built AthleteTable of the state's roster.
+    """
+
+    def __init__(self, state: RegattaState, seed: int = 0, events=None, table: Optional[AthleteTable] = None):
+        params = state.params
+        self.rng = random.Random(seed)
+        self.lineups = {event_num: {'athletes': list(lineup.get('athletes', [])), 'coxswain': lineup.get('coxswain')}
+                        for event_num, lineup in state.lineups.items()}
+
+        table = table or AthleteTable(state.athletes)
+        preferring = table.preferring()
+        self._requirements = {}
+        self._min_age = {}
+        self._times = {}
+        self._candidates = {}
+        for event_num in self.lineups:
+            event_name, event_day = find_event_details(event_num)
+            if not event_name:
+                continue
+            requirements = parse_event_requirements(event_name)
+            self._requirements[event_num] = requirements
+            self._min_age[event_num] = min_required_age(event_name)
+            self._times[event_num] = get_event_time(event_num, params.event_spacing_minutes, 'morning',
+                                                    params).timestamp() / 60
+            self._candidates[event_num] = []
+            if events is None or event_num in events:
+                rows = preferring.get(event_num, [])
+                eligible = table.rower_mask(event_name) & table.available_on(event_day)
+                self._candidates[event_num] = [table.athletes[r] for r in rows if eligible[r]]
+
+            # Lineups can be shorter than the boat when loaded from older presets
+            athletes = self.lineups[event_num]['athletes']
+            athletes.extend([None] * (requirements['num_rowers'] - len(athletes)))
+        # Seats a move may change, per event
+        self._free_seats = {}
+        for event_num in self._requirements:
+            if events is not None and event_num not in events:
+                continue
+            athletes = self.lineups[event_num]['athletes']
+            pinned = pinned_seats(state.pins, event_num, self.lineups[event_num])
+            free = [seat for seat in range(len(athletes)) if seat not in pinned]
+            if free and (self._candidates[event_num] or any(athletes[seat] for seat in free)):
+                self._free_seats[event_num] = free
+        self._events = list(self._free_seats)
+        self._min_gap = params.min_gap_minutes
+
+        # Events each athlete races in (rowing or coxing), for conflicts
+        self._races = {}
+        for event_num in self._requirements:
+            lineup = self.lineups[event_num]
+            for athlete in lineup['athletes'] + [lineup['coxswain']]:
+                if athlete is not None:
+                    self._races.setdefault(id(athlete), set()).add(event_num)
+
+        self._event_penalty = {event_num: self._crew_penalty(event_num) for event_num in self._requirements}
+        self._athlete_conflicts = {key: self._conflict_count(races) for key, races in self._races.items()}
+        self.objective = sum(self._event_penalty.values()) + \
+            PENALTY_WEIGHTS['conflicts'] * sum(self._athlete_conflicts.values())
+
+    def conflicts(self) -> int:
+        """Pairs of races of one athlete closer than min_gap_minutes"""
+        return sum(self._athlete_conflicts.values())
+
+    def snapshot(self) -> Dict:
+        """A copy of the current lineups"""
+        return {event_num: {'athletes': list(lineup['athletes']), 'coxswain': lineup['coxswain']}
+                for event_num, lineup in self.lineups.items()}
+
+    def step(self, temperature: float) -> bool:
+        """Try one random move; keep it if it does not worsen the objective, or by chance. Returns whether kept."""
+        if not self._events:
+            return False
+        event_num = self.rng.choice(self._events)
+        athletes = self.lineups[event_num]['athletes']
+        seat = self.rng.choice(self._free_seats[event_num])
+        leaving = athletes[seat]
+
+        bench = self._candidates[event_num]
+        joining = None
+        if bench and (leaving is None or self.rng.random() < 0.9):
+            joining = self.rng.choice(bench)
+            if joining in athletes or joining is self.lineups[event_num]['coxswain']:
+                return False
+        if joining is leaving:
+            return False
+
+        before = self.objective
+        self._move(event_num, seat, joining)
+        delta = self.objective - before
+        if delta <= 0 or (temperature > 0 and self.rng.random() < math.exp(-delta / temperature)):
+            return True
+        self._move(event_num, seat, leaving)
+        return False
+
+    def fill_open_seats(self) -> int:
+        """Seat the best bench candidate in each open seat where one improves the objective. Returns seats filled."""
+        filled = 0
+        for event_num in self._events:
+            lineup = self.lineups[event_num]
+            for seat in self._free_seats[event_num]:
+                if lineup['athletes'][seat] is not None:
+                    continue
+                best, best_objective = None, self.objective
+                for athlete in self._candidates[event_num]:
+                    if athlete in lineup['athletes'] or athlete is lineup['coxswain']:
+                        continue
+                    self._move(event_num, seat, athlete)
+                    if self.objective < best_objective:
+                        best, best_objective = athlete, self.objective
+                    self._move(event_num, seat, None)
+                if best is not None:
+                    self._move(event_num, seat, best)
+                    filled += 1
+        return filled
+
+    def _move(self, event_num: int, seat: int, athlete: Optional[object]):
+        """Seat an athlete (or nobody) and update the objective for the crew and both athletes"""
+        athletes = self.lineups[event_num]['athletes']
+        leaving = athletes[seat]
+        athletes[seat] = athlete
+
+        penalty = self._crew_penalty(event_num)
+        self.objective += penalty - self._event_penalty[event_num]
+        self._event_penalty[event_num] = penalty
+
+        for changed, racing in ((leaving, False), (athlete, True)):
+            if changed is None:
+                continue
+            races = self._races.setdefault(id(changed), set())
+            if racing:
+                races.add(event_num)
+            elif changed is not self.lineups[event_num]['coxswain']:
+                races.discard(event_num)
+            count = self._conflict_count(races)
+            self.objective += PENALTY_WEIGHTS['conflicts'] * (count - self._athlete_conflicts.get(id(changed), 0))
+            self._athlete_conflicts[id(changed)] = count
+
+    def _conflict_count(self, races) -> int:
+        times = sorted(self._times[event_num] for event_num in races)
+        return sum(1 for i, t in enumerate(times) for u in times[i + 1:] if u - t < self._min_gap)
+
+    def _crew_penalty(self, event_num: int) -> int:
+        """Weighted problems of one crew, as checked by LineupValidator"""
+        requirements = self._requirements[event_num]
+        crew = [a for a in self.lineups[event_num]['athletes'] if a is not None]
+        num_rowers = requirements['num_rowers']
+        penalty = PENALTY_WEIGHTS['empty_seats'] * max(num_rowers - len(crew), 0)
+
+        if requirements['gender_req'] == 'Mixed' and crew:
+            men = sum(1 for a in crew if a.gender == 'M')
+            penalty += PENALTY_WEIGHTS['gender'] * abs(2 * men - len(crew))
+
+        if not requirements['is_sculling'] and crew:
+            port_only = sum(1 for a in crew if a.can_port and not a.can_starboard)
+            starboard_only = sum(1 for a in crew if a.can_starboard and not a.can_port)
+            unsided = sum(1 for a in crew if not (a.can_port or a.can_starboard))
+            if not sides_feasible(port_only, starboard_only, unsided, num_rowers):
+                excess = max(port_only - num_rowers // 2, 0) + max(starboard_only - num_rowers // 2, 0) + unsided
+                penalty += PENALTY_WEIGHTS['sides'] * excess
+
+        min_age = self._min_age[event_num]
+        if min_age is not None and crew and sum(a.age for a in crew) < min_age * len(crew):
+            penalty += PENALTY_WEIGHTS['age']
+        return penalty
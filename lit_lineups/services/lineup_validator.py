@@ -1,142 +1,217 @@
 """
 Lineup validation service
 """
-from typing import List, Dict
-from utils.event_utils import check_time_conflict, find_event_details
+from dataclasses import replace
+from typing import List, Dict, Optional
+import numpy as np
+import pandas as pd
+from models.athlete_table import AthleteTable
+from models.constants import EVENTS_DATA
+from models.lineup_store import EMPTY, LineupStore
+from models.regatta_state import RegattaParams, RegattaState
+from utils.event_utils import get_event_time, min_required_age, parse_event_requirements
+from utils.perf_utils import profiled, record_cache_lookup
+
+# Event number -> name; the first listing wins, as in find_event_details
+EVENT_NAMES = {}
+for _events in EVENTS_DATA.values():
+    for _num, _name in _events:
+        EVENT_NAMES.setdefault(_num, _name)
+
+VALIDATION_COLUMNS = ['event_name', 'num_rowers', 'filled', 'missing_rowers', 'needs_cox', 'men', 'women',
+                      'gender_ok', 'port_ok', 'starboard_ok', 'unsided', 'avg_age', 'min_age', 'age_ok', 'conflicts',
+                      'messages']
+
+# Columns the issue texts are built from, in _messages argument order
+MESSAGE_COLUMNS = ['missing_rowers', 'needs_cox', 'men', 'women', 'gender_ok', 'port_ok', 'starboard_ok',
+                   'unsided', 'avg_age', 'min_age', 'age_ok', 'conflicts']
 
 class LineupValidator:
     """Service for validating event lineups"""
-    
-    def _check_age_requirements(self, lineup: Dict, requirements: Dict, event_name: str) -> List[str]:
-        """Check age category requirements - average age must meet minimum"""
-        issues = []
-        
-        if not lineup['athletes']:
-            return issues
-        
-        # Extract age categories from event name
-        import re
-        from models.constants import AGE_CATEGORIES
-        
-        age_cats_in_event = re.findall(r'\b([A-K]{1,2}(?:-[A-K]{1,2})?)\b', event_name)
-        
-        if not age_cats_in_event:
-            return issues
-        
-        # Find the minimum age requirement for this event
-        min_required_age = None
-        for cat_group in age_cats_in_event:
-            if '-' in cat_group:
-                # Range like "AA-B"
-                start_cat = cat_group.split('-')[0]
-            else:
-                # Single category like "A"
-                start_cat = cat_group
-            
-            if start_cat in AGE_CATEGORIES:
-                cat_min_age = AGE_CATEGORIES[start_cat][0]
-                if min_required_age is None or cat_min_age < min_required_age:
-                    min_required_age = cat_min_age
-        
-        if min_required_age is not None:
-            # Calculate average age of rowers (excluding coxswain)
-            avg_age = sum(a.age for a in lineup['athletes']) / len(lineup['athletes'])
-            
-            if avg_age < min_required_age:
-                issues.append(f"Average age {avg_age:.1f} is below minimum {min_required_age} for this category")
-        
-        return issues
-    
-    def validate_lineup(self, lineup: Dict, requirements: Dict, event_num: int, 
-                       all_lineups: Dict, spacing_minutes: int, min_gap_minutes: int) -> List[str]:
-        """Validate a lineup and return list of issues"""
-        issues = []
-        
-        # Check if lineup is complete
-        issues.extend(self._check_completeness(lineup, requirements))
-        
-        # Check gender balance for mixed events
-        issues.extend(self._check_gender_balance(lineup, requirements))
-        
-        # Check sweep rowing balance
-        issues.extend(self._check_sweep_balance(lineup, requirements))
-        
-        # Check age requirements
-        from utils.event_utils import find_event_details
-        event_name, _ = find_event_details(event_num)
-        if event_name:
-            issues.extend(self._check_age_requirements(lineup, requirements, event_name))
-        
-        # Check time conflicts
-        issues.extend(self._check_time_conflicts(lineup, event_num, all_lineups, spacing_minutes, min_gap_minutes))
-        
-        return issues
-    
-    def _check_completeness(self, lineup: Dict, requirements: Dict) -> List[str]:
-        """Check if lineup is complete"""
-        issues = []
-        
-        if len(lineup['athletes']) < requirements['num_rowers']:
-            issues.append(f"Need {requirements['num_rowers'] - len(lineup['athletes'])} more rowers")
-        
-        if requirements['has_cox'] and not lineup['coxswain']:
-            issues.append("Need a coxswain")
-        
-        return issues
-    
-    def _check_gender_balance(self, lineup: Dict, requirements: Dict) -> List[str]:
-        """Check gender balance for mixed events"""
-        issues = []
-        
-        if requirements['gender_req'] == 'Mixed' and lineup['athletes']:
-            male_count = sum(1 for a in lineup['athletes'] if a.gender == 'M')
-            female_count = sum(1 for a in lineup['athletes'] if a.gender == 'F')
-            if male_count != female_count:
-                issues.append(f"Mixed event needs equal men and women (currently {male_count}M, {female_count}F)")
-        
-        return issues
-    
-    def _check_sweep_balance(self, lineup: Dict, requirements: Dict) -> List[str]:
-        """Check port/starboard balance for sweep events"""
-        issues = []
-        
-        if not requirements['is_sculling'] and len(lineup['athletes']) > 1:
-            port_rowers = sum(1 for a in lineup['athletes'] if a.can_port)
-            starboard_rowers = sum(1 for a in lineup['athletes'] if a.can_starboard)
-            both_sides = sum(1 for a in lineup['athletes'] if a.can_port and a.can_starboard)
-            
-            needed_port = requirements['num_rowers'] // 2
-            needed_starboard = requirements['num_rowers'] // 2
-            
-            if port_rowers < needed_port and (port_rowers + both_sides) < needed_port:
-                issues.append("Not enough port-side rowers available")
-            if starboard_rowers < needed_starboard and (starboard_rowers + both_sides) < needed_starboard:
-                issues.append("Not enough starboard-side rowers available")
-        
-        return issues
-    
-    def _check_time_conflicts(self, lineup: Dict, event_num: int, all_lineups: Dict, 
-                             spacing_minutes: int, min_gap_minutes: int) -> List[str]:
-        """Check for time conflicts with other events"""
-        issues = []
-        
-        if not (lineup['athletes'] or lineup['coxswain']):
-            return issues
-        
-        all_lineup_athletes = lineup['athletes'] + ([lineup['coxswain']] if lineup['coxswain'] else [])
-        
-        for athlete in all_lineup_athletes:
-            conflicts = []
-            for other_event, other_lineup in all_lineups.items():
-                if other_event != event_num:
-                    other_athletes = other_lineup['athletes'] + ([other_lineup['coxswain']] if other_lineup['coxswain'] else [])
-                    if athlete in other_athletes:
-                        if check_time_conflict(event_num, other_event, spacing_minutes, min_gap_minutes):
-                            other_event_name, _ = find_event_details(other_event)
-                            if other_event_name:
-                                conflicts.append(f"Event {other_event}: {other_event_name}")
-            
-            if conflicts:
-                issues.append(f"{athlete.name} has time conflicts with: {', '.join(conflicts)}")
-        
-        return issues
\ No newline at end of file
+
+    def __init__(self):
+        self.results = None       # Table from the last validate_all call
+        self._results_key = None  # Crews and parameters it was computed from (full runs only)
+
+    @profiled('LineupValidator.validate_all')
+    def validate_all(self, state: RegattaState, events: Optional[set] = None) -> pd.DataFrame:
+        """Validate every lineup with a crew in one pass and return one row per event.
+
+        Checks completeness, mixed-event gender balance, sweep side coverage, the
+        average age minimum and time conflicts (a crew member racing another event
+        less than min_gap_minutes away in the morning session). `events` limits the
+        rows to those events; conflicts are still found against every lineup.
+        `messages` holds the issue texts per event, in check order. A full run
+        over the same crews and parameters as the previous one returns its table.
+        """
+        params = state.params
+        key = self._state_key(state) if events is None else None
+        if key is not None:
+            record_cache_lookup('lineup_validation', key == self._results_key)
+            if key == self._results_key:
+                return self.results
+        store = LineupStore(state.lineups, AthleteTable(state.athletes))
+        crew = store.crew_arrays()
+
+        names = [EVENT_NAMES.get(int(event_num)) for event_num in store.events]
+        selected = (crew['filled'] > 0) | crew['has_cox']
+        selected &= np.array([name is not None for name in names], dtype=bool)
+        if events is not None:
+            selected &= np.isin(store.events, list(events))
+        idx = np.flatnonzero(selected)
+        event_names = [names[i] for i in idx]
+        columns = self.crew_checks({name: values[idx] for name, values in crew.items()}, event_names)
+        columns['conflicts'] = self._time_conflicts(store, selected, params)
+        columns['messages'] = [self._messages(*row) for row in zip(*(columns[column] for column in MESSAGE_COLUMNS))]
+
+        self.results = pd.DataFrame(columns, index=pd.Index(store.events[idx], name='event_num'),
+                                    columns=VALIDATION_COLUMNS)
+        self._results_key = key
+        return self.results
+
+    @staticmethod
+    def crew_checks(crew: Dict[str, np.ndarray], event_names: List[str]) -> Dict[str, np.ndarray]:
+        """The per-crew check columns (all but conflicts and messages) for crews given as crew_arrays rows.
+
+        `crew` holds the LineupStore.crew_arrays columns of one crew per entry
+        of `event_names`; the same event may appear more than once (e.g. one
+        crew per what-if change).
+        """
+        requirements = [parse_event_requirements(name) for name in event_names]
+
+        def requirement(key, dtype):
+            return np.array([r[key] for r in requirements], dtype=dtype)
+
+        filled = crew['filled']
+        num_rowers = requirement('num_rowers', np.int64)
+        men, women = crew['men'], crew['women']
+
+        # Mixed crews need as many men as women
+        gender_ok = (requirement('gender_req', object) != 'Mixed') | (filled == 0) | (men == women)
+
+        # Sweep crews must split half to each side (see seat_sides.sides_feasible): more starboard-only
+        # rowers than starboard seats leave port short, and vice versa
+        is_sweep = ~requirement('is_sculling', bool) & (filled > 0)
+        half = num_rowers // 2
+        port, starboard, both = (crew[side] for side in ('port', 'starboard', 'both_sides'))
+        port_ok = ~is_sweep | (starboard - both <= half)
+        starboard_ok = ~is_sweep | (port - both <= half)
+        unsided = np.where(is_sweep, filled - port - starboard + both, 0)
+
+        # Average rower age against the youngest category in the event name
+        avg_age = crew['avg_age']
+        min_age = np.array([min_required_age(name) for name in event_names], dtype=float)
+        age_ok = (filled == 0) | np.isnan(min_age) | (avg_age >= min_age)
+
+        return {
+            'event_name': np.array(event_names, dtype=object),
+            'num_rowers': num_rowers,
+            'filled': filled,
+            'missing_rowers': np.maximum(num_rowers - filled, 0),
+            'needs_cox': requirement('has_cox', bool) & ~crew['has_cox'],
+            'men': men,
+            'women': women,
+            'gender_ok': gender_ok,
+            'port_ok': port_ok,
+            'starboard_ok': starboard_ok,
+            'unsided': unsided,
+            'avg_age': avg_age,
+            'min_age': pd.array(min_age, dtype='Int64'),
+            'age_ok': age_ok,
+        }
+
+    @staticmethod
+    def issue_counts(columns: Dict[str, np.ndarray], conflicts: np.ndarray) -> np.ndarray:
+        """How many issue texts _messages gives each row of crew_checks columns, with `conflicts` conflict texts"""
+        return ((columns['missing_rowers'] > 0).astype(np.int64) + columns['needs_cox'] + ~columns['gender_ok']
+                + ~columns['port_ok'] + ~columns['starboard_ok'] + (columns['unsided'] > 0) + ~columns['age_ok']
+                + conflicts)
+
+    @staticmethod
+    def _time_conflicts(store: LineupStore, selected: np.ndarray, params: RegattaParams) -> List[List[str]]:
+        """For each selected event, one message per crew member racing another event too close in time.
+
+        Crew members are listed bow to stroke, then the coxswain; the clashing
+        events in lineup order.
+        """
+        num_events = len(store.events)
+        slots = np.column_stack([store.seats, store.coxswains])
+        event_idx, slot = np.nonzero(slots != EMPTY)
+        rows = slots[event_idx, slot]
+
+        # Distinct (athlete, event) memberships, sorted by athlete then lineup order
+        memberships = np.unique(rows * num_events + event_idx)
+        member_rows, member_events = memberships // num_events, memberships % num_events
+
+        # Pair every seat in a selected event with each event its athlete is in
+        wanted = selected[event_idx]
+        seat_events, seat_rows = event_idx[wanted], rows[wanted]
+        first = np.searchsorted(member_rows, seat_rows, 'left')
+        counts = np.searchsorted(member_rows, seat_rows, 'right') - first
+        seat_of_pair = np.repeat(np.arange(len(seat_rows)), counts)
+        others = member_events[np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+        race_times = np.array([get_event_time(int(e), params.event_spacing_minutes, 'morning', params)
+                               for e in store.events], dtype='datetime64[ns]')
+        named = np.array([int(e) in EVENT_NAMES for e in store.events], dtype=bool)
+        this = seat_events[seat_of_pair]
+        gap = np.abs(race_times[this] - race_times[others]) / np.timedelta64(1, 'm')
+        clash = (this != others) & named[others] & (gap < params.min_gap_minutes)
+
+        conflicts = {i: [] for i in np.flatnonzero(selected)}
+        clashes = {}
+        for seat_idx, other in zip(seat_of_pair[clash].tolist(), others[clash].tolist()):
+            clashes.setdefault(seat_idx, []).append(f"Event {store.events[other]}: {EVENT_NAMES[int(store.events[other])]}")
+        for seat_idx, clashing in clashes.items():
+            athlete = store.table.athletes[seat_rows[seat_idx]]
+            conflicts[seat_events[seat_idx]].append(f"{athlete.name} has time conflicts with: {', '.join(clashing)}")
+        return list(conflicts.values())
+
+    @staticmethod
+    def _messages(missing_rowers, needs_cox, men, women, gender_ok, port_ok, starboard_ok, unsided, avg_age,
+                  min_age, age_ok, conflicts) -> List[str]:
+        """Issue texts for one row of the validation table"""
+        messages = []
+        if missing_rowers:
+            messages.append(f"Need {missing_rowers} more rowers")
+        if needs_cox:
+            messages.append("Need a coxswain")
+        if not gender_ok:
+            messages.append(f"Mixed event needs equal men and women (currently {men}M, {women}F)")
+        if not port_ok:
+            messages.append("Not enough port-side rowers available")
+        if not starboard_ok:
+            messages.append("Not enough starboard-side rowers available")
+        if unsided:
+            messages.append(f"{unsided} rower{'s' if unsided != 1 else ''} can row neither port nor starboard")
+        if not age_ok:
+            messages.append(f"Average age {avg_age:.1f} is below minimum {min_age} for this category")
+        messages.extend(conflicts)
+        return messages
+
+    @staticmethod
+    def _state_key(state: RegattaState) -> tuple:
+        """Who sits where, with every athlete field the checks read, plus the parameters"""
+        def athlete_key(athlete):
+            if athlete is None:
+                return None
+            return (id(athlete), athlete.name, athlete.gender, athlete.age, athlete.can_port, athlete.can_starboard)
+
+        return (state.params.as_key(),
+                tuple((event_num, tuple(map(athlete_key, lineup.get('athletes', []))),
+                       athlete_key(lineup.get('coxswain'))) for event_num, lineup in state.lineups.items()))
+
+    def event_messages(self, event_num: int) -> List[str]:
+        """Issues of one event from the last validate_all table"""
+        if self.results is None or event_num not in self.results.index:
+            return []
+        return self.results.at[event_num, 'messages']
+
+    def validate_lineup(self, lineup: Dict, requirements: Dict, event_num: int,
+                       all_lineups: Dict, spacing_minutes: int, min_gap_minutes: int, params=None) -> List[str]:
+        """Validate a lineup and return list of issues (its row of the cached validate_all table)"""
+        params = replace(params or RegattaParams(), event_spacing_minutes=spacing_minutes,
+                         min_gap_minutes=min_gap_minutes)
+        state = RegattaState(lineups={**all_lineups, event_num: lineup}, params=params)
+        self.validate_all(state)
+        return self.event_messages(event_num)
@@ -0,0 +1,292 @@
+"""
+Seeded synthetic regatta generator for scale testing
+"""
+import json
+import math
+import random
+import re
+from typing import Dict, List, Tuple
+from models.athlete import Athlete
+from models.boat import Boat
+from models.constants import AGE_CATEGORIES, EVENTS_DATA
+from models.regatta_state import RegattaState
+from services.boat_assignment import BoatAssignment
+from services.data_manager import DataManager
+from utils.event_utils import parse_event_requirements
+
+DAYS = ['Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Standard masters events: gender, optional class, age category (or range), boat class
+STANDARD_EVENT = re.compile(r"^(Men's|Women's|Mixed) (?:(Open|Club|Ltwt) )?([A-K]{1,2}(?:-[A-K]{1,2})?) (1x|2x|2-|4x|4-|4\+|8\+)$")
+
+# Lightweight limits (pounds) for individual athletes
+LIGHTWEIGHT_LIMITS = {'M': 165, 'F': 135}
+
+# Relative frequency of boat classes in a generated event catalog (matches the RowFest mix)
+BOAT_CLASS_WEIGHTS = {'1x': 42, '2x': 58, '2-': 15, '4x': 45, '4-': 10, '4+': 45, '8+': 31}
+
+# Fleet boat type for each event boat class
+FLEET_TYPES = {'1x': ('1x', 1), '2x': ('2-/2x', 2), '2-': ('2-/2x', 2), '4x': ('4-/4x', 4),
+               '4-': ('4-/4x', 4), '4+': ('4+', 4), '8+': ('8+', 8)}
+
+# Rigging weight bands (average pounds per rower) seen in the club fleet
+WEIGHT_BANDS = [(115, 145), (145, 175), (150, 180), (165, 195), (180, 210), (195, 225)]
+
+# Event statuses the Event Planning tab can set
+EVENT_STATUSES = ['athlete_requested', 'coaches_suggested', 'contingent']
+
+FIRST_NAMES = {
+    'M': ['James', 'Robert', 'John', 'Michael', 'David', 'William', 'Richard', 'Joseph', 'Thomas', 'Charles',
+          'Daniel', 'Matthew', 'Anthony', 'Mark', 'Steven', 'Paul', 'Andrew', 'Joshua', 'Kevin', 'Brian',
+          'George', 'Edward', 'Ronald', 'Timothy', 'Jason', 'Jeffrey', 'Ryan', 'Jacob', 'Gary', 'Eric',
+          'Stephen', 'Jonathan', 'Larry', 'Justin', 'Scott', 'Brandon', 'Frank', 'Gregory', 'Raymond', 'Samuel'],
+    'F': ['Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen',
+          'Lisa', 'Nancy', 'Betty', 'Sandra', 'Margaret', 'Ashley', 'Kimberly', 'Emily', 'Donna', 'Michelle',
+          'Carol', 'Amanda', 'Melissa', 'Deborah', 'Stephanie', 'Rebecca', 'Sharon', 'Laura', 'Cynthia', 'Amy',
+          'Kathleen', 'Angela', 'Helen', 'Anna', 'Brenda', 'Pamela', 'Nicole', 'Emma', 'Samantha', 'Katherine'],
+}
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+              'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores',
+              'Green', 'Adams', 'Nelson', 'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell', 'Carter', 'Roberts',
+              'Kowalski', 'Novak', 'Peszek', 'de Jong', 'Yakubov', 'Farmer', 'Hughes', 'Turner', 'Butler', 'Hale']
+BOAT_ADJECTIVES = ['Swift', 'Silver', 'Red', 'Blue', 'Golden', 'Iron', 'Quiet', 'Wild', 'Lucky', 'Bold',
+                   'Crimson', 'Rapid', 'Steady', 'Brave', 'Northern', 'Southern', 'Old', 'New', 'Little', 'Big']
+BOAT_NOUNS = ['Heron', 'Osprey', 'Kraken', 'Dolphin', 'Arrow', 'Comet', 'Falcon', 'Marlin', 'Otter', 'Pelican',
+              'Badger', 'Tempest', 'Current', 'Tide', 'Wave', 'Breeze', 'Spirit', 'Legacy', 'Promise', 'Voyager']
+MANUFACTURERS = ['Hudson', 'Vespoli', 'Empacher', 'Filippi', 'WinTech']
+
+
+def parse_standard_event(event_name: str):
+    """Split a standard event name into (gender, class, age categories, boat class), or None"""
+    match = STANDARD_EVENT.match(event_name)
+    if not match:
+        return None
+    gender, event_class, age_range, boat_class = match.groups()
+    categories = list(AGE_CATEGORIES)
+    if '-' in age_range:
+        start, end = age_range.split('-')
+        age_cats = categories[categories.index(start):categories.index(end) + 1]
+    else:
+        age_cats = [age_range]
+    return gender, event_class, age_cats, boat_class
+
+
+def generate_event_catalog(seed: int = 0, events_per_day: int = 60) -> Tuple[Dict, Dict]:
+    """Generate an event catalog and 2024 entry counts shaped like EVENTS_DATA / ROWFEST_2024_ENTRIES"""
+    rng = random.Random(seed)
+    categories = list(AGE_CATEGORIES)
+    boat_classes = list(BOAT_CLASS_WEIGHTS)
+    boat_weights = [BOAT_CLASS_WEIGHTS[c] for c in boat_classes]
+
+    events_data = {}
+    entries_data = {}
+    event_num = 1
+    for day in DAYS:
+        events_data[day] = []
+        entries_data[day] = []
+        for _ in range(events_per_day):
+            gender = rng.choices(["Men's", "Women's", "Mixed"], weights=[4, 4, 2])[0]
+            event_class = "" if gender == "Mixed" else rng.choices(["Open ", "Club ", "Ltwt "], weights=[6, 2, 1])[0]
+            start = rng.randrange(len(categories))
+            if rng.random() < 0.25 and start < len(categories) - 1:
+                end = rng.randrange(start + 1, len(categories))
+                age = f"{categories[start]}-{categories[end]}"
+            else:
+                age = categories[start]
+            boat_class = rng.choices(boat_classes, weights=boat_weights)[0]
+            if gender == "Mixed" and boat_class == '1x':
+                boat_class = '2x'
+
+            name = f"{gender} {event_class}{age} {boat_class}"
+            # Small boats and popular age groups draw bigger fields
+            entries = max(1, int(rng.gauss(9 if boat_class in ('1x', '2x') else 6, 4)))
+            events_data[day].append((event_num, name))
+            entries_data[day].append((event_num, name, entries))
+            event_num += 1
+
+    return events_data, entries_data
+
+
+def generate_roster(rng: random.Random, num_athletes: int) -> List[Athlete]:
+    """Generate athletes with masters-like ages, weights, capabilities and availability"""
+    athletes = []
+    used_names = set()
+    for index in range(num_athletes):
+        gender = 'F' if rng.random() < 0.5 else 'M'
+        name = f"{rng.choice(FIRST_NAMES[gender])} {rng.choice(LAST_NAMES)}"
+        if name in used_names:
+            name = f"{name} {index}"
+        used_names.add(name)
+
+        age = int(rng.triangular(21, 85, 50))
+        if gender == 'M':
+            weight = int(min(260, max(130, rng.gauss(182, 20))))
+        else:
+            weight = int(min(210, max(105, rng.gauss(145, 17))))
+
+        # Sweep side: mostly one side, some both, a few scullers only
+        side = rng.choices(['port', 'starboard', 'both', 'none'], weights=[25, 25, 40, 10])[0]
+        can_port = side in ('port', 'both')
+        can_starboard = side in ('starboard', 'both')
+        can_scull = side == 'none' or rng.random() < 0.85
+        can_cox = rng.random() < (0.15 if weight < 140 else 0.05)
+        if can_cox and rng.random() < 0.3:
+            # Dedicated coxswain
+            can_port = can_starboard = can_scull = False
+
+        if rng.random() < 0.7:
+            available_days = list(DAYS)
+        else:
+            first = rng.randrange(len(DAYS) - 1)
+            available_days = DAYS[first:first + rng.randint(2, 3)]
+
+        athletes.append(Athlete(name, gender, age, weight, can_port, can_starboard, can_scull, can_cox,
+                                [], available_days))
+    return athletes
+
+
+def _can_row_event(athlete: Athlete, event_info) -> bool:
+    """Check whether an athlete is a sensible rower for a standard event"""
+    gender, event_class, age_cats, boat_class = event_info
+    if gender == "Men's" and athlete.gender != 'M':
+        return False
+    if gender == "Women's" and athlete.gender != 'F':
+        return False
+    if event_class == 'Ltwt' and athlete.weight > LIGHTWEIGHT_LIMITS[athlete.gender]:
+        return False
+
+    # Age categories go by crew average, so allow athletes a little either side
+    min_age = AGE_CATEGORIES[age_cats[0]][0]
+    max_age = AGE_CATEGORIES[age_cats[-1]][1]
+    if not (min_age - 8 <= athlete.age <= max_age + 12):
+        return False
+
+    if 'x' in boat_class:
+        return athlete.can_scull
+    return athlete.can_port or athlete.can_starboard
+
+
+def _choose_entries(rng: random.Random, num_athletes: int, entry_ratio: float) -> List[Tuple[int, str, str, tuple]]:
+    """Pick the events the club enters, in schedule order"""
+    candidates = []
+    for day, events in EVENTS_DATA.items():
+        for event_num, event_name in events:
+            event_info = parse_standard_event(event_name)
+            if event_info:
+                candidates.append((event_num, event_name, day, event_info))
+
+    count = min(len(candidates), max(8, round(num_athletes * entry_ratio)))
+    chosen = set(event_num for event_num, _, _, _ in rng.sample(candidates, count))
+    return [entry for entry in candidates if entry[0] in chosen]
+
+
+def _assign_preferences(rng: random.Random, athletes: List[Athlete], entries):
+    """Give each athlete a few preferred events among the club's entries they could row"""
+    for athlete in athletes:
+        options = [event_num for event_num, _, day, event_info in entries
+                   if day in athlete.available_days and _can_row_event(athlete, event_info)]
+        if not options:
+            continue
+        count = min(len(options), rng.choice([1, 2, 2, 3, 3, 3, 4, 5, 6]))
+        athlete.preferred_events = sorted(rng.sample(options, count))
+
+
+def _build_lineups(rng: random.Random, athletes: List[Athlete], entries) -> Dict:
+    """Fill each entry from the athletes who asked for it, leaving some crews short"""
+    interested = {event_num: [] for event_num, _, _, _ in entries}
+    for athlete in athletes:
+        for event_num in athlete.preferred_events:
+            interested[event_num].append(athlete)
+    coxswains = [a for a in athletes if a.can_cox]
+
+    lineups = {}
+    for event_num, event_name, day, event_info in entries:
+        requirements = parse_event_requirements(event_name)
+        candidates = list(interested[event_num])
+        rng.shuffle(candidates)
+        if not candidates:
+            continue
+
+        if requirements['gender_req'] == 'Mixed':
+            half = requirements['num_rowers'] // 2
+            crew = ([a for a in candidates if a.gender == 'M'][:half] +
+                    [a for a in candidates if a.gender == 'F'][:half])
+        else:
+            crew = candidates[:requirements['num_rowers']]
+
+        coxswain = None
+        if requirements['has_cox'] and rng.random() < 0.9:
+            available = [a for a in coxswains if a.is_available_on_day(day) and a not in crew]
+            if available:
+                coxswain = rng.choice(available)
+
+        seats = crew + [None] * (requirements['num_rowers'] - len(crew))
+        lineups[event_num] = {'athletes': seats, 'coxswain': coxswain}
+    return lineups
+
+
+def generate_fleet(rng: random.Random, entries) -> List[Boat]:
+    """Generate a fleet sized for the entered events"""
+    events_per_type = {}
+    for _, _, _, event_info in entries:
+        boat_type = FLEET_TYPES[event_info[3]]
+        events_per_type[boat_type] = events_per_type.get(boat_type, 0) + 1
+
+    boats = []
+    used_names = set()
+    boat_id = 1
+    for (boat_type, num_seats), event_count in events_per_type.items():
+        # Boats are reused across sessions, so roughly one boat per three entries
+        for _ in range(math.ceil(event_count / 3) + 1):
+            name = f"{rng.choice(BOAT_ADJECTIVES)} {rng.choice(BOAT_NOUNS)}"
+            if name in used_names:
+                name = f"{name} {boat_id}"
+            used_names.add(name)
+            min_weight, max_weight = rng.choice(WEIGHT_BANDS)
+            boats.append(Boat(name, boat_type, num_seats, min_weight, max_weight,
+                              rng.choice(MANUFACTURERS), rng.randint(2008, 2025), boat_id, "Racing"))
+            boat_id += 1
+    return boats
+
+
+def generate_regatta(num_athletes: int = 150, seed: int = 0, entry_ratio: float = 0.85,
+                     assign_boats: bool = True) -> RegattaState:
+    """Generate a reproducible regatta: roster, preferences, entries, lineups and fleet"""
+    rng = random.Random(seed)
+    athletes = generate_roster(rng, num_athletes)
+    entries = _choose_entries(rng, num_athletes, entry_ratio)
+    _assign_preferences(rng, athletes, entries)
+    lineups = _build_lineups(rng, athletes, entries)
+    boats = generate_fleet(rng, entries)
+
+    event_statuses = {}
+    for event_num in lineups:
+        if rng.random() < 0.3:
+            event_statuses[event_num] = rng.choice(EVENT_STATUSES)
+
+    state = RegattaState(
+        athletes=athletes,
+        lineups=lineups,
+        boats=boats,
+        selected_events=set(lineups),
+        event_statuses=event_statuses,
+        preset_name=f"Synthetic {num_athletes} (seed {seed})",
+        preset_description=f"Generated regatta with {num_athletes} athletes and {len(lineups)} lineups"
+    )
+    if assign_boats:
+        BoatAssignment(state).assign_all_boats()
+    return state
+
+
+def write_synthetic_preset(filepath, num_athletes: int = 150, seed: int = 0, entry_ratio: float = 0.85,
+                           assign_boats: bool = True) -> RegattaState:
+    """Generate a regatta and save it as a preset the app can load"""
+    state = generate_regatta(num_athletes, seed, entry_ratio, assign_boats)
+    data = DataManager().serialize(state, state.preset_name, state.preset_description)
+    data["selected_events"] = sorted(state.selected_events)
+    data["generator"] = {"athletes": num_athletes, "seed": seed, "entry_ratio": entry_ratio}
+    with open(filepath, 'w') as f:
+        f.write(json.dumps(data, indent=2))
+    return state
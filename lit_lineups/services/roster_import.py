@@ -0,0 +1,216 @@
+"""
+Bulk roster import from CSV or Excel with row-level validation
+"""
+import io
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from models.athlete import Athlete
+from models.constants import EVENTS_DATA
+
+DAYS = list(EVENTS_DATA)
+KNOWN_EVENTS = {num for events in EVENTS_DATA.values() for num, _ in events}
+
+# Same limits as the roster tab's add/edit form
+AGE_RANGE = (18, 100)
+WEIGHT_RANGE = (100, 300)
+DEFAULT_WEIGHT = 160
+
+# Normalized header -> roster field
+COLUMN_ALIASES = {
+    'name': 'name', 'athlete': 'name', 'full_name': 'name',
+    'gender': 'gender', 'sex': 'gender',
+    'age': 'age',
+    'weight': 'weight', 'weight_lbs': 'weight', 'lbs': 'weight',
+    'port': 'can_port', 'can_port': 'can_port', 'can_row_port': 'can_port',
+    'starboard': 'can_starboard', 'can_starboard': 'can_starboard', 'can_row_starboard': 'can_starboard',
+    'stbd': 'can_starboard',
+    'scull': 'can_scull', 'can_scull': 'can_scull', 'sculling': 'can_scull',
+    'cox': 'can_cox', 'can_cox': 'can_cox', 'coxswain': 'can_cox',
+    'available_days': 'available_days', 'days': 'available_days', 'availability': 'available_days',
+    'preferred_events': 'preferred_events', 'events': 'preferred_events', 'preferences': 'preferred_events'
+}
+REQUIRED_FIELDS = ['name', 'gender', 'age']
+
+# Blank flag cells take the same defaults as the add-athlete form
+FLAG_DEFAULTS = {'can_port': True, 'can_starboard': True, 'can_scull': True, 'can_cox': False}
+TRUE_VALUES = {'y', 'yes', 'true', 't', '1', 'x', '✓'}
+FALSE_VALUES = {'n', 'no', 'false', 'f', '0', '-', '✗'}
+GENDER_VALUES = {'m': 'M', 'male': 'M', 'man': 'M', 'f': 'F', 'female': 'F', 'w': 'F', 'woman': 'F'}
+DAY_PREFIXES = {day[:3].lower(): day for day in DAYS}
+
+
+@dataclass
+class RosterImport:
+    """A validated roster file"""
+    athletes: pd.DataFrame     # one row per valid athlete, coerced to Athlete field types
+    errors: pd.DataFrame       # row, column, value, message for every rejected cell
+    total_rows: int
+    given: pd.DataFrame = None  # like `athletes`, True where the file has a non-blank cell (not a default)
+
+    @property
+    def rejected_rows(self) -> int:
+        return self.errors['row'].nunique() if len(self.errors) else 0
+
+
+def read_roster_file(data: bytes, file_name: str) -> pd.DataFrame:
+    """Read a CSV or Excel roster into a frame of strings"""
+    if file_name.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        try:
+            frame = pd.read_excel(io.BytesIO(data), dtype=str)
+        except ImportError as e:
+            raise ValueError(f"Reading Excel files needs an Excel reader for pandas ({e}); save the sheet as CSV instead")
+    else:
+        frame = pd.read_csv(io.BytesIO(data), dtype=str, skipinitialspace=True, encoding='utf-8-sig')
+    return frame.fillna("")
+
+
+def _normalize_header(header) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', str(header).strip().lower()).strip('_')
+
+
+def _split_tokens(values: pd.Series) -> pd.Series:
+    """Explode comma/semicolon/slash/whitespace separated cells into one token per row (indexed by source row)"""
+    return values.str.split(r'[\s,;/|]+', regex=True).explode().str.strip().loc[lambda t: t.fillna("") != ""]
+
+
+def validate_roster(raw: pd.DataFrame) -> RosterImport:
+    """Coerce every column at once and collect row-level errors.
+
+    Rows are numbered as in the file (header is row 1). Rows with any error are
+    left out of `athletes`; the others are ready for `upsert_athletes`.
+    """
+    columns = {}
+    for header in raw.columns:
+        field = COLUMN_ALIASES.get(_normalize_header(header))
+        if field is not None and field not in columns:
+            columns[field] = header
+
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        errors = pd.DataFrame({'row': 1, 'column': missing, 'value': "",
+                               'message': [f"Missing required column '{field}'" for field in missing]})
+        return RosterImport(pd.DataFrame(), errors, len(raw), pd.DataFrame())
+
+    raw = raw.reset_index(drop=True)
+    rows = raw.index + 2
+    text = {field: raw[header].astype(str).str.strip() for field, header in columns.items()}
+    errors = []
+
+    def reject(field, mask, message):
+        """Record an error for every masked row; `message` may map the rejected values to messages"""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            values = text[field][mask]
+            messages = message(values) if callable(message) else message
+            errors.append(pd.DataFrame({'row': rows[mask], 'column': columns[field],
+                                        'value': values.to_numpy(), 'message': messages}))
+
+    athletes = pd.DataFrame(index=raw.index)
+
+    # Names: required and unique within the file (case-insensitive)
+    athletes['name'] = text['name'].str.replace(r'\s+', ' ', regex=True)
+    reject('name', athletes['name'] == "", "Name is required")
+    name_keys = athletes['name'].str.casefold()
+    first_row = pd.Series(rows, index=raw.index).groupby(name_keys).transform('min')
+    duplicate = (athletes['name'] != "") & name_keys.duplicated()
+    reject('name', duplicate, lambda v: ("Duplicate of row " + first_row[v.index].astype(str)).to_numpy())
+
+    athletes['gender'] = text['gender'].str.lower().map(GENDER_VALUES)
+    reject('gender', athletes['gender'].isna(), "Gender must be M or F")
+
+    for field, (low, high), default in (('age', AGE_RANGE, None), ('weight', WEIGHT_RANGE, DEFAULT_WEIGHT)):
+        if field not in text:
+            athletes[field] = default
+            continue
+        blank = text[field] == ""
+        numbers = pd.to_numeric(text[field], errors='coerce')
+        if default is not None:
+            numbers = numbers.mask(blank, default)
+        invalid = numbers.isna() | (numbers % 1 != 0)
+        reject(field, invalid, f"{field.title()} must be a whole number")
+        reject(field, ~invalid & ((numbers < low) | (numbers > high)), f"{field.title()} must be between {low} and {high}")
+        athletes[field] = numbers.where(~invalid, 0).astype(int)
+
+    for field, default in FLAG_DEFAULTS.items():
+        if field not in text:
+            athletes[field] = default
+            continue
+        lowered = text[field].str.lower()
+        athletes[field] = np.select([lowered.isin(TRUE_VALUES), lowered.isin(FALSE_VALUES), lowered == ""],
+                                    [True, False, default], default=False).astype(bool)
+        reject(field, ~(lowered.isin(TRUE_VALUES) | lowered.isin(FALSE_VALUES) | (lowered == "")),
+               "Expected yes/no (y, n, true, false, 1, 0, x)")
+
+    # Available days: any of Thu/Fri/Sat/Sun (full names or 3-letter prefixes); blank means every day
+    if 'available_days' in text:
+        tokens = _split_tokens(text['available_days'].str.lower())
+        days = tokens.str[:3].map(DAY_PREFIXES)
+        reject('available_days', raw.index.isin(tokens.index[days.isna()]),
+               f"Days must be among {', '.join(d[:3] for d in DAYS)}")
+        day_sets = days.dropna().groupby(level=0).agg(set)
+        athletes['available_days'] = [[d for d in DAYS if d in day_sets.get(i, DAYS)] for i in raw.index]
+    else:
+        athletes['available_days'] = [list(DAYS) for _ in raw.index]
+
+    # Preferred events: event numbers from the catalog
+    if 'preferred_events' in text:
+        tokens = _split_tokens(text['preferred_events'])
+        numbers = pd.to_numeric(tokens, errors='coerce')
+        not_number = numbers.isna() | (numbers % 1 != 0)
+        unknown = ~not_number & ~numbers.isin(KNOWN_EVENTS)
+        reject('preferred_events', raw.index.isin(tokens.index[not_number]), "Preferred events must be event numbers")
+        unknown_tokens = tokens[unknown].groupby(level=0).agg(", ".join)
+        reject('preferred_events', raw.index.isin(unknown_tokens.index),
+               lambda v: ("Unknown event number(s): " + unknown_tokens[v.index]).to_numpy())
+        valid_numbers = numbers[~not_number & ~unknown].astype(int)
+        event_lists = valid_numbers.groupby(level=0).agg(lambda s: list(dict.fromkeys(s)))
+        athletes['preferred_events'] = [event_lists.get(i, []) for i in raw.index]
+    else:
+        athletes['preferred_events'] = [[] for _ in raw.index]
+
+    errors = (pd.concat(errors, ignore_index=True).sort_values(['row', 'column'], kind='stable').reset_index(drop=True)
+              if errors else pd.DataFrame(columns=['row', 'column', 'value', 'message']))
+    rejected = np.isin(rows, errors['row'].to_numpy())
+    given = pd.DataFrame({field: text[field] != "" if field in text else False for field in athletes.columns},
+                         index=raw.index)
+    return RosterImport(athletes[~rejected].reset_index(drop=True), errors, len(raw),
+                        given[~rejected].reset_index(drop=True))
+
+
+def upsert_athletes(roster: List[Athlete], athletes: pd.DataFrame, given: Optional[pd.DataFrame] = None) -> Dict:
+    """Add new athletes and update existing ones (matched by name, ignoring case) in place.
+
+    Existing Athlete objects are updated rather than replaced, so lineups that
+    already seat them stay valid; they are returned as `updated_athletes` so
+    callers can report changes to those lineups. Only the cells `given` marks
+    (RosterImport.given: columns in the file, non-blank) overwrite an existing
+    athlete; defaults for the rest apply to new athletes only. Without `given`
+    every field is applied.
+    """
+    by_name = {athlete.name.strip().casefold(): athlete for athlete in roster}
+    added = 0
+    updated_athletes = []
+    given_records = given.to_dict('records') if given is not None else None
+    for i, record in enumerate(athletes.to_dict('records')):
+        athlete = by_name.get(record['name'].casefold())
+        if athlete is None:
+            athlete = Athlete(**record)
+            roster.append(athlete)
+            by_name[record['name'].casefold()] = athlete
+            added += 1
+        else:
+            for field, value in record.items():
+                if given_records is None or given_records[i][field]:
+                    setattr(athlete, field, value)
+            updated_athletes.append(athlete)
+    updated = len(updated_athletes)
+    return {
+        "success": True,
+        "message": f"Imported {added + updated} athletes ({added} new, {updated} updated)",
+        "added": added,
+        "updated": updated,
+        "updated_athletes": updated_athletes
+    }
@@ -0,0 +1,115 @@
+"""
+Regatta schedule builder shared by the schedule tab and the command line
+"""
+import pandas as pd
+from models.athlete_table import AthleteTable
+from models.constants import EVENTS_DATA
+from models.lineup_store import LineupStore
+from models.regatta_state import RegattaState
+from utils.event_utils import build_timetable, get_event_entries_2024
+from utils.perf_utils import profiled
+
+SESSIONS = ('morning', 'afternoon')
+DAYS = tuple(EVENTS_DATA)
+TIME_COLUMNS = ('meet', 'launch', 'race', 'land')
+
+# Column order for schedule exports
+EXPORT_COLUMNS = ['Day', 'Session', 'Event', 'Event Name', 'Round', 'Meet', 'Launch', 'Race', 'Land',
+                  'Entries 2024', 'Boat', 'Weight Check', 'Rowers', 'Coxswain']
+
+@profiled('build_schedule')
+def build_schedule(state: RegattaState) -> pd.DataFrame:
+    """Build the whole-regatta schedule: one row per lineup and session, in catalog order.
+
+    meet/launch/race/land are datetime64 columns; rowers holds a list of names per row.
+    """
+    params = state.params
+    store = LineupStore(state.lineups, AthleteTable(state.athletes))
+    avg_weights = store.crew_stats()['avg_weight']
+
+    # One record per lineup, in catalog order (day, then event order within the day)
+    lineup_rows = []
+    for day, events in EVENTS_DATA.items():
+        for event_num, event_name in events:
+            lineup = state.lineups.get(event_num)
+            if not lineup or not (lineup['athletes'] or lineup['coxswain']):
+                continue
+
+            athletes = store.rowers(event_num)
+            coxswain = store.coxswain(event_num)
+
+            # Boat assignment and weight compatibility
+            boat = state.boat_assignments.get(event_num)
+            weight_check = None
+            if boat is not None and athletes:
+                weight_check = boat.weight_check(avg_weights[event_num])
+
+            lineup_rows.append({
+                'day': day,
+                'event_num': event_num,
+                'event_name': event_name,
+                'entries_2024': get_event_entries_2024(event_num),
+                'boat': boat.name if boat is not None else None,
+                'weight_check': weight_check,
+                'rowers': [a.name for a in athletes],
+                'coxswain': coxswain.name if coxswain else None
+            })
+
+    lineups = pd.DataFrame(lineup_rows, columns=['day', 'event_num', 'event_name', 'entries_2024', 'boat',
+                                                 'weight_check', 'rowers', 'coxswain'])
+    lineups['event_num'] = lineups['event_num'].astype('int64')
+    lineups['entries_2024'] = lineups['entries_2024'].astype('Int64')
+
+    # Every lineup races in both sessions: its heat row, then its final row
+    sessions = pd.DataFrame({'session': list(SESSIONS)})
+    schedule = lineups.merge(sessions, how='cross')
+
+    # Heats are certain only when last year's entries overflowed one race (or are unknown)
+    has_heat = (schedule['entries_2024'].isna() | (schedule['entries_2024'] > params.boats_per_race)).astype(bool)
+    is_morning = schedule['session'] == 'morning'
+    schedule['session_name'] = 'Final'
+    schedule.loc[is_morning & has_heat, 'session_name'] = "Heat"
+    schedule.loc[is_morning & ~has_heat, 'session_name'] = "Heat - if needed"
+
+    # Race times straight from the timetable; events missing from it race at the session start
+    race = pd.Series(pd.NaT, index=schedule.index, dtype='datetime64[ns]')
+    for session in SESSIONS:
+        in_session = schedule['session'] == session
+        session_start = pd.Timestamp.combine(
+            params.regatta_start_date,
+            params.afternoon_start_time if session == 'afternoon' else params.morning_start_time
+        )
+        timetable = build_timetable(params.timetable_key(), session)
+        race[in_session] = pd.to_datetime(schedule.loc[in_session, 'event_num'].map(timetable)).fillna(session_start)
+    schedule['race'] = race
+    schedule['meet'] = race - pd.Timedelta(minutes=params.meet_minutes_before)
+    schedule['launch'] = race - pd.Timedelta(minutes=params.launch_minutes_before)
+    schedule['land'] = race + pd.Timedelta(minutes=params.land_minutes_after)
+
+    schedule['day'] = pd.Categorical(schedule['day'], categories=DAYS, ordered=True)
+    schedule['session'] = pd.Categorical(schedule['session'], categories=SESSIONS, ordered=True)
+    return schedule[['day', 'session', 'event_num', 'event_name', 'session_name', *TIME_COLUMNS,
+                     'entries_2024', 'boat', 'weight_check', 'rowers', 'coxswain']]
+
+def session_schedule(schedule: pd.DataFrame, day: str, session: str) -> pd.DataFrame:
+    """The lineups racing in one day's session, in race order"""
+    rows = schedule[(schedule['day'] == day) & (schedule['session'] == session)]
+    return rows.sort_values('race', kind='stable')
+
+def schedule_export(schedule: pd.DataFrame) -> pd.DataFrame:
+    """Flatten the schedule into export columns (full date-times, names joined with '; ')"""
+    export = pd.DataFrame({
+        'Day': schedule['day'].astype(str),
+        'Session': schedule['session'].astype(str),
+        'Event': schedule['event_num'],
+        'Event Name': schedule['event_name'],
+        'Round': schedule['session_name']
+    })
+    for column in TIME_COLUMNS:
+        export[column.title()] = schedule[column].dt.strftime("%Y-%m-%d %H:%M")
+    export['Entries 2024'] = schedule['entries_2024'].astype('string').fillna("")
+    export['Boat'] = schedule['boat'].fillna("")
+    export['Weight Check'] = schedule['weight_check'].fillna("")
+    export['Rowers'] = schedule['rowers'].str.join("; ")
+    export['Coxswain'] = schedule['coxswain'].fillna("")
+    return export[EXPORT_COLUMNS]
@@ -0,0 +1,206 @@
+"""
+Seat order optimization within a boat
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+from models.pins import pinned_seats
+from models.regatta_state import RegattaState
+from services.seat_sides import PORT, rigged_side
+from utils.event_utils import find_event_details, parse_event_requirements
+from utils.perf_utils import profiled
+
+# Objective name -> description shown in the app
+SEATING_OBJECTIVES = {
+    'balance': "Even weight fore and aft",
+    'engine_room': "Heaviest rowers in the middle seats",
+    'pairs': "Keep rowers who sit together in other events next to each other",
+}
+
+
+def adjacent_pairs(athletes: List) -> Counter:
+    """Neighbouring rowers in a seat order, as pairs of athlete ids"""
+    return Counter(frozenset((id(a), id(b))) for a, b in zip(athletes, athletes[1:])
+                   if a is not None and b is not None)
+
+
+def optimize_seat_order(athletes: List, sweep: bool, objective: str = 'balance',
+                        pair_counts: Optional[Counter] = None) -> Optional[List]:
+    """Best order of a crew's seats (bow first, empty seats as None) under an objective.
+
+    In a sweep boat every rower sits in a seat rigged for a side they row;
+    returns None when no such order exists. Among equally good orders the one
+    moving the fewest rowers from their current seats wins. `pair_counts`
+    (for 'pairs') counts how often two athletes sit next to each other
+    elsewhere, keyed like adjacent_pairs.
+    """
+    if objective not in SEATING_OBJECTIVES:
+        raise ValueError(f"Unknown seating objective: {objective}")
+
+    n = len(athletes)
+    port_ok = [a is None or not sweep or a.can_port for a in athletes]
+    starboard_ok = [a is None or not sweep or a.can_starboard for a in athletes]
+    if not _sides_remain(port_ok, starboard_ok, range(n), 0):
+        return None
+
+    fits = [[(port_ok if rigged_side(s) == PORT else starboard_ok)[i] for s in range(n)] for i in range(n)]
+    if objective == 'balance':
+        order = _balanced_order(athletes, fits, port_ok, starboard_ok)
+    else:
+        order = _dp_order(athletes, fits, objective, pair_counts or Counter())
+    return [athletes[i] for i in order] if order is not None else None
+
+
+def _balanced_order(athletes: List, fits: List[List[bool]], port_ok: List[bool],
+                    starboard_ok: List[bool]) -> Optional[List[int]]:
+    """Branch and bound over seat orders for the smallest weight moment about the middle of the boat.
+
+    Seats are filled bow to stroke. The rearrangement inequality bounds the
+    moment the unplaced rowers can still add (heaviest against the extreme
+    seats), which prunes every branch that cannot beat the best order so far.
+    """
+    n = len(athletes)
+    weights = [a.weight if a is not None else 0 for a in athletes]
+    offsets = [2 * s - (n - 1) for s in range(n)]  # Seat distance from the middle, in half seats
+    best = [None, None]  # (|moment|, moved), order
+
+    def search(seat, moment, moved, order, remaining):
+        if seat == n:
+            cost = (abs(moment), moved)
+            if best[0] is None or cost < best[0]:
+                best[0], best[1] = cost, list(order)
+            return
+
+        # Moment range of the rest: sorted weights against sorted (ascending) free offsets. Rowers
+        # whose own seat is already taken will be moved whatever happens.
+        rest = sorted(weights[i] for i in remaining)
+        free = offsets[seat:]
+        low = moment + sum(w * o for w, o in zip(rest, reversed(free)))
+        high = moment + sum(w * o for w, o in zip(rest, free))
+        displaced = sum(1 for i in remaining if i < seat and athletes[i] is not None)
+        if best[0] is not None and (max(low, -high, 0), moved + displaced) >= best[0]:
+            return
+
+        # The current occupant first, so the first complete order found moves nobody; empty seats are
+        # interchangeable, so only one of them is tried
+        tried_empty = False
+        for i in sorted(remaining, key=lambda i: (i != seat, i)):
+            if athletes[i] is None:
+                if tried_empty:
+                    continue
+                tried_empty = True
+            if fits[i][seat] and _sides_remain(port_ok, starboard_ok, remaining - {i}, seat + 1):
+                order.append(i)
+                search(seat + 1, moment + weights[i] * offsets[seat], moved + _moved(athletes, i, seat),
+                       order, remaining - {i})
+                order.pop()
+
+    search(0, 0, 0, [], frozenset(range(n)))
+    return best[1]
+
+
+def _moved(athletes: List, i: int, seat: int) -> int:
+    """Whether placing athlete i in a seat moves a rower (empty seats never count)"""
+    return int(i != seat and athletes[i] is not None)
+
+
+def _sides_remain(port_ok: List[bool], starboard_ok: List[bool], remaining, seat: int) -> bool:
+    """Whether the remaining rowers can fill the seats from `seat` to stroke on sides they row.
+
+    As in seat_sides.sides_feasible: nobody is left without a side and
+    neither one-sided group outnumbers the free seats rigged for its side.
+    """
+    free = len(port_ok) - seat
+    free_port = sum(1 for s in range(seat, len(port_ok)) if rigged_side(s) == PORT)
+    port_only = starboard_only = 0
+    for i in remaining:
+        if not (port_ok[i] or starboard_ok[i]):
+            return False
+        port_only += not starboard_ok[i]
+        starboard_only += not port_ok[i]
+    return port_only <= free_port and starboard_only <= free - free_port
+
+
+def _dp_order(athletes: List, fits: List[List[bool]], objective: str, pair_counts: Counter) -> Optional[List[int]]:
+    """Dynamic program over the set of rowers seated from bow, exact for per-seat and neighbour costs.
+
+    A state is the set of placed rowers plus, for 'pairs', the last one placed
+    (the only one the next seat's neighbour term depends on), so an eight
+    takes a few thousand states instead of 40,320 orders.
+    """
+    n = len(athletes)
+    weights = [a.weight if a is not None else 0 for a in athletes]
+    centre = (n - 1) / 2
+    track_last = objective == 'pairs'
+
+    def step_cost(i, seat, last):
+        if objective == 'engine_room':
+            # Weight times distance from the middle: heavy rowers pull hardest amidships
+            primary = round(weights[i] * abs(seat - centre), 6)
+        else:
+            together = athletes[i] is not None and last is not None and athletes[last] is not None
+            primary = -pair_counts.get(frozenset((id(athletes[i]), id(athletes[last]))), 0) if together else 0
+        return primary, _moved(athletes, i, seat)
+
+    # (placed mask, last placed) -> ((primary, moved), previous state, rower placed)
+    states = {(0, None): ((0, 0), None, None)}
+    for mask in range(1 << n):
+        seat = bin(mask).count('1')
+        for last in ([None] if mask == 0 or not track_last else range(n)):
+            entry = states.get((mask, last))
+            if entry is None or seat == n:
+                continue
+            for i in range(n):
+                if mask & (1 << i) or not fits[i][seat]:
+                    continue
+                primary, moved = step_cost(i, seat, last)
+                cost = (entry[0][0] + primary, entry[0][1] + moved)
+                key = (mask | (1 << i), i if track_last else None)
+                if key not in states or cost < states[key][0]:
+                    states[key] = (cost, (mask, last), i)
+
+    full = (1 << n) - 1
+    finals = [key for key in states if key[0] == full]
+    if not finals:
+        return None
+    key = min(finals, key=lambda key: states[key][0])
+    order = []
+    while states[key][1] is not None:
+        order.append(states[key][2])
+        key = states[key][1]
+    return order[::-1]
+
+
+@profiled('optimize_all_seating')
+def optimize_all_seating(state: RegattaState, objective: str = 'balance') -> Dict:
+    """Reorder the seats of every lineup in place under one objective (lineups with pinned seats stay as they are)"""
+    pair_counts = Counter()
+    if objective == 'pairs':
+        for lineup in state.lineups.values():
+            pair_counts.update(adjacent_pairs(lineup.get('athletes', [])))
+
+    reordered = []
+    unseatable = []
+    for event_num, lineup in state.lineups.items():
+        event_name, _ = find_event_details(event_num)
+        athletes = lineup.get('athletes', [])
+        if not event_name or sum(a is not None for a in athletes) < 2 or pinned_seats(state.pins, event_num, lineup):
+            continue
+
+        # Only pairs from the other events count for this one
+        counts = None
+        if objective == 'pairs':
+            counts = pair_counts.copy()
+            counts.subtract(adjacent_pairs(athletes))
+
+        requirements = parse_event_requirements(event_name)
+        order = optimize_seat_order(athletes, not requirements['is_sculling'], objective, counts)
+        if order is None:
+            unseatable.append(event_num)
+        elif any(a is not b for a, b in zip(order, athletes)):
+            lineup['athletes'] = order
+            reordered.append(event_num)
+
+    message = f"Reordered {len(reordered)} lineup{'s' if len(reordered) != 1 else ''}"
+    if unseatable:
+        message += f"; {len(unseatable)} sweep crew{'s' if len(unseatable) != 1 else ''} cannot be seated on their sides"
+    return {"success": True, "message": message, "reordered": reordered, "unseatable": unseatable}
@@ -0,0 +1,56 @@
+"""
+Port/starboard side assignment for sweep crews
+"""
+from typing import List, Optional
+
+PORT = "Port"
+STARBOARD = "Starboard"
+
+
+def rigged_side(seat_idx: int) -> str:
+    """Side a seat is rigged for in a standard (stroke-side port) boat; seat 0 is bow"""
+    return PORT if seat_idx % 2 else STARBOARD
+
+
+def sides_feasible(port_only, starboard_only, unsided, num_rowers):
+    """Whether rowers can be split half to each side.
+
+    This is the matching of rowers to num_rowers // 2 seats per side, which by
+    Hall's condition exists exactly when every rower can row some side and
+    neither one-sided group outnumbers its side. Works on scalars or arrays.
+    """
+    half = num_rowers // 2
+    return (unsided == 0) & (port_only <= half) & (starboard_only <= half)
+
+
+def assign_sides(athletes: List, num_rowers: int) -> Optional[List[Optional[str]]]:
+    """Side for every seat of a sweep crew (None for empty seats), or None if no split exists.
+
+    One-sided rowers take their side; rowers who can row both keep their seat's
+    rigged side while it has room, so a crew seated on its rig needs no changes.
+    """
+    seated = [(i, a) for i, a in enumerate(athletes) if a is not None]
+    port_only = sum(1 for _, a in seated if a.can_port and not a.can_starboard)
+    starboard_only = sum(1 for _, a in seated if a.can_starboard and not a.can_port)
+    unsided = sum(1 for _, a in seated if not (a.can_port or a.can_starboard))
+    if not sides_feasible(port_only, starboard_only, unsided, num_rowers):
+        return None
+
+    room = {PORT: num_rowers // 2 - port_only, STARBOARD: num_rowers // 2 - starboard_only}
+    sides = [None] * len(athletes)
+    flexible = []
+    for i, athlete in seated:
+        if not athlete.can_starboard:
+            sides[i] = PORT
+        elif not athlete.can_port:
+            sides[i] = STARBOARD
+        elif room[rigged_side(i)] > 0:
+            sides[i] = rigged_side(i)
+            room[sides[i]] -= 1
+        else:
+            flexible.append(i)
+
+    # Whoever found their rigged side full fits on the other one (the split is feasible)
+    for i in flexible:
+        sides[i] = STARBOARD if rigged_side(i) == PORT else PORT
+    return sides
@@ -0,0 +1,117 @@
+"""
+Background runner for the anytime lineup search
+"""
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, List
+from models.regatta_state import RegattaState
+from services.lineup_search import LineupSearch
+
+# Annealing temperature at the start of a run; it falls linearly to 0 at the end of the budget
+START_TEMPERATURE = 4.0
+
+# Seconds between progress updates while nothing improves
+PUBLISH_INTERVAL = 0.1
+
+
+@dataclass
+class SolverProgress:
+    """What a run has found so far"""
+    status: str = 'ready'            # ready, running, finished, cancelled or failed
+    time_budget: float = 0.0
+    elapsed: float = 0.0
+    initial_objective: int = 0
+    objective: int = 0               # Best objective found
+    conflicts: int = 0               # Athlete time conflicts in the best lineups
+    iterations: int = 0
+    improvements: int = 0
+    message: str = ''
+    history: List[tuple] = field(default_factory=list)  # (elapsed, objective) at each improvement
+
+
+class SolverRunner:
+    """Runs a LineupSearch for a time budget, on a background thread or in the caller's.
+
+    The best lineups found so far are always available, so a run can be
+    stopped early and its result taken ("accept current best"). The search
+    works on its own copy of the lineups, made when the runner is created;
+    nothing is written back until the caller applies best_lineups().
+    progress() and best_lineups() may be called from any thread.
+    """
+
+    def __init__(self, state: RegattaState, time_budget: float, seed: int = 0):
+        self.search = LineupSearch(state, seed)
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._best = self.search.snapshot()
+        self._progress = SolverProgress(time_budget=time_budget, initial_objective=self.search.objective,
+                                        objective=self.search.objective, conflicts=self.search.conflicts())
+
+    def start(self):
+        """Run the search on a daemon thread and return at once"""
+        self._thread = threading.Thread(target=self.run, name='lineup-search', daemon=True)
+        self._thread.start()
+
+    def run(self) -> SolverProgress:
+        """Run the search until the budget is spent or the run is cancelled"""
+        search = self.search
+        budget = self._progress.time_budget
+        started = time.perf_counter()
+        best_objective = search.objective
+        iterations = improvements = 0
+        self._publish(status='running')
+
+        try:
+            next_publish = 0.0
+            while not self._cancelled.is_set():
+                elapsed = time.perf_counter() - started
+                if elapsed >= budget:
+                    break
+                search.step(START_TEMPERATURE * (1 - elapsed / budget))
+                iterations += 1
+
+                if search.objective < best_objective:
+                    best_objective = search.objective
+                    improvements += 1
+                    with self._lock:
+                        self._best = search.snapshot()
+                        self._progress.history.append((elapsed, best_objective))
+                    self._publish(elapsed=elapsed, objective=best_objective, conflicts=search.conflicts(),
+                                  iterations=iterations, improvements=improvements)
+                elif elapsed >= next_publish:
+                    self._publish(elapsed=elapsed, iterations=iterations)
+                    next_publish = elapsed + PUBLISH_INTERVAL
+        except Exception as e:
+            self._publish(status='failed', message=str(e))
+            return self.progress()
+
+        status = 'cancelled' if self._cancelled.is_set() else 'finished'
+        self._publish(status=status, elapsed=time.perf_counter() - started, iterations=iterations)
+        return self.progress()
+
+    def cancel(self):
+        """Stop the run after its current move; the best lineups so far stay available"""
+        self._cancelled.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def progress(self) -> SolverProgress:
+        """A copy of the current progress"""
+        with self._lock:
+            return replace(self._progress, history=list(self._progress.history))
+
+    def best_lineups(self) -> Dict:
+        """A copy of the best lineups found so far"""
+        with self._lock:
+            return {event_num: {'athletes': list(lineup['athletes']), 'coxswain': lineup['coxswain']}
+                    for event_num, lineup in self._best.items()}
+
+    def _publish(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self._progress, name, value)
@@ -45,6 +45,8 @@ def render_data_tab():
     st.markdown("### 📂 Load Existing Presets")
     
     presets = data_manager.get_available_presets(sort_by_date=(sort_option == "Most Recent"))
+    for preset_error in data_manager.preset_errors:
+        st.warning(preset_error)
     
     if not presets:
         st.info("💡 No saved presets found. Create your first preset below!")
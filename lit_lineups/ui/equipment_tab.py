@@ -6,7 +6,12 @@ import pandas as pd
 from datetime import timedelta
 from models.boat import Boat, create_sample_boats
 from models.constants import EVENTS_DATA
-from utils.event_utils import get_event_time, get_event_time_both_sessions, parse_event_requirements
+from models.pins import BOAT, boat_pinned, toggle_pin, unpin
+from utils.event_utils import get_event_time_both_sessions
+from models.session_state import (record_change, get_regatta_params, get_regatta_state, apply_regatta_state, rerun_scoped,
+                                  get_lineup_store)
+from services.boat_assignment import BoatAssignment
+from services.issue_engine import get_issue_engine
 
 def render_equipment_tab():
     """Render the equipment management tab"""
@@ -48,8 +53,19 @@ def render_equipment_tab():
         if st.button("Clear All Boats"):
             st.session_state.boats = []
             st.session_state.boat_assignments = {}
+            for event_num in list(st.session_state.pins):
+                unpin(st.session_state.pins, event_num, BOAT)
+            record_change('pins', 'clear')
             st.success("All boats cleared!")
     
+    _render_boat_assignment_panel()
+
+@st.fragment
+def _render_boat_assignment_panel():
+    """Render the fleet, boat assignments and utilization, rerunning on their own while boats change"""
+    # The Issues view badge as drawn, so boat edits only rerun the app when it changes
+    st.session_state.equipment_issue_count = get_issue_engine().total_issues() if st.session_state.lineups else 0
+    
     # Display current boat fleet
     if st.session_state.boats:
         st.subheader("Available Boats")
@@ -85,10 +101,8 @@ def render_equipment_tab():
     st.subheader("Boat Assignments")
     
     # Show events that need boats (ordered by event number)
-    events_needing_boats = []
-    for event_num, lineup in st.session_state.lineups.items():
-        if lineup.get('athletes') and any(a is not None for a in lineup['athletes']):
-            events_needing_boats.append(event_num)
+    crew_stats = get_lineup_store().crew_stats()
+    events_needing_boats = crew_stats.index[crew_stats['filled'] > 0].tolist()
     
     if not events_needing_boats:
         st.info("No lineups with athletes to assign boats to.")
@@ -118,14 +132,13 @@ def _render_boat_assignment_for_event(event_num):
     if not event_name:
         return
     
-    lineup = st.session_state.lineups[event_num]
-    athletes = [a for a in lineup.get('athletes', []) if a is not None]
+    store = get_lineup_store()
+    athletes = store.rowers(event_num)
     
     if not athletes:
         return
     
-    # Calculate average weight
-    avg_weight = sum(a.weight for a in athletes) / len(athletes)
+    avg_weight = store.crew_stats().at[event_num, 'avg_weight']
     
     # Get compatible boats
     compatible_boats = [boat for boat in st.session_state.boats 
@@ -208,7 +221,8 @@ def _render_boat_assignment_for_event(event_num):
                     if st.button(f"{status_icon} {boat_text}", 
                                key=f"assign_{event_num}_{boat.name}"):
                         st.session_state.boat_assignments[event_num] = boat
-                        st.rerun()
+                        record_change('boat_assignments', 'assign', event_num)
+                        _finish_boat_edit()
             else:
                 if current_boat:
                     st.info("Current boat is the only compatible option available")
@@ -227,7 +241,7 @@ def _render_boat_assignment_for_event(event_num):
                     'Weight': f"{athlete.weight}lbs"
                 })
             
-            coxswain = lineup.get('coxswain')
+            coxswain = store.coxswain(event_num)
             if coxswain:
                 lineup_data.append({
                     'Position': 'Cox',
@@ -243,7 +257,8 @@ def _render_boat_assignment_for_event(event_num):
             st.write(f"**{event_day} Schedule:**")
             
             # Get times for both sessions
-            morning_time, afternoon_time = get_event_time_both_sessions(event_num, st.session_state.event_spacing_minutes)
+            params = get_regatta_params()
+            morning_time, afternoon_time = get_event_time_both_sessions(event_num, params.event_spacing_minutes, params)
             
             # Create schedule table
             schedule_data = []
@@ -273,28 +288,29 @@ def _render_boat_assignment_for_event(event_num):
             schedule_df = pd.DataFrame(schedule_data)
             st.dataframe(schedule_df, use_container_width=True, hide_index=True)
             
-            # Unassign button
+            # Pin and unassign buttons
             if current_boat:
                 st.write("")  # Add some spacing
+                pinned = boat_pinned(st.session_state.pins, event_num)
+                if st.button("Unpin Boat" if pinned else "Pin Boat", key=f"pin_boat_{event_num}",
+                             help="Auto-assign keeps a pinned boat on this event"):
+                    toggle_pin(st.session_state.pins, event_num, BOAT)
+                    record_change('pins', 'toggle', event_num)
+                    rerun_scoped(False)
                 if st.button("Unassign Boat", key=f"unassign_{event_num}"):
                     del st.session_state.boat_assignments[event_num]
-                    st.rerun()
+                    unpin(st.session_state.pins, event_num, BOAT)
+                    record_change('boat_assignments', 'unassign', event_num)
+                    record_change('pins', 'unpin', event_num)
+                    _finish_boat_edit()
+
+def _finish_boat_edit():
+    """Redraw after a boat change: just the panel, or the app when the Issues badge changed"""
+    rerun_scoped(get_issue_engine().total_issues() != st.session_state.get('equipment_issue_count'))
 
 def _boats_conflict(event1_num, event2_num):
     """Check if two events have conflicting boat usage times"""
-    # Get timing for both events
-    event1_time = get_event_time(event1_num, st.session_state.event_spacing_minutes)
-    event2_time = get_event_time(event2_num, st.session_state.event_spacing_minutes)
-    
-    # Calculate launch and land times
-    event1_launch = event1_time - timedelta(minutes=st.session_state.launch_minutes_before)
-    event1_land = event1_time + timedelta(minutes=st.session_state.land_minutes_after)
-    
-    event2_launch = event2_time - timedelta(minutes=st.session_state.launch_minutes_before)
-    event2_land = event2_time + timedelta(minutes=st.session_state.land_minutes_after)
-    
-    # Check for overlap
-    return not (event1_land <= event2_launch or event2_land <= event1_launch)
+    return BoatAssignment(get_regatta_state()).boats_conflict(event1_num, event2_num)
 
 def _show_boat_conflicts():
     """Show any boat assignment conflicts"""
@@ -382,137 +398,14 @@ def _show_boat_conflicts():
 
 def _auto_assign_boats():
     """Auto-assign boats to events to minimize boat count while avoiding conflicts"""
-    from datetime import timedelta
-    from utils.event_utils import get_event_time, parse_event_requirements
-    
-    # Clear existing assignments
-    st.session_state.boat_assignments = {}
-    
-    # Get all events that need boats
-    events_needing_boats = []
-    for event_num, lineup in st.session_state.lineups.items():
-        if lineup.get('athletes') and any(a is not None for a in lineup['athletes']):
-            # Find event name
-            event_name = None
-            for day, events in EVENTS_DATA.items():
-                for num, name in events:
-                    if num == event_num:
-                        event_name = name
-                        break
-                if event_name:
-                    break
-            
-            if event_name:
-                athletes = [a for a in lineup.get('athletes', []) if a is not None]
-                avg_weight = sum(a.weight for a in athletes) / len(athletes)
-                event_time = get_event_time(event_num, st.session_state.event_spacing_minutes)
-                launch_time = event_time - timedelta(minutes=st.session_state.launch_minutes_before)
-                land_time = event_time + timedelta(minutes=st.session_state.land_minutes_after)
-                
-                events_needing_boats.append({
-                    'event_num': event_num,
-                    'event_name': event_name,
-                    'avg_weight': avg_weight,
-                    'launch_time': launch_time,
-                    'land_time': land_time,
-                    'requirements': parse_event_requirements(event_name)
-                })
-    
-    if not events_needing_boats:
-        return {"success": False, "message": "No events need boat assignments"}
-    
-    # Sort events by launch time to assign in chronological order
-    events_needing_boats.sort(key=lambda x: x['launch_time'])
-    
-    assigned_count = 0
-    issues = []
-    boats_used = set()
+    state = get_regatta_state()
+    result = BoatAssignment(state).assign_all_boats()
+    apply_regatta_state(state)
     
-    for event_info in events_needing_boats:
-        event_num = event_info['event_num']
-        event_name = event_info['event_name']
-        avg_weight = event_info['avg_weight']
-        launch_time = event_info['launch_time']
-        land_time = event_info['land_time']
-        requirements = event_info['requirements']
-        
-        # Find compatible boats
-        compatible_boats = []
-        for boat in st.session_state.boats:
-            if boat.is_compatible_with_event(event_name):
-                compatible_boats.append(boat)
-        
-        if not compatible_boats:
-            issues.append(f"No compatible boats found for Event {event_num}")
-            continue
-        
-        # Score boats by preference:
-        # 1. Weight compatibility (good > warning > bad)
-        # 2. Whether boat is already in use (prefer reusing boats)
-        # 3. Availability (no time conflicts)
-        
-        boat_scores = []
-        for boat in compatible_boats:
-            # Check if boat is available (no time conflicts)
-            available = True
-            for assigned_event, assigned_boat in st.session_state.boat_assignments.items():
-                if assigned_boat == boat:
-                    # Check for time conflict
-                    other_event_time = get_event_time(assigned_event, st.session_state.event_spacing_minutes)
-                    other_launch = other_event_time - timedelta(minutes=st.session_state.launch_minutes_before)
-                    other_land = other_event_time + timedelta(minutes=st.session_state.land_minutes_after)
-                    
-                    # Check for overlap
-                    if not (land_time <= other_launch or other_land <= launch_time):
-                        available = False
-                        break
-            
-            if not available:
-                continue  # Skip boats that would cause conflicts
-            
-            # Calculate score
-            score = 0
-            
-            # Weight compatibility score (most important)
-            weight_check = boat.weight_check(avg_weight)
-            if weight_check == "good":
-                score += 100
-            elif weight_check == "warning":
-                score += 50
-            else:
-                score += 10  # Still usable but not ideal
-            
-            # Prefer boats already in use (to minimize total boats needed)
-            if boat.name in boats_used:
-                score += 20
-            
-            boat_scores.append((score, boat))
-        
-        if not boat_scores:
-            issues.append(f"No available boats for Event {event_num} (all compatible boats have conflicts)")
-            continue
-        
-        # Sort by score (highest first) and assign best boat
-        boat_scores.sort(key=lambda x: x[0], reverse=True)
-        best_score, best_boat = boat_scores[0]
-        
-        st.session_state.boat_assignments[event_num] = best_boat
-        boats_used.add(best_boat.name)
-        assigned_count += 1
-        
-        # Check if weight is outside ideal range
-        weight_check = best_boat.weight_check(avg_weight)
-        if weight_check == "bad":
-            issues.append(f"Event {event_num}: Weight {avg_weight:.1f}lbs significantly outside {best_boat.name} range ({best_boat.min_weight}-{best_boat.max_weight}lbs)")
-        elif weight_check == "warning":
-            issues.append(f"Event {event_num}: Weight {avg_weight:.1f}lbs near limits for {best_boat.name} ({best_boat.min_weight}-{best_boat.max_weight}lbs)")
+    if result["success"]:
+        record_change('boat_assignments', 'auto_assign')
     
-    return {
-        "success": True,
-        "assigned": assigned_count,
-        "boats_used": len(boats_used),
-        "issues": issues
-    }
+    return result
 
 def _add_boat_to_lineup_display():
     """Helper to add boat info to lineup displays"""
@@ -3,6 +3,7 @@ Event planning tab UI for tracking event entry status - compact grid layout
 """
 import streamlit as st
 from models.constants import EVENTS_DATA
+from models.session_state import record_change
 
 def render_event_planning_tab():
     """Render the event planning tab for tracking event entry decisions"""
@@ -143,24 +144,28 @@ def render_event_planning_tab():
                 if st.button("🟢 Athlete", key=f"btn_athlete_{selected_event}",
                            type="primary" if current_status == "athlete_requested" else "secondary"):
                     st.session_state.event_statuses[selected_event] = "athlete_requested"
+                    record_change('event_statuses', 'set', selected_event)
                     st.rerun()
             
             with status_cols[1]:
                 if st.button("🟡 Coaches", key=f"btn_coaches_{selected_event}",
                            type="primary" if current_status == "coaches_suggested" else "secondary"):
                     st.session_state.event_statuses[selected_event] = "coaches_suggested"
+                    record_change('event_statuses', 'set', selected_event)
                     st.rerun()
             
             with status_cols[2]:
                 if st.button("🟣 Contingent", key=f"btn_contingent_{selected_event}",
                            type="primary" if current_status == "contingent" else "secondary"):
                     st.session_state.event_statuses[selected_event] = "contingent"
+                    record_change('event_statuses', 'set', selected_event)
                     st.rerun()
             
             with status_cols[3]:
                 if st.button("⚪ Clear", key=f"btn_clear_{selected_event}",
                            type="primary" if current_status == "none" else "secondary"):
                     st.session_state.event_statuses[selected_event] = "none"
+                    record_change('event_statuses', 'set', selected_event)
                     st.rerun()
     
     # Summary
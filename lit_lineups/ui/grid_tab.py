@@ -1,184 +1,58 @@
 """
 Assignments overview tab UI
 """
+import itertools
 import streamlit as st
-import pandas as pd
-from models.constants import EVENTS_DATA
+import numpy as np
+from models.session_state import cached_on_revisions, get_regatta_state
+from services.assignment_grid import AssignmentGrid, build_assignment_grid
 
-def render_assignments_overview_tab():
-    """Render the assignments overview tab showing athlete assignments across all events"""
-    st.header("Assignments Overview")
-    
-    if not st.session_state.lineups:
-        st.info("No lineups created yet. Create lineups in the Lineup tab.")
-        return
-    
-    # Get all events that have lineups with athletes
-    events_with_lineups = []
-    for event_num, lineup in st.session_state.lineups.items():
-        athletes = [a for a in lineup.get('athletes', []) if a is not None]
-        coxswain = lineup.get('coxswain')
-        if athletes or coxswain:
-            # Find event name and day
-            event_name = "Unknown Event"
-            event_day = "Unknown Day"
-            for day, day_events in EVENTS_DATA.items():
-                for num, name in day_events:
-                    if num == event_num:
-                        event_name = name
-                        event_day = day
-                        break
-                if event_name != "Unknown Event":
-                    break
-            
-            events_with_lineups.append({
-                'event_num': event_num,
-                'event_name': event_name,
-                'event_day': event_day,
-                'lineup': lineup
-            })
-    
-    if not events_with_lineups:
-        st.info("No events have athletes assigned yet.")
-        return
-    
-    # Sort events by day then by event number
-    day_order = {'Thursday': 0, 'Friday': 1, 'Saturday': 2, 'Sunday': 3, 'Monday': 4}
-    events_with_lineups.sort(key=lambda x: (day_order.get(x['event_day'], 999), x['event_num']))
-    
-    # Get all unique athletes across all events
-    all_athletes = set()
-    for event_info in events_with_lineups:
-        lineup = event_info['lineup']
-        athletes = [a for a in lineup.get('athletes', []) if a is not None]
-        coxswain = lineup.get('coxswain')
-        
-        for athlete in athletes:
-            all_athletes.add(athlete)
-        if coxswain:
-            all_athletes.add(coxswain)
-    
-    # Sort athletes by name
-    sorted_athletes = sorted(all_athletes, key=lambda x: x.name)
-    
-    # Create the dataframe for athletes
-    athlete_data = []
-    
-    for athlete in sorted_athletes:
-        row = {'Type': 'Athlete', 'Name': athlete.name}
-        event_count = 0
-        
-        for event_info in events_with_lineups:
-            event_num = event_info['event_num']
-            lineup = event_info['lineup']
-            athletes = lineup.get('athletes', [])
-            coxswain = lineup.get('coxswain')
-            
-            # Check if athlete is in this event
-            is_rower = athlete in athletes
-            is_cox = athlete == coxswain
-            
-            if is_cox:
-                row[str(event_num)] = "C"
-                event_count += 1
-            elif is_rower:
-                row[str(event_num)] = "X"
-                event_count += 1
-            else:
-                row[str(event_num)] = ""
-        
-        row['Total Events'] = event_count
-        athlete_data.append(row)
-    
-    # Create the dataframe for boats (if boat assignments exist)
-    boat_data = []
-    if hasattr(st.session_state, 'boat_assignments') and st.session_state.boat_assignments:
-        # Get all boats that are assigned
-        assigned_boats = set(st.session_state.boat_assignments.values())
-        sorted_boats = sorted(assigned_boats, key=lambda x: x.name)
-        
-        for boat in sorted_boats:
-            row = {'Type': 'Boat', 'Name': boat.name}
-            event_count = 0
-            
-            for event_info in events_with_lineups:
-                event_num = event_info['event_num']
-                assigned_boat = st.session_state.boat_assignments.get(event_num)
-                
-                if assigned_boat == boat:
-                    row[str(event_num)] = "B"
-                    event_count += 1
-                else:
-                    row[str(event_num)] = ""
-            
-            row['Total Events'] = event_count
-            boat_data.append(row)
-    
-    # Combine athlete and boat data
-    all_data = athlete_data + boat_data
-    
-    # Create DataFrame
-    df = pd.DataFrame(all_data)
-    
-    # Create multi-level column headers
-    # First, group events by day to create the header structure
-    events_by_day = {}
-    for event_info in events_with_lineups:
-        day = event_info['event_day']
-        if day not in events_by_day:
-            events_by_day[day] = []
-        events_by_day[day].append(event_info['event_num'])
-    
-    # Display day headers above the table
-    st.markdown("### Event Assignments")
-    
-    # Calculate total number of event columns
-    total_event_columns = len(events_with_lineups)
-    
-    # Create CSS for consistent grid layout
-    grid_css = f"""
+# Above this many event columns the HTML grid gets unwieldy, so show a scrollable dataframe instead
+MAX_HTML_GRID_EVENTS = 100
+
+GRID_CSS = """
     <style>
-    .assignment-grid {{
+    .assignment-grid {
         display: grid;
-        grid-template-columns: 150px repeat({total_event_columns}, 80px) 100px;
+        grid-template-columns: 150px repeat(__COLUMNS__, 80px) 100px;
         gap: 1px;
         background-color: var(--text-color);
         margin: 10px 0;
-    }}
-    .grid-cell {{
+    }
+    .grid-cell {
         padding: 8px;
         text-align: center;
         background-color: var(--background-color);
         color: var(--text-color);
         font-size: 14px;
-    }}
-    .grid-header {{
+    }
+    .grid-header {
         background-color: var(--secondary-background-color);
         font-weight: bold;
-    }}
-    .grid-name {{
+    }
+    .grid-name {
         text-align: left;
-    }}
-    .grid-rower {{
+    }
+    .grid-rower {
         background-color: #2196f3;
         color: white;
         font-weight: bold;
-    }}
-    .grid-cox {{
+    }
+    .grid-cox {
         background-color: #ff9800;
         color: white;
         font-weight: bold;
-    }}
-    .grid-boat {{
+    }
+    .grid-boat {
         background-color: #4caf50;
         color: white;
         font-weight: bold;
-    }}
-    .grid-unavailable {{
+    }
+    .grid-unavailable {
         position: relative;
         color: #999;
-    }}
-    .grid-unavailable::after {{
+    }
+    .grid-unavailable::after {
         content: '';
         position: absolute;
         top: 50%;
@@ -187,110 +61,52 @@ def render_assignments_overview_tab():
         height: 2px;
         background-color: red;
         transform: translateY(-50%);
-    }}
-    .grid-total {{
+    }
+    .grid-total {
         font-weight: bold;
-    }}
-    .grid-athlete-row {{
+    }
+    .grid-athlete-row {
         background-color: var(--background-color);
-    }}
-    .grid-boat-row {{
+    }
+    .grid-boat-row {
         background-color: var(--secondary-background-color);
-    }}
+    }
     </style>
     """
-    st.markdown(grid_css, unsafe_allow_html=True)
-    
-    # Create the main grid container
-    grid_html = "<div class='assignment-grid'>"
-    
-    # Day header row (spanning multiple columns)
-    grid_html += "<div class='grid-cell grid-header'>Name</div>"
-    
-    # Group consecutive events by day for spanning
-    current_day = None
-    day_span_start = 0
-    i = 0
-    
-    for event_info in events_with_lineups:
-        day = event_info['event_day']
-        if current_day != day:
-            if current_day is not None:
-                # Close previous day span
-                span_count = i - day_span_start
-                grid_html += f"<div class='grid-cell grid-header' style='grid-column: span {span_count};'>{current_day.upper()}</div>"
-            current_day = day
-            day_span_start = i
-        i += 1
-    
-    # Close the last day span
-    if current_day is not None:
-        span_count = i - day_span_start
-        grid_html += f"<div class='grid-cell grid-header' style='grid-column: span {span_count};'>{current_day.upper()}</div>"
-    
-    grid_html += "<div class='grid-cell grid-header'>Total</div>"
-    
-    # Event number header row
-    grid_html += "<div class='grid-cell grid-header'></div>"  # Empty cell under "Name"
+
+# Dataframe fallback cell values, using the legend's colors (styling every cell is too slow at this size)
+CELL_GLYPHS = {'X': "🔵 X", 'C': "🟠 C", 'B': "🟢 B"}
+UNAVAILABLE_GLYPH = "✕"
+
+def render_assignments_overview_tab():
+    """Render the assignments overview tab showing athlete assignments across all events"""
+    st.header("Assignments Overview")
     
-    for event_info in events_with_lineups:
-        event_num = event_info['event_num']
-        grid_html += f"<div class='grid-cell grid-header'>{event_num}</div>"
+    if not st.session_state.lineups:
+        st.info("No lineups created yet. Create lineups in the Lineup tab.")
+        return
     
-    grid_html += "<div class='grid-cell grid-header'>Events</div>"
+    # Matrices and their rendering are rebuilt only when lineups, boats or the roster change
+    grid, rendered = cached_on_revisions(
+        'assignments_overview', ('lineups', 'boat_assignments', 'boats', 'athletes'), _build_overview
+    )
     
-    # Data rows
-    for _, row in df.iterrows():
-        row_type = row['Type']
-        
-        # Name cell with type indicator
-        if row_type == 'Athlete':
-            grid_html += f"<div class='grid-cell grid-name grid-athlete-row'>{row['Name']}</div>"
-        else:  # Boat
-            grid_html += f"<div class='grid-cell grid-name grid-boat-row'>🚣 {row['Name']}</div>"
-        
-        # Event assignments
-        for event_info in events_with_lineups:
-            event_num = event_info['event_num']
-            event_day = event_info['event_day']
-            value = row.get(str(event_num), "")
-            
-            # Check if this is an athlete row and if they're unavailable for this day
-            is_unavailable = False
-            if row_type == 'Athlete':
-                # Find the athlete object to check availability
-                athlete = next((a for a in sorted_athletes if a.name == row['Name']), None)
-                if athlete and not athlete.is_available_on_day(event_day):
-                    is_unavailable = True
-            
-            if value == "C":
-                cell_class = "grid-cell grid-cox"
-            elif value == "X":
-                cell_class = "grid-cell grid-rower"
-            elif value == "B":
-                cell_class = "grid-cell grid-boat"
-            else:
-                # Use appropriate background for empty cells
-                if row_type == 'Athlete':
-                    cell_class = "grid-cell grid-athlete-row"
-                else:
-                    cell_class = "grid-cell grid-boat-row"
-            
-            # Add unavailable class if needed
-            if is_unavailable:
-                cell_class += " grid-unavailable"
-            
-            grid_html += f"<div class='{cell_class}'>{value}</div>"
-        
-        # Total events
-        if row_type == 'Athlete':
-            grid_html += f"<div class='grid-cell grid-total grid-athlete-row'>{row['Total Events']}</div>"
-        else:
-            grid_html += f"<div class='grid-cell grid-total grid-boat-row'>{row['Total Events']}</div>"
+    if grid.events.empty:
+        st.info("No events have athletes assigned yet.")
+        return
     
-    grid_html += "</div>"
+    # Display day headers above the table
+    st.markdown("### Event Assignments")
     
-    st.markdown(grid_html, unsafe_allow_html=True)
+    if len(grid.events) > MAX_HTML_GRID_EVENTS:
+        st.caption(f"{len(grid.events)} events: showing a scrollable table. Hover an event column for its name; "
+                   f"{UNAVAILABLE_GLYPH} marks days the athlete is unavailable.")
+        df, column_config = rendered
+        st.dataframe(df, column_config=column_config, hide_index=True, use_container_width=True)
+    else:
+        grid_css, grid_html = rendered
+        st.markdown(grid_css, unsafe_allow_html=True)
+        st.markdown(grid_html, unsafe_allow_html=True)
     
     # Legend
     st.markdown("---")
@@ -300,11 +116,87 @@ def render_assignments_overview_tab():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Athletes", len(sorted_athletes))
+        st.metric("Total Athletes", len(grid.athletes))
     
     with col2:
-        st.metric("Total Events", len(events_with_lineups))
+        st.metric("Total Events", len(grid.events))
     
     with col3:
-        total_boats = len(boat_data) if boat_data else 0
-        st.metric("Total Boats Used", total_boats)
\ No newline at end of file
+        st.metric("Total Boats Used", len(grid.boats))
+
+def _build_overview():
+    """Build the grid and its rendering: (css, html) or, for large regattas, (dataframe, column config)"""
+    grid = build_assignment_grid(get_regatta_state())
+    if grid.events.empty:
+        return grid, None
+    if len(grid.events) > MAX_HTML_GRID_EVENTS:
+        return grid, _build_grid_frame(grid)
+    return grid, (GRID_CSS.replace('__COLUMNS__', str(len(grid.events))), _build_grid_html(grid))
+
+def _cells(marks, classes):
+    """HTML cells for a matrix of marks with a matching matrix of CSS classes"""
+    return "<div class='" + classes + "'>" + marks + "</div>"
+
+def _build_grid_html(grid: AssignmentGrid):
+    """Render the assignment grid as CSS-grid HTML"""
+    events = grid.events
+    parts = ["<div class='assignment-grid'>"]
+    
+    # Day header row, one cell spanning each run of same-day events
+    parts.append("<div class='grid-cell grid-header'>Name</div>")
+    for day, run in itertools.groupby(events['day']):
+        span_count = sum(1 for _ in run)
+        parts.append(f"<div class='grid-cell grid-header' style='grid-column: span {span_count};'>{day.upper()}</div>")
+    parts.append("<div class='grid-cell grid-header'>Total</div>")
+    
+    # Event number header row
+    parts.append("<div class='grid-cell grid-header'></div>")  # Empty cell under "Name"
+    parts.extend(f"<div class='grid-cell grid-header'>{event_num}</div>" for event_num in events['event_num'])
+    parts.append("<div class='grid-cell grid-header'>Events</div>")
+    
+    # Athlete rows: cell classes chosen for the whole matrix at once
+    marks = grid.athlete_marks
+    classes = np.select([marks == 'C', marks == 'X'], ["grid-cell grid-cox", "grid-cell grid-rower"],
+                        "grid-cell grid-athlete-row").astype(object)
+    classes = np.where(grid.unavailable, classes + " grid-unavailable", classes)
+    cells = _cells(marks, classes)
+    for athlete, row_cells, total in zip(grid.athletes, cells, grid.athlete_totals):
+        parts.append(f"<div class='grid-cell grid-name grid-athlete-row'>{athlete.name}</div>")
+        parts.append("".join(row_cells))
+        parts.append(f"<div class='grid-cell grid-total grid-athlete-row'>{total}</div>")
+    
+    # Boat rows
+    marks = grid.boat_marks
+    classes = np.where(marks == 'B', "grid-cell grid-boat", "grid-cell grid-boat-row").astype(object)
+    cells = _cells(marks, classes)
+    for boat, row_cells, total in zip(grid.boats, cells, grid.boat_totals):
+        parts.append(f"<div class='grid-cell grid-name grid-boat-row'>🚣 {boat.name}</div>")
+        parts.append("".join(row_cells))
+        parts.append(f"<div class='grid-cell grid-total grid-boat-row'>{total}</div>")
+    
+    parts.append("</div>")
+    return "".join(parts)
+
+def _build_grid_frame(grid: AssignmentGrid):
+    """Dataframe and column config for grids too wide for the HTML layout"""
+    df = grid.to_frame()
+    event_columns = [str(num) for num in grid.events['event_num']]
+    
+    # Swap marks for glyphs across the whole matrix at once
+    marks = df[event_columns].to_numpy(dtype=object)
+    cells = np.full(marks.shape, '', dtype=object)
+    for mark, glyph in CELL_GLYPHS.items():
+        cells[marks == mark] = glyph
+    cells[:len(grid.athletes)][grid.unavailable & (grid.athlete_marks == '')] = UNAVAILABLE_GLYPH
+    df[event_columns] = cells
+    
+    column_config = {
+        'Type': st.column_config.TextColumn("Type", width="small", pinned=True),
+        'Name': st.column_config.TextColumn("Name", pinned=True),
+        'Total Events': st.column_config.NumberColumn("Events", width="small")
+    }
+    for column, day, event_name in zip(event_columns, grid.events['day'], grid.events['event_name']):
+        column_config[column] = st.column_config.TextColumn(
+            f"{day[:3]} {column}", help=f"{day} - Event {column}: {event_name}", width="small"
+        )
+    return df, column_config
@@ -3,10 +3,9 @@ Issues analysis tab UI
 """
 import streamlit as st
 import pandas as pd
-from datetime import timedelta
-from collections import defaultdict
-from models.constants import EVENTS_DATA
-from utils.event_utils import get_event_time
+from services.dropout_analysis import analyze_dropouts
+from services.issue_engine import get_issue_engine
+from models.session_state import cached_on_revisions, discard_stale_selection, get_regatta_state
 
 def render_issues_tab():
     """Render the comprehensive issues analysis tab"""
@@ -16,14 +15,15 @@ def render_issues_tab():
         st.info("No lineups created yet. Create some lineups to see issue analysis.")
         return
     
-    # Calculate all issues
-    athlete_conflicts = _check_athlete_conflicts()
-    boat_conflicts = _check_boat_conflicts()
-    unassigned_boats = _check_unassigned_boats()
-    incomplete_lineups = _check_incomplete_lineups()
-    weight_issues = _check_weight_issues()
-    athlete_workload = _analyze_athlete_workload()
-    age_category_issues = _check_age_category_issues()
+    # Read all issues from the shared engine (only changed events are recomputed)
+    engine = get_issue_engine()
+    athlete_conflicts = engine.issues('athlete_conflicts')
+    boat_conflicts = engine.issues('boat_conflicts')
+    unassigned_boats = engine.issues('unassigned_boats')
+    incomplete_lineups = engine.issues('incomplete_lineups')
+    weight_issues = engine.issues('weight_issues')
+    athlete_workload = engine.workload()
+    age_category_issues = engine.issues('age_category_issues')
     
     # Summary section at top
     st.subheader("📊 Issues Summary")
@@ -155,7 +155,7 @@ def render_issues_tab():
     st.subheader("⛵ Equipment Utilization")
     
     if hasattr(st.session_state, 'boats') and st.session_state.boats:
-        boat_usage = _analyze_boat_usage()
+        boat_usage = engine.boat_usage(st.session_state.boats)
         
         col1, col2 = st.columns(2)
         
@@ -174,323 +174,43 @@ def render_issues_tab():
                     st.write(f"• {boat}")
             else:
                 st.success("All boats are in use!")
-
-def _check_athlete_conflicts():
-    """Check for athlete scheduling conflicts"""
-    conflicts = []
-    
-    # Build athlete event schedule
-    athlete_events = defaultdict(list)
-    
-    for event_num, lineup in st.session_state.lineups.items():
-        event_time = get_event_time(event_num, st.session_state.event_spacing_minutes)
-        
-        # Add rowers
-        for athlete in lineup.get('athletes', []):
-            if athlete is not None:
-                athlete_events[athlete.name].append((event_num, event_time))
-        
-        # Add coxswain
-        if lineup.get('coxswain'):
-            athlete_events[lineup['coxswain'].name].append((event_num, event_time))
-    
-    # Check for conflicts
-    for athlete_name, events in athlete_events.items():
-        if len(events) <= 1:
-            continue
-        
-        # Sort by time
-        events.sort(key=lambda x: x[1])
-        
-        for i in range(len(events) - 1):
-            current_event, current_time = events[i]
-            next_event, next_time = events[i + 1]
-            
-            gap_minutes = (next_time - current_time).total_seconds() / 60
-            
-            if 0 < gap_minutes < st.session_state.min_gap_minutes:
-                conflicts.append(f"{athlete_name}: {gap_minutes:.0f} min gap between events {current_event} and {next_event}")
     
-    return conflicts
+    _render_dropout_impact()
 
-def _check_boat_conflicts():
-    """Check for boat assignment conflicts"""
-    conflicts = []
-    
-    if not hasattr(st.session_state, 'boat_assignments'):
-        return conflicts
-    
-    # Group events by boat
-    boat_events = defaultdict(list)
-    
-    for event_num, boat in st.session_state.boat_assignments.items():
-        event_time = get_event_time(event_num, st.session_state.event_spacing_minutes)
-        launch_time = event_time - timedelta(minutes=st.session_state.launch_minutes_before)
-        land_time = event_time + timedelta(minutes=st.session_state.land_minutes_after)
-        
-        boat_events[boat.name].append((event_num, launch_time, land_time))
-    
-    # Check for overlaps
-    for boat_name, events in boat_events.items():
-        if len(events) <= 1:
-            continue
-        
-        # Sort by launch time
-        events.sort(key=lambda x: x[1])
-        
-        for i in range(len(events) - 1):
-            current_event, current_launch, current_land = events[i]
-            next_event, next_launch, next_land = events[i + 1]
-            
-            # Check if there's overlap
-            if current_land > next_launch:
-                overlap_minutes = (current_land - next_launch).total_seconds() / 60
-                conflicts.append(f"{boat_name}: {overlap_minutes:.0f} min overlap between events {current_event} and {next_event}")
-    
-    return conflicts
-
-def _check_incomplete_lineups():
-    """Check for lineups with empty seats"""
-    incomplete = []
-    
-    for event_num, lineup in st.session_state.lineups.items():
-        # Find event name and requirements
-        event_name = "Unknown"
-        for day, events in EVENTS_DATA.items():
-            for num, name in events:
-                if num == event_num:
-                    event_name = name
-                    break
-        
-        # Parse event requirements
-        from utils.event_utils import parse_event_requirements
-        try:
-            requirements = parse_event_requirements(event_name)
-        except:
-            continue  # Skip if we can't parse requirements
-        
-        athletes = lineup.get('athletes', [])
-        coxswain = lineup.get('coxswain')
-        
-        # Check if lineup has any athletes at all
-        if not athletes and not coxswain:
-            continue  # Skip completely empty lineups (not an issue)
-        
-        # Check for empty rower seats
-        empty_seats = 0
-        filled_seats = 0
-        
-        for i, athlete in enumerate(athletes):
-            if athlete is None:
-                empty_seats += 1
-            else:
-                filled_seats += 1
-        
-        # Only report if lineup is partially filled but incomplete
-        if filled_seats > 0:  # Only check lineups that have at least one athlete
-            if empty_seats > 0:
-                incomplete.append(f"Event {event_num} ({event_name}): {empty_seats} empty rower seat{'s' if empty_seats != 1 else ''}")
-            
-            # Check for missing coxswain if required
-            if requirements.get('has_cox', False) and not coxswain:
-                incomplete.append(f"Event {event_num} ({event_name}): Missing required coxswain")
-    
-    return incomplete
-
-def _check_unassigned_boats():
-    """Check for events without boat assignments"""
-    unassigned = []
-    
-    for event_num, lineup in st.session_state.lineups.items():
-        # Only check events with athletes
-        if lineup.get('athletes') and any(a is not None for a in lineup['athletes']):
-            if not hasattr(st.session_state, 'boat_assignments') or event_num not in st.session_state.boat_assignments:
-                # Find event name
-                event_name = "Unknown"
-                for day, events in EVENTS_DATA.items():
-                    for num, name in events:
-                        if num == event_num:
-                            event_name = name
-                            break
-                
-                unassigned.append(f"Event {event_num}: {event_name}")
-    
-    return unassigned
-
-def _check_weight_issues():
-    """Check for boat weight compatibility issues"""
-    issues = []
-    
-    if not hasattr(st.session_state, 'boat_assignments'):
-        return issues
-    
-    for event_num, boat in st.session_state.boat_assignments.items():
-        lineup = st.session_state.lineups.get(event_num, {})
-        athletes = [a for a in lineup.get('athletes', []) if a is not None]
-        
-        if not athletes:
-            continue
-        
-        avg_weight = sum(a.weight for a in athletes) / len(athletes)
-        weight_check = boat.weight_check(avg_weight)
-        
-        # Find event name
-        event_name = "Unknown"
-        for day, events in EVENTS_DATA.items():
-            for num, name in events:
-                if num == event_num:
-                    event_name = name
-                    break
-        
-        if weight_check == "bad":
-            issues.append(f"❌ Event {event_num} ({event_name}): {boat.name} - avg weight {avg_weight:.1f}lbs outside range {boat.min_weight}-{boat.max_weight}lbs")
-        elif weight_check == "warning":
-            issues.append(f"⚠️ Event {event_num} ({event_name}): {boat.name} - avg weight {avg_weight:.1f}lbs near range limits {boat.min_weight}-{boat.max_weight}lbs")
-    
-    return issues
-
-def _analyze_athlete_workload():
-    """Analyze athlete workload and distribution"""
-    athlete_events = defaultdict(list)
-    athlete_daily_events = defaultdict(lambda: defaultdict(int))
-    
-    # Count events per athlete
-    for event_num, lineup in st.session_state.lineups.items():
-        # Find event day
-        event_day = None
-        for day, events in EVENTS_DATA.items():
-            for num, name in events:
-                if num == event_num:
-                    event_day = day
-                    break
-            if event_day:
-                break
-        
-        # Count rowers
-        for athlete in lineup.get('athletes', []):
-            if athlete is not None:
-                athlete_events[athlete.name].append(event_num)
-                if event_day:
-                    athlete_daily_events[athlete.name][event_day] += 1
-        
-        # Count coxswain
-        if lineup.get('coxswain'):
-            athlete_events[lineup['coxswain'].name].append(event_num)
-            if event_day:
-                athlete_daily_events[lineup['coxswain'].name][event_day] += 1
-    
-    # Find overloaded athletes (6+ events)
-    overloaded = []
-    for athlete_name, events in athlete_events.items():
-        if len(events) >= 6:
-            overloaded.append({
-                'Athlete': athlete_name,
-                'Total Events': len(events),
-                'Events': ', '.join(map(str, sorted(events)))
-            })
-    
-    # Daily breakdown for busy athletes
-    daily_breakdown = []
-    for athlete_name, daily_counts in athlete_daily_events.items():
-        if sum(daily_counts.values()) >= 2:  # Athletes with 2+ events
-            row = {'Athlete': athlete_name}
-            for day in ['Thursday', 'Friday', 'Saturday', 'Sunday']:
-                row[day] = daily_counts.get(day, 0)
-            row['Total'] = sum(daily_counts.values())
-            daily_breakdown.append(row)
-    
-    # Sort by total events
-    daily_breakdown.sort(key=lambda x: x['Total'], reverse=True)
-    
-    # Find unused athletes
-    all_athlete_names = {a.name for a in st.session_state.athletes}
-    used_athlete_names = set(athlete_events.keys())
-    unused = list(all_athlete_names - used_athlete_names)
-    
-    return {
-        'overloaded': overloaded,
-        'daily_breakdown': daily_breakdown,
-        'unused': unused
-    }
-
-def _analyze_boat_usage():
-    """Analyze boat usage and availability"""
-    used_boats = defaultdict(list)
-    
-    if hasattr(st.session_state, 'boat_assignments'):
-        for event_num, boat in st.session_state.boat_assignments.items():
-            used_boats[boat.name].append(event_num)
-    
-    # Find unused boats
-    all_boat_names = {boat.name for boat in getattr(st.session_state, 'boats', [])}
-    used_boat_names = set(used_boats.keys())
-    unused_boats = list(all_boat_names - used_boat_names)
-    
-    return {
-        'used': dict(used_boats),
-        'unused': unused_boats
-    }
-
-def _check_age_category_issues():
-    """Check for age category mismatches with boats"""
-    issues = []
-    
-    if not hasattr(st.session_state, 'boat_assignments'):
-        return issues
+def _render_dropout_impact():
+    """What-if analysis of every athlete dropping out, run on request and kept until the state changes"""
+    st.subheader("🤒 Dropout Impact")
+    st.caption("Simulates each athlete dropping out: which lineups break, who can step in (eligible, available, "
+               "no time conflict, and keeping gender balance, sides, average age and boat weight band) and how "
+               "many lineup issues remain.")
+    
+    if not st.session_state.get('dropout_analysis_shown'):
+        if st.button("Analyze Dropouts", key="analyze_dropouts"):
+            st.session_state.dropout_analysis_shown = True
+            st.rerun()
+        return
     
-    for event_num, boat in st.session_state.boat_assignments.items():
-        lineup = st.session_state.lineups.get(event_num, {})
-        
-        # Find event name and parse age category
-        event_name = "Unknown"
-        for day, events in EVENTS_DATA.items():
-            for num, name in events:
-                if num == event_num:
-                    event_name = name
-                    break
-        
-        if event_name == "Unknown":
-            continue
-        
-        # Extract age category from event name (e.g., "Master E", "Master B", etc.)
-        event_age_category = None
-        if "Master" in event_name:
-            # Look for patterns like "Master E", "Master B", etc.
-            parts = event_name.split()
-            for i, part in enumerate(parts):
-                if part == "Master" and i + 1 < len(parts):
-                    next_part = parts[i + 1]
-                    if len(next_part) == 1 and next_part.isalpha():
-                        event_age_category = next_part.upper()
-                        break
-        
-        if not event_age_category or not boat.year:
-            continue  # Skip if we can't determine age category or boat year
-        
-        # Calculate boat age (assuming current year is 2025)
-        current_year = 2025
-        boat_age = current_year - boat.year
-        
-        # Define age category requirements (approximate boat age ranges)
-        # These are typical masters rowing age categories and corresponding boat age limits
-        age_category_limits = {
-            'A': {'min_boat_age': 0, 'max_boat_age': 15},    # 27-35: Can use newer boats
-            'B': {'min_boat_age': 0, 'max_boat_age': 20},    # 36-42: Can use fairly new boats
-            'C': {'min_boat_age': 0, 'max_boat_age': 25},    # 43-49: Can use moderately aged boats
-            'D': {'min_boat_age': 0, 'max_boat_age': 30},    # 50-56: Can use older boats
-            'E': {'min_boat_age': 0, 'max_boat_age': 35},    # 57-63: Can use quite old boats
-            'F': {'min_boat_age': 0, 'max_boat_age': 40},    # 64-70: Can use very old boats
-            'G': {'min_boat_age': 0, 'max_boat_age': 50},    # 71+: Can use any age boat
-        }
-        
-        if event_age_category in age_category_limits:
-            limits = age_category_limits[event_age_category]
-            
-            if boat_age < limits['min_boat_age']:
-                # Boat is too new/young for this age category (critical)
-                issues.append(f"❌ Event {event_num} ({event_name}): {boat.name} ({boat.year}) is too new for Master {event_age_category} category")
-            elif boat_age > limits['max_boat_age']:
-                # Boat is too old for this age category (warning)
-                issues.append(f"⚠️ Event {event_num} ({event_name}): {boat.name} ({boat.year}) may be too old for Master {event_age_category} category")
+    result = cached_on_revisions('dropout_analysis', ('lineups', 'athletes', 'boats', 'boat_assignments', 'params'),
+                                 lambda: analyze_dropouts(get_regatta_state()))
+    summary, impact = result['summary'], result['impact']
+    st.write(f"{result['message']}. Lineup issues now: **{result['total_issues']}**.")
+    if summary.empty:
+        return
     
-    return issues
\ No newline at end of file
+    st.dataframe(summary.rename(columns={
+        'athlete': 'Athlete', 'events': 'Events', 'broken': 'Lineups Broken', 'uncovered': 'Seats Without Sub',
+        'issues_after': 'Issues Without Them', 'issues_with_substitutes': 'Issues With Subs'
+    }), use_container_width=True, hide_index=True)
+    
+    discard_stale_selection('dropout_athlete', summary['athlete'].tolist())
+    athlete_name = st.selectbox("Show substitutes for", summary['athlete'].tolist(), key="dropout_athlete")
+    seats = impact[impact['athlete'] == athlete_name]
+    st.dataframe(pd.DataFrame({
+        'Event': [f"{num}: {name}" for num, name in zip(seats['event_num'], seats['event_name'])],
+        'Seat': seats['role'],
+        'Broken': seats['broken'].map({True: '⚠️', False: ''}),
+        'Substitutes (best first)': seats['substitutes'].map(lambda names: ', '.join(names) or 'None available'),
+        'Issues Before': seats['issues_before'],
+        'Issues Without': seats['issues_after'],
+        'Issues With Best Sub': seats['issues_with_substitute'],
+    }), use_container_width=True, hide_index=True)
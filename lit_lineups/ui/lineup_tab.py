@@ -4,6 +4,16 @@ Event lineup management tab UI
 import streamlit as st
 from models.constants import EVENTS_DATA
 from utils.event_utils import parse_event_requirements
+from services.cox_allocation import get_cox_allocator
+from services.dropout_analysis import DropoutAnalysis
+from services.issue_engine import get_issue_engine
+from services.itinerary import seat_name
+from services.seat_order import SEATING_OBJECTIVES, optimize_all_seating
+from services.seat_sides import assign_sides
+from models.athlete_table import CAN_COX
+from models.pins import COX, CREW, is_pinned, toggle_pin, unpin
+from models.session_state import (record_change, cached_on_revisions, discard_stale_selection, rerun_scoped,
+                                  get_athlete_table, get_lineup_store, get_regatta_params, get_regatta_state)
 
 def render_lineup_tab():
     """Render the lineup management tab"""
@@ -20,20 +30,60 @@ def render_lineup_tab():
     # Event selection section
     st.subheader("Select Events to Race")
     
-    # Filter events
-    filtered_events_by_day = {}
-    for day, events in EVENTS_DATA.items():
-        filtered_events = []
-        for event_num, event_name in events:
-            if _should_show_event(event_name):
-                filtered_events.append((event_num, event_name))
-        if filtered_events:
-            filtered_events_by_day[day] = filtered_events
+    # Filter events (recomputed only when the roster or parameters change)
+    filtered_events_by_day = cached_on_revisions('lineup_eligible_events', ('athletes', 'params'), _filter_events)
     
     if not filtered_events_by_day:
         st.warning("No eligible events found for your roster!")
         return
     
+    _render_event_selector(filtered_events_by_day)
+    
+    # Only show lineup management if events are selected
+    if not st.session_state.selected_events:
+        st.info("Select events above to start creating lineups.")
+        return
+    
+    # Create event list for selectbox from selected events
+    selected_event_list = []
+    for day, events in filtered_events_by_day.items():
+        for event_num, event_name in events:
+            if event_num in st.session_state.selected_events:
+                selected_event_list.append((event_num, event_name))
+    
+    if not selected_event_list:
+        st.info("No events selected.")
+        return
+    
+    _render_cox_allocation()
+    _render_seating_optimizer()
+    
+    # Badge events that currently have issues
+    issue_engine = get_issue_engine()
+    event_labels = {}
+    for num, name in selected_event_list:
+        badge = "⚠️ " if issue_engine.event_issue_count(num) else ""
+        event_labels[num] = f"{badge}{num}: {name}"
+    
+    # Remember the badges drawn outside the lineup editor so seat edits only rerun the app when they change
+    st.session_state.lineup_issue_badges = _issue_badges(tuple(event_labels))
+    
+    discard_stale_selection('lineup_event_selector', event_labels)
+    selected_event = st.selectbox("Select Event to Build Lineup", 
+                                options=[num for num, _ in selected_event_list],
+                                format_func=lambda x: event_labels[x],
+                                key="lineup_event_selector")
+    
+    # Current lineup section
+    if selected_event:
+        event_name = next((name for num, name in selected_event_list if num == selected_event), "Unknown Event")
+        _render_lineup_editor(selected_event, event_name)
+
+@st.fragment
+def _render_event_selector(filtered_events_by_day):
+    """Render the event checkboxes, rerunning the app only when the selection changes"""
+    selection_changed = False
+    
     # Group events by day for better organization
     for day, events in filtered_events_by_day.items():
         with st.expander(f"{day} Events ({len(events)} available)", expanded=False):
@@ -53,40 +103,135 @@ def render_lineup_tab():
                         # Clear lineup when event is deselected
                         if event_num in st.session_state.lineups:
                             del st.session_state.lineups[event_num]
+                            record_change('lineups', 'remove', event_num)
+                        if st.session_state.pins.pop(event_num, None):
+                            record_change('pins', 'clear', event_num)
+                    selection_changed |= is_selected != (event_num in st.session_state.selected_events)
                 
                 col_idx += 1
     
-    # Only show lineup management if events are selected
-    if not st.session_state.selected_events:
-        st.info("Select events above to start creating lineups.")
+    # The lineup picker below lists the selected events
+    if selection_changed:
+        st.rerun()
+
+def _render_cox_allocation():
+    """Offer to fill every open cox seat from the regatta-wide allocation"""
+    allocator = get_cox_allocator()
+    if not allocator.suggestions and not allocator.unfilled:
         return
     
-    # Create event list for selectbox from selected events
-    selected_event_list = []
-    for day, events in filtered_events_by_day.items():
-        for event_num, event_name in events:
-            if event_num in st.session_state.selected_events:
-                selected_event_list.append((event_num, event_name))
-    
-    if not selected_event_list:
-        st.info("No events selected.")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        open_seats = len(allocator.suggestions) + len(allocator.unfilled)
+        note = f" ({len(allocator.unfilled)} without an available coxswain)" if allocator.unfilled else ""
+        st.write(f"{open_seats} coxed event{'s' if open_seats != 1 else ''} without a coxswain{note}")
+    with col2:
+        if allocator.suggestions and st.button("Assign Coxswains", key="assign_coxswains"):
+            allocator.apply(get_regatta_state())
+            record_change('lineups', 'assign_coxswains')
+            st.rerun()
+
+def _render_seating_optimizer():
+    """Reorder the seats of every lineup under a chosen objective"""
+    if not st.session_state.lineups:
         return
     
-    selected_event = st.selectbox("Select Event to Build Lineup", 
-                                options=[num for num, _ in selected_event_list],
-                                format_func=lambda x: next(f"{x}: {name}" for num, name in selected_event_list if num == x))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        objective = st.selectbox("Seating objective", options=list(SEATING_OBJECTIVES),
+                                 format_func=SEATING_OBJECTIVES.get, key="seating_objective")
+    with col2:
+        st.write("")
+        if st.button("Optimize Seating", key="optimize_seating"):
+            result = optimize_all_seating(get_regatta_state(), objective)
+            for event_num in result["reordered"]:
+                record_change('lineups', 'reorder', event_num)
+            st.session_state.seating_result = result["message"]
+            st.rerun()
     
-    # Current lineup section
-    if selected_event:
-        event_name = next((name for num, name in selected_event_list if num == selected_event), "Unknown Event")
+    if 'seating_result' in st.session_state:
+        st.caption(st.session_state.pop('seating_result'))
+
+@st.fragment
+def _render_lineup_editor(selected_event, event_name):
+    """Render the seat buttons and current lineup, rerunning on their own while seats change"""
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        _render_lineup_management(selected_event, event_name)
+    
+    with col2:
+        _render_seat_assignment_display(selected_event, event_name)
+    
+    _render_substitute_finder(selected_event, event_name)
+
+def _render_substitute_finder(selected_event, event_name):
+    """Rank the whole roster for one seat of the lineup, from the shared substitution index"""
+    requirements = parse_event_requirements(event_name)
+    current_lineup = st.session_state.lineups[selected_event]
+    
+    with st.expander("🔄 Find Substitutes"):
+        seats = list(range(requirements['num_rowers'])) + ([-1] if requirements['has_cox'] else [])
         
-        col1, col2 = st.columns([3, 1])
+        def seat_label(seat):
+            if seat is None:
+                return "Choose a seat..."
+            athlete = current_lineup['athletes'][seat] if seat >= 0 else current_lineup.get('coxswain')
+            label = seat_name(seat, requirements) if seat >= 0 else "Cox"
+            return f"{label}: {athlete.name if athlete else 'Empty'}"
         
-        with col1:
-            _render_lineup_management(selected_event, event_name)
+        seat = st.selectbox("Seat", [None] + seats, format_func=seat_label, key=f"substitute_seat_{selected_event}")
+        if seat is None:
+            return
         
+        # Weight checks use the assigned boats' limits, so boat edits count too
+        index = cached_on_revisions('substitution_index',
+                                    ('lineups', 'athletes', 'boats', 'boat_assignments', 'params'),
+                                    lambda: DropoutAnalysis(get_regatta_state()))
+        candidates = index.seat_candidates(selected_event, seat)
+        feasible = candidates[candidates['feasible']]
+        st.caption(f"{len(feasible)} of {len(candidates)} athletes can take this seat; cheapest first "
+                   f"(events already raced, not preferring the event, weight outside the boat's band)")
+        st.dataframe(candidates.drop(columns='row').rename(columns={
+            'athlete': 'Athlete', 'feasible': 'Feasible', 'cost': 'Cost', 'races': 'Races', 'prefers': 'Prefers',
+            'avg_age': 'Crew Avg Age', 'avg_weight': 'Crew Avg Weight', 'problems': 'Problems'
+        }), hide_index=True, use_container_width=True, height=300)
+        
+        if feasible.empty:
+            return
+        top = feasible.head(10)
+        names = dict(zip(top['row'].tolist(), top['athlete']))
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            row = st.selectbox("Substitute", list(names), format_func=names.get,
+                               key=f"substitute_pick_{selected_event}_{seat}")
         with col2:
-            _render_seat_assignment_display(selected_event, event_name)
+            if st.button(f"Seat {names[row]}", key=f"substitute_seat_button_{selected_event}_{seat}"):
+                _set_seat_by_hand(selected_event, seat if seat >= 0 else COX, st.session_state.athletes[row])
+
+def _issue_badges(event_nums):
+    """The picker events, the Issues view count, which picker events are badged with issues and the open cox seats"""
+    issue_engine = get_issue_engine()
+    badged = frozenset(num for num in event_nums if issue_engine.event_issue_count(num))
+    allocator = get_cox_allocator()
+    return event_nums, issue_engine.total_issues(), badged, len(allocator.suggestions) + len(allocator.unfilled)
+
+def _finish_lineup_edit():
+    """Redraw after a seat change: just the editor, or the app when issue badges outside it changed"""
+    drawn = st.session_state.get('lineup_issue_badges')
+    rerun_scoped(drawn is None or _issue_badges(drawn[0]) != drawn)
+
+def _filter_events():
+    """Get the events worth showing, grouped by day"""
+    filtered_events_by_day = {}
+    for day, events in EVENTS_DATA.items():
+        filtered_events = []
+        for event_num, event_name in events:
+            if _should_show_event(event_name):
+                filtered_events.append((event_num, event_name))
+        if filtered_events:
+            filtered_events_by_day[day] = filtered_events
+    return filtered_events_by_day
 
 def _should_show_event(event_name):
     """Check if event should be shown based on filtering criteria"""
@@ -108,7 +253,8 @@ def _should_show_event(event_name):
 def _has_enough_eligible_athletes(event_name):
     """Check if we have enough eligible athletes for an event"""
     requirements = parse_event_requirements(event_name)
-    eligible_count = sum(1 for athlete in st.session_state.athletes if _athlete_fits_basic_requirements(athlete, event_name))
+    table = get_athlete_table()
+    eligible_count = int(table.rower_mask(event_name).sum())
     
     # Check if we have enough rowers
     if eligible_count < requirements['num_rowers']:
@@ -116,31 +262,12 @@ def _has_enough_eligible_athletes(event_name):
     
     # If event needs a coxswain, check if we have one available
     if requirements['has_cox']:
-        cox_count = sum(1 for athlete in st.session_state.athletes if athlete.can_cox)
+        cox_count = int(table.has(CAN_COX).sum())
         if cox_count < 1:
             return False
     
     return True
 
-def _athlete_fits_basic_requirements(athlete, event_name):
-    """Check if athlete meets basic requirements for an event"""
-    from models.boat import BoatType
-    
-    # Gender requirements
-    if 'Men\'s' in event_name and athlete.gender != 'M':
-        return False
-    if 'Women\'s' in event_name and athlete.gender != 'F':
-        return False
-    
-    # Boat type requirements
-    boat = BoatType(event_name.split()[-1])
-    if boat.is_sculling and not athlete.can_scull:
-        return False
-    if boat.is_sweep and not (athlete.can_port or athlete.can_starboard):
-        return False
-    
-    return True
-
 def _get_day_from_event_data(event_num):
     """Get the day for a given event number"""
     for day, events in EVENTS_DATA.items():
@@ -178,31 +305,28 @@ def _render_lineup_management(selected_event, event_name):
     # Initialize lineup if needed
     if selected_event not in st.session_state.lineups:
         st.session_state.lineups[selected_event] = {'athletes': [None] * requirements['num_rowers'], 'coxswain': None}
+        record_change('lineups', 'create', selected_event)
     
     current_lineup = st.session_state.lineups[selected_event]
     
     # Ensure the athletes list has the right length
     if len(current_lineup.get('athletes', [])) != requirements['num_rowers']:
         current_lineup['athletes'] = [None] * requirements['num_rowers']
+        record_change('lineups', 'clear', selected_event)
     
-    # Get eligible athletes not already in the lineup
-    eligible_athletes = [a for a in st.session_state.athletes if _athlete_fits_basic_requirements(a, event_name)]
-    day_available_athletes = [a for a in eligible_athletes if a.is_available_on_day(event_day)]
+    # Get eligible athletes available on the day, in roster order
+    table = get_athlete_table()
+    candidates = table.rower_mask(event_name)
     
     # For coxed events, also include athletes who can cox (even if they can't row this event)
     if requirements['has_cox']:
-        eligible_coxswains = [a for a in st.session_state.athletes if a.can_cox and a.is_available_on_day(event_day)]
-        # Combine rowers and coxswains, removing duplicates
-        all_available = list(set(day_available_athletes + eligible_coxswains))
-    else:
-        all_available = day_available_athletes
+        candidates |= table.has(CAN_COX)
+    candidates &= table.available_on(event_day)
     
     # Remove athletes already in lineup
-    assigned_athletes = set([a for a in current_lineup.get('athletes', []) if a is not None])
-    if current_lineup.get('coxswain'):
-        assigned_athletes.add(current_lineup['coxswain'])
+    candidates[table.rows(current_lineup.get('athletes', []) + [current_lineup.get('coxswain')])] = False
     
-    available_athletes = [a for a in all_available if a not in assigned_athletes]
+    available_athletes = table.select(candidates)
     
     if not available_athletes:
         st.write("No available athletes for this event/day")
@@ -226,18 +350,17 @@ def _render_lineup_management(selected_event, event_name):
             # Rower seat buttons
             for i in range(requirements['num_rowers']):
                 with button_cols[i]:
-                    seat_name = _get_seat_name(i, requirements)
+                    seat_label = seat_name(i, requirements)
                     current_occupant = current_lineup['athletes'][i]
                     
                     # Shorter button text
                     if current_occupant:
-                        button_text = f"{seat_name}*"  # * indicates occupied
+                        button_text = f"{seat_label}*"  # * indicates occupied
                     else:
-                        button_text = seat_name
+                        button_text = seat_label
                     
                     if st.button(button_text, key=f"{athlete.name}_{selected_event}_seat_{i}"):
-                        current_lineup['athletes'][i] = athlete
-                        st.rerun()
+                        _set_seat_by_hand(selected_event, i, athlete)
             
             # Coxswain button
             if requirements['has_cox'] and athlete.can_cox:
@@ -246,14 +369,16 @@ def _render_lineup_management(selected_event, event_name):
                     cox_text = "Cox*" if current_cox else "Cox"
                     
                     if st.button(cox_text, key=f"{athlete.name}_{selected_event}_cox"):
-                        current_lineup['coxswain'] = athlete
-                        st.rerun()
+                        _set_seat_by_hand(selected_event, COX, athlete)
     
     # Clear lineup button
     if st.button("Clear Entire Lineup", key=f"clear_{selected_event}"):
         current_lineup['athletes'] = [None] * requirements['num_rowers']
         current_lineup['coxswain'] = None
-        st.rerun()
+        st.session_state.pins.pop(selected_event, None)
+        record_change('lineups', 'clear', selected_event)
+        record_change('pins', 'clear', selected_event)
+        _finish_lineup_edit()
 
 def _render_seat_assignment_display(selected_event, event_name):
     """Render a thin display of current seat assignments"""
@@ -267,47 +392,67 @@ def _render_seat_assignment_display(selected_event, event_name):
     # Initialize lineup if needed
     if selected_event not in st.session_state.lineups:
         st.session_state.lineups[selected_event] = {'athletes': [None] * requirements['num_rowers'], 'coxswain': None}
+        record_change('lineups', 'create', selected_event)
     
     current_lineup = st.session_state.lineups[selected_event]
     
     # Ensure the athletes list has the right length
     if len(current_lineup.get('athletes', [])) != requirements['num_rowers']:
         current_lineup['athletes'] = [None] * requirements['num_rowers']
+        record_change('lineups', 'clear', selected_event)
     
     # Show race time
     from utils.event_utils import get_event_time
-    event_time = get_event_time(selected_event, st.session_state.event_spacing_minutes)
+    params = get_regatta_params()
+    event_time = get_event_time(selected_event, params.event_spacing_minutes, 'morning', params)
     st.write(f"*{event_day} at {event_time.strftime('%H:%M')}*")
     
+    # Sweep crews show the side each rower takes (none if the crew can't split evenly; see the issues below)
+    sides = None
+    if not requirements['is_sculling']:
+        sides = assign_sides(current_lineup['athletes'], requirements['num_rowers'])
+    
+    # Pinned seats (and a pinned crew) are kept by auto-assignment and the lineup search
+    pins = st.session_state.pins
+    crew_pinned = is_pinned(pins, selected_event, CREW)
+    
     # Show each seat compactly
     for seat_idx in range(requirements['num_rowers']):
-        seat_name = _get_seat_name(seat_idx, requirements)
         current_athlete = current_lineup['athletes'][seat_idx]
         
         if current_athlete:
-            col1, col2 = st.columns([3, 1])
+            col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
-                st.write(f"**{seat_name}:** {current_athlete.name}")
+                label = seat_name(seat_idx, requirements, sides[seat_idx] if sides else None)
+                pin_mark = " 📌" if crew_pinned or is_pinned(pins, selected_event, seat_idx) else ""
+                st.write(f"**{label}:** {current_athlete.name}{pin_mark}")
             with col2:
+                _render_pin_toggle(selected_event, seat_idx, disabled=crew_pinned)
+            with col3:
                 if st.button("Remove", key=f"remove_seat_display_{selected_event}_{seat_idx}"):
-                    current_lineup['athletes'][seat_idx] = None
-                    st.rerun()
+                    _set_seat_by_hand(selected_event, seat_idx, None)
         else:
-            st.write(f"**{seat_name}:** *Empty*")
+            st.write(f"**{seat_name(seat_idx, requirements)}:** *Empty*")
     
     # Show coxswain
     if requirements['has_cox']:
         current_cox = current_lineup.get('coxswain')
         if current_cox:
-            col1, col2 = st.columns([3, 1])
+            col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
-                st.write(f"**Cox:** {current_cox.name}")
+                pin_mark = " 📌" if crew_pinned or is_pinned(pins, selected_event, COX) else ""
+                st.write(f"**Cox:** {current_cox.name}{pin_mark}")
             with col2:
+                _render_pin_toggle(selected_event, COX, disabled=crew_pinned)
+            with col3:
                 if st.button("Remove", key=f"remove_cox_display_{selected_event}"):
-                    current_lineup['coxswain'] = None
-                    st.rerun()
+                    _set_seat_by_hand(selected_event, COX, None)
         else:
             st.write(f"**Cox:** *Empty*")
+            suggested_cox = get_cox_allocator().suggestions.get(selected_event)
+            if suggested_cox and st.button(f"Use {suggested_cox.name}", key=f"suggested_cox_{selected_event}",
+                                           help="Suggested by the regatta-wide coxswain allocation"):
+                _set_seat_by_hand(selected_event, COX, suggested_cox)
     
     # Show more helpful status
     athletes = [a for a in current_lineup.get('athletes', []) if a is not None]
@@ -324,31 +469,59 @@ def _render_seat_assignment_display(selected_event, event_name):
     
     # Show average age if we have athletes
     if athletes:
-        avg_age = sum(a.age for a in athletes) / len(athletes)
+        avg_age = get_lineup_store().crew_stats().at[selected_event, 'avg_age']
         st.write(f"Average age: **{avg_age:.1f}**")
     
-    # Clear all button
+    # Inline validation from the shared issue engine (seat count is shown above)
+    event_issues = get_issue_engine().event_issues(
+        selected_event, ['lineup_validation', 'athlete_conflicts', 'boat_conflicts']
+    )
+    for issue in event_issues:
+        if issue != f"Need {total_seats - filled_seats} more rowers":
+            st.caption(f"⚠️ {issue}")
+    
+    # Crew pin and clear all buttons
     if athletes or current_lineup.get('coxswain'):
-        if st.button("Clear All", key=f"clear_display_{selected_event}"):
-            current_lineup['athletes'] = [None] * requirements['num_rowers']
-            current_lineup['coxswain'] = None
-            st.rerun()
+        col1, col2 = st.columns(2)
+        with col1:
+            crew_label = "Unpin Crew" if crew_pinned else "Pin Crew"
+            if st.button(crew_label, key=f"pin_crew_{selected_event}",
+                         help="Auto-assignment and the lineup search keep a pinned crew as it is"):
+                toggle_pin(pins, selected_event, CREW)
+                record_change('pins', 'toggle', selected_event)
+                rerun_scoped(False)
+        with col2:
+            if st.button("Clear All", key=f"clear_display_{selected_event}"):
+                current_lineup['athletes'] = [None] * requirements['num_rowers']
+                current_lineup['coxswain'] = None
+                pins.pop(selected_event, None)
+                record_change('lineups', 'clear', selected_event)
+                record_change('pins', 'clear', selected_event)
+                _finish_lineup_edit()
 
-def _get_seat_name(seat_idx, requirements):
-    """Get the name for a seat position"""
-    if requirements['is_sculling']:
-        return f"Seat {seat_idx + 1}"
+def _set_seat_by_hand(event_num, seat, athlete):
+    """Put an athlete (None to empty it) in a rower seat, or the cox seat for COX, dropping the seat's pin
+    so automatic assignment does not bring back the athlete it held"""
+    lineup = st.session_state.lineups[event_num]
+    if seat == COX:
+        lineup['coxswain'] = athlete
+        record_change('lineups', 'set_cox', event_num)
     else:
-        if requirements['num_rowers'] == 8:
-            positions = ["Bow", "2", "3", "4", "5", "6", "7", "Stroke"]
-        elif requirements['num_rowers'] == 4:
-            positions = ["Bow", "2", "3", "Stroke"]
-        elif requirements['num_rowers'] == 2:
-            positions = ["Bow", "Stroke"]
-        else:
-            positions = [f"Seat {i+1}" for i in range(requirements['num_rowers'])]
-        
-        return positions[seat_idx] if seat_idx < len(positions) else f"Seat {seat_idx + 1}"
+        lineup['athletes'][seat] = athlete
+        record_change('lineups', 'set_seat', event_num)
+    if is_pinned(st.session_state.pins, event_num, seat):
+        unpin(st.session_state.pins, event_num, seat)
+        record_change('pins', 'unpin', event_num)
+    _finish_lineup_edit()
+
+def _render_pin_toggle(event_num, pin, disabled=False):
+    """Pin or unpin one seat (or the cox) so automatic assignment leaves it alone"""
+    pinned = is_pinned(st.session_state.pins, event_num, pin)
+    if st.button("Unpin" if pinned else "Pin", key=f"pin_{event_num}_{pin}", disabled=disabled,
+                 help="Auto-assignment and the lineup search keep a pinned athlete in this seat"):
+        toggle_pin(st.session_state.pins, event_num, pin)
+        record_change('pins', 'toggle', event_num)
+        rerun_scoped(False)
 
 def _get_available_athletes_for_seat(event_num, seat_idx, requirements, event_day):
     """Get athletes available for a specific seat"""
@@ -2,6 +2,7 @@
 Notes tab UI for free-form note taking
 """
 import streamlit as st
+from models.session_state import rerun_scoped
 
 def render_notes_tab():
     """Render the notes tab for free-form note taking"""
@@ -17,6 +18,29 @@ def render_notes_tab():
     
     st.write("Use this space for free-form notes about your regatta, lineups, strategy, or anything else.")
     
+    _render_notes_editor()
+    
+    # Tips section
+    with st.expander("💡 Notes Tips"):
+        st.markdown("""
+        **Your notes support:**
+        - Plain text formatting
+        - Line breaks and paragraphs
+        - Lists and bullet points
+        - Event planning and strategy notes
+        - Boat assignment rationale
+        - Weather or logistics considerations
+        
+        **Notes are automatically:**
+        - Saved with your session
+        - Included in preset saves
+        - Exported with JSON downloads
+        - Imported when loading presets
+        """)
+
+@st.fragment
+def _render_notes_editor():
+    """Render the notes text area and quick actions, rerunning on their own as notes are typed"""
     # Text area for notes - unique key based on refresh counter
     notes = st.text_area(
         "Notes",
@@ -40,7 +64,9 @@ def render_notes_tab():
     with col1:
         if st.button("Clear Notes"):
             st.session_state.notes = ""
-            st.rerun()
+            # The text area keeps its own value, so give it a fresh key
+            st.session_state.notes_refresh_counter += 1
+            rerun_scoped(app_changed=False)
     
     with col2:
         # Copy to clipboard (uses markdown)
@@ -51,21 +77,3 @@ def render_notes_tab():
         # Word count
         word_count = len(st.session_state.notes.split()) if st.session_state.notes.strip() else 0
         st.metric("Words", word_count)
-    
-    # Tips section
-    with st.expander("💡 Notes Tips"):
-        st.markdown("""
-        **Your notes support:**
-        - Plain text formatting
-        - Line breaks and paragraphs
-        - Lists and bullet points
-        - Event planning and strategy notes
-        - Boat assignment rationale
-        - Weather or logistics considerations
-        
-        **Notes are automatically:**
-        - Saved with your session
-        - Included in preset saves
-        - Exported with JSON downloads
-        - Imported when loading presets
-        """)
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Sidebar performance panel shown when profiling is enabled (STREAMLIT_PROFILE=true)
+"""
+import streamlit as st
+import pandas as pd
+from utils.perf_utils import PROFILE_DIR, PROFILE_LOG
+
+# Number of recent reruns kept for the history chart
+HISTORY_LENGTH = 30
+
+def render_performance_panel(rerun):
+    """Render the timings of the rerun that just finished in the sidebar"""
+    if rerun is None:
+        return
+
+    history = st.session_state.setdefault('perf_history', [])
+    history.append(rerun.as_dict())
+    del history[:-HISTORY_LENGTH]
+
+    with st.sidebar.expander(f"⏱️ Performance ({rerun.total_seconds * 1000:.0f} ms)", expanded=False):
+        st.caption("Section times are inclusive: a tab's time includes the service calls made while rendering it.")
+
+        if rerun.sections:
+            sections_df = pd.DataFrame([
+                {'Section': name, 'Calls': s['calls'], 'ms': round(s['seconds'] * 1000, 1)}
+                for name, s in rerun.sections.items()
+            ]).sort_values('ms', ascending=False)
+            st.dataframe(sections_df, hide_index=True, use_container_width=True)
+
+        if rerun.caches:
+            caches_df = pd.DataFrame([
+                {'Cache': name, 'Hits': c['hits'], 'Misses': c['misses']}
+                for name, c in rerun.caches.items()
+            ])
+            st.dataframe(caches_df, hide_index=True, use_container_width=True)
+
+        if len(history) > 1:
+            st.caption(f"Last {len(history)} reruns (ms)")
+            st.line_chart([round(r['total_seconds'] * 1000, 1) for r in history], height=120)
+
+        if PROFILE_LOG:
+            st.caption(f"Appending to `{PROFILE_LOG}`")
+
+        st.toggle(
+            "🔬 Profile next interaction",
+            key="profile_next_interaction",
+            help=f"Run the next rerun under cProfile and tracemalloc (much slower) and save the results to `{PROFILE_DIR}/`"
+        )
+
+    capture = st.session_state.get('last_profile_capture')
+    if capture is not None:
+        _render_capture(capture)
+
+def _render_capture(capture):
+    """Show the slowest functions and top allocations of the last captured rerun"""
+    with st.sidebar.expander(f"🔬 Last profile ({capture['created_at']})", expanded=True):
+        st.caption(f"{capture['total_seconds']:.2f} s under the profilers · peak traced memory "
+                   f"{capture['peak_kib'] / 1024:.1f} MiB")
+
+        st.markdown("**App functions by cumulative time**")
+        st.dataframe(_functions_df(capture['app_functions']), hide_index=True, use_container_width=True)
+
+        st.markdown("**Slowest functions by own time**")
+        st.dataframe(_functions_df(capture['slowest_functions']), hide_index=True, use_container_width=True)
+
+        st.markdown("**Top allocations still held**")
+        allocations_df = pd.DataFrame(capture['allocations'])
+        if not allocations_df.empty:
+            allocations_df['size_kib'] = allocations_df['size_kib'].round(1)
+            allocations_df.columns = ['Location', 'KiB', 'Blocks']
+        st.dataframe(allocations_df, hide_index=True, use_container_width=True)
+
+        st.caption(f"Saved `{capture['prof_path']}` (open with snakeviz or `python -m pstats`) "
+                   f"and `{capture['allocations_path']}`")
+        if st.button("Clear profile", key="clear_profile_capture"):
+            del st.session_state.last_profile_capture
+            st.rerun()
+
+def _functions_df(rows):
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    df['tottime'] = (df['tottime'] * 1000).round(1)
+    df['cumtime'] = (df['cumtime'] * 1000).round(1)
+    df.columns = ['Function', 'Calls', 'Own ms', 'Cumulative ms']
+    return df
@@ -5,7 +5,11 @@ import streamlit as st
 import pandas as pd
 from models.athlete import Athlete, create_sample_roster
 from models.constants import EVENTS_DATA
-from services.auto_assignment import AutoAssignment
+from services.auto_assignment import AutoAssignment, affected_events, roster_signature
+from services.roster_import import read_roster_file, validate_roster, upsert_athletes
+from services.solver_runner import SolverRunner
+from models.session_state import (record_change, get_regatta_state, apply_regatta_state, get_state_tracker,
+                                  cached_on_revisions, rerun_scoped)
 
 
 def render_roster_tab():
@@ -17,15 +21,20 @@ def render_roster_tab():
     with col1:
         if st.button("Load Sample Roster"):
             st.session_state.athletes = create_sample_roster()
-            # Clear any existing lineups when loading new roster
+            # Clear any existing lineups (and their pins) when loading new roster
             st.session_state.lineups = {}
+            st.session_state.pins = {}
             st.success("Sample roster loaded!")
     
     with col2:
         if st.button("Auto-Assign Preferred"):
             if st.session_state.athletes:
-                auto_assigner = AutoAssignment()
+                state = get_regatta_state()
+                auto_assigner = AutoAssignment(state)
                 result = auto_assigner.assign_all_preferred_events()
+                apply_regatta_state(state)
+                record_change('lineups', 'auto_assign')
+                _set_assignment_baseline()
                 
                 if result["success"]:
                     st.success(f"Made {result['assignments_made']} automatic assignments!")
@@ -42,10 +51,15 @@ def render_roster_tab():
         if st.button("Clear Roster"):
             st.session_state.athletes = []
             st.session_state.lineups = {}  # Clear all lineups since athletes no longer exist
+            st.session_state.pins = {}
             if hasattr(st.session_state, 'selected_events'):
                 st.session_state.selected_events = set()  # Clear selected events
             st.success("Roster cleared! All lineups and event selections have been reset.")
     
+    _render_resolve_changes()
+    _render_roster_import()
+    _render_lineup_search()
+    
     # Add new athlete
     st.subheader("Add New Athlete")
     with st.form("add_athlete"):
@@ -105,6 +119,7 @@ def render_roster_tab():
                     new_athlete = Athlete(name, gender, age, weight, can_port, can_starboard, can_scull, 
                                         can_cox, preferred_list, available_days)
                     st.session_state.athletes.append(new_athlete)
+                    record_change('athletes', 'add', len(st.session_state.athletes) - 1)
                     st.success(f"Added {name} to roster!")
             else:
                 st.error("Please enter a name")
@@ -175,6 +190,7 @@ def render_roster_tab():
                 idx = next(i for i, a in enumerate(st.session_state.athletes) 
                           if f"{a.name} ({a.gender}, {a.age})" == athlete_to_delete)
                 removed = st.session_state.athletes.pop(idx)
+                record_change('athletes', 'remove', idx)
                 st.success(f"Removed {removed.name} from roster!")
                 st.rerun()
     
@@ -247,6 +263,7 @@ def render_roster_tab():
                                                     edit_can_starboard, edit_can_scull, edit_can_cox, 
                                                     edit_preferred_list, edit_available_days)
                             st.session_state.athletes[st.session_state.editing_athlete_idx] = updated_athlete
+                            record_change('athletes', 'update', st.session_state.editing_athlete_idx)
                             st.session_state.editing_athlete_idx = None
                             st.success(f"Updated {edit_name}!")
                             st.rerun()
@@ -256,4 +273,155 @@ def render_roster_tab():
             with col2:
                 if st.form_submit_button("Cancel"):
                     st.session_state.editing_athlete_idx = None
-                    st.rerun()
\ No newline at end of file
+                    st.rerun()
+
+
+def _set_assignment_baseline():
+    """Remember the roster the lineups were assigned for, to find the events a later roster change affects"""
+    st.session_state.assignment_baseline = (get_state_tracker().sequence,
+                                            roster_signature(st.session_state.athletes))
+
+def _render_resolve_changes():
+    """Re-solve just the events affected by roster changes since the last assignment"""
+    if 'resolve_result' in st.session_state:
+        st.success(st.session_state.pop('resolve_result'))
+    baseline = st.session_state.get('assignment_baseline')
+    if baseline is None or not st.session_state.lineups:
+        return
+    events = cached_on_revisions('resolve_events', ('athletes', 'lineups'),
+                                 lambda _: affected_events(baseline[1], get_regatta_state()), baseline[0])
+    if not events:
+        return
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.info(f"Roster changes since the last auto-assignment affect {len(events)} "
+                f"event{'s' if len(events) != 1 else ''}. Re-solving keeps every other lineup and all pins.")
+    with col2:
+        if st.button("Re-solve Changes", key="resolve_changes"):
+            state = get_regatta_state()
+            result = AutoAssignment(state).reassign_events(events)
+            apply_regatta_state(state)
+            for event_num in result["events"]:
+                record_change('lineups', 'resolve', event_num)
+            _set_assignment_baseline()
+            st.session_state.resolve_result = result["message"]
+            st.rerun()
+
+def _render_roster_import():
+    """Import or update many athletes at once from a CSV or Excel file"""
+    with st.expander("📥 Import Roster from CSV / Excel"):
+        st.caption("Columns: Name, Gender (M/F), Age, and optionally Weight, Port, Starboard, Scull, Cox (yes/no), "
+                   "Available Days (e.g. Thu/Fri) and Preferred Events (event numbers). "
+                   "Athletes whose name is already on the roster are updated; everyone else is added.")
+        if 'roster_import_result' in st.session_state:
+            st.success(st.session_state.pop('roster_import_result'))
+        uploaded_file = st.file_uploader("Roster file", type=['csv', 'xlsx', 'xls'], key="roster_import_file")
+        if uploaded_file is None:
+            return
+        
+        try:
+            result = validate_roster(read_roster_file(uploaded_file.getvalue(), uploaded_file.name))
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            st.error(f"Could not read {uploaded_file.name}: {e}")
+            return
+        
+        existing_names = {athlete.name.strip().casefold() for athlete in st.session_state.athletes}
+        updates = int(result.athletes['name'].str.casefold().isin(existing_names).sum()) if len(result.athletes) else 0
+        st.write(f"**{len(result.athletes)}** of {result.total_rows} rows ready to import "
+                 f"({len(result.athletes) - updates} new, {updates} updates)")
+        
+        if len(result.errors):
+            st.warning(f"{result.rejected_rows} rows have errors and will be skipped")
+            st.dataframe(result.errors.rename(columns=str.title), hide_index=True, use_container_width=True)
+        
+        if len(result.athletes) and st.button(f"Import {len(result.athletes)} Athletes", key="roster_import_apply"):
+            import_result = upsert_athletes(st.session_state.athletes, result.athletes, result.given)
+            # One change for the whole import, so roster-derived caches rebuild once
+            record_change('athletes', 'import')
+            # Updated athletes may sit in lineups: their checks depend on the new values
+            updated = {id(athlete) for athlete in import_result["updated_athletes"]}
+            for event_num, lineup in st.session_state.lineups.items():
+                crew = lineup.get('athletes', []) + [lineup.get('coxswain')]
+                if any(id(athlete) in updated for athlete in crew if athlete is not None):
+                    record_change('lineups', 'import', event_num)
+            st.session_state.roster_import_result = import_result["message"]
+            rerun_scoped(True)
+
+def _render_lineup_search():
+    """Improve every lineup with a time-boxed background search, keeping the app responsive"""
+    with st.expander("🔍 Improve Lineups (background search)"):
+        st.caption("Searches for lineups with fewer time conflicts and lineup issues, starting from the current "
+                   "lineups. The best lineups so far can be accepted at any time.")
+        runner = st.session_state.get('lineup_search')
+        
+        if runner is None or not runner.is_running():
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                time_budget = st.slider("Time budget (seconds)", min_value=2, max_value=60, value=10,
+                                        key="lineup_search_budget")
+            with col2:
+                st.write("")
+                if st.button("Start Search", key="lineup_search_start", disabled=not st.session_state.lineups):
+                    runner = SolverRunner(get_regatta_state(), time_budget)
+                    runner.start()
+                    st.session_state.lineup_search = runner
+                    st.session_state.lineup_search_revisions = get_state_tracker().revision('lineups', 'athletes')
+                    st.rerun()
+        
+        if 'lineup_search_result' in st.session_state:
+            st.success(st.session_state.pop('lineup_search_result'))
+        if runner is None:
+            return
+        if runner.is_running():
+            _render_running_search()
+        else:
+            _render_search_status(runner)
+
+@st.fragment(run_every=1.0)
+def _render_running_search():
+    """Poll the running search; once it stops, redraw the tab without polling"""
+    runner = st.session_state.get('lineup_search')
+    if runner is None:
+        return
+    _render_search_status(runner)
+    if not runner.is_running():
+        st.rerun()
+
+def _render_search_status(runner):
+    """Progress of the lineup search, with cancel and accept buttons"""
+    progress = runner.progress()
+    
+    if progress.status == 'running':
+        st.progress(min(progress.elapsed / progress.time_budget, 1.0),
+                    text=f"Searching... {progress.elapsed:.0f}s of {progress.time_budget:.0f}s")
+    elif progress.status == 'failed':
+        st.error(f"Search failed: {progress.message}")
+    else:
+        st.write(f"Search {progress.status} after {progress.elapsed:.1f}s ({progress.iterations:,} moves tried)")
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Objective", progress.objective, delta=progress.objective - progress.initial_objective,
+                delta_color="inverse", help="Weighted count of conflicts, empty seats and lineup issues (lower is better)")
+    col2.metric("Conflicts remaining", progress.conflicts)
+    col3.metric("Improvements", progress.improvements)
+    
+    if st.session_state.get('lineup_search_revisions') != get_state_tracker().revision('lineups', 'athletes'):
+        st.warning("Lineups or the roster changed since the search started; accepting replaces those edits.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if runner.is_running() and st.button("Cancel", key="lineup_search_cancel"):
+            runner.cancel()
+            st.rerun()
+    with col2:
+        if progress.improvements and st.button("Accept Current Best", key="lineup_search_accept", type="primary"):
+            runner.cancel()
+            lineups = runner.best_lineups()
+            st.session_state.lineups = lineups
+            st.session_state.selected_events.update(
+                event_num for event_num, lineup in lineups.items() if any(lineup['athletes']) or lineup['coxswain'])
+            del st.session_state.lineup_search
+            st.session_state.lineup_search_result = (f"Accepted lineups with objective {progress.objective} "
+                                                     f"(was {progress.initial_objective})")
+            st.rerun()
@@ -2,13 +2,14 @@
 Event-related utility functions
 """
 import re
-import streamlit as st
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict
-from models.constants import EVENTS_DATA, ROWFEST_2024_ENTRIES
+from models.constants import AGE_CATEGORIES, EVENTS_DATA, ROWFEST_2024_ENTRIES
 from models.boat import BoatType
+from models.regatta_state import RegattaParams
 
-@st.cache_data
+@lru_cache(maxsize=None)
 def normalize_event_name(event_name: str) -> str:
     """Normalize event name for matching by removing variations"""
     normalized = event_name.lower()
@@ -93,7 +94,7 @@ def events_match(event_name_1: str, event_name_2: str) -> bool:
             features_1['paralympic_class'] == features_2['paralympic_class'] and
             features_1['is_lightweight'] == features_2['is_lightweight'])
 
-@st.cache_data
+@lru_cache(maxsize=None)
 def get_event_entries_2024(event_num: int):
     """Get the number of entries for an event from RowFest 2024 data using name matching only"""
     # Find current event name
@@ -137,67 +138,62 @@ def parse_event_requirements(event_name: str) -> Dict:
         'boat_class': boat_class
     }
 
-@st.cache_data
-def get_event_time(event_num: int, spacing_minutes: int = 4, session: str = 'morning') -> datetime:
-    """Calculate event time based on event number, spacing, and session with race delays"""
-    # Get base time from session state
-    base_date = st.session_state.regatta_start_date
-    
-    # Choose morning or afternoon start time
-    if session == 'afternoon':
-        base_time = st.session_state.afternoon_start_time
-    else:
-        base_time = st.session_state.morning_start_time
-    
-    base_datetime = datetime.combine(base_date, base_time)
-    
-    # Find which day the event is on
-    day_offset = 0
-    
+@lru_cache(maxsize=None)
+def min_required_age(event_name: str):
+    """Youngest average crew age allowed by the event's age categories (None if unrestricted)"""
+    min_age = None
+    for cat_group in re.findall(r'\b([A-K]{1,2}(?:-[A-K]{1,2})?)\b', event_name):
+        # A range like "AA-B" starts at its first category
+        start_cat = cat_group.split('-')[0]
+        if start_cat in AGE_CATEGORIES:
+            cat_min_age = AGE_CATEGORIES[start_cat][0]
+            if min_age is None or cat_min_age < min_age:
+                min_age = cat_min_age
+    return min_age
+
+# Day offsets from the regatta start date
+DAY_OFFSETS = {'Thursday': 0, 'Friday': 1, 'Saturday': 2, 'Sunday': 3}
+
+@lru_cache(maxsize=32)
+def build_timetable(timetable_key: tuple, session: str = 'morning') -> Dict[int, datetime]:
+    """Calculate every event's time for a session in one pass per day"""
+    spacing_minutes, start_date, morning_start, afternoon_start, boats_per_race = timetable_key
+    base_time = afternoon_start if session == 'afternoon' else morning_start
+    base_datetime = datetime.combine(start_date, base_time)
+    
+    times = {}
     for day, events in EVENTS_DATA.items():
-        if any(num == event_num for num, _ in events):
-            if day == 'Friday':
-                day_offset = 1
-            elif day == 'Saturday':
-                day_offset = 2
-            elif day == 'Sunday':
-                day_offset = 3
-            
-            # Calculate cumulative time delay from previous events
-            day_events = [num for num, _ in events]
-            target_position = day_events.index(event_num)
-            
-            cumulative_delay = 0
-            for i in range(target_position):
-                prev_event_num = day_events[i]
-                entries_2024 = get_event_entries_2024(prev_event_num)
-                
-                if entries_2024 is not None and entries_2024 > st.session_state.boats_per_race:
-                    # This event needed multiple races, causing extra delay
-                    races_needed = (entries_2024 + st.session_state.boats_per_race - 1) // st.session_state.boats_per_race
-                    extra_delay = (races_needed - 1) * spacing_minutes
-                    cumulative_delay += extra_delay
-            
-            # Calculate final event time
-            base_time_with_day = base_datetime + timedelta(days=day_offset)
-            position_delay = target_position * spacing_minutes
-            total_delay = position_delay + cumulative_delay
+        base_time_with_day = base_datetime + timedelta(days=DAY_OFFSETS.get(day, 0))
+        cumulative_delay = 0
+        for position, (event_num, _) in enumerate(events):
+            times.setdefault(event_num, base_time_with_day + timedelta(minutes=position * spacing_minutes + cumulative_delay))
             
-            event_time = base_time_with_day + timedelta(minutes=total_delay)
-            return event_time
-    
-    return base_datetime
+            entries_2024 = get_event_entries_2024(event_num)
+            if entries_2024 is not None and entries_2024 > boats_per_race:
+                # This event needed multiple races, delaying every later event
+                races_needed = (entries_2024 + boats_per_race - 1) // boats_per_race
+                cumulative_delay += (races_needed - 1) * spacing_minutes
+    return times
+
+def get_event_time(event_num: int, spacing_minutes: int, session: str, params: RegattaParams) -> datetime:
+    """Calculate event time based on event number, spacing, and session with race delays"""
+    times = build_timetable(params.timetable_key(spacing_minutes), session)
+    if event_num in times:
+        return times[event_num]
+    base_time = params.afternoon_start_time if session == 'afternoon' else params.morning_start_time
+    return datetime.combine(params.regatta_start_date, base_time)
 
-def get_event_time_both_sessions(event_num: int, spacing_minutes: int = 4) -> tuple:
+def get_event_time_both_sessions(event_num: int, spacing_minutes: int, params: RegattaParams) -> tuple:
     """Get both morning and afternoon times for an event"""
-    morning_time = get_event_time(event_num, spacing_minutes, 'morning')
-    afternoon_time = get_event_time(event_num, spacing_minutes, 'afternoon')
+    morning_time = get_event_time(event_num, spacing_minutes, 'morning', params)
+    afternoon_time = get_event_time(event_num, spacing_minutes, 'afternoon', params)
     return morning_time, afternoon_time
 
-def check_time_conflict(event1_num: int, event2_num: int, spacing_minutes: int, min_gap_minutes: int, session: str = 'morning') -> bool:
+def check_time_conflict(event1_num: int, event2_num: int, spacing_minutes: int, min_gap_minutes: int, session: str,
+                        params: RegattaParams) -> bool:
     """Check if two events have a time conflict in the specified session"""
-    time1 = get_event_time(event1_num, spacing_minutes, session)
-    time2 = get_event_time(event2_num, spacing_minutes, session)
+    time1 = get_event_time(event1_num, spacing_minutes, session, params)
+    time2 = get_event_time(event2_num, spacing_minutes, session, params)
     
     return abs((time1 - time2).total_seconds() / 60) < min_gap_minutes
 
@@ -209,10 +205,9 @@ def find_event_details(event_num: int):
                 return name, day
     return None, None
 
-@st.cache_data
-def will_event_have_heat(event_num: int) -> bool:
+def will_event_have_heat(event_num: int, boats_per_race: int) -> bool:
     """Determine if an event will have a heat based on 2024 entries"""
     entries_2024 = get_event_entries_2024(event_num)
     if entries_2024 is None:
         return True  # Default to having heat if we don't have data
-    return entries_2024 > st.session_state.boats_per_race
\ No newline at end of file
+    return entries_2024 > boats_per_race
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Opt-in per-rerun timing for the app
+
+Enable with STREAMLIT_PROFILE=true. Set STREAMLIT_PROFILE_LOG to a file path to also append one
+JSON line per rerun there (useful on the deployed box, where the sidebar panel is not watched).
+When profiling is off, `timed` is a no-op and `profiled` returns the function unchanged.
+
+A single rerun can also be captured under cProfile and tracemalloc (`start_capture`/`stop_capture`);
+the .prof file and an allocations report are written to STREAMLIT_PROFILE_DIR (default ./profiles).
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+PROFILING_ENABLED = os.getenv("STREAMLIT_PROFILE", "false").lower() == "true"
+PROFILE_LOG = os.getenv("STREAMLIT_PROFILE_LOG")
+PROFILE_DIR = os.getenv("STREAMLIT_PROFILE_DIR", "profiles")
+
+# Functions under this directory count as app code in capture summaries
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rows kept in the inline capture summaries
+CAPTURE_TOP_N = 20
+
+# Each Streamlit session runs its script on its own thread, so the current rerun is thread-local
+_local = threading.local()
+
+# lru_cache'd functions whose hit/miss deltas are reported per rerun: name -> function
+_tracked_caches = {}
+
+
+class RerunTimings:
+    """Wall time, call counts and cache hits recorded during one script run"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = datetime.now()
+        self.total_seconds = None
+        self.sections = {}
+        self.caches = {}
+        self._start = time.perf_counter()
+        self._cache_info_start = {name: func.cache_info() for name, func in _tracked_caches.items()}
+
+    def add_time(self, name, seconds):
+        section = self.sections.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        section['calls'] += 1
+        section['seconds'] += seconds
+
+    def add_cache_lookup(self, name, hit):
+        counts = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def finish(self):
+        """Stop the clock and fold in the lru_cache deltas since the rerun started"""
+        self.total_seconds = time.perf_counter() - self._start
+        for name, func in _tracked_caches.items():
+            before = self._cache_info_start.get(name)
+            after = func.cache_info()
+            hits = after.hits - (before.hits if before else 0)
+            misses = after.misses - (before.misses if before else 0)
+            if hits or misses:
+                counts = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+                counts['hits'] += hits
+                counts['misses'] += misses
+
+    def as_dict(self):
+        return {
+            'timestamp': self.started_at.isoformat(timespec='milliseconds'),
+            'label': self.label,
+            'total_seconds': round(self.total_seconds or 0.0, 6),
+            'sections': {name: {'calls': s['calls'], 'seconds': round(s['seconds'], 6)}
+                         for name, s in self.sections.items()},
+            'caches': self.caches
+        }
+
+
+def track_cache(name, func):
+    """Report hits and misses of an lru_cache'd function in every rerun"""
+    _tracked_caches[name] = func
+
+
+def start_rerun(label=None):
+    """Begin recording a rerun on this thread; returns None when profiling is off"""
+    if not PROFILING_ENABLED:
+        return None
+    _local.rerun = RerunTimings(label)
+    return _local.rerun
+
+
+def finish_rerun():
+    """Stop recording, append the rerun to the log if configured, and return it"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun.finish()
+    if PROFILE_LOG:
+        append_to_log(rerun, PROFILE_LOG)
+    return rerun
+
+
+def current_rerun():
+    return getattr(_local, 'rerun', None)
+
+
+def append_to_log(rerun, filepath):
+    """Append one rerun as a JSON line"""
+    try:
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(rerun.as_dict()) + "\n")
+    except OSError as e:
+        print(f"⚠️  Could not write profile log {filepath}: {e}")
+
+
+@contextmanager
+def timed(name):
+    """Time the enclosed block under `name` in the current rerun"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun.add_time(name, time.perf_counter() - start)
+
+
+def profiled(name=None):
+    """Decorator timing every call of a function; leaves it untouched when profiling is off"""
+    def decorate(func):
+        if not PROFILING_ENABLED:
+            return func
+        section = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(section):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_cache_lookup(name, hit):
+    """Count a hit or miss of an app-level cache in the current rerun"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun.add_cache_lookup(name, hit)
+
+
+class ProfileCapture:
+    """cProfile and tracemalloc running over one script execution"""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.started_at = datetime.now()
+        self.profiler = cProfile.Profile()
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        self._start = None
+
+    def start(self):
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self, output_dir=PROFILE_DIR):
+        """Stop both profilers, write the .prof file and allocations report, and return a summary"""
+        self.profiler.disable()
+        total_seconds = time.perf_counter() - self._start
+        snapshot = _without_profiler_traces(tracemalloc.take_snapshot())
+        _, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(output_dir, exist_ok=True)
+        stem = os.path.join(output_dir, f"profile_{self.started_at.strftime('%Y%m%d_%H%M%S')}")
+        prof_path = f"{stem}.prof"
+        allocations_path = f"{stem}_allocations.txt"
+
+        self.profiler.dump_stats(prof_path)
+        stats = pstats.Stats(self.profiler)
+        allocations = _top_allocations(snapshot)
+        with open(allocations_path, 'w') as f:
+            f.write(f"Allocations still held at the end of the rerun ({self.started_at.isoformat()})\n")
+            f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+            for stat in snapshot.statistics('lineno')[:100]:
+                f.write(f"{stat}\n")
+
+        return {
+            'label': self.label,
+            'created_at': self.started_at.isoformat(timespec='seconds'),
+            'total_seconds': total_seconds,
+            'peak_kib': peak / 1024,
+            'prof_path': prof_path,
+            'allocations_path': allocations_path,
+            'app_functions': _top_functions(stats, 'cumtime', app_only=True),
+            'slowest_functions': _top_functions(stats, 'tottime'),
+            'allocations': allocations
+        }
+
+
+def _function_label(key):
+    filename, line, func = key
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, APP_DIR)
+    elif filename != '~':
+        filename = os.path.basename(filename)
+    return f"{func} ({filename}:{line})" if filename != '~' else func
+
+
+def _top_functions(stats, sort_key, app_only=False):
+    """Top functions by total ('tottime') or cumulative ('cumtime') time"""
+    rows = []
+    for key, (_, num_calls, tottime, cumtime, _) in stats.stats.items():
+        if app_only and not key[0].startswith(APP_DIR):
+            continue
+        rows.append({'function': _function_label(key), 'calls': num_calls, 'tottime': tottime, 'cumtime': cumtime})
+    rows.sort(key=lambda row: row[sort_key], reverse=True)
+    return rows[:CAPTURE_TOP_N]
+
+
+def _without_profiler_traces(snapshot):
+    """Drop the profilers' and import machinery's own allocations"""
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")
+    ])
+
+
+def _top_allocations(snapshot):
+    """Top source lines by memory still allocated"""
+    rows = []
+    for stat in snapshot.statistics('lineno')[:CAPTURE_TOP_N]:
+        frame = stat.traceback[0]
+        filename = frame.filename
+        filename = os.path.relpath(filename, APP_DIR) if filename.startswith(APP_DIR) else os.path.basename(filename)
+        rows.append({'location': f"{filename}:{frame.lineno}", 'size_kib': stat.size / 1024, 'count': stat.count})
+    return rows
+
+
+def start_capture(label=None):
+    """Run the rest of this script execution under cProfile and tracemalloc"""
+    leftover = getattr(_local, 'capture', None)
+    if leftover is not None:
+        # A rerun cut short (st.rerun/st.stop) never reached stop_capture
+        leftover.profiler.disable()
+        if leftover._owns_tracemalloc:
+            tracemalloc.stop()
+    _local.capture = ProfileCapture(label)
+    _local.capture.start()
+    return _local.capture
+
+
+def stop_capture(output_dir=PROFILE_DIR):
+    """Finish the capture started on this thread, returning its summary (None if none is running)"""
+    capture = getattr(_local, 'capture', None)
+    if capture is None:
+        return None
+    _local.capture = None
+    return capture.stop(output_dir)
@@ -0,0 +1,41 @@
+"""
+Shared test setup
+"""
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+import pytest
+import streamlit as st
+
+# The app modules import each other from the lit_lineups directory (models, services, utils)
+APP_DIR = Path(__file__).resolve().parent.parent / "lit_lineups"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+PRESET = APP_DIR / "presets" / "RowFest_2025_version_3.json"
+
+
+@pytest.fixture
+def session():
+    """A cleared st.session_state (bare mode keeps it for the whole process)"""
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    yield st.session_state
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+@pytest.fixture
+def preset_path():
+    """Path of the bundled RowFest preset"""
+    return str(PRESET)
+
+
+@pytest.fixture
+def preset_state():
+    """A fresh RegattaState of the bundled RowFest preset"""
+    from services.data_manager import DataManager
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataManager().read_state(str(PRESET))
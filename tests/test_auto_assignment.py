@@ -0,0 +1,77 @@
+"""
+Automatic assignment: sweep side balancing
+"""
+import random
+
+from models.athlete import Athlete
+from models.regatta_state import RegattaState
+from services.auto_assignment import AutoAssignment
+from services.seat_sides import sides_feasible
+
+SIDES = {'both': (True, True), 'port': (True, False), 'starboard': (False, True), 'none': (False, False)}
+
+
+def _rower(name, side, gender='M'):
+    port, starboard = SIDES[side]
+    return Athlete(name, gender, 40, can_port=port, can_starboard=starboard)
+
+
+def _balance(crew, bench, num_rowers, pinned=()):
+    return AutoAssignment(RegattaState())._balance_sides(crew, list(crew) + list(bench), num_rowers, list(pinned))
+
+
+def _splits(athletes, num_rowers):
+    port = sum(a.can_port and not a.can_starboard for a in athletes)
+    starboard = sum(a.can_starboard and not a.can_port for a in athletes)
+    unsided = sum(not (a.can_port or a.can_starboard) for a in athletes)
+    return sides_feasible(port, starboard, unsided, num_rowers)
+
+
+def test_rower_without_a_side_is_replaced():
+    crew = [_rower('A', 'port'), _rower('B', 'starboard'), _rower('C', 'both'), _rower('D', 'none')]
+    spare = _rower('E', 'both')
+    result = _balance(crew, [spare], 4)
+    assert result == crew[:3] + [spare]
+
+
+def test_one_sided_substitute_does_not_overfill_the_other_side():
+    pinned = [_rower('P1', 'starboard'), _rower('P2', 'starboard')]
+    crew = [_rower('A', 'port'), _rower('B', 'none')]
+    same_gender_starboard = _rower('S', 'starboard')
+    other_gender_port = _rower('T', 'port', gender='F')
+    result = _balance(crew, [same_gender_starboard, other_gender_port], 4, pinned)
+    assert result == [crew[0], other_gender_port]
+    assert _splits(pinned + result, 4)
+
+
+def test_crew_is_unchanged_when_no_swap_helps():
+    crew = [_rower('A', 'port'), _rower('B', 'port'), _rower('C', 'port'), _rower('D', 'both')]
+    result = _balance(crew, [_rower('E', 'port')], 4)
+    assert result == crew
+
+
+def test_pinned_rowers_are_never_seated_twice():
+    pinned = [_rower('P', 'starboard')]
+    crew = [_rower('A', 'port'), _rower('B', 'port'), _rower('C', 'port')]
+    # The pinned rower is also among the event's candidates
+    result = AutoAssignment(RegattaState())._balance_sides(crew, crew + pinned + [_rower('E', 'both')], 4, pinned)
+    assert pinned[0] not in result
+    assert _splits(pinned + result, 4)
+
+
+def test_random_crews_keep_their_members_consistent():
+    rng = random.Random(0)
+    for trial in range(500):
+        num_rowers = rng.choice([2, 4, 8])
+        people = [_rower(f"{trial}-{i}", rng.choice(list(SIDES)), rng.choice('MF')) for i in range(num_rowers + 6)]
+        num_pinned = rng.randint(0, num_rowers // 2)
+        pinned, crew, bench = people[:num_pinned], people[num_pinned:num_rowers], people[num_rowers:]
+        result = _balance(crew, bench + pinned, num_rowers, pinned)
+
+        assert len(result) == len(crew) and len(set(map(id, result))) == len(result)
+        assert all(a in crew or a in bench for a in result)
+        assert not any(a in pinned for a in result)
+        # Enough two-sided spares always make the crew splittable (pinned rowers permitting)
+        spares = sum(a.can_port and a.can_starboard for a in bench)
+        if spares >= len(crew) and _splits(pinned, num_rowers):
+            assert _splits(pinned + result, num_rowers)
@@ -0,0 +1,53 @@
+"""
+Command-line runner: validate exit codes
+"""
+import pytest
+
+import cli
+from models.regatta_state import RegattaState
+from services.data_manager import DataManager
+
+
+@pytest.fixture
+def clean_preset(tmp_path, preset_state):
+    """The preset's roster and boats with no lineups, so nothing to report"""
+    path = tmp_path / "clean.json"
+    DataManager().write_state(RegattaState(athletes=preset_state.athletes, boats=preset_state.boats), path,
+                              "Clean", "No lineups")
+    return str(path)
+
+
+@pytest.fixture
+def broken_preset(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text("{not json")
+    return str(path)
+
+
+def test_lineups_with_issues(preset_path, capsys):
+    assert cli.main(['validate', preset_path]) == cli.EXIT_ISSUES
+    out = capsys.readouterr().out
+    assert out.startswith(f"{preset_path}: 28 lineups, ") and "  Event " in out
+
+
+def test_no_issues(clean_preset, capsys):
+    assert cli.main(['validate', clean_preset]) == cli.EXIT_OK
+    assert capsys.readouterr().out.strip() == f"{clean_preset}: 0 lineups, 0 with issues"
+
+
+@pytest.mark.parametrize("path", ["missing.json", None])
+def test_unreadable_presets(tmp_path, broken_preset, path, capsys):
+    preset = str(tmp_path / path) if path else broken_preset
+    assert cli.main(['validate', preset]) == cli.EXIT_ERROR
+    captured = capsys.readouterr()
+    assert captured.out == "" and captured.err.startswith(f"{preset}: error: ")
+
+
+def test_worst_preset_sets_the_exit_code(preset_path, clean_preset, broken_preset):
+    assert cli.main(['validate', clean_preset, clean_preset]) == cli.EXIT_OK
+    assert cli.main(['validate', clean_preset, preset_path]) == cli.EXIT_ISSUES
+    assert cli.main(['validate', preset_path, broken_preset, clean_preset]) == cli.EXIT_ERROR
+
+
+def test_jobs_give_the_same_exit_code(preset_path, clean_preset):
+    assert cli.main(['validate', clean_preset, preset_path, '--jobs', '2']) == cli.EXIT_ISSUES
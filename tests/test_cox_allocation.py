@@ -0,0 +1,109 @@
+"""
+Coxswain allocation: no cox is double-booked
+"""
+import random
+
+import pytest
+
+from services.cox_allocation import CoxAllocator
+from services.regatta_generator import generate_regatta
+from utils.event_utils import find_event_details, get_event_time, parse_event_requirements
+
+
+def _open_cox_seats(state, rng=None, share=1.0):
+    """Clear the cox of (a random share of) the coxed lineups"""
+    for lineup in state.lineups.values():
+        if lineup.get('coxswain') is not None and (rng is None or rng.random() < share):
+            lineup['coxswain'] = None
+
+
+def _minutes(state, event_num):
+    params = state.params
+    return get_event_time(event_num, params.event_spacing_minutes, 'morning', params).timestamp() / 60
+
+
+def _assert_no_double_booking(state, allocator):
+    """Every suggestion is a free, eligible cox who coxes nothing else that clashes with it.
+
+    Coxes already set in the lineups may clash among themselves (the
+    generator does not check); the allocator keeps them as they are.
+    """
+    min_gap = state.params.min_gap_minutes
+    on_roster = {id(a) for a in state.athletes}
+    open_coxed = set()
+    for event_num, lineup in state.lineups.items():
+        name, _ = find_event_details(event_num)
+        if name and parse_event_requirements(name)['has_cox'] and any(lineup.get('athletes', [])) \
+                and lineup.get('coxswain') is None:
+            open_coxed.add(event_num)
+    assert set(allocator.suggestions) | set(allocator.unfilled) == open_coxed
+    assert not set(allocator.suggestions) & set(allocator.unfilled)
+
+    coxing = {}
+    for event_num, lineup in state.lineups.items():
+        if lineup.get('coxswain') is not None:
+            coxing.setdefault(id(lineup['coxswain']), []).append((event_num, False))
+    for event_num, cox in allocator.suggestions.items():
+        _, day = find_event_details(event_num)
+        assert cox.can_cox and id(cox) in on_roster and day in cox.available_days
+        coxing.setdefault(id(cox), []).append((event_num, True))
+
+        rowed = [e for e, lineup in state.lineups.items() if cox in lineup.get('athletes', [])]
+        assert event_num not in rowed
+        assert all(abs(_minutes(state, e) - _minutes(state, event_num)) >= min_gap for e in rowed)
+
+    for events in coxing.values():
+        for i, (event_num, suggested) in enumerate(events):
+            for other, other_suggested in events[i + 1:]:
+                if suggested or other_suggested:
+                    assert abs(_minutes(state, event_num) - _minutes(state, other)) >= min_gap
+
+
+def test_preset_allocation(preset_state):
+    _open_cox_seats(preset_state)
+    allocator = CoxAllocator()
+    allocator.refresh(preset_state)
+    assert allocator.suggestions
+    _assert_no_double_booking(preset_state, allocator)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_synthetic_allocation_keeps_set_coxswains(seed):
+    state = generate_regatta(300, seed=seed, assign_boats=False)
+    _open_cox_seats(state, random.Random(seed), share=0.7)
+    allocator = CoxAllocator()
+    allocator.refresh(state)
+    _assert_no_double_booking(state, allocator)
+
+
+def test_incremental_refresh_after_edits():
+    rng = random.Random(7)
+    state = generate_regatta(300, seed=7, assign_boats=False)
+    _open_cox_seats(state)
+    allocator = CoxAllocator()
+    allocator.refresh(state)
+
+    for _ in range(10):
+        # Seat a suggested cox as a rower elsewhere, or set a cox by hand, then re-solve just that event
+        event_num = rng.choice(sorted(allocator.suggestions))
+        cox = allocator.suggestions[event_num]
+        other = rng.choice(sorted(state.lineups))
+        athletes = state.lineups[other]['athletes']
+        if rng.random() < 0.5 and athletes and cox not in athletes and state.lineups[other].get('coxswain') is not cox:
+            athletes[rng.randrange(len(athletes))] = cox
+            changed = {other}
+        else:
+            allocator.apply(state, {event_num})
+            changed = {event_num}
+        allocator.refresh(state, changed)
+        _assert_no_double_booking(state, allocator)
+
+
+def test_applied_suggestions_are_kept():
+    state = generate_regatta(150, seed=3, assign_boats=False)
+    _open_cox_seats(state)
+    allocator = CoxAllocator()
+    suggestions = dict(allocator.refresh(state))
+    assert allocator.apply(state) == len(suggestions)
+    assert all(state.lineups[e]['coxswain'] is cox for e, cox in suggestions.items())
+    assert CoxAllocator().refresh(state) == {}
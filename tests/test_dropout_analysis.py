@@ -0,0 +1,96 @@
+"""
+Dropout analysis totals against re-validating the regatta without the athlete
+"""
+import random
+
+import pandas as pd
+import pytest
+
+from services.dropout_analysis import DropoutAnalysis, analyze_dropouts
+from services.lineup_validator import LineupValidator
+from services.regatta_generator import generate_regatta
+
+
+def _total_issues(state):
+    return int(LineupValidator().validate_all(state)['messages'].map(len).sum())
+
+
+def _without(state, athlete):
+    """Take an athlete out of every lineup; returns the lineups to restore"""
+    saved = {e: (list(lineup['athletes']), lineup.get('coxswain')) for e, lineup in state.lineups.items()}
+    for lineup in state.lineups.values():
+        lineup['athletes'] = [None if a is athlete else a for a in lineup['athletes']]
+        if lineup.get('coxswain') is athlete:
+            lineup['coxswain'] = None
+    return saved
+
+
+def _restore(state, saved):
+    for e, (athletes, coxswain) in saved.items():
+        state.lineups[e]['athletes'], state.lineups[e]['coxswain'] = athletes, coxswain
+
+
+def _check_dropouts(state, sample):
+    result = analyze_dropouts(state)
+    impact, summary = result['impact'], result['summary']
+    assert result['total_issues'] == _total_issues(state)
+    by_name = {a.name: a for a in state.athletes}
+
+    names = list(summary['athlete'])
+    random.Random(0).shuffle(names)
+    for name in names[:sample]:
+        athlete = by_name[name]
+        saved = _without(state, athlete)
+        expected = summary.loc[summary['athlete'] == name, 'issues_after'].iloc[0]
+        assert _total_issues(state) == expected, name
+
+        for row in impact[impact['athlete'] == name].itertuples():
+            if not row.substitutes:
+                assert pd.isna(row.issues_with_substitute)
+                continue
+            lineup = state.lineups[row.event_num]
+            substitute = by_name[row.substitutes[0]]
+            before = (list(lineup['athletes']), lineup['coxswain'])
+            if row.role == 'Cox':
+                lineup['coxswain'] = substitute
+            else:
+                lineup['athletes'][next(i for i, a in enumerate(saved[row.event_num][0]) if a is athlete)] = substitute
+            results = LineupValidator().validate_all(state)
+            assert len(results.at[row.event_num, 'messages']) == row.issues_with_substitute, (name, row.event_num)
+            assert not any(substitute.name in text for text in results.at[row.event_num, 'conflicts'])
+            lineup['athletes'], lineup['coxswain'] = before
+        _restore(state, saved)
+
+
+def test_preset_dropouts(preset_state):
+    _check_dropouts(preset_state, sample=30)
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_synthetic_dropouts(seed):
+    _check_dropouts(generate_regatta(200, seed=seed), sample=15)
+
+
+def test_seat_candidates_match_the_listed_substitutes(preset_state):
+    analysis = DropoutAnalysis(preset_state)
+    impact = analyze_dropouts(preset_state)['impact']
+    by_name = {a.name: a for a in preset_state.athletes}
+    checked = 0
+    for row in impact.itertuples():
+        lineup = preset_state.lineups[row.event_num]
+        athlete = by_name[row.athlete]
+        seat = -1 if row.role == 'Cox' else next(i for i, a in enumerate(lineup['athletes']) if a is athlete)
+        candidates = analysis.seat_candidates(row.event_num, seat)
+
+        assert row.athlete not in set(candidates['athlete'])
+        feasible = candidates[candidates['feasible']]
+        assert (feasible['problems'] == "").all()
+        assert (candidates.loc[~candidates['feasible'], 'problems'] != "").all()
+        assert list(feasible['athlete'][:len(row.substitutes)]) == list(row.substitutes)
+        checked += 1
+    assert checked
+
+
+def test_seat_candidates_for_unknown_events(preset_state):
+    analysis = DropoutAnalysis(preset_state)
+    assert analysis.seat_candidates(99999, 0).empty
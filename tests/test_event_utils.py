@@ -0,0 +1,24 @@
+"""
+Event timetable helpers take the regatta parameters explicitly
+"""
+from datetime import time
+
+import pytest
+
+from models.regatta_state import RegattaParams
+from utils.event_utils import get_event_time, get_event_time_both_sessions, will_event_have_heat
+
+
+def test_event_times_follow_the_given_params():
+    early, late = RegattaParams(), RegattaParams(morning_start_time=time(9, 30))
+    assert get_event_time(153, early.event_spacing_minutes, 'morning', early).time() == early.morning_start_time
+    assert get_event_time(153, late.event_spacing_minutes, 'morning', late).time() == time(9, 30)
+    morning, afternoon = get_event_time_both_sessions(153, early.event_spacing_minutes, early)
+    assert (morning.time(), afternoon.time()) == (early.morning_start_time, early.afternoon_start_time)
+
+
+def test_params_are_required():
+    with pytest.raises(TypeError):
+        get_event_time(153, 4)
+    with pytest.raises(TypeError):
+        will_event_have_heat(153)
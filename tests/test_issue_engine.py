@@ -0,0 +1,31 @@
+"""
+Issue engine refreshes against the session's change journal
+"""
+from models.session_state import apply_regatta_state, get_regatta_state, get_state_tracker, record_change
+from services.issue_engine import IssueEngine, get_issue_engine
+
+
+def _fresh_issues(category):
+    engine = IssueEngine()
+    engine.refresh_state(get_regatta_state())
+    return engine.issues(category)
+
+
+def test_athlete_edit_in_place_refreshes_weight_issues(session, preset_state):
+    state = preset_state
+    apply_regatta_state(state)
+    get_state_tracker()
+    get_issue_engine()
+
+    # A seated rower in a lineup with a boat, edited in place as the roster tab does
+    event_num = next(e for e, boat in state.boat_assignments.items()
+                     if boat is not None and any(state.lineups.get(e, {}).get('athletes', [])))
+    athlete = next(a for a in state.lineups[event_num]['athletes'] if a is not None)
+    before = list(get_issue_engine().issues('weight_issues'))
+    athlete.weight = 400
+    record_change('athletes', 'edit')
+
+    after = get_issue_engine().issues('weight_issues')
+    assert after != before
+    assert after == _fresh_issues('weight_issues')
+    assert any(f"Event {event_num} " in message for message in after)
@@ -0,0 +1,98 @@
+"""
+Itinerary export: the CSV and iCalendar files in the archive
+"""
+import io
+import re
+import zipfile
+
+import pandas as pd
+
+from services.itinerary import ItineraryIndex
+from services.itinerary_export import (ICS_LINE_OCTETS, ITINERARY_EXPORT_COLUMNS, _file_stem, export_itineraries,
+                                       itinerary_export)
+from services.regatta_generator import generate_regatta
+
+
+def _archive(state, batch_size=25):
+    buffer = io.BytesIO()
+    exported = export_itineraries(state, buffer, batch_size)
+    archive = zipfile.ZipFile(buffer)
+    return exported, {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+
+
+def _itineraries(state):
+    index = ItineraryIndex()
+    index.refresh(state.lineups, state.boat_assignments, state.params)
+    return {athlete.name: index.itinerary(athlete) for athlete in state.athletes}
+
+
+def _unfold(ics):
+    """Content lines of a calendar, checking the folding and line endings on the way"""
+    assert ics.endswith("\r\n")
+    physical = ics[:-2].split("\r\n")
+    assert all(len(line.encode('utf-8')) <= ICS_LINE_OCTETS for line in physical)
+    assert "\n" not in "".join(physical)
+    return "\r\n".join(physical).replace("\r\n ", "").split("\r\n")
+
+
+def _vevents(lines):
+    """Property name -> value of each VEVENT block"""
+    events, inside = [], False
+    for line in lines:
+        if line in ("BEGIN:VEVENT", "END:VEVENT"):
+            inside = line == "BEGIN:VEVENT"
+            if inside:
+                events.append({})
+        elif inside:
+            name, value = line.split(":", 1)
+            events[-1][name] = value
+    return events
+
+
+def _unescape(text):
+    return re.sub(r'\\([\\;,nN])', lambda m: "\n" if m.group(1) in 'nN' else m.group(1), text)
+
+
+def test_csv_and_ics_per_athlete_with_races(preset_state):
+    exported, files = _archive(preset_state)
+    itineraries = {name: it for name, it in _itineraries(preset_state).items() if not it.empty}
+    assert exported == len(itineraries)
+    assert len(files) == 2 * exported
+
+    for name, itinerary in itineraries.items():
+        stem = re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('._')
+        text = files[f"{stem}.csv"]
+        assert text == itinerary_export(itinerary).to_csv(index=False)
+        frame = pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+        assert list(frame.columns) == ITINERARY_EXPORT_COLUMNS
+        assert frame['Event'].astype(int).tolist() == itinerary['event_num'].tolist()
+
+        lines = _unfold(files[f"{stem}.ics"])
+        assert lines[:2] == ["BEGIN:VCALENDAR", "VERSION:2.0"] and lines[-1] == "END:VCALENDAR"
+        assert _unescape(lines[4].split(":", 1)[1]) == f"{name} - Regatta schedule"
+        events = _vevents(lines)
+        assert len(events) == len(itinerary)
+        assert len({event['UID'] for event in events}) == len(events)
+        for event, row in zip(events, itinerary.itertuples()):
+            assert event['DTSTART'] == row.meet.strftime("%Y%m%dT%H%M%S")
+            assert event['DTEND'] == row.land.strftime("%Y%m%dT%H%M%S")
+            assert _unescape(event['SUMMARY']) == f"{row.event_num}: {row.event_name} ({row.session_name})"
+            description = _unescape(event['DESCRIPTION']).split("\n")
+            assert description[:3] == [f"Role: {row.role}", f"Boat: {row.boat or 'Not assigned'}",
+                                       f"Crew: {row.crew}"]
+
+
+def test_batches_do_not_change_the_files():
+    state = generate_regatta(120, seed=4)
+
+    def contents(batch_size):
+        exported, files = _archive(state, batch_size)
+        return exported, {name: re.sub(r"DTSTAMP:\d{8}T\d{6}Z", "", text) for name, text in files.items()}
+
+    assert contents(7) == contents(25)
+
+
+def test_file_stems_are_safe_and_unique():
+    used = set()
+    stems = [_file_stem(name, used) for name in ["Ann O'Neil", "ann o'neil", "Ann O/Neil", "...", "Zoë"]]
+    assert stems == ["Ann_O_Neil", "ann_o_neil_2", "Ann_O_Neil_3", "athlete", "Zo"]
@@ -0,0 +1,68 @@
+"""
+Lineup search: incremental scoring and pinned seats
+"""
+from dataclasses import replace
+
+from models.pins import CREW, pinned_seats
+from services.lineup_search import PENALTY_WEIGHTS, LineupSearch
+
+
+def _rescored(search, state):
+    """The objective of the search's current lineups, scored from scratch"""
+    fresh = LineupSearch(replace(state, lineups=search.snapshot()))
+    full = sum(fresh._crew_penalty(event_num) for event_num in fresh._requirements) + \
+        PENALTY_WEIGHTS['conflicts'] * fresh.conflicts()
+    assert fresh.objective == full
+    return full
+
+
+def test_incremental_objective_matches_a_full_rescore(preset_state):
+    search = LineupSearch(preset_state, seed=1)
+    assert search.objective == _rescored(search, preset_state)
+    kept = 0
+    for i in range(3000):
+        kept += search.step(2.0 * (1 - i / 3000))
+        if i % 250 == 0:
+            assert search.objective == _rescored(search, preset_state)
+    assert kept > 0
+    assert search.objective == _rescored(search, preset_state)
+    assert search.fill_open_seats() >= 0
+    assert search.objective == _rescored(search, preset_state)
+
+
+def test_greedy_steps_never_worsen_the_objective(preset_state):
+    search = LineupSearch(preset_state, seed=2)
+    objective = search.objective
+    for _ in range(1000):
+        search.step(0)
+        assert search.objective <= objective
+        objective = search.objective
+
+
+def test_pinned_seats_never_change(preset_state):
+    lineups = preset_state.lineups
+    seated = [(e, seat) for e, lineup in lineups.items() for seat, a in enumerate(lineup['athletes']) if a is not None]
+    crew_event = seated[0][0]
+    preset_state.pins = {crew_event: {CREW}}
+    for event_num, seat in seated[1::3]:
+        preset_state.pins.setdefault(event_num, set()).add(seat)
+    held = {(e, seat): lineups[e]['athletes'][seat]
+            for e in preset_state.pins for seat in pinned_seats(preset_state.pins, e, lineups[e])}
+
+    search = LineupSearch(preset_state, seed=3)
+    for i in range(3000):
+        search.step(2.0 * (1 - i / 3000))
+    search.fill_open_seats()
+    snapshot = search.snapshot()
+    assert all(snapshot[e]['athletes'][seat] is athlete for (e, seat), athlete in held.items())
+
+
+def test_events_limit_the_moves(preset_state):
+    moving = next(iter(preset_state.lineups))
+    search = LineupSearch(preset_state, seed=4, events={moving})
+    for _ in range(2000):
+        search.step(4.0)
+    snapshot = search.snapshot()
+    for event_num, lineup in preset_state.lineups.items():
+        if event_num != moving:
+            assert snapshot[event_num]['athletes'][:len(lineup['athletes'])] == lineup['athletes']
@@ -0,0 +1,92 @@
+"""
+Batch lineup validation against a lineup-at-a-time reference
+"""
+import random
+from dataclasses import replace
+
+from services.lineup_validator import LineupValidator
+from utils.event_utils import check_time_conflict, find_event_details, min_required_age, parse_event_requirements
+
+
+def _crew(lineup):
+    return [a for a in lineup['athletes'] if a is not None] + \
+        ([lineup['coxswain']] if lineup.get('coxswain') is not None else [])
+
+
+def _reference_messages(event_num, lineups, params):
+    """One lineup's issues, checked on its own as the per-lineup validator did"""
+    lineup = lineups[event_num]
+    event_name, _ = find_event_details(event_num)
+    requirements = parse_event_requirements(event_name)
+    rowers = [a for a in lineup['athletes'] if a is not None]
+    messages = []
+    if len(rowers) < requirements['num_rowers']:
+        messages.append(f"Need {requirements['num_rowers'] - len(rowers)} more rowers")
+    if requirements['has_cox'] and lineup.get('coxswain') is None:
+        messages.append("Need a coxswain")
+    if requirements['gender_req'] == 'Mixed' and rowers:
+        men = sum(a.gender == 'M' for a in rowers)
+        women = sum(a.gender == 'F' for a in rowers)
+        if men != women:
+            messages.append(f"Mixed event needs equal men and women (currently {men}M, {women}F)")
+    if not requirements['is_sculling'] and rowers:
+        half = requirements['num_rowers'] // 2
+        if sum(a.can_starboard and not a.can_port for a in rowers) > half:
+            messages.append("Not enough port-side rowers available")
+        if sum(a.can_port and not a.can_starboard for a in rowers) > half:
+            messages.append("Not enough starboard-side rowers available")
+        unsided = sum(not (a.can_port or a.can_starboard) for a in rowers)
+        if unsided:
+            messages.append(f"{unsided} rower{'s' if unsided != 1 else ''} can row neither port nor starboard")
+    min_age = min_required_age(event_name)
+    if rowers and min_age is not None:
+        avg_age = sum(a.age for a in rowers) / len(rowers)
+        if avg_age < min_age:
+            messages.append(f"Average age {avg_age:.1f} is below minimum {min_age} for this category")
+    for athlete in _crew(lineup):
+        clashing = [f"Event {other}: {find_event_details(other)[0]}" for other, other_lineup in lineups.items()
+                    if other != event_num and find_event_details(other)[0] and athlete in _crew(other_lineup)
+                    and check_time_conflict(event_num, other, params.event_spacing_minutes, params.min_gap_minutes,
+                                            'morning', params)]
+        if clashing:
+            messages.append(f"{athlete.name} has time conflicts with: {', '.join(clashing)}")
+    return messages
+
+
+def _check(state):
+    results = LineupValidator().validate_all(state)
+    expected = {event_num: _reference_messages(event_num, state.lineups, state.params)
+                for event_num, lineup in state.lineups.items() if _crew(lineup) and find_event_details(event_num)[0]}
+    assert sorted(results.index) == sorted(expected)
+    for event_num, messages in expected.items():
+        assert results.at[event_num, 'messages'] == messages, event_num
+
+
+def test_preset_lineups_match_the_reference(preset_state):
+    _check(preset_state)
+
+
+def test_random_lineups_match_the_reference(preset_state):
+    rng = random.Random(0)
+    athletes = preset_state.athletes
+    for trial in range(30):
+        lineups = {}
+        for event_num in preset_state.lineups:
+            requirements = parse_event_requirements(find_event_details(event_num)[0])
+            seats = [None] * requirements['num_rowers']
+            for seat, athlete in zip(rng.sample(range(len(seats)), rng.randint(0, len(seats))),
+                                     rng.sample(athletes, len(athletes))):
+                seats[seat] = athlete
+            cox = rng.choice(athletes) if requirements['has_cox'] and rng.random() < 0.7 else None
+            lineups[event_num] = {'athletes': seats, 'coxswain': cox}
+        gap = rng.choice([15, 30, 60])
+        _check(replace(preset_state, lineups=lineups, params=replace(preset_state.params, min_gap_minutes=gap)))
+
+
+def test_events_limit_the_rows_but_not_the_conflicts(preset_state):
+    full = LineupValidator().validate_all(preset_state)
+    some = set(list(full.index)[::2])
+    partial = LineupValidator().validate_all(preset_state, some)
+    assert set(partial.index) == some
+    for event_num in some:
+        assert partial.at[event_num, 'messages'] == full.at[event_num, 'messages']
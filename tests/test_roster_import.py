@@ -0,0 +1,75 @@
+"""
+Roster import: row-level validation and upserts into an existing roster
+"""
+from models.athlete import Athlete
+from services.roster_import import read_roster_file, upsert_athletes, validate_roster
+
+
+def _import(csv_text):
+    return validate_roster(read_roster_file(csv_text.encode(), "roster.csv"))
+
+
+def _existing():
+    return Athlete("Ann Lee", "F", 45, weight=130, can_port=True, can_starboard=False, can_scull=True, can_cox=True,
+                   preferred_events=[153], available_days=['Thursday'])
+
+
+def test_missing_required_column_rejects_file():
+    result = _import("Name,Age\nAnn Lee,45\n")
+    assert len(result.athletes) == 0
+    assert result.errors['message'].tolist() == ["Missing required column 'gender'"]
+
+
+def test_invalid_cells_reject_their_rows():
+    result = _import("Name,Gender,Age,Weight,Cox,Available Days,Preferred Events\n"
+                     "Ann Lee,F,45,130,yes,Thu,153\n"
+                     "Bob Ray,Q,50,,,,\n"
+                     "Cy Doe,M,12,170,,,\n"
+                     "Di Fox,F,40,abc,maybe,Mon,99999\n"
+                     "ann lee,F,46,,,,\n")
+    assert result.total_rows == 5
+    assert result.athletes['name'].tolist() == ["Ann Lee"]
+    assert result.rejected_rows == 4
+    errors = {(row, column): message for row, column, message
+              in result.errors[['row', 'column', 'message']].itertuples(index=False)}
+    assert errors[(3, 'Gender')] == "Gender must be M or F"
+    assert errors[(4, 'Age')] == "Age must be between 18 and 100"
+    assert errors[(5, 'Weight')] == "Weight must be a whole number"
+    assert errors[(5, 'Cox')].startswith("Expected yes/no")
+    assert errors[(5, 'Preferred Events')] == "Unknown event number(s): 99999"
+    assert (5, 'Available Days') in errors
+    assert errors[(6, 'Name')] == "Duplicate of row 2"
+
+
+def test_new_athletes_take_form_defaults():
+    roster = []
+    result = _import("Name,Gender,Age\nBob Ray,M,50\n")
+    outcome = upsert_athletes(roster, result.athletes, result.given)
+    assert (outcome['added'], outcome['updated']) == (1, 0)
+    bob = roster[0]
+    assert (bob.weight, bob.can_port, bob.can_starboard, bob.can_scull, bob.can_cox) == (160, True, True, True, False)
+    assert bob.preferred_events == [] and len(bob.available_days) == 4
+
+
+def test_update_keeps_fields_missing_from_file():
+    ann = _existing()
+    roster = [ann]
+    result = _import("name,gender,age\nann lee,F,46\n")
+    outcome = upsert_athletes(roster, result.athletes, result.given)
+    assert (outcome['added'], outcome['updated']) == (0, 1)
+    assert outcome['updated_athletes'] == [ann] and roster == [ann]
+    assert ann.age == 46
+    assert (ann.weight, ann.can_starboard, ann.can_cox) == (130, False, True)
+    assert ann.preferred_events == [153]
+    assert ann.available_days == ['Thursday']
+
+
+def test_update_ignores_blank_cells():
+    ann = _existing()
+    result = _import("Name,Gender,Age,Weight,Starboard,Cox,Available Days,Preferred Events\n"
+                     "Ann Lee,F,45,,,no,,\n")
+    upsert_athletes([ann], result.athletes, result.given)
+    assert ann.weight == 130
+    assert ann.can_starboard is False
+    assert ann.can_cox is False
+    assert ann.preferred_events == [153] and ann.available_days == ['Thursday']
@@ -0,0 +1,94 @@
+"""
+Seat order optimizers against brute force over every order
+"""
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from models.athlete import Athlete
+from services.seat_order import SEATING_OBJECTIVES, adjacent_pairs, optimize_seat_order
+from services.seat_sides import PORT, rigged_side
+
+KINDS = {'both': (True, True), 'port': (True, False), 'starboard': (False, True)}
+
+
+def _crew(rng, n, empty_seats=0):
+    athletes = []
+    for i in range(n):
+        port, starboard = KINDS[rng.choice(['both', 'both', 'port', 'starboard'])]
+        athletes.append(Athlete(f"R{i}", 'M', 40, weight=rng.randint(120, 220), can_port=port,
+                                can_starboard=starboard))
+    for seat in rng.sample(range(n), empty_seats):
+        athletes[seat] = None
+    return athletes
+
+
+def _cost(order, original, sweep, objective, pair_counts):
+    """(objective value, rowers moved) of a seat order, or None if a rower sits on a side they can't row"""
+    n = len(order)
+    if sweep and any(a is not None and not (a.can_port if rigged_side(s) == PORT else a.can_starboard)
+                     for s, a in enumerate(order)):
+        return None
+    weights = [a.weight if a is not None else 0 for a in order]
+    if objective == 'balance':
+        primary = abs(sum(w * (2 * s - (n - 1)) for s, w in enumerate(weights)))
+    elif objective == 'engine_room':
+        primary = sum(w * abs(s - (n - 1) / 2) for s, w in enumerate(weights))
+    else:
+        primary = -sum(pair_counts.get(pair, 0) * count for pair, count in adjacent_pairs(order).items())
+    moved = sum(1 for s, a in enumerate(order) if a is not None and original[s] is not a)
+    return round(primary, 6), moved
+
+
+def _brute_force_best(athletes, sweep, objective, pair_counts):
+    costs = [_cost(list(order), athletes, sweep, objective, pair_counts)
+             for order in itertools.permutations(athletes)]
+    costs = [cost for cost in costs if cost is not None]
+    return min(costs) if costs else None
+
+
+def _pair_counts(rng, athletes):
+    rowers = [a for a in athletes if a is not None]
+    return Counter({frozenset((id(a), id(b))): rng.randint(0, 3) for a, b in itertools.combinations(rowers, 2)})
+
+
+@pytest.mark.parametrize('objective', list(SEATING_OBJECTIVES))
+def test_fours_match_brute_force(objective):
+    rng = random.Random(objective)
+    for trial in range(150):
+        athletes = _crew(rng, 4, empty_seats=rng.choice([0, 0, 1, 2]))
+        sweep = trial % 3 != 0
+        pair_counts = _pair_counts(rng, athletes)
+        best = _brute_force_best(athletes, sweep, objective, pair_counts)
+        order = optimize_seat_order(athletes, sweep, objective, pair_counts)
+        if best is None:
+            assert order is None
+            continue
+        assert sorted(map(id, order)) == sorted(map(id, athletes))
+        assert _cost(order, athletes, sweep, objective, pair_counts) == best
+
+
+@pytest.mark.parametrize('objective', list(SEATING_OBJECTIVES))
+def test_eights_match_brute_force(objective):
+    rng = random.Random(f"eight-{objective}")
+    for trial in range(2):
+        athletes = _crew(rng, 8, empty_seats=trial)
+        pair_counts = _pair_counts(rng, athletes)
+        best = _brute_force_best(athletes, True, objective, pair_counts)
+        order = optimize_seat_order(athletes, True, objective, pair_counts)
+        if best is None:
+            assert order is None
+        else:
+            assert _cost(order, athletes, True, objective, pair_counts) == best
+
+
+def test_an_optimal_crew_is_left_in_place():
+    athletes = [Athlete(f"R{i}", 'M', 40, weight=160) for i in range(4)]
+    assert optimize_seat_order(athletes, True, 'balance') == athletes
+
+
+def test_unknown_objective_is_rejected():
+    with pytest.raises(ValueError):
+        optimize_seat_order([None, None], True, 'fastest')
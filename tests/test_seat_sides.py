@@ -0,0 +1,81 @@
+"""
+Sweep side feasibility and assignment against brute force
+"""
+import itertools
+
+import numpy as np
+
+from models.athlete import Athlete
+from services.seat_sides import PORT, STARBOARD, assign_sides, rigged_side, sides_feasible
+
+KINDS = {'both': (True, True), 'port': (True, False), 'starboard': (False, True), 'none': (False, False)}
+
+
+def _rower(kind):
+    port, starboard = KINDS[kind]
+    return Athlete(kind, 'M', 40, can_port=port, can_starboard=starboard)
+
+
+def _can_row(athlete, side):
+    return athlete.can_port if side == PORT else athlete.can_starboard
+
+
+def _brute_force_feasible(athletes, num_rowers):
+    """Whether some side per seated rower fits everyone with at most half the seats per side"""
+    seated = [a for a in athletes if a is not None]
+    for sides in itertools.product((PORT, STARBOARD), repeat=len(seated)):
+        if all(_can_row(a, s) for a, s in zip(seated, sides)) and \
+                sides.count(PORT) <= num_rowers // 2 and sides.count(STARBOARD) <= num_rowers // 2:
+            return True
+    return False
+
+
+def _crews(num_rowers):
+    """Every crew of rower kinds in every seating, empty seats included, for a boat size"""
+    for kinds in itertools.product(list(KINDS) + [None], repeat=num_rowers):
+        yield [_rower(kind) if kind else None for kind in kinds]
+
+
+def test_sides_feasible_matches_brute_force():
+    for num_rowers in (2, 4):
+        for athletes in _crews(num_rowers):
+            seated = [a for a in athletes if a is not None]
+            counts = (sum(a.can_port and not a.can_starboard for a in seated),
+                      sum(a.can_starboard and not a.can_port for a in seated),
+                      sum(not (a.can_port or a.can_starboard) for a in seated))
+            assert bool(sides_feasible(*counts, num_rowers)) == _brute_force_feasible(athletes, num_rowers)
+
+
+def test_sides_feasible_on_arrays():
+    port_only, starboard_only, unsided = np.array([0, 3, 1, 2]), np.array([4, 1, 0, 2]), np.array([0, 0, 1, 0])
+    assert sides_feasible(port_only, starboard_only, unsided, 8).tolist() == [True, True, False, True]
+
+
+def test_assign_sides_gives_a_valid_split_exactly_when_one_exists():
+    for num_rowers in (2, 4):
+        for athletes in _crews(num_rowers):
+            sides = assign_sides(athletes, num_rowers)
+            if not _brute_force_feasible(athletes, num_rowers):
+                assert sides is None
+                continue
+            assert len(sides) == len(athletes)
+            for athlete, side in zip(athletes, sides):
+                assert (side is None) == (athlete is None)
+                assert athlete is None or _can_row(athlete, side)
+            assert sides.count(PORT) <= num_rowers // 2 and sides.count(STARBOARD) <= num_rowers // 2
+
+
+def test_assign_sides_keeps_rigged_sides_when_possible():
+    athletes = [_rower('both') for _ in range(8)]
+    assert assign_sides(athletes, 8) == [rigged_side(i) for i in range(8)]
+    # One-sided rowers already on their rigged side move nobody
+    athletes[0], athletes[1] = _rower('starboard'), _rower('port')
+    assert assign_sides(athletes, 8) == [rigged_side(i) for i in range(8)]
+
+
+def test_eights_split_like_brute_force():
+    kinds = list(KINDS)
+    for mix in itertools.combinations_with_replacement(kinds, 8):
+        athletes = [_rower(kind) for kind in mix]
+        sides = assign_sides(athletes, 8)
+        assert (sides is not None) == _brute_force_feasible(athletes, 8)
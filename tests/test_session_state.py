@@ -0,0 +1,50 @@
+"""
+Session state revisions and the change journal
+"""
+import streamlit as st
+
+from models.session_state import StateTracker, get_state_tracker, record_change
+
+
+def test_replacing_a_container_bumps_its_revision(session):
+    session.lineups = {}
+    tracker = get_state_tracker()
+    before = tracker.revision('lineups')
+
+    session.lineups = {}
+    assert get_state_tracker().revision('lineups') == (before[0] + 1,)
+    assert tracker.changes_since(0, 'lineups')[-1].action == 'replace'
+
+
+def test_replacing_a_container_twice_between_syncs_is_seen(session):
+    # The second dict can reuse the freed first dict's id(); the tracker must still see a new container
+    session.lineups = {}
+    session.athletes = []
+    tracker = get_state_tracker()
+    for _ in range(20):
+        session.lineups = {}
+        session.lineups = {}
+        session.athletes = []
+        session.athletes = []
+        revisions = tracker.revision('lineups', 'athletes')
+        tracker.sync(st.session_state)
+        assert tracker.revision('lineups', 'athletes') == (revisions[0] + 1, revisions[1] + 1)
+
+
+def test_in_place_edits_are_journaled_with_their_key(session):
+    session.lineups = {}
+    tracker = get_state_tracker()
+    start = tracker.sequence
+    record_change('lineups', 'set_seat', 158)
+    record_change('pins', 'toggle', 158)
+    changes = tracker.changes_since(start)
+    assert [(c.domain, c.action, c.key) for c in changes] == [('lineups', 'set_seat', 158), ('pins', 'toggle', 158)]
+    assert tracker.changes_since(start, 'pins') == changes[1:]
+
+
+def test_journal_overflow_asks_for_a_full_refresh():
+    tracker = StateTracker(journal_size=3)
+    for i in range(5):
+        tracker.record('lineups', 'set_seat', i)
+    assert tracker.changes_since(0) is None
+    assert [c.key for c in tracker.changes_since(2)] == [2, 3, 4]
@@ -0,0 +1,63 @@
+"""
+Background runner for the lineup search
+"""
+import time
+from dataclasses import replace
+
+from services.lineup_search import LineupSearch
+from services.solver_runner import SolverRunner
+
+
+def _objective(state, lineups):
+    return LineupSearch(replace(state, lineups=lineups)).objective
+
+
+def test_zero_budget_returns_the_starting_lineups(preset_state):
+    runner = SolverRunner(preset_state, time_budget=0)
+    progress = runner.run()
+    assert progress.status == 'finished'
+    assert progress.iterations == 0 and progress.improvements == 0
+    assert progress.objective == progress.initial_objective
+    assert _objective(preset_state, runner.best_lineups()) == progress.initial_objective
+
+
+def test_cancel_keeps_the_best_lineups_so_far(preset_state):
+    runner = SolverRunner(preset_state, time_budget=60)
+    runner.start()
+    deadline = time.perf_counter() + 10
+    while runner.progress().iterations == 0 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    runner.cancel()
+
+    assert not runner.is_running()
+    progress = runner.progress()
+    assert progress.status == 'cancelled'
+    assert progress.elapsed < 60
+    best = runner.best_lineups()
+    assert _objective(preset_state, best) == progress.objective <= progress.initial_objective
+    assert [objective for _, objective in progress.history] == sorted(
+        (objective for _, objective in progress.history), reverse=True)
+
+
+def test_best_lineups_are_copies(preset_state):
+    runner = SolverRunner(preset_state, time_budget=0)
+    runner.run()
+    best = runner.best_lineups()
+    event_num = next(iter(best))
+    best[event_num]['athletes'][0] = None
+    assert runner.best_lineups()[event_num]['athletes'] == runner.search.snapshot()[event_num]['athletes']
+
+
+def test_runner_leaves_the_state_untouched(preset_state):
+    before = {e: (list(lineup['athletes']), lineup['coxswain']) for e, lineup in preset_state.lineups.items()}
+    runner = SolverRunner(preset_state, time_budget=0.2)
+    runner.run()
+    after = {e: (list(lineup['athletes']), lineup['coxswain']) for e, lineup in preset_state.lineups.items()}
+    assert after == before
+
+
+def test_cancel_before_start_stops_at_once(preset_state):
+    runner = SolverRunner(preset_state, time_budget=60)
+    runner.cancel()
+    progress = runner.run()
+    assert progress.status == 'cancelled' and progress.iterations == 0